@@ -14,9 +14,9 @@ class DecoratorsSqlAnalysis():
             def wrapper(self, *args, **kwargs):
                 f(self, *args, **kwargs)
                 if len(self.sw_columns) > 0:
-                    aql.joinon(self.db, self.sw_columns, ['run_id'],
-                               [self.sc_out, func_name],
-                               [self.sc_out, 'def_loop'], verbose=True)
+                    self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                                    [self.sc_out, func_name],
+                                    [self.sc_out, 'def_loop'], verbose=True)
             return wrapper
         return _append_sw_columns
 
@@ -24,8 +24,8 @@ class DecoratorsSqlAnalysis():
         def _append_pp_id_columns(f):
             def wrapper(self, *args, **kwargs):
                 f(self, *args, **kwargs)
-                aql.joinon(self.db, ['pt_id', 'fl_id', 'nd_id', 'pp'], ['pp_id'],
-                           [self.sc_out, func_name], [self.sc_out, 'def_plant'])
+                self.aql.joinon(self.db, ['pt_id', 'fl_id', 'nd_id', 'pp'], ['pp_id'],
+                                [self.sc_out, func_name], [self.sc_out, 'def_plant'])
             return wrapper
         return _append_pp_id_columns
 
@@ -33,8 +33,8 @@ class DecoratorsSqlAnalysis():
         def _append_pt_id_columns(f):
             def wrapper(self, *args, **kwargs):
                 f(self, *args, **kwargs)
-                aql.joinon(self.db, ['pt'], ['pt_id'],
-                           [self.sc_out, func_name], [self.sc_out, 'def_pp_type'])
+                self.aql.joinon(self.db, ['pt'], ['pt_id'],
+                                [self.sc_out, func_name], [self.sc_out, 'def_pp_type'])
             return wrapper
         return _append_pt_id_columns
 
@@ -42,8 +42,8 @@ class DecoratorsSqlAnalysis():
         def _append_fl_id_columns(f):
             def wrapper(self, *args, **kwargs):
                 f(self, *args, **kwargs)
-                aql.joinon(self.db, ['fl'], ['fl_id'],
-                           [self.sc_out, func_name], [self.sc_out, 'def_fuel'])
+                self.aql.joinon(self.db, ['fl'], ['fl_id'],
+                                [self.sc_out, func_name], [self.sc_out, 'def_fuel'])
             return wrapper
         return _append_fl_id_columns
 
@@ -51,9 +51,28 @@ class DecoratorsSqlAnalysis():
         def _append_nd_id_columns(f):
             def wrapper(self, *args, **kwargs):
                 f(self, *args, **kwargs)
-                aql.joinon(self.db, ['nd'], ['nd_id'],
-                           [self.sc_out, func_name], [self.sc_out, 'def_node'])
+                self.aql.joinon(self.db, ['nd'], ['nd_id'],
+                                [self.sc_out, func_name], [self.sc_out, 'def_node'])
             return wrapper
         return _append_nd_id_columns
 
+    def incremental(list_tb):
+        '''
+        Computes only new and replaced model runs if ``self.bool_incremental``.
 
+        Must be the outermost decorator. ``list_tb`` are the generated
+        table names, formatted with ``self.format_kw``, or a function
+        ``list_tb(self, *args, **kwargs)`` returning them.
+        '''
+        def _incremental(f):
+            def wrapper(self, *args, **kwargs):
+                if not getattr(self, 'bool_incremental', False):
+                    return f(self, *args, **kwargs)
+
+                _list_tb = (list_tb(self, *args, **kwargs)
+                            if callable(list_tb) else
+                            [tb.format(**self.format_kw) for tb in list_tb])
+
+                self.run_incremental(f, _list_tb, *args, **kwargs)
+            return wrapper
+        return _incremental
@@ -0,0 +1,740 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+In-process analysis of file outputs.
+
+The :class:`grimsel.analysis.sql_analysis.SqlAnalysis` classes generate
+their tables through PostgreSQL statements executed by the functions of
+:mod:`grimsel.auxiliary.sqlutils.aux_sql_func`. The :class:`FileBackend`
+provides the same functions on top of an embedded DuckDB database. The
+output tables of the ``fastparquet``, ``hdf5``, and ``duckdb`` output
+targets are exposed in the schema ``sc_out`` of this database, so all
+analysis products can be generated directly from the model output files::
+
+    >>> backend = FileBackend('output_dir', 'fastparquet', 'out_test',
+    ...                       slct_run_id=[0, 1, 2], threads=8)
+    >>> sqac = SqlAnalysis('out_test', None, backend=backend)
+    >>> sqac.build_tables_plant_run()
+    >>> df = backend.read_sql(None, 'out_test', 'analysis_plant_run')
+
+* **Run selection**: The run ids passed as ``slct_run_id`` are pushed down
+  to the file scans: Parquet files of other model runs are not read, all
+  other tables are filtered by their ``run_id`` column through parquet
+  row group statistics, PyTables queries, or DuckDB filter pushdown.
+* **Scans**: Parquet files are read through lazy views; the scans are
+  executed by DuckDB with ``threads`` threads. HDF5 tables are loaded
+  into the database the first time they are referenced by a statement.
+* **SQL dialect**: The PostgreSQL statements are translated by
+  :func:`translate_sql` (``SELECT ... INTO``, multiple ``ALTER TABLE``
+  actions, ``FLOAT`` and ``DECIMAL`` types, set-returning
+  ``generate_series``, ``width_bucket``). Integer divisions are truncated
+  as in PostgreSQL.
+
+Tables from other schemas (e.g. the comparison data used by
+:class:`grimsel.analysis.sql_analysis_comp.SqlAnalysisComp`) can be added
+through :meth:`FileBackend.register_table`.
+
+"""
+
+import os
+import re
+import time
+from glob import glob
+from collections import OrderedDict
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+import grimsel.auxiliary.sqlutils.aux_sql_func as aql
+import grimsel.auxiliary.maps as maps
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+OUTPUT_TARGETS = ('fastparquet', 'hdf5', 'duckdb')
+
+# PostgreSQL's width_bucket for increasing bounds
+MACRO_WIDTH_BUCKET = '''
+    CREATE OR REPLACE MACRO width_bucket(op, b1, b2, cnt) AS
+    CASE WHEN op IS NULL THEN NULL
+         WHEN op < b1 THEN 0
+         WHEN op >= b2 THEN cnt + 1
+         ELSE CAST(floor((op - b1)::DOUBLE * cnt / (b2 - b1)) AS INTEGER) + 1
+    END
+    '''
+
+_RE_LITERAL = re.compile(r'(\'(?:[^\']|\'\')*\')')
+_RE_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+_RE_INTO = re.compile(r'\bINTO\s+([\w{}."]+)\s*', re.IGNORECASE)
+_RE_ALTER = re.compile(r'^\s*(ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?[\w."]+)\s+(.*)$',
+                       re.IGNORECASE | re.DOTALL)
+_RE_DOUBLE = re.compile(r'\b(FLOAT|DECIMAL|NUMERIC)\b(?!\s*\()',
+                        re.IGNORECASE)
+_RE_GEN_SERIES = re.compile(r'\bgenerate_series\s*\(', re.IGNORECASE)
+_RE_QUERY = re.compile(r'^\s*\(?\s*(SELECT|WITH|VALUES|SHOW|DESCRIBE)\b',
+                       re.IGNORECASE)
+_RE_PARQ = re.compile(r'^(?P<tb>.+?)(_(?P<run_id>\d{4,}))?\.parq$')
+_RE_WORKER_CSV = re.compile(r'^(?P<tb>.+)_ForkPoolWorker-\d+\.csv$')
+
+
+def _split_outside_literals(exec_str, sep):
+    '''
+    Splits a string at all separator characters outside of string literals
+    and parentheses.
+    '''
+
+    list_part, part = [], []
+    depth, in_literal = 0, False
+
+    for char in exec_str:
+        if char == '\'':
+            in_literal = not in_literal
+        elif not in_literal:
+            depth += (char == '(') - (char == ')')
+
+        if char == sep and not in_literal and depth == 0:
+            list_part.append(''.join(part))
+            part = []
+        else:
+            part.append(char)
+
+    list_part.append(''.join(part))
+
+    return list_part
+
+
+def _sub_outside_literals(pattern, repl, exec_str):
+
+    parts = _RE_LITERAL.split(exec_str)
+    parts[::2] = [pattern.sub(repl, part) for part in parts[::2]]
+
+    return ''.join(parts)
+
+
+def _mask_literals(exec_str):
+    ''' Replaces string literals by blanks of the same length. '''
+
+    return _RE_LITERAL.sub(lambda m: ' ' * len(m.group()), exec_str)
+
+
+def _unnest_generate_series(stmt):
+    '''
+    Wraps ``generate_series`` calls in select lists by ``UNNEST``.
+
+    PostgreSQL's ``generate_series`` is set-returning, DuckDB's scalar
+    function returns a list. Calls in ``FROM`` and ``JOIN`` clauses
+    are table functions in both dialects and remain unchanged.
+    '''
+
+    pos = 0
+    while True:
+        masked = _mask_literals(stmt)
+        m = _RE_GEN_SERIES.search(masked, pos)
+        if not m:
+            return stmt
+
+        prev = masked[:m.start()].rstrip().split()
+        if prev and prev[-1].upper() in ('FROM', 'JOIN', 'UNNEST('):
+            pos = m.end()
+            continue
+
+        depth, end = 1, m.end()
+        while depth:
+            depth += (masked[end] == '(') - (masked[end] == ')')
+            end += 1
+
+        stmt = (stmt[:m.start()] + 'UNNEST(' + stmt[m.start():end] + ')'
+                + stmt[end:])
+        pos = end + len('UNNEST()')
+
+
+def translate_sql(exec_str):
+    '''
+    Translates PostgreSQL statements into DuckDB statements.
+
+    Only the constructs used by the analysis classes are covered:
+
+    * ``SELECT ... INTO tb FROM ...`` becomes ``CREATE TABLE tb AS ...``
+    * ``ALTER TABLE`` statements with several actions are split
+    * ``FLOAT`` and ``DECIMAL``/``NUMERIC`` without precision are double
+      precision (DuckDB's defaults are single precision and three
+      decimal places)
+    * ``generate_series`` in select lists returns rows
+
+    Parameters
+    ----------
+    exec_str : str
+        one or several ``;``-separated PostgreSQL statements
+
+    Returns
+    -------
+    list
+        list of DuckDB statements
+
+    '''
+
+    exec_str = _RE_COMMENT.sub(' ', exec_str)
+
+    list_stmt = []
+    for stmt in _split_outside_literals(exec_str, ';'):
+
+        if not stmt.strip():
+            continue
+
+        stmt = _sub_outside_literals(_RE_DOUBLE, 'DOUBLE', stmt)
+        stmt = _unnest_generate_series(stmt)
+
+        m_alter = _RE_ALTER.match(stmt)
+        if m_alter:
+            list_stmt += ['%s %s'%(m_alter.group(1), action.strip())
+                          for action in _split_outside_literals(
+                                                    m_alter.group(2), ',')]
+            continue
+
+        masked = _mask_literals(stmt)
+        m_into = next((m for m in _RE_INTO.finditer(masked)
+                       if not masked[:m.start()].rstrip().upper()
+                                                .endswith('INSERT')), None)
+        if m_into:
+            stmt = 'CREATE TABLE {} AS {} {}'.format(
+                        m_into.group(1), stmt[:m_into.start()],
+                        stmt[m_into.end():])
+
+        list_stmt.append(stmt.strip())
+
+    return list_stmt
+
+
+class FileBackend():
+    '''
+    Embedded DuckDB database exposing file outputs as SQL tables.
+
+    The methods have the signatures of the corresponding functions
+    of :mod:`grimsel.auxiliary.sqlutils.aux_sql_func`; the ``db``
+    arguments are ignored.
+
+    Parameters
+    ----------
+    cl_out : str
+        output file (``hdf5``, ``duckdb``) or directory (``fastparquet``)
+        as defined by the :class:`grimsel.core.io.IO` parameter ``cl_out``
+    output_target : str
+        one of ``('fastparquet', 'hdf5', 'duckdb')``
+    sc_out : str
+        schema name of the output tables; this is the ``sc_out``
+        argument of the analysis classes
+    slct_run_id : list or None
+        run ids to be included; all if ``None``
+    threads : int or None
+        number of DuckDB threads; DuckDB's default (number of cores)
+        if ``None``
+    database : str
+        DuckDB database holding the analysis tables; in-memory by default
+
+    '''
+
+    def __init__(self, cl_out, output_target, sc_out, slct_run_id=None,
+                 threads=None, database=':memory:'):
+
+        if duckdb is None:
+            raise ImportError('FileBackend requires the duckdb package.')
+
+        if not output_target in OUTPUT_TARGETS:
+            raise ValueError('FileBackend: output_target must be one of '
+                             '{}.'.format(OUTPUT_TARGETS))
+
+        self.cl_out = cl_out
+        self.output_target = output_target
+        self.sc_out = sc_out
+        self.slct_run_id = (list(map(int, slct_run_id))
+                            if slct_run_id is not None else None)
+
+        self.con = duckdb.connect(database)
+
+        if threads:
+            self.con.execute('SET threads = %d'%threads)
+        self.con.execute('SET integer_division = true')
+        self.con.execute(MACRO_WIDTH_BUCKET)
+
+        # unqualified table names refer to the public schema
+        self.con.execute('CREATE SCHEMA IF NOT EXISTS public')
+        self.con.execute('SET schema = \'public\'')
+        self.con.execute('CREATE SCHEMA IF NOT EXISTS %s'%sc_out)
+
+        # {schema: set of file tables}; views are not listed as tables
+        self._file_tables = {sc_out: set()}
+        # {(schema, table): loader function} of tables not yet loaded
+        self._pending = {}
+
+        getattr(self, '_register_%s'%output_target)()
+
+        logger.info('FileBackend: {} tables from {} in schema {}'.format(
+                        len(self._file_tables[sc_out]), cl_out, sc_out))
+
+    def __repr__(self):
+
+        return 'FileBackend({}, {}, sc_out={})'.format(self.cl_out,
+                                                       self.output_target,
+                                                       self.sc_out)
+
+    def close(self):
+
+        self.con.close()
+
+    def refresh(self):
+        '''
+        Updates the file tables after further model runs were written.
+
+        Used by the incremental analysis
+        (:mod:`grimsel.analysis.sql_analysis_incremental`).
+        '''
+
+        if self.output_target == 'duckdb':
+            self.con.execute('DETACH DATABASE IF EXISTS _output')
+
+        self._pending = {}
+        getattr(self, '_register_%s'%self.output_target)()
+
+    @property
+    def _run_id_str(self):
+
+        return '(%s)'%', '.join(map(str, self.slct_run_id))
+
+    def _get_where_run_id(self, cols):
+
+        if self.slct_run_id is None or not 'run_id' in cols:
+            return ''
+
+        return ' WHERE run_id IN %s'%self._run_id_str
+
+    def _create_view(self, tb, from_str, sc=None):
+        ''' Creates a view in schema ``sc``, filtered by run id. '''
+
+        sc = sc if sc else self.sc_out
+
+        cols = [c[0] for c in self.con.execute('DESCRIBE SELECT * FROM %s'
+                                               %from_str).fetchall()]
+
+        self.con.execute('CREATE OR REPLACE VIEW {sc}.{tb} AS SELECT * '
+                         'FROM {from_str}{where}'.format(
+                             sc=sc, tb=tb, from_str=from_str,
+                             where=self._get_where_run_id(cols)))
+
+        self._file_tables.setdefault(sc, set()).add(tb)
+
+    def _register_fastparquet(self):
+        '''
+        Creates a view for each table of the parquet output directory.
+
+        The files of model runs which are not selected are excluded.
+        '''
+
+        dict_tb_fn = {}
+        for fn in sorted(glob(os.path.join(self.cl_out, '*.parq'))):
+
+            m = _RE_PARQ.match(os.path.basename(fn))
+            dict_tb_fn.setdefault(m.group('tb'), []).append(
+                                    (m.group('run_id'), fn))
+
+        # rows of def_run and run_stats written by the run_parallel workers,
+        # before they are merged by ModelLoop._merge_df_run_files
+        dict_tb_csv = {}
+        for fn in sorted(glob(os.path.join(self.cl_out, '*.csv'))):
+
+            m = _RE_WORKER_CSV.match(os.path.basename(fn))
+            if m:
+                dict_tb_csv.setdefault(m.group('tb'), []).append(fn)
+
+        get_list_str = lambda list_fn: ', '.join('\'%s\''%fn for fn in list_fn)
+
+        for tb, list_fn in dict_tb_fn.items():
+
+            list_slct = [fn for run_id, fn in list_fn
+                         if run_id is None or self.slct_run_id is None
+                         or int(run_id) in self.slct_run_id]
+
+            if list_slct:
+                from_str = ('read_parquet([%s], union_by_name=true)'
+                            %get_list_str(list_slct))
+            else:
+                # no selected run: empty view with the table's columns
+                from_str = ('(SELECT * FROM read_parquet(\'%s\') LIMIT 0)'
+                            %list_fn[0][1])
+
+            if tb in dict_tb_csv:
+                # merged rows take precedence
+                from_str = ('''(SELECT * FROM {parq}
+                               UNION ALL BY NAME
+                               SELECT * FROM {csv}
+                               WHERE NOT run_id IN (SELECT run_id
+                                                    FROM {parq}))'''
+                            .format(parq=from_str,
+                                    csv=('read_csv([%s], union_by_name=true)'
+                                         %get_list_str(dict_tb_csv[tb]))))
+
+            self._create_view(tb, from_str)
+
+        for tb, list_fn in dict_tb_csv.items():
+
+            if not tb in dict_tb_fn:
+                self._create_view(tb, 'read_csv([%s], union_by_name=true)'
+                                      %get_list_str(list_fn))
+
+    def _register_duckdb(self):
+        ''' Attaches the DuckDB output file and creates views. '''
+
+        if not os.path.isfile(self.cl_out):
+            raise IOError('File %s not found.'%self.cl_out)
+
+        self.con.execute('ATTACH \'%s\' AS _output (READ_ONLY)'%self.cl_out)
+
+        list_tb = self.con.execute('''
+                                   SELECT table_name
+                                   FROM information_schema.tables
+                                   WHERE table_catalog = '_output'
+                                   AND table_type = 'BASE TABLE'
+                                   ''').fetchall()
+
+        for tb, in list_tb:
+            self._create_view(tb, '_output.main.%s'%tb)
+
+    def _register_hdf5(self):
+        '''
+        Collects the tables of the HDF5 output file.
+
+        The tables are loaded when they are first used.
+        '''
+
+        if not os.path.isfile(self.cl_out):
+            raise IOError('File %s not found.'%self.cl_out)
+
+        with pd.HDFStore(self.cl_out, mode='r') as store:
+            keys = [key.lstrip('/') for key in store.keys()]
+
+        for tb in keys:
+            self._file_tables[self.sc_out].add(tb)
+            self._pending[(self.sc_out, tb)] = self._load_hdf5
+
+    def _load_hdf5(self, sc, tb):
+        '''
+        Reads an HDF5 table and copies it to the database.
+
+        Selected run ids are passed to the PyTables query if ``run_id`` is
+        a data column.
+        '''
+
+        t = time.time()
+
+        with pd.HDFStore(self.cl_out, mode='r') as store:
+
+            storer = store.get_storer(tb)
+            is_data_col = (storer.is_table
+                           and 'run_id' in (storer.data_columns or []))
+
+            if self.slct_run_id is not None and is_data_col:
+                df = store.select(tb, where='run_id in %s'
+                                            %str(self.slct_run_id))
+            else:
+                df = store.select(tb)
+
+        if self.slct_run_id is not None and 'run_id' in df.columns:
+            df = df.loc[df.run_id.isin(self.slct_run_id)]
+
+        df = df.reset_index(drop=True)
+
+        self.con.register('_df_load', df)
+        self.con.execute('CREATE OR REPLACE TABLE {sc}.{tb} AS SELECT * '
+                         'FROM _df_load'.format(sc=sc, tb=tb))
+        self.con.unregister('_df_load')
+
+        logger.info('Loaded {} rows of table {} in {:.3f} sec'.format(
+                        len(df), tb, time.time() - t))
+
+    def _load_pending(self, exec_str=None, tables=None):
+        '''
+        Loads the pending tables referenced by the statement or listed in
+        ``tables``.
+
+        Parameters
+        ----------
+        exec_str : str
+            SQL statement; all ``schema.table`` references are loaded
+        tables : list
+            list of ``(schema, table)`` tuples
+
+        '''
+
+        if not self._pending:
+            return
+
+        tables = list(tables) if tables else []
+
+        if exec_str:
+            tables += re.findall(r'\b(\w+)\.(\w+)\b', exec_str)
+
+        for sc_tb in tables:
+            loader = self._pending.pop(tuple(sc_tb), None)
+            if loader:
+                loader(*sc_tb)
+
+    def register_table(self, sc, tb, data):
+        '''
+        Adds a table to the database.
+
+        Parameters
+        ----------
+        sc : str
+            schema name; created if it doesn't exist
+        tb : str
+            table name
+        data : DataFrame or str
+            table or parquet file name; files are registered as views
+
+        '''
+
+        self.con.execute('CREATE SCHEMA IF NOT EXISTS %s'%sc)
+
+        if isinstance(data, pd.DataFrame):
+            self.con.register('_df_load', data)
+            self.con.execute('CREATE OR REPLACE TABLE {sc}.{tb} AS SELECT * '
+                             'FROM _df_load'.format(sc=sc, tb=tb))
+            self.con.unregister('_df_load')
+            self._file_tables.setdefault(sc, set()).add(tb)
+        else:
+            self._create_view(tb, 'read_parquet(\'%s\')'%data, sc)
+
+    def _execute(self, list_stmt):
+
+        for stmt in list_stmt:
+            self.con.execute(stmt)
+
+        if list_stmt and _RE_QUERY.match(list_stmt[-1]):
+            return self.con.fetchall()
+
+    def exec_sql(self, exec_str, ret_res=True, time_msg=False, db=None,
+                 con_cur=None):
+        '''
+        Translates and executes PostgreSQL statements.
+
+        Returns the rows of the last statement if it is a query.
+        '''
+
+        t = time.time()
+
+        self._load_pending(exec_str)
+
+        result = self._execute(translate_sql(exec_str))
+
+        if time_msg:
+            print(time_msg, time.time() - t, 'seconds')
+
+        if ret_res:
+            return result
+
+    def get_sql_tables(self, sc, db=None, con_cur=None):
+        ''' Returns list of tables in schema, including the file tables. '''
+
+        list_tb = [tb for tb, in self.con.execute('''
+                        SELECT table_name
+                        FROM information_schema.tables
+                        WHERE table_schema = ?
+                        AND table_type = 'BASE TABLE'
+                        ''', [sc]).fetchall()]
+
+        return list_tb + sorted(self._file_tables.get(sc, set())
+                                - set(list_tb))
+
+    def get_sql_cols(self, tb, sc='public', db=None, con_cur=None):
+        '''
+        Returns the names and data types of the selected table as a
+        dictionary ``{'col_name': 'col_type', ...}``.
+        '''
+
+        self._load_pending(tables=[(sc, tb)])
+
+        return OrderedDict(self.con.execute('''
+                        SELECT column_name, data_type
+                        FROM information_schema.columns
+                        WHERE table_schema = ? AND table_name = ?
+                        ORDER BY ordinal_position
+                        ''', [sc, tb]).fetchall())
+
+    def read_sql(self, db=None, sc=None, tb=None, filt=False,
+                 filt_func=False, drop=False, keep=False, distinct=False,
+                 verbose=False, limit=None):
+        '''
+        Reads a table into a DataFrame.
+
+        See :func:`grimsel.auxiliary.sqlutils.aux_sql_func.read_sql`
+        for the ``filt``, ``filt_func``, and ``keep`` arguments.
+        '''
+
+        self._load_pending(tables=[(sc, tb)])
+
+        _keep = [keep] if isinstance(keep, str) else keep
+
+        if filt and any(not list(ff[1]) for ff in filt):
+            filt_str = 'FALSE'
+        elif filt:
+            filt_str = aql.assemble_filt_sql(filt,
+                                             filt_func if filt_func else {})
+        else:
+            filt_str = 'TRUE'
+
+        exec_str = ('SELECT {distinct}{keep} FROM {sc}.{tb} WHERE {filt}'
+                    '{limit}').format(distinct='DISTINCT ' if distinct else '',
+                                      keep=', '.join(_keep) if _keep else '*',
+                                      sc=sc, tb=tb, filt=filt_str,
+                                      limit=(' LIMIT %d'%limit
+                                             if isinstance(limit, int)
+                                             else ''))
+        if verbose:
+            print(exec_str)
+
+        df = self.con.execute(exec_str).df()
+
+        if drop:
+            df = df.drop(drop, axis=1)
+
+        return df[keep] if isinstance(keep, str) else df
+
+    def write_sql(self, df, db=None, sc=None, tb=None, if_exists=None,
+                  engine=None, chunksize=None, con_cur=None):
+        '''
+        Writes a DataFrame to the database.
+
+        With ``if_exists='append'``, columns missing in the existing table
+        are added and the columns are matched by name.
+        '''
+
+        self.con.execute('CREATE SCHEMA IF NOT EXISTS %s'%sc)
+        self.con.register('_df_write', df)
+
+        try:
+            exists = tb in self.get_sql_tables(sc)
+
+            if exists and if_exists == 'replace':
+                self.con.execute('DROP TABLE IF EXISTS %s.%s'%(sc, tb))
+            elif exists and not if_exists == 'append':
+                raise ValueError('Table %s.%s exists.'%(sc, tb))
+
+            if not exists or if_exists == 'replace':
+                self.con.execute('CREATE TABLE {sc}.{tb} AS SELECT * '
+                                 'FROM _df_write'.format(sc=sc, tb=tb))
+            else:
+                old_cols = self.get_sql_cols(tb, sc)
+                new_cols = self.con.execute('DESCRIBE SELECT * '
+                                            'FROM _df_write').fetchall()
+                for col, dtype, *_ in new_cols:
+                    if not col in old_cols:
+                        self.con.execute('ALTER TABLE {}.{} ADD COLUMN "{}" '
+                                         '{}'.format(sc, tb, col, dtype))
+
+                self.con.execute('INSERT INTO {sc}.{tb} BY NAME SELECT * '
+                                 'FROM _df_write'.format(sc=sc, tb=tb))
+        finally:
+            self.con.unregister('_df_write')
+
+    def init_table(self, tb_name, cols, schema='public', ref_schema=None,
+                   pk=[], unique=[], appendix='', bool_auto_fk=False,
+                   bool_return=False, db=None, con_cur=None,
+                   skip_if_exists=False, warn_if_exists=False):
+        '''
+        Drop and re-initialize table.
+
+        Default data types are taken from
+        :data:`grimsel.auxiliary.sqlutils.aux_sql_func.coldict`. Keys,
+        foreign keys, and the ``appendix`` are not applied: constraints
+        only slow down the updates of the analysis tables.
+        '''
+
+        _coldict = aql.get_coldict()
+
+        _cols = []
+        for icol in cols:
+            if not isinstance(icol, (tuple, list)):
+                icol = (icol,)
+
+            _cols.append(icol[:2] if len(icol) > 1
+                         else (icol[0], _coldict[icol[0]][0]))
+
+        exec_str = ('DROP TABLE IF EXISTS {sc}.{tb} CASCADE;\n'
+                    'CREATE TABLE {sc}.{tb} ({cols})').format(
+                        sc=schema, tb=tb_name,
+                        cols=',\n '.join(' '.join(c) for c in _cols))
+
+        self.exec_sql(exec_str)
+
+        return ', '.join([c[0] for c in _cols])
+
+    def joinon(self, db, new_col, on_col, tb_target, tb_source,
+               new_columns=True, verbose=False):
+        '''
+        Join columns from one table to another table.
+
+        See :func:`grimsel.auxiliary.sqlutils.aux_sql_func.joinon`.
+        '''
+
+        if not type(new_col) is dict:
+            new_col = {c: c for c in new_col}
+        if not type(on_col) is dict:
+            on_col = {c: c for c in on_col}
+
+        if type(tb_target) is str:
+            tb_target = tb_target.split('.')
+        if type(tb_source) is str:
+            tb_source = tb_source.split('.')
+
+        dict_type = self.get_sql_cols(tb_source[1], tb_source[0])
+
+        if any(not c in dict_type for c in list(new_col) + list(on_col)):
+            raise ValueError('joinon: Either new_col or on_col are not '
+                             'in tb_source.')
+
+        list_stmt = []
+        if new_columns:
+            list_stmt += ['ALTER TABLE {} ADD COLUMN IF NOT EXISTS {} {}'
+                          .format('.'.join(tb_target), col_tgt,
+                                  dict_type[col_src])
+                          for col_src, col_tgt in new_col.items()]
+
+        list_stmt.append(
+            'UPDATE {tg} AS tg SET {set_str} FROM {src} AS src WHERE {on_str}'
+            .format(tg='.'.join(tb_target), src='.'.join(tb_source),
+                    set_str=', '.join('%s = src.%s'%(col_tgt, col_src)
+                                      for col_src, col_tgt in new_col.items()),
+                    on_str=' AND '.join('tg.%s = src.%s'%(col_tgt, col_src)
+                                        for col_src, col_tgt
+                                        in on_col.items())))
+
+        if verbose:
+            print(';\n'.join(list_stmt))
+
+        t = time.time()
+        self._execute(list_stmt)
+
+        logger.info('Join columns {} from {} to {} in {:.3f} sec'.format(
+                        ', '.join(new_col.values()), '.'.join(tb_source),
+                        '.'.join(tb_target), time.time() - t))
+
+        return ';\n'.join(list_stmt)
+
+    def get_maps(self, sc=None):
+        '''
+        Returns a :class:`grimsel.auxiliary.maps.Maps` instance from the
+        definition tables of schema ``sc`` (default ``sc_out``).
+        '''
+
+        sc = sc if sc else self.sc_out
+        list_tb = self.get_sql_tables(sc)
+
+        dict_tb = {name: self.read_sql(sc=sc, tb='def_' + name)
+                   for name in maps.Maps.list_id_tbs
+                   if 'def_' + name in list_tb}
+
+        return maps.Maps.from_dicts(dict_tb)
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lazy reading of model results across runs.
+
+A :class:`ResultStore` opens the output collection of a model loop
+(``hdf5``, ``fastparquet``, ``duckdb``, or ``psql``) and returns lazy
+:class:`ResultTable` handles. Column selections and filters are collected
+first and only applied when the data is read:
+
+.. code:: python
+
+    store = ResultStore('output_dir', 'fastparquet')
+    df = (store['var_sy_pwr'].select(['sy', 'pp_id', 'value'])
+                             .where(nd='CH0', pt=['GAS_LIN', 'WIN_ONS'],
+                                    swco_vl='co10')
+                             .to_pandas())
+
+Names are translated to ids through :class:`grimsel.auxiliary.maps.Maps`
+before the scan. Filters on ``def_run`` columns (e.g. ``swco_vl``) are
+translated into ``run_id`` filters. With the ``fastparquet`` target, the
+files of the excluded model runs are not opened at all.
+
+"""
+
+import os
+import re
+from glob import glob
+
+import pandas as pd
+import fastparquet as pq
+
+import grimsel.auxiliary.sqlutils.aux_sql_func as aql
+from grimsel.auxiliary.filters import Filter
+from grimsel.auxiliary import input_cache
+from grimsel.auxiliary.maps import Maps
+from grimsel import _get_logger
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+logger = _get_logger(__name__)
+
+
+OUTPUT_TARGETS = ['hdf5', 'fastparquet', 'duckdb', 'psql']
+
+# per-run parquet files are named tb_{run_id}.parq
+_RE_PARQ = re.compile(r'^(?P<tb>.+?)(_(?P<run_id>\d{4,}))?\.parq$')
+
+# where keywords translated to ids through the Maps dictionaries
+_NAME_KEYS = ['nd', 'pt', 'fl', 'pp', 'ca', 'pf']
+
+# where keywords which can be translated to plant ids
+_PLANT_KEYS = {'nd': 'dict_plant_2_node_id',
+               'pt': 'dict_plant_2_pp_type_id',
+               'fl': 'dict_plant_2_fuel_id'}
+
+
+class ResultTable():
+    '''
+    Lazy handle of an output table.
+
+    Instances are generated by :meth:`ResultStore.table`. The methods
+    :meth:`select` and :meth:`where` return new handles; nothing is read
+    before :meth:`to_pandas` or :meth:`iter_chunks` are called.
+
+    '''
+
+    def __init__(self, store, tb, columns=None, filt=None):
+
+        self.store = store
+        self.tb = tb
+        self.columns = columns
+        self.filt = list(filt) if filt else []
+
+    def __repr__(self):
+
+        return 'ResultTable({}, columns={}, filt={})'.format(self.tb,
+                                                            self.columns,
+                                                            self.filt)
+
+    @property
+    def all_columns(self):
+        ''' List of all columns of the table. '''
+
+        return self.store.get_columns(self.tb)
+
+    def select(self, columns):
+        '''
+        Returns a handle reading the selected columns only.
+
+        Parameters
+        ----------
+        columns : str or list
+            selected column names
+
+        '''
+
+        columns = [columns] if isinstance(columns, str) else list(columns)
+
+        missing = [c for c in columns if not c in self.all_columns]
+        if missing:
+            raise ValueError('ResultTable {}: unknown columns '
+                             '{}.'.format(self.tb, missing))
+
+        return ResultTable(self.store, self.tb, columns, self.filt)
+
+    def where(self, **kwargs):
+        '''
+        Returns a handle reading the filtered rows only.
+
+        Keyword arguments are either
+
+        * table columns, e.g. ``run_id=[0, 1]`` or ``bool_out=False``
+        * names of nodes, plant types, fuels, plants, energy carriers, or
+          profiles (``nd``, ``pt``, ``fl``, ``pp``, ``ca``, ``pf``); these
+          are translated to the ids of the corresponding ``*_id`` column;
+          ``nd``, ``pt``, and ``fl`` are translated to ``pp_id`` for
+          tables without these columns
+        * columns of the ``def_run`` table, e.g. ``swco_vl='co10'``;
+          these are translated to ``run_id`` values
+
+        Scalar values are equivalent to single element lists.
+
+        Raises
+        ------
+        ValueError
+            if a keyword can't be translated into a column of the table
+            or if names are not defined
+
+        '''
+
+        filt = list(self.filt)
+        cols = self.all_columns
+
+        for key, vals in kwargs.items():
+
+            vals = (list(vals) if isinstance(vals, (list, tuple, set))
+                    else [vals])
+
+            if key in cols:
+                filt.append((key, vals))
+            elif key in _NAME_KEYS:
+                filt.append(self._get_name_filter(key, vals, cols))
+            elif (not self.tb == 'def_run' and 'run_id' in cols
+                  and key in self.store.get_columns('def_run')):
+                run_id = (self.store.table('def_run').select('run_id')
+                                    .where(**{key: vals}).to_pandas())
+                filt.append(('run_id', sorted(set(run_id.run_id.tolist()))))
+            else:
+                raise ValueError('ResultTable {}: can\'t filter by '
+                                 '{}.'.format(self.tb, key))
+
+        return ResultTable(self.store, self.tb, self.columns, filt)
+
+    def _get_name_filter(self, key, vals, cols):
+
+        dict_id = getattr(self.store.maps, 'dict_%s_id'%key, None) or {}
+
+        missing = [val for val in vals if not val in dict_id]
+        if missing:
+            raise ValueError('ResultTable {}: unknown {} names '
+                             '{}.'.format(self.tb, key, missing))
+
+        ids = [dict_id[val] for val in vals]
+
+        if key + '_id' in cols:
+            return (key + '_id', ids)
+
+        if key in _PLANT_KEYS and 'pp_id' in cols:
+            dict_pp = getattr(self.store.maps, _PLANT_KEYS[key])
+            return ('pp_id', [pp_id for pp_id, val_id in dict_pp.items()
+                              if val_id in ids])
+
+        raise ValueError('ResultTable {}: can\'t filter by '
+                         '{}.'.format(self.tb, key))
+
+    def iter_chunks(self, chunksize=None):
+        '''
+        Reads the table in chunks.
+
+        Parameters
+        ----------
+        chunksize : int or None
+            maximum number of rows per chunk; with the ``fastparquet``
+            target, each file is read separately in any case
+
+        Yields
+        ------
+        DataFrame
+
+        '''
+
+        columns = self.columns if self.columns else self.all_columns
+        flt = Filter(self.filt)
+
+        # filter columns need to be read, even if they are not selected
+        cols_read = columns + [c for c in flt.columns if not c in columns]
+
+        read = getattr(self.store, '_iter_%s'%self.store.output_target)
+
+        for df in read(self.tb, cols_read, flt, chunksize):
+            yield flt.apply(df)[columns].reset_index(drop=True)
+
+    def __iter__(self):
+
+        return self.iter_chunks()
+
+    def to_pandas(self, names=False):
+        '''
+        Reads the table.
+
+        Parameters
+        ----------
+        names : bool
+            if ``True``, name columns (``nd``, ``pt``, ...) are added
+            through :meth:`grimsel.auxiliary.maps.Maps.id_to_name`
+
+        Returns
+        -------
+        DataFrame
+
+        '''
+
+        list_df = list(self.iter_chunks())
+        df = (pd.concat(list_df, ignore_index=True) if len(list_df) > 1
+              else list_df[0])
+
+        if names:
+            df = self.store.maps.id_to_name(df)
+
+        return df
+
+
+class ResultStore():
+    '''
+    Read access to the output tables of a model loop.
+
+    Parameters
+    ----------
+    cl_out : str
+        output collection as in the ``io`` parameters of the model loop:
+        parquet directory, HDF5 or DuckDB file name, or PostgreSQL
+        output schema
+    output_target : str
+        one of ``'hdf5'``, ``'fastparquet'``, ``'duckdb'``, ``'psql'``
+    db : str or None
+        database name, only required for the ``psql`` target
+
+    Example
+    -------
+    >>> store = ResultStore('output.h5', 'hdf5')
+    >>> for df in store['var_sy_pwr'].where(run_id=0).iter_chunks(10**6):
+    ...     pass
+
+    '''
+
+    def __init__(self, cl_out, output_target, db=None):
+
+        if not output_target in OUTPUT_TARGETS:
+            raise ValueError('ResultStore: output_target must be one of '
+                             '{}.'.format(OUTPUT_TARGETS))
+
+        if output_target == 'duckdb' and duckdb is None:
+            raise ImportError('ResultStore: output target duckdb requires '
+                              'the duckdb package.')
+
+        if output_target == 'psql' and not db:
+            raise ValueError('ResultStore: output target psql requires the '
+                             'db parameter.')
+
+        if (output_target in ['hdf5', 'duckdb'] and not os.path.isfile(cl_out)
+            or output_target == 'fastparquet' and not os.path.isdir(cl_out)):
+            raise IOError('ResultStore: {} not found.'.format(cl_out))
+
+        self.cl_out = cl_out
+        self.output_target = output_target
+        self.db = db
+
+        self._maps = None
+        self._dict_columns = {}
+
+    def __repr__(self):
+
+        return 'ResultStore({}, {})'.format(self.cl_out, self.output_target)
+
+    def __getitem__(self, tb):
+
+        return self.table(tb)
+
+    @property
+    def maps(self):
+        ''' :class:`grimsel.auxiliary.maps.Maps` of the output tables. '''
+
+        if self._maps is None:
+            if self.output_target == 'fastparquet':
+                self._maps = Maps.from_parquet(self.cl_out)
+            elif self.output_target == 'hdf5':
+                self._maps = Maps.from_hdf5(self.cl_out)
+            elif self.output_target == 'duckdb':
+                self._maps = Maps.from_duckdb(self.cl_out)
+            else:
+                self._maps = Maps(self.cl_out, self.db)
+
+        return self._maps
+
+    @property
+    def tables(self):
+        ''' Sorted list of the output table names. '''
+
+        if self.output_target == 'fastparquet':
+            return sorted(self._get_parquet_files())
+
+        elif self.output_target == 'hdf5':
+            with pd.HDFStore(self.cl_out, mode='r') as store:
+                return sorted(key.lstrip('/') for key in store.keys())
+
+        elif self.output_target == 'duckdb':
+            with duckdb.connect(self.cl_out, read_only=True) as con:
+                return sorted(tb for tb, in
+                              con.execute('SHOW TABLES').fetchall())
+
+        return sorted(aql.get_sql_tables(self.cl_out, self.db))
+
+    def table(self, tb):
+        '''
+        Returns the lazy handle of table ``tb``.
+
+        Returns
+        -------
+        ResultTable
+
+        '''
+
+        if not tb in self.tables:
+            raise ValueError('ResultStore: table {} not found in '
+                             '{}.'.format(tb, self.cl_out))
+
+        return ResultTable(self, tb)
+
+    def get_columns(self, tb):
+        ''' Returns the column names of table ``tb``. '''
+
+        if not tb in self._dict_columns:
+
+            if self.output_target == 'fastparquet':
+                fn = self._get_parquet_files()[tb][0][1]
+                cols = list(pq.ParquetFile(fn).columns)
+
+            elif self.output_target == 'hdf5':
+                with pd.HDFStore(self.cl_out, mode='r') as store:
+                    cols = list(store.select(tb, stop=0).columns)
+
+            elif self.output_target == 'duckdb':
+                with duckdb.connect(self.cl_out, read_only=True) as con:
+                    cols = [c[0] for c in
+                            con.execute('DESCRIBE %s'%tb).fetchall()]
+
+            else:
+                cols = list(aql.get_sql_cols(tb, self.cl_out, self.db))
+
+            self._dict_columns[tb] = cols
+
+        return self._dict_columns[tb]
+
+    def _get_parquet_files(self):
+        '''
+        Collects the parquet files of the output directory.
+
+        Returns
+        -------
+        dict
+            ``{table name: [(run_id or None, file name), ...]}``
+
+        '''
+
+        dict_tb_fn = {}
+        for fn in sorted(glob(os.path.join(self.cl_out, '*.parq'))):
+
+            m = _RE_PARQ.match(os.path.basename(fn))
+            run_id = m.group('run_id')
+            dict_tb_fn.setdefault(m.group('tb'), []).append(
+                        (int(run_id) if run_id is not None else None, fn))
+
+        return dict_tb_fn
+
+    @staticmethod
+    def _get_run_id_filter(flt):
+        ''' Returns the set of filtered run ids or ``None``. '''
+
+        slct_run_id = None
+
+        for col, vals in flt.filt:
+            if col == 'run_id':
+                vals = set(vals)
+                slct_run_id = (vals if slct_run_id is None
+                               else slct_run_id & vals)
+
+        return slct_run_id
+
+    @staticmethod
+    def _split_chunks(df, chunksize):
+
+        if not chunksize or len(df) <= chunksize:
+            yield df
+        else:
+            for start in range(0, len(df), chunksize):
+                yield df.iloc[start:start + chunksize]
+
+    def _iter_fastparquet(self, tb, columns, flt, chunksize):
+        '''
+        Reads the parquet files of the table.
+
+        Per-run files of excluded model runs are skipped; the row group
+        statistics are used to skip row groups within the files.
+        '''
+
+        slct_run_id = self._get_run_id_filter(flt)
+
+        list_fn = [fn for run_id, fn in self._get_parquet_files()[tb]
+                   if run_id is None or slct_run_id is None
+                   or run_id in slct_run_id]
+
+        logger.debug('Reading {} of table {}'.format(len(list_fn), tb))
+
+        if not list_fn:
+            yield pd.DataFrame(columns=columns)
+
+        for fn in list_fn:
+            df = input_cache.read_table(fn, flt, columns)
+            yield from self._split_chunks(df, chunksize)
+
+    def _iter_hdf5(self, tb, columns, flt, chunksize):
+        '''
+        Reads the HDF5 table. Filters on data columns are applied by the
+        PyTables query.
+        '''
+
+        with pd.HDFStore(self.cl_out, mode='r') as store:
+
+            storer = store.get_storer(tb)
+
+            if storer.is_table:
+                where = flt.to_hdf5(storer.data_columns or [])
+                result = store.select(tb, where=where or None,
+                                      columns=columns, chunksize=chunksize)
+            else:
+                result = self._split_chunks(store.select(tb)[columns],
+                                            chunksize)
+
+            if isinstance(result, pd.DataFrame):
+                yield result
+            else:
+                nchunks = 0
+                for df in result:
+                    nchunks += 1
+                    yield df
+
+                if not nchunks:
+                    yield pd.DataFrame(columns=columns)
+
+    def _iter_duckdb(self, tb, columns, flt, chunksize):
+
+        exec_str = 'SELECT {cols} FROM {tb} WHERE {filt}'.format(
+                        cols=', '.join(columns), tb=tb, filt=flt.to_sql())
+
+        with duckdb.connect(self.cl_out, read_only=True) as con:
+
+            res = con.execute(exec_str)
+
+            if not chunksize:
+                yield res.df()
+                return
+
+            nchunks = 0
+            while True:
+                rows = res.fetchmany(chunksize)
+
+                if nchunks and not rows:
+                    break
+
+                yield pd.DataFrame.from_records(rows, columns=columns)
+                nchunks += 1
+
+                if not rows:
+                    break
+
+    def _iter_psql(self, tb, columns, flt, chunksize):
+
+        result = aql.read_sql(self.db, self.cl_out, tb,
+                              filt=flt.filt if flt else False, keep=columns,
+                              chunksize=chunksize)
+
+        if isinstance(result, pd.DataFrame):
+            yield result
+        else:
+            yield from result
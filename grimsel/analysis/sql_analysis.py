@@ -11,62 +11,85 @@ import grimsel.auxiliary.sqlutils.aux_sql_func as aql
 import grimsel.auxiliary.timemap as tm
 
 from grimsel.analysis.sql_analysis_hourly import SqlAnalysisHourly
+from grimsel.analysis.sql_analysis_incremental import SqlAnalysisIncremental
 from grimsel.analysis.decorators import DecoratorsSqlAnalysis
 
 
+def _list_tb_plant_run(self, list_timescale=None):
+    ''' Table names of the build_tables_plant_run methods. '''
 
+    return ['analysis_plant_{}run_tot'.format(ts + '_' if ts != '' else '')
+            for ts in (list_timescale if list_timescale is not None else [''])]
 
 
-class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
+class SqlAnalysis(SqlAnalysisHourly, SqlAnalysisIncremental,
+                  DecoratorsSqlAnalysis):
     ''' Performs various SQL-based analyses on the output tables. '''
 
     def __init__(self, sc_out, db, slct_run_id=None, bool_run=True, nd_id=False,
-                 suffix=False, slct_pt=False, sw_year_col='swyr_vl'):
-        ''' Init extracts model run parameter names from def_run table. '''
+                 suffix=False, slct_pt=False, sw_year_col='swyr_vl',
+                 backend=None, incremental=False):
+        '''
+        Init extracts model run parameter names from def_run table.
+
+        Parameters
+        ----------
+        backend : :class:`grimsel.analysis.file_backend.FileBackend` or None
+            executes the analysis on the file output tables instead of
+            the PostgreSQL database ``db``
+        incremental : bool
+            if True, the methods decorated with
+            :meth:`DecoratorsSqlAnalysis.incremental` only add new and
+            replaced model runs to existing analysis tables; see
+            :mod:`grimsel.analysis.sql_analysis_incremental`
+
+        '''
 
 
         self.bool_run = bool_run
 
+        self.aql = backend if backend else aql
+
+        self.bool_incremental = incremental
+        self._slct_run_id_arg = slct_run_id
+
         self.db = db
 
         self.sc_out = sc_out
-        self.slct_run_id = (aql.read_sql(self.db, self.sc_out, 'def_run',
-                                         keep='run_id', distinct=True).tolist()
+        self.slct_run_id = (self.aql.read_sql(self.db, self.sc_out, 'def_run',
+                                              keep='run_id', distinct=True).tolist()
                             if not slct_run_id else slct_run_id)
         self._suffix = '_' + suffix if suffix else ''
         self.sw_columns = [c for c in
-                           aql.read_sql(self.db, sc_out,
-                                        'def_run').columns
-                           if 'sw' in c and 'vl' in c]
-
-        self.sw_columns = [c for c in
-                           aql.get_sql_cols('def_run', sc_out, self.db).keys()
+                           self.aql.get_sql_cols('def_run', sc_out, self.db).keys()
                            if 'sw' in c and 'vl' in c]
 
 
         self.in_run_id = '(' + ', '.join(map(str, self.slct_run_id)) + ')'
-        self._nd_id = nd_id if nd_id else aql.read_sql(self.db, sc_out, 'def_node',
-                                                       filt=[('0', ['0'])],
-                                                       keep=['nd_id'])['nd_id'].tolist()
+        self._nd_id = nd_id if nd_id else self.aql.read_sql(self.db, sc_out, 'def_node',
+                                                            filt=[('0', ['0'])],
+                                                            keep=['nd_id'])['nd_id'].tolist()
         self.in_nd_id = '(' + ', '.join(map(str, self._nd_id)) + ')'
 
 
-        _nd = aql.read_sql(self.db, sc_out, 'def_node', filt=[('0', ['0'])],
-                           keep=['nd'])['nd'].tolist()
+        _nd = self.aql.read_sql(self.db, sc_out, 'def_node', filt=[('0', ['0'])],
+                                keep=['nd'])['nd'].tolist()
         self.in_nd = '(' + ', '.join(['\'' + str(c) + '\'' for c in _nd]) + ')'
 
 
 
         # get time resolution
-        self.time_res = aql.read_sql(self.db, sc_out, 'tm_soy').iloc[0]['weight']
+        self.time_res = self.aql.read_sql(self.db, sc_out, 'tm_soy', keep=['weight'],
+                                          limit=1).iloc[0]['weight']
 
         try:
-            self.tm_cols = aql.read_sql(self.db, self.sc_out, 'tm_soy_full').columns.tolist()
+            self.tm_cols = self.aql.read_sql(self.db, self.sc_out, 'tm_soy_full',
+                                             limit=0).columns.tolist()
         except:
             print('Generating complete timemap...', end=' ')
             timemap = tm.TimeMap(self.time_res)
             self.tm_cols = timemap.df_time_red.columns.tolist()
-            aql.write_sql(timemap.df_time_red, self.db, self.sc_out, 'tm_soy_full', 'replace')
+            self.aql.write_sql(timemap.df_time_red, self.db, self.sc_out, 'tm_soy_full', 'replace')
             print('done.')
 
 
@@ -79,15 +102,15 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
 
 #        list_pt_id = self.list_to_str(aql.read_sql(self.db, self.sc_out, 'def_pp_type',
 #                                                   filt=[('pt', slct_pt + ['%STO%'], ' LIKE ')] if slct_pt else False)['pt_id'])
-        list_pt_id = aql.read_sql(self.db, self.sc_out, 'def_pp_type',
-                                  filt=[('pt', slct_pt, ' LIKE ')] if slct_pt else False)['pt_id']
-        self.slct_pp_id = aql.read_sql(self.db, self.sc_out, 'def_plant',
-                                  filt=[('pt_id', list_pt_id),
-                                        ('nd_id', self._nd_id)])['pp_id'].tolist()
+        list_pt_id = self.aql.read_sql(self.db, self.sc_out, 'def_pp_type',
+                                       filt=[('pt', slct_pt, ' LIKE ')] if slct_pt else False)['pt_id']
+        self.slct_pp_id = self.aql.read_sql(self.db, self.sc_out, 'def_plant',
+                                       filt=[('pt_id', list_pt_id),
+                                             ('nd_id', self._nd_id)])['pp_id'].tolist()
 
-        list_slct_pp_id =  self.list_to_str(aql.read_sql(self.db, self.sc_out, 'def_plant',
-                                                         filt=[('pt_id', list_pt_id.tolist(), ' = '),
-                                                               ('nd_id', self._nd_id)] if slct_pt else False)['pp_id'])
+        list_slct_pp_id =  self.list_to_str(self.aql.read_sql(self.db, self.sc_out, 'def_plant',
+                                                              filt=[('pt_id', list_pt_id.tolist(), ' = '),
+                                                                    ('nd_id', self._nd_id)] if slct_pt else False)['pp_id'])
 
         self.format_kw = {'sfx': self._suffix, 'sc_out': self.sc_out,
                           'in_run_id': self.in_run_id,
@@ -123,7 +146,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                         SELECT pp_id, ca_id, run_id, value AS cap_erg_tot
                         FROM {sc_out}.var_yr_cap_erg_tot) AS cap
                     '''.format(**self.format_kw)
-        aql.exec_sql(exec_str, db=self.db)
+        self.aql.exec_sql(exec_str, db=self.db)
 
         # %%  /* DURING HOW MANY HOURS IS THE OUTPUT/INPUT NOT ZERO? */
         #      --> SELECTICE CAPACITY FACTOR
@@ -148,21 +171,21 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                            erg_yr_sy, cap_pwr_tot, cf_sy
                        FROM {sc_out}.analysis_plant_run_tot) AS erg
                    '''.format(**self.format_kw, threshold_cf_sub=threshold_cf_sub)
-        aql.exec_sql(exec_str, db=self.db)
+        self.aql.exec_sql(exec_str, db=self.db)
 
 
         for itb in ['analysis_selective_cf_storage', 'analysis_max_share_cap_erg']:
 
-            aql.joinon(self.db, self.sw_columns, ['run_id'],
-                       [self.sc_out, itb], [self.sc_out, 'def_run'])
-            aql.joinon(self.db, ['nd_id', 'pt_id', 'fl_id', 'pp'], ['pp_id'],
-                       [self.sc_out, itb], [self.sc_out, 'def_plant'])
-            aql.joinon(self.db, ['fl'], ['fl_id'],
-                       [self.sc_out, itb], [self.sc_out, 'def_fuel'])
-            aql.joinon(self.db, ['nd'], ['nd_id'],
-                       [self.sc_out, itb], [self.sc_out, 'def_node'])
-            aql.joinon(self.db, ['pt'], ['pt_id'],
-                       [self.sc_out, itb], [self.sc_out, 'def_pp_type'])
+            self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                            [self.sc_out, itb], [self.sc_out, 'def_run'])
+            self.aql.joinon(self.db, ['nd_id', 'pt_id', 'fl_id', 'pp'], ['pp_id'],
+                            [self.sc_out, itb], [self.sc_out, 'def_plant'])
+            self.aql.joinon(self.db, ['fl'], ['fl_id'],
+                            [self.sc_out, itb], [self.sc_out, 'def_fuel'])
+            self.aql.joinon(self.db, ['nd'], ['nd_id'],
+                            [self.sc_out, itb], [self.sc_out, 'def_node'])
+            self.aql.joinon(self.db, ['pt'], ['pt_id'],
+                            [self.sc_out, itb], [self.sc_out, 'def_pp_type'])
 
 
     def generate_total_vc(self):
@@ -182,18 +205,18 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                    LEFT JOIN {sc_out}.par_vc_co2 AS vcco
                        ON vcfl.run_id = vcco.run_id AND vcfl.pp_id = vcco.pp_id;
                    '''.format(**self.format_kw, tb_name=tb_name)
-        aql.exec_sql(exec_str, db=self.db)
-
-        aql.joinon(self.db, self.sw_columns, ['run_id'],
-                   [self.sc_out, tb_name], [self.sc_out, 'def_run'])
-        aql.joinon(self.db, ['nd_id', 'pt_id', 'fl_id', 'pp'], ['pp_id'],
-                   [self.sc_out, tb_name], [self.sc_out, 'def_plant'])
-        aql.joinon(self.db, ['fl'], ['fl_id'],
-                   [self.sc_out, tb_name], [self.sc_out, 'def_fuel'])
-        aql.joinon(self.db, ['nd'], ['nd_id'],
-                   [self.sc_out, tb_name], [self.sc_out, 'def_node'])
-        aql.joinon(self.db, ['pt'], ['pt_id'],
-                   [self.sc_out, tb_name], [self.sc_out, 'def_pp_type'])
+        self.aql.exec_sql(exec_str, db=self.db)
+
+        self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                        [self.sc_out, tb_name], [self.sc_out, 'def_run'])
+        self.aql.joinon(self.db, ['nd_id', 'pt_id', 'fl_id', 'pp'], ['pp_id'],
+                        [self.sc_out, tb_name], [self.sc_out, 'def_plant'])
+        self.aql.joinon(self.db, ['fl'], ['fl_id'],
+                        [self.sc_out, tb_name], [self.sc_out, 'def_fuel'])
+        self.aql.joinon(self.db, ['nd'], ['nd_id'],
+                        [self.sc_out, tb_name], [self.sc_out, 'def_node'])
+        self.aql.joinon(self.db, ['pt'], ['pt_id'],
+                        [self.sc_out, tb_name], [self.sc_out, 'def_pp_type'])
 
     def generate_view_time_series_subset(self):
         '''
@@ -216,10 +239,10 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                                   WHERE nd_id in {in_nd_id})
                     AND pp_id in {list_slct_pp_id};
                     ''').format(**self.format_kw)
-        aql.exec_sql(exec_str, db=self.db)
+        self.aql.exec_sql(exec_str, db=self.db)
 
 
-        if 'var_sy_erg_st' in aql.get_sql_tables(self.sc_out, self.db):
+        if 'var_sy_erg_st' in self.aql.get_sql_tables(self.sc_out, self.db):
             exec_str = ('''
                         DROP VIEW IF EXISTS {sc_out}.analysis_time_series_view_energy CASCADE;
                         CREATE VIEW {sc_out}.analysis_time_series_view_energy AS
@@ -234,7 +257,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                                       WHERE nd_id in {in_nd_id})
                         AND pp_id in {list_slct_pp_id};
                         ''').format(**self.format_kw)
-            aql.exec_sql(exec_str, db=self.db)
+            self.aql.exec_sql(exec_str, db=self.db)
 
         exec_str = ('''
                     DROP VIEW IF EXISTS {sc_out}.analysis_time_series_view_crosssector_0 CASCADE;
@@ -270,7 +293,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                     LEFT JOIN (SELECT pp, pp_id FROM {sc_out}.def_plant) AS dfpp ON dfpp.pp = tb.pp
                     GROUP BY sy, ca_id, pp_id, bool_out, run_id, pwrerg_cat;
                     ''').format(**self.format_kw)
-        aql.exec_sql(exec_str, db=self.db)
+        self.aql.exec_sql(exec_str, db=self.db)
 
 
     def post_analysis_erg_sto_res(self):
@@ -332,6 +355,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
 
 
     # %%
+    @DecoratorsSqlAnalysis.incremental(_list_tb_plant_run)
     def build_tables_plant_run(self, list_timescale=None):
         '''
         Calculates the main indicators of interest from the model output
@@ -382,7 +406,9 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                             pwr.bool_out,
                             pwr.ca_id,
                             pwr.pp_id,
+                            dfpp.pt_id,
                             dfpp.fl_id,
+                            dfpp.nd_id,
                             dfnd.tm_id,
                             {col_timescale_id}
                             SUM(dffl.co2_int * pwr.value * tmsoy.weight * (ppca.factor_lin_0 + 0.5 * pwr.value * ppca.factor_lin_1)) AS co2_yr_sy,
@@ -390,24 +416,22 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                             SUM(pwr.value * tmsoy.weight) AS erg_yr_sy,
                             COUNT(pwr.run_id) AS count_check
                         FROM (SELECT * FROM {sc_out}.var_sy_pwr WHERE run_id IN {in_run_id}) AS pwr
-                        NATURAL LEFT JOIN (SELECT nd_id, tm_id FROM {sc_out}.def_node) AS dfnd
+                        LEFT JOIN (SELECT pp_id, pt_id, fl_id, nd_id FROM {sc_out}.def_plant) AS dfpp
+                            ON dfpp.pp_id = pwr.pp_id
                         LEFT JOIN (SELECT run_id, sy, nd_id, value FROM {sc_out}.dual_supply) AS mc
-                            ON mc.run_id = pwr.run_id AND mc.nd_id = dfplt.nd_id AND mc.sy = pwr.sy
-                        LEFT JOIN {sc_out}.par_pp_eff AS eff
-                            ON eff.pp_id = pwr.pp_id AND eff.run_id = pwr.run_id AND eff.ca_id = pwr.ca_id
+                            ON mc.run_id = pwr.run_id AND mc.nd_id = dfpp.nd_id AND mc.sy = pwr.sy
                         LEFT JOIN (SELECT pp_id, ca_id, factor_lin_0, factor_lin_1 FROM {sc_out}.plant_encar) AS ppca
                             ON ppca.pp_id = pwr.pp_id AND ppca.ca_id = pwr.ca_id
-                        LEFT JOIN (SELECT pp_id, fl_id, nd_id FROM {sc_out}.def_plant) AS dfpp
-                            ON dfpp.pp_id = pwr.pp_id
                         LEFT JOIN (SELECT co2_int, fl_id FROM {sc_out}.def_fuel) AS dffl
                             ON dfpp.fl_id = dffl.fl_id
-                        LEFT JOIN (SELECT nd_id, price_co2 FROM {sc_out}.def_node) AS dfnd
+                        LEFT JOIN (SELECT nd_id, tm_id FROM {sc_out}.def_node) AS dfnd
                             ON dfpp.nd_id = dfnd.nd_id
                         LEFT JOIN (SELECT tm_id, weight, sy FROM {sc_out}.tm_soy) AS tmsoy
                             ON pwr.sy = tmsoy.sy AND dfnd.tm_id = tmsoy.tm_id
                         {join_timescale_id}
                         GROUP BY pwr.run_id, pwr.ca_id, {col_timescale_id}
-                                 pwr.pp_id, pwr.bool_out;
+                                 pwr.pp_id, pwr.bool_out, dfpp.pt_id,
+                                 dfpp.fl_id, dfpp.nd_id, dfnd.tm_id;
 
                         /* ADD DERIVED COLUMNS */
                         DROP VIEW IF EXISTS plant_{tb_mod}run_01 CASCADE;
@@ -445,7 +469,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                         DROP VIEW IF EXISTS plant_{tb_mod}run_2;
                         CREATE VIEW plant_{tb_mod}run_2 AS
                         SELECT pr1.*,
-                            pr1.val_yr_0 / NULLIF(cap_pwr_tot, 0) AS val_yr_0_cap,
+                            pr1.val_yr_sy / NULLIF(cap_pwr_tot, 0) AS val_yr_sy_cap,
                             erg_yr_sy / NULLIF(cap_pwr_tot * 8760, 0) AS cf_sy
                         FROM plant_{tb_mod}run_1 AS pr1;
 
@@ -456,7 +480,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
 
             if self.bool_run:
                 print(exec_str)
-                aql.exec_sql(exec_str, db=self.db, ret_res=False)
+                self.aql.exec_sql(exec_str, db=self.db, ret_res=False)
 
                 itb = '''
                       analysis_plant_{tb_mod}run_tot
@@ -470,21 +494,22 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
 
                 print(itb)
 
-                aql.joinon(self.db, ['pp_broad_cat', 'pt'], ['pt_id'],
-                           [self.sc_out, itb], [self.sc_out, 'def_pp_type'])
-                aql.joinon(self.db, self.sw_columns, ['run_id'],
-                           [self.sc_out, itb], [self.sc_out, 'def_run'])
-                aql.joinon(self.db, ['fl_id', 'pp'], ['pp_id'],
-                           [self.sc_out, itb], [self.sc_out, 'def_plant'])
-                aql.joinon(self.db, ['fl'], ['fl_id'],
-                           [self.sc_out, itb], [self.sc_out, 'def_fuel'])
-                aql.joinon(self.db, ['nd'], ['nd_id'],
-                           [self.sc_out, itb], [self.sc_out, 'def_node'])
+                self.aql.joinon(self.db, ['pp_broad_cat', 'pt'], ['pt_id'],
+                                [self.sc_out, itb], [self.sc_out, 'def_pp_type'])
+                self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                                [self.sc_out, itb], [self.sc_out, 'def_run'])
+                self.aql.joinon(self.db, ['pp'], ['pp_id'],
+                                [self.sc_out, itb], [self.sc_out, 'def_plant'])
+                self.aql.joinon(self.db, ['fl'], ['fl_id'],
+                                [self.sc_out, itb], [self.sc_out, 'def_fuel'])
+                self.aql.joinon(self.db, ['nd'], ['nd_id'],
+                                [self.sc_out, itb], [self.sc_out, 'def_node'])
 
         return exec_str
 
 
     # %%
+    @DecoratorsSqlAnalysis.incremental(_list_tb_plant_run)
     def build_tables_plant_run_new(self, list_timescale=None):
         '''
         Calculates the main indicators of interest from the model output
@@ -532,8 +557,8 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                     ('erg_yr_sy', 'DOUBLE PRECISION'),
                    ] + ([(timescale, 'SMALLINT')] if timescale else [])
             pk = ['run_id', 'pp_id', 'ca_id', 'bool_out'] + ([timescale] if timescale else [])
-            cols = aql.init_table(tb_name=tb_name, cols=cols, schema=self.sc_out,
-                                  pk=pk, db=self.db)
+            cols = self.aql.init_table(tb_name=tb_name, cols=cols, schema=self.sc_out,
+                                       pk=pk, db=self.db)
 
 
             exec_str = ('''
@@ -571,30 +596,30 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                         ).format(cols=cols, tb_name=tb_name,
                                  **self.format_kw, **time_scale_kw)
             if self.bool_run:
-                aql.exec_sql(exec_str, db=self.db, ret_res=False)
+                self.aql.exec_sql(exec_str, db=self.db, ret_res=False)
 
                 itb = '''
                       analysis_plant_{tb_mod}run_tot
                       '''.format(**self.format_kw, **time_scale_kw)
 
-                aql.joinon(self.db, ['fl_id', 'pt_id', 'pp'], ['pp_id'],
-                           [self.sc_out, itb], [self.sc_out, 'def_plant'])
-                aql.joinon(self.db, ['fl'], ['fl_id'],
-                           [self.sc_out, itb], [self.sc_out, 'def_fuel'])
-                aql.joinon(self.db, ['nd'], ['nd_id'],
-                           [self.sc_out, itb], [self.sc_out, 'def_node'])
-                aql.joinon(self.db, ['pt'], ['pt_id'],
-                           [self.sc_out, itb], [self.sc_out, 'def_pp_type'])
-                aql.joinon(self.db, {'value': 'cap_pwr_tot'},
-                           ['pp_id', 'ca_id', 'run_id'],
-                           [self.sc_out, itb], [self.sc_out, 'var_yr_cap_pwr_tot'])
-                aql.joinon(self.db, {'value': 'cap_pwr_leg'},
-                           ['pp_id', 'ca_id', 'run_id'],
-                           [self.sc_out, itb], [self.sc_out, 'par_cap_pwr_leg'])
+                self.aql.joinon(self.db, ['fl_id', 'pt_id', 'pp'], ['pp_id'],
+                                [self.sc_out, itb], [self.sc_out, 'def_plant'])
+                self.aql.joinon(self.db, ['fl'], ['fl_id'],
+                                [self.sc_out, itb], [self.sc_out, 'def_fuel'])
+                self.aql.joinon(self.db, ['nd'], ['nd_id'],
+                                [self.sc_out, itb], [self.sc_out, 'def_node'])
+                self.aql.joinon(self.db, ['pt'], ['pt_id'],
+                                [self.sc_out, itb], [self.sc_out, 'def_pp_type'])
+                self.aql.joinon(self.db, {'value': 'cap_pwr_tot'},
+                                ['pp_id', 'ca_id', 'run_id'],
+                                [self.sc_out, itb], [self.sc_out, 'var_yr_cap_pwr_tot'])
+                self.aql.joinon(self.db, {'value': 'cap_pwr_leg'},
+                                ['pp_id', 'ca_id', 'run_id'],
+                                [self.sc_out, itb], [self.sc_out, 'par_cap_pwr_leg'])
 
                 if len(self.sw_columns) > 0:
-                    aql.joinon(self.db, self.sw_columns, ['run_id'],
-                               [self.sc_out, itb], [self.sc_out, 'def_run'])
+                    self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                                    [self.sc_out, itb], [self.sc_out, 'def_run'])
 
         return exec_str
 
@@ -613,8 +638,8 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                 ('supply_pf_id', 'SMALLINT'), ('weight_0', 'FLOAT'),
                ]
         pk = ['pp_id', 'ca_id']
-        cols = aql.init_table(tb_name=tb_name, cols=cols, schema=self.sc_out,
-                              pk=pk, db=self.db)
+        cols = self.aql.init_table(tb_name=tb_name, cols=cols, schema=self.sc_out,
+                                   pk=pk, db=self.db)
 
         exec_strg = '''
         INSERT INTO {sc_out}.pp_tm_pf_map
@@ -625,7 +650,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
         NATURAL LEFT JOIN (SELECT weight AS weight_0, tm_id
                            FROM {sc_out}.tm_soy WHERE sy = 0) AS tmsy;
         '''.format(**self.format_kw, cols=cols)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
 
         tb_name = 'nd_tm_pf_map'
         cols = [('nd_id', 'SMALLINT'), ('ca_id', 'SMALLINT'),
@@ -633,8 +658,8 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                 ('dmnd_pf_id', 'SMALLINT'), ('weight_0', 'FLOAT'),
                ]
         pk = ['nd_id', 'ca_id']
-        cols = aql.init_table(tb_name=tb_name, cols=cols, schema=self.sc_out,
-                              pk=pk, db=self.db)
+        cols = self.aql.init_table(tb_name=tb_name, cols=cols, schema=self.sc_out,
+                                   pk=pk, db=self.db)
 
         exec_strg = '''
         INSERT INTO {sc_out}.nd_tm_pf_map
@@ -645,7 +670,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
         NATURAL LEFT JOIN (SELECT weight AS weight_0, tm_id
                            FROM {sc_out}.tm_soy WHERE sy = 0) AS tmsy;
         '''.format(**self.format_kw, cols=cols)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
 
 
 # %%
@@ -677,7 +702,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                               **self.format_kw)
 
         if self.bool_run:
-            aql.exec_sql(exec_str)
+            self.aql.exec_sql(exec_str)
 
         return exec_str
 
@@ -685,6 +710,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
 
 
     # %% Table plant_run for different time scales
+    @DecoratorsSqlAnalysis.incremental(['analysis_plant_run_quick{sfx}'])
     def build_tables_plant_run_quick(self):
         '''
         SAME as build_tables_plant_run, but based on the yearly energy
@@ -717,7 +743,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                              erg.bool_out, dfplt.set_def_st;
                     '''.format(**self.format_kw)
         if self.bool_run:
-            aql.exec_sql(exec_str, db=self.db, ret_res=False)
+            self.aql.exec_sql(exec_str, db=self.db, ret_res=False)
 
         exec_strg = '''
         DROP VIEW IF EXISTS plant_run_quick_0d CASCADE;
@@ -738,7 +764,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                            WHERE pp LIKE '%DMND') AS dfpp;
         '''.format(**self.format_kw)
         if self.bool_run:
-            aql.exec_sql(exec_strg, db=self.db, ret_res=False)
+            self.aql.exec_sql(exec_strg, db=self.db, ret_res=False)
 
 
 
@@ -795,7 +821,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                     FROM plant_run_quick_2 AS pr2;
                     ''').format(**self.format_kw)
         if self.bool_run:
-            aql.exec_sql(exec_str, db=self.db, ret_res=False)
+            self.aql.exec_sql(exec_str, db=self.db, ret_res=False)
 
         '''
         /* ################## */
@@ -805,16 +831,16 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
 
         tb = 'analysis_plant_run_quick{sfx}'.format(**self.format_kw)
         if self.bool_run:
-            aql.joinon(self.db, ['pp_broad_cat', 'pt'], ['pt_id'], [self.sc_out, tb],
-                       [self.sc_out, 'def_pp_type'])
-            aql.joinon(self.db, self.sw_columns, ['run_id'],
-                       [self.sc_out, tb], [self.sc_out, 'def_run'])
-            aql.joinon(self.db, ['set_def_winsol', 'fl_id', 'pp'], ['pp_id'], [self.sc_out, tb],
-                       [self.sc_out, 'def_plant'])
-            aql.joinon(self.db, ['fl'], ['fl_id'], [self.sc_out, tb],
-                       [self.sc_out, 'def_fuel'])
-            aql.joinon(self.db, ['nd'], ['nd_id'], [self.sc_out, tb],
-                       [self.sc_out, 'def_node'])
+            self.aql.joinon(self.db, ['pp_broad_cat', 'pt'], ['pt_id'], [self.sc_out, tb],
+                            [self.sc_out, 'def_pp_type'])
+            self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                            [self.sc_out, tb], [self.sc_out, 'def_run'])
+            self.aql.joinon(self.db, ['set_def_winsol', 'fl_id', 'pp'], ['pp_id'], [self.sc_out, tb],
+                            [self.sc_out, 'def_plant'])
+            self.aql.joinon(self.db, ['fl'], ['fl_id'], [self.sc_out, tb],
+                            [self.sc_out, 'def_fuel'])
+            self.aql.joinon(self.db, ['nd'], ['nd_id'], [self.sc_out, tb],
+                            [self.sc_out, 'def_node'])
 
         return exec_str
 
@@ -866,7 +892,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
 
 
         if self.bool_run:
-            aql.exec_sql(exec_str)
+            self.aql.exec_sql(exec_str, db=self.db)
 
             '''
             /* ################## */
@@ -874,21 +900,21 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
             /* ################## */
             '''
 
-            aql.joinon(self.sw_columns, ['run_id'],
-                       [self.sc_out, 'analysis_weighted_mix'],
-                       [self.sc_out, 'def_run'])
-            aql.joinon(['fl_id', 'pt_id'], ['pp'],
-                       [self.sc_out, 'analysis_weighted_mix'],
-                       [self.sc_out, 'def_plant'])
-            aql.joinon(['pt'], ['pt_id'],
-                       [self.sc_out, 'analysis_weighted_mix'],
-                       [self.sc_out, 'def_pp_type'])
-            aql.joinon(['fl'], ['fl_id'],
-                       [self.sc_out, 'analysis_weighted_mix'],
-                       [self.sc_out, 'def_fuel'])
-            aql.joinon(['nd'], ['nd_id'],
-                       [self.sc_out, 'analysis_weighted_mix'],
-                       [self.sc_out, 'def_node'])
+            self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                            [self.sc_out, 'analysis_weighted_mix'],
+                            [self.sc_out, 'def_run'])
+            self.aql.joinon(self.db, ['fl_id', 'pt_id'], ['pp'],
+                            [self.sc_out, 'analysis_weighted_mix'],
+                            [self.sc_out, 'def_plant'])
+            self.aql.joinon(self.db, ['pt'], ['pt_id'],
+                            [self.sc_out, 'analysis_weighted_mix'],
+                            [self.sc_out, 'def_pp_type'])
+            self.aql.joinon(self.db, ['fl'], ['fl_id'],
+                            [self.sc_out, 'analysis_weighted_mix'],
+                            [self.sc_out, 'def_fuel'])
+            self.aql.joinon(self.db, ['nd'], ['nd_id'],
+                            [self.sc_out, 'analysis_weighted_mix'],
+                            [self.sc_out, 'def_node'])
         return exec_str
 
 
@@ -993,13 +1019,13 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
             tb = 'analysis_{tb_mod}mc_hist'.format(**self.format_kw,
                                                    **time_scale_keys)
 
-            aql.exec_sql(exec_str, db=self.db)
-            aql.joinon(self.db, ['run_name'] + self.sw_columns, ['run_id'],
-                       [self.sc_out, tb], [self.sc_out, 'def_run'])
-            aql.joinon(self.db, ['pt'], ['pt_id'],
-                       [self.sc_out, tb], [self.sc_out, 'def_pp_type'])
-            aql.joinon(self.db, ['nd'], ['nd_id'],
-                       [self.sc_out, tb], [self.sc_out, 'def_node'])
+            self.aql.exec_sql(exec_str, db=self.db)
+            self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                            [self.sc_out, tb], [self.sc_out, 'def_run'])
+            self.aql.joinon(self.db, ['pt'], ['pt_id'],
+                            [self.sc_out, tb], [self.sc_out, 'def_pp_type'])
+            self.aql.joinon(self.db, ['nd'], ['nd_id'],
+                            [self.sc_out, tb], [self.sc_out, 'def_node'])
             return exec_str
 
 
@@ -1073,10 +1099,10 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                     GROUP BY dfnd.nd, dfnd_2.nd, bool_out, vrtr.run_id;
                     ''').format(**self.format_kw)
         if self.bool_run:
-            aql.exec_sql(exec_str)
+            self.aql.exec_sql(exec_str)
 
-            aql.joinon(['run_name'] + self.sw_columns, ['run_id'],
-                       ['public', 'node_node_run'], [self.sc_out, 'def_run'])
+            self.aql.joinon(['run_name'] + self.sw_columns, ['run_id'],
+                            ['public', 'node_node_run'], [self.sc_out, 'def_run'])
         return exec_str
 
 
@@ -1108,13 +1134,14 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                     INTO run
                     FROM run_0
                     ''')
-        aql.exec_sql(exec_str)
+        self.aql.exec_sql(exec_str)
 
 
         print(exec_str)
 
     # %% Table energy balance
 
+    @DecoratorsSqlAnalysis.incremental(['analysis_plant_run_tot_balance'])
     def build_table_plant_run_tot_balance(self, from_quick=False):
 
         erg_col = 'erg_yr_yr' if from_quick else 'erg_yr_sy'
@@ -1158,21 +1185,21 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                                          'TRNS_RV')
                         AND prt.bool_out = False OR (prt.bool_out = True AND pp_broad_cat = 'DMND_FLEX')
                     GROUP BY prt.run_id, prt.bool_out, prt.nd, grdlss.nd_id, dfnd.nd, prt.ca_id
-                    ORDER BY run_id;
+                    ORDER BY prt.run_id;
                     ''').format(**self.format_kw, erg_col=erg_col, tb_base=tb_base)
-        aql.exec_sql(exec_str, db=self.db)
+        self.aql.exec_sql(exec_str, db=self.db)
 
         if len(self.sw_columns) > 0:
-            aql.joinon(self.db, self.sw_columns,
-                       ['run_id'], [self.sc_out, 'analysis_plant_run_tot_balance'],
-                       [self.sc_out, 'def_run'])
-
-        aql.joinon(self.db, ['nd'],
-                   ['nd_id'], [self.sc_out, 'analysis_plant_run_tot_balance'],
-                   [self.sc_out, 'def_node'])
-        aql.joinon(self.db, ['ca'],
-                   ['ca_id'], [self.sc_out, 'analysis_plant_run_tot_balance'],
-                   [self.sc_out, 'def_encar'])
+            self.aql.joinon(self.db, self.sw_columns,
+                            ['run_id'], [self.sc_out, 'analysis_plant_run_tot_balance'],
+                            [self.sc_out, 'def_run'])
+
+        self.aql.joinon(self.db, ['nd'],
+                        ['nd_id'], [self.sc_out, 'analysis_plant_run_tot_balance'],
+                        [self.sc_out, 'def_node'])
+        self.aql.joinon(self.db, ['ca'],
+                        ['ca_id'], [self.sc_out, 'analysis_plant_run_tot_balance'],
+                        [self.sc_out, 'def_encar'])
         return exec_str
 
 
@@ -1207,7 +1234,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                     WHERE charg <> 0 AND disch <> 0
                     ORDER BY run_id, sy
                     ''').format(**self.format_kw)
-        aql.exec_sql(exec_str, db=self.db)
+        self.aql.exec_sql(exec_str, db=self.db)
         return exec_str
 
 
@@ -1306,7 +1333,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                     ) AS mrg
                     LEFT JOIN def_run_name AS dfrn ON dfrn.run_id = mrg.run_id;
                     ''').format(**self.format_kw)
-        aql.exec_sql(exec_str, db=self.db)
+        self.aql.exec_sql(exec_str, db=self.db)
         return(exec_str)
 
 
@@ -1328,8 +1355,8 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                 ('emissions_cost', 'DOUBLE PRECISION'),
                ]
         pk = ['pp_id', 'ca_id', 'run_id']
-        cols = aql.init_table(tb_name=tb_name, cols=cols, schema=self.sc_out,
-                              pk=pk, db=self.db)
+        cols = self.aql.init_table(tb_name=tb_name, cols=cols, schema=self.sc_out,
+                                   pk=pk, db=self.db)
 
 
         exec_strg = '''
@@ -1383,7 +1410,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
         SELECT {cols} FROM tb_final;
         '''.format(**self.format_kw, cols=cols)
 
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
 
 
 
@@ -1404,9 +1431,9 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                 ('type', 'VARCHAR'),
                ]
         pk = ['pp_id', 'ca_id', 'run_id', 'type']
-        aql.init_table(tb_name=tb_name,
-                       cols=cols, schema=self.sc_out,
-                       pk=pk, db=self.db)
+        self.aql.init_table(tb_name=tb_name,
+                            cols=cols, schema=self.sc_out,
+                            pk=pk, db=self.db)
 
 
         exec_strg = '''
@@ -1440,7 +1467,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
         AND pwr.run_id IN {in_run_id}
         GROUP BY pwr.pp_id, pwr.ca_id, pwr.run_id;
         '''.format(**self.format_kw)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
 
         for vc in ['fl', 'co2']:
             print('Inserting vc_%s_lin ... '%vc, end='')
@@ -1449,7 +1476,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
             SELECT pp_id, ca_id, run_id, value_vc_{vc}_lin AS value, 'vc_{vc}_lin'::VARCHAR AS type
             FROM temp_vc_lin;
             '''.format(**self.format_kw, vc=vc)
-            aql.exec_sql(exec_strg, db=self.db)
+            self.aql.exec_sql(exec_strg, db=self.db)
             print('done.')
 
         print('Inserting vc_fl ... ', end='')
@@ -1477,7 +1504,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
         SELECT pp_id, ca_id, run_id, value_vc_fl AS value, 'vc_fl'::VARCHAR AS type
         FROM tb_final;
         '''.format(**self.format_kw)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
         print('done.')
 
 
@@ -1492,7 +1519,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
         WHERE run_id IN {in_run_id}
         AND pp_id IN (SELECT pp_id FROM {sc_out}.def_plant WHERE set_def_pp = 1 AND set_def_lin = 0);
         '''.format(**self.format_kw)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
         print('done.')
 
         print('Inserting vc_om ... ', end='')
@@ -1515,7 +1542,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
         SELECT pp_id, ca_id, run_id, value_vc_om AS value, 'vc_om'::VARCHAR AS type
         FROM tb_final;
         '''.format(**self.format_kw)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
         print('done.')
 
         print('Inserting fc_om ... ', end='')
@@ -1534,7 +1561,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
         SELECT pp_id, ca_id, run_id, value, 'fc_om'::VARCHAR AS type
         FROM tb_final;
         '''.format(**self.format_kw)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
         print('done.')
 
 
@@ -1551,7 +1578,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
             AND run_id IN {in_run_id}
         ;
         '''.format(**self.format_kw)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
         print('done.')
 
         print('Inserting total_total ... ', end='')
@@ -1567,7 +1594,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
         AND run_id IN {in_run_id}
         GROUP BY run_id;
         '''.format(**self.format_kw)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
         print('done.')
 
 
@@ -1581,7 +1608,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
         FROM {sc_out}.def_run
         WHERE run_id IN {in_run_id};
         '''.format(**self.format_kw)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
         print('done.')
 
     # %% COST DISAGGREGATION
@@ -1698,18 +1725,18 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                     LEFT JOIN {sc_out}.def_run AS dflp ON dflp.run_id = ccda.run_id;
 
                     ''').format(**self.format_kw)
-        aql.exec_sql(exec_str)
+        self.aql.exec_sql(exec_str)
 
 
-        aql.joinon(['pt_id'], ['pp_id'],
-                   ['public', 'plant_run_cost_disaggregation'],
-                   [self.sc_out, 'def_plant'])
-        aql.joinon(['pt'], ['pt_id'],
-                   ['public', 'plant_run_cost_disaggregation'],
-                   [self.sc_out, 'def_pp_type'])
-        aql.joinon(self.sw_columns, ['run_id'],
-                   ['public', 'plant_run_cost_disaggregation'],
-                   [self.sc_out, 'def_run'])
+        self.aql.joinon(['pt_id'], ['pp_id'],
+                        ['public', 'plant_run_cost_disaggregation'],
+                        [self.sc_out, 'def_plant'])
+        self.aql.joinon(['pt'], ['pt_id'],
+                        ['public', 'plant_run_cost_disaggregation'],
+                        [self.sc_out, 'def_pp_type'])
+        self.aql.joinon(self.sw_columns, ['run_id'],
+                        ['public', 'plant_run_cost_disaggregation'],
+                        [self.sc_out, 'def_run'])
 
         return(exec_str)
 
@@ -1748,21 +1775,21 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                     SELECT -1 AS pp_id, run_id, 'tc'::VARCHAR AS comp, objective AS ttc
                         FROM {sc_out}.def_run
                     ''').format(**self.format_kw)
-        aql.exec_sql(exec_str, db=self.db)
-
-        aql.joinon(self.db, ['nd_id', 'pp', 'fl_id'], ['pp_id'],
-                   [self.sc_out, 'analysis_plant_run_cost_disaggregation_highlevel'],
-                   [self.sc_out, 'def_plant'])
-        aql.joinon(self.db, ['nd'], ['nd_id'],
-                   [self.sc_out, 'analysis_plant_run_cost_disaggregation_highlevel'],
-                   [self.sc_out, 'def_node'])
-        aql.joinon(self.db, ['fl'], ['fl_id'],
-                   [self.sc_out, 'analysis_plant_run_cost_disaggregation_highlevel'],
-                   [self.sc_out, 'def_fuel'])
+        self.aql.exec_sql(exec_str, db=self.db)
+
+        self.aql.joinon(self.db, ['nd_id', 'pp', 'fl_id'], ['pp_id'],
+                        [self.sc_out, 'analysis_plant_run_cost_disaggregation_highlevel'],
+                        [self.sc_out, 'def_plant'])
+        self.aql.joinon(self.db, ['nd'], ['nd_id'],
+                        [self.sc_out, 'analysis_plant_run_cost_disaggregation_highlevel'],
+                        [self.sc_out, 'def_node'])
+        self.aql.joinon(self.db, ['fl'], ['fl_id'],
+                        [self.sc_out, 'analysis_plant_run_cost_disaggregation_highlevel'],
+                        [self.sc_out, 'def_fuel'])
         if len(self.sw_columns) > 0:
-            aql.joinon(self.db, self.sw_columns, ['run_id'],
-                       [self.sc_out, 'analysis_plant_run_cost_disaggregation_highlevel'],
-                       [self.sc_out, 'def_run'])
+            self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                            [self.sc_out, 'analysis_plant_run_cost_disaggregation_highlevel'],
+                            [self.sc_out, 'def_run'])
 
         return exec_str
 
@@ -1782,9 +1809,9 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
                 ('share_chp', 'DOUBLE PRECISION')
                ]
         pk = ['fl', 'nd', 'run_id']
-        slct_cols = aql.init_table(tb_name=tb_name,
-                                  cols=cols, schema=self.sc_out,
-                                  pk=pk, db=self.db)
+        slct_cols = self.aql.init_table(tb_name=tb_name,
+                                       cols=cols, schema=self.sc_out,
+                                       pk=pk, db=self.db)
 
         exec_strg = '''
         WITH tb_tot AS (
@@ -1811,7 +1838,7 @@ class SqlAnalysis(SqlAnalysisHourly, DecoratorsSqlAnalysis):
         SELECT {slct_cols} FROM tb_final;
 
         '''.format(slct_cols=slct_cols, **self.format_kw)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
 
 
 
@@ -23,7 +23,9 @@ class SqlAnalysisComp(sql_analysis.SqlAnalysis):
 
     def __init__(self, sc_out, db, **kwargs):
 
-        self.mps = maps.Maps(sc_out, db)
+        backend = kwargs.get('backend')
+        self.mps = (backend.get_maps(sc_out) if backend
+                    else maps.Maps(sc_out, db))
 
         super().__init__(sc_out, db, **kwargs)
 
@@ -42,9 +44,9 @@ class SqlAnalysisComp(sql_analysis.SqlAnalysis):
                 ('input_simple', 'VARCHAR'),
                ]
         pk = ['fl', 'mt_id', 'nd', 'run_id', 'input']
-        aql.init_table(tb_name=tb_name,
-                       cols=cols, schema=self.sc_out,
-                       pk=pk, db=self.db)
+        self.aql.init_table(tb_name=tb_name,
+                            cols=cols, schema=self.sc_out,
+                            pk=pk, db=self.db)
 
 
         exec_strg = '''
@@ -225,7 +227,7 @@ class SqlAnalysisComp(sql_analysis.SqlAnalysis):
         UPDATE {sc_out}.analysis_monthly_comparison
         SET fl2 = fl;
         '''.format(**self.format_kw)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
 
 
 
@@ -243,7 +245,7 @@ class SqlAnalysisComp(sql_analysis.SqlAnalysis):
                     ALTER TABLE {sc_out}.analysis_time_series
                     RENAME TO analysis_time_series_soy;
                     '''.format(**self.format_kw)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
 
         if not sy_only:
 
@@ -258,7 +260,7 @@ class SqlAnalysisComp(sql_analysis.SqlAnalysis):
                         LEFT JOIN {sc_out}.analysis_time_series_soy AS ts
                         ON hs.sy = ts.sy;
                         '''.format(**self.format_kw)
-            aql.exec_sql(exec_strg, db=self.db)
+            self.aql.exec_sql(exec_strg, db=self.db)
 
             # insert rows of entsoe data after adding some convenience columns
             exec_strg = '''
@@ -358,11 +360,11 @@ class SqlAnalysisComp(sql_analysis.SqlAnalysis):
                         FROM (SELECT * FROM profiles_raw.timestamp_template WHERE year = 2015) AS ts
                         LEFT  JOIN tb_raw ON tb_raw.year = ts.year AND tb_raw.hy = ts.slot
                         '''.format(**self.format_kw, st_yr=', '.join(stats_years))
-            aql.exec_sql(exec_strg, db=self.db)
+            self.aql.exec_sql(exec_strg, db=self.db)
 
-            aql.joinon(self.db, self.sw_columns, ['run_id'],
-                       [self.sc_out, 'analysis_time_series'],
-                       [self.sc_out, 'def_run'])
+            self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                            [self.sc_out, 'analysis_time_series'],
+                            [self.sc_out, 'def_run'])
 
             for col in self.sw_columns:
                 exec_strg = '''
@@ -370,7 +372,7 @@ class SqlAnalysisComp(sql_analysis.SqlAnalysis):
                             SET {col} = 'none'
                             WHERE {col} IS NULL;
                             '''.format(**self.format_kw, col=col)
-                aql.exec_sql(exec_strg, db=self.db)
+                self.aql.exec_sql(exec_strg, db=self.db)
 
 
     def analysis_production_comparison(self):
@@ -395,10 +397,10 @@ class SqlAnalysisComp(sql_analysis.SqlAnalysis):
                     ;
                     '''.format(**self.format_kw)
 
-        aql.exec_sql(exec_str, db=self.db)
+        self.aql.exec_sql(exec_str, db=self.db)
 
         # add stats
-        df_erg_inp = aql.read_sql(self.db, self.sc_out, 'fuel_node_encar').set_index(['fl_id', 'nd_id', 'ca_id'])
+        df_erg_inp = self.aql.read_sql(self.db, self.sc_out, 'fuel_node_encar').set_index(['fl_id', 'nd_id', 'ca_id'])
         df_erg_inp = df_erg_inp[[c for c in df_erg_inp.columns if 'erg_inp' in c]]
         df_erg_inp = df_erg_inp.stack().reset_index().rename(columns={'level_3': 'swhy_vl', 0: 'value'})
         df_erg_inp['swhy_vl'] = df_erg_inp['swhy_vl'].replace({'erg_inp': 'erg_inp_yr2015'}).map(lambda x: x[-6:])
@@ -436,19 +438,19 @@ class SqlAnalysisComp(sql_analysis.SqlAnalysis):
 
         df_erg_inp = pd.concat([df_erg_inp])
 
-        aql.write_sql(df_erg_inp, self.db, self.sc_out,
-                      'analysis_production_comparison', 'append')
+        self.aql.write_sql(df_erg_inp, self.db, self.sc_out,
+                           'analysis_production_comparison', 'append')
 
 
-        aql.joinon(self.db, self.sw_columns, ['run_id'],
-                   [self.sc_out, 'analysis_production_comparison'],
-                   [self.sc_out, 'def_run'])
-        aql.joinon(self.db, ['fl'], ['fl_id'],
-                   [self.sc_out, 'analysis_production_comparison'],
-                   [self.sc_out, 'def_fuel'])
-        aql.joinon(self.db, ['nd'], ['nd_id'],
-                   [self.sc_out, 'analysis_production_comparison'],
-                   [self.sc_out, 'def_node'])
+        self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                        [self.sc_out, 'analysis_production_comparison'],
+                        [self.sc_out, 'def_run'])
+        self.aql.joinon(self.db, ['fl'], ['fl_id'],
+                        [self.sc_out, 'analysis_production_comparison'],
+                        [self.sc_out, 'def_fuel'])
+        self.aql.joinon(self.db, ['nd'], ['nd_id'],
+                        [self.sc_out, 'analysis_production_comparison'],
+                        [self.sc_out, 'def_node'])
 
     def analysis_cf_comparison(self):
 
@@ -468,23 +470,23 @@ class SqlAnalysisComp(sql_analysis.SqlAnalysis):
                        'par'::VARCHAR AS var_par, value AS cf
                    FROM {sc_out}.par_cf_max
                    '''.format(**self.format_kw)
-        aql.exec_sql(exec_str, db=self.db)
-
-        aql.joinon(self.db, self.sw_columns, ['run_id'],
-                   [self.sc_out, 'analysis_cf_comparison'],
-                   [self.sc_out, 'def_run'])
-        aql.joinon(self.db, ['pp', 'nd_id', 'pt_id', 'fl_id'], ['pp_id'],
-                   [self.sc_out, 'analysis_cf_comparison'],
-                   [self.sc_out, 'def_plant'])
-        aql.joinon(self.db, ['nd'], ['nd_id'],
-                   [self.sc_out, 'analysis_cf_comparison'],
-                   [self.sc_out, 'def_node'])
-        aql.joinon(self.db, ['pt'], ['pt_id'],
-                   [self.sc_out, 'analysis_cf_comparison'],
-                   [self.sc_out, 'def_pp_type'])
-        aql.joinon(self.db, ['fl'], ['fl_id'],
-                   [self.sc_out, 'analysis_cf_comparison'],
-                   [self.sc_out, 'def_fuel'])
+        self.aql.exec_sql(exec_str, db=self.db)
+
+        self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                        [self.sc_out, 'analysis_cf_comparison'],
+                        [self.sc_out, 'def_run'])
+        self.aql.joinon(self.db, ['pp', 'nd_id', 'pt_id', 'fl_id'], ['pp_id'],
+                        [self.sc_out, 'analysis_cf_comparison'],
+                        [self.sc_out, 'def_plant'])
+        self.aql.joinon(self.db, ['nd'], ['nd_id'],
+                        [self.sc_out, 'analysis_cf_comparison'],
+                        [self.sc_out, 'def_node'])
+        self.aql.joinon(self.db, ['pt'], ['pt_id'],
+                        [self.sc_out, 'analysis_cf_comparison'],
+                        [self.sc_out, 'def_pp_type'])
+        self.aql.joinon(self.db, ['fl'], ['fl_id'],
+                        [self.sc_out, 'analysis_cf_comparison'],
+                        [self.sc_out, 'def_fuel'])
 
 
     def analysis_price_comparison(self, valmin=-20, valmax=150, nbins=170):
@@ -584,20 +586,20 @@ class SqlAnalysisComp(sql_analysis.SqlAnalysis):
                    FROM table_complete_binned
                    NATURAL LEFT JOIN bucket_list
                    '''.format(**self.format_kw)
-        aql.exec_sql(exec_str, db=self.db)
-
-        aql.joinon(self.db, self.sw_columns, ['run_id'],
-                   [self.sc_out, 'analysis_price_comparison'],
-                   [self.sc_out, 'def_run'])
-        aql.joinon(self.db, ['nd'], ['nd_id'],
-                   [self.sc_out, 'analysis_price_comparison'],
-                   [self.sc_out, 'def_node'])
-        aql.joinon(self.db, ['ca', 'fl_id'], ['ca_id'],
-                   [self.sc_out, 'analysis_price_comparison'],
-                   [self.sc_out, 'def_encar'])
-        aql.joinon(self.db, ['fl'], ['fl_id'],
-                   [self.sc_out, 'analysis_price_comparison'],
-                   [self.sc_out, 'def_fuel'])
+        self.aql.exec_sql(exec_str, db=self.db)
+
+        self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                        [self.sc_out, 'analysis_price_comparison'],
+                        [self.sc_out, 'def_run'])
+        self.aql.joinon(self.db, ['nd'], ['nd_id'],
+                        [self.sc_out, 'analysis_price_comparison'],
+                        [self.sc_out, 'def_node'])
+        self.aql.joinon(self.db, ['ca', 'fl_id'], ['ca_id'],
+                        [self.sc_out, 'analysis_price_comparison'],
+                        [self.sc_out, 'def_encar'])
+        self.aql.joinon(self.db, ['fl'], ['fl_id'],
+                        [self.sc_out, 'analysis_price_comparison'],
+                        [self.sc_out, 'def_fuel'])
         exec_strg = '''
                      ALTER TABLE {sc_out}.analysis_price_comparison
                      ADD COLUMN IF NOT EXISTS season VARCHAR(20),
@@ -619,7 +621,7 @@ class SqlAnalysisComp(sql_analysis.SqlAnalysis):
                      FROM {sc_out}.tm_soy_full AS tm
                      WHERE prc.hy = tm.sy;
                      '''.format(**self.format_kw)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
 
         exec_str = '''
                    DROP TABLE IF EXISTS {sc_out}.analysis_price_weighted;
@@ -631,11 +633,11 @@ class SqlAnalysisComp(sql_analysis.SqlAnalysis):
                    FROM {sc_out}._view_analysis_prices_complete
                    GROUP BY nd_id, ca_id, run_id, sta_mod;
                    '''.format(**self.format_kw)
-        aql.exec_sql(exec_str, db=self.db)
-
-        aql.joinon(self.db, self.sw_columns, ['run_id'],
-                   [self.sc_out, 'analysis_price_weighted'],
-                   [self.sc_out, 'def_run'])
-        aql.joinon(self.db, ['nd'], ['nd_id'],
-                   [self.sc_out, 'analysis_price_weighted'],
-                   [self.sc_out, 'def_node'])
+        self.aql.exec_sql(exec_str, db=self.db)
+
+        self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                        [self.sc_out, 'analysis_price_weighted'],
+                        [self.sc_out, 'def_run'])
+        self.aql.joinon(self.db, ['nd'], ['nd_id'],
+                        [self.sc_out, 'analysis_price_weighted'],
+                        [self.sc_out, 'def_node'])
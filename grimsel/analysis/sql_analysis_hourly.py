@@ -15,6 +15,7 @@ class SqlAnalysisHourly():
     ''' Performs various SQL-based analyses on the output tables. '''
 
 
+    @DecoratorsSqlAnalysis.incremental(['analysis_time_series_dual_supply'])
     @DecoratorsSqlAnalysis.append_sw_columns('analysis_time_series_dual_supply')
     @DecoratorsSqlAnalysis.append_nd_id_columns('analysis_time_series_dual_supply')
     def generate_complete_dual_supply(self):
@@ -23,13 +24,13 @@ class SqlAnalysisHourly():
 
 
         tb_name = 'analysis_time_series_dual_supply'
-        aql.init_table(tb_name, (['sy', 'nd_id', 'ca_id', 'run_id',
-                                  'value', 'nd', *self.tm_cols] +
-                                 [(c, 'VARCHAR') for c in self.sw_columns]
-                                  + [('mc', 'DECIMAL')]),
-                                 schema=self.sc_out,
-                                 ref_schema=self.sc_out,
-                                 pk=['sy', 'nd_id', 'run_id'], db=self.db)
+        self.aql.init_table(tb_name, (['sy', 'nd_id', 'ca_id', 'run_id',
+                                       'value', 'nd', *self.tm_cols] +
+                                      [(c, 'VARCHAR') for c in self.sw_columns]
+                                       + [('mc', 'DECIMAL')]),
+                                      schema=self.sc_out,
+                                      ref_schema=self.sc_out,
+                                      pk=['sy', 'nd_id', 'run_id'], db=self.db)
 
         exec_str_0 = ('''
                       INSERT INTO {sc_out}.{tb_name} (sy, nd_id, ca_id, value, run_id)
@@ -37,22 +38,23 @@ class SqlAnalysisHourly():
                       FROM {sc_out}.dual_supply
                       WHERE run_id in {in_run_id}
                       ''').format(tb_name=tb_name, sc_out=self.sc_out, in_run_id=self.in_run_id)
-        aql.exec_sql(exec_str_0, db=self.db)
+        self.aql.exec_sql(exec_str_0, db=self.db)
 
         # add timemap indices
-        aql.joinon(self.db, [c for c in self.tm_cols if not c == 'sy'], ['sy'],
-                   [self.sc_out, 'analysis_time_series_dual_supply'],
-                   [self.sc_out, 'tm_soy_full'],  new_columns=False)
+        self.aql.joinon(self.db, [c for c in self.tm_cols if not c == 'sy'], ['sy'],
+                        [self.sc_out, 'analysis_time_series_dual_supply'],
+                        [self.sc_out, 'tm_soy_full'],  new_columns=False)
 
         exec_str_1 = ('''
                       UPDATE {sc_out}.analysis_time_series_dual_supply
                       SET mc = value / weight;
                       '''.format(sc_out=self.sc_out))
-        aql.exec_sql(exec_str_1, db=self.db)
+        self.aql.exec_sql(exec_str_1, db=self.db)
 
         return(exec_str_0 + exec_str_1)
 
 
+    @DecoratorsSqlAnalysis.incremental(['analysis_time_series'])
     @DecoratorsSqlAnalysis.append_nd_id_columns('analysis_time_series')
     @DecoratorsSqlAnalysis.append_fl_id_columns('analysis_time_series')
     @DecoratorsSqlAnalysis.append_pp_id_columns('analysis_time_series')
@@ -66,15 +68,15 @@ class SqlAnalysisHourly():
         self.generate_view_time_series_subset()
 
 
-        aql.init_table(tb_name, (['sy', 'ca_id', 'pp_id', 'bool_out', 'run_id',
-                                 'pwrerg_cat', 'nd_id', 'fl_id', 'pt_id',
-                                 * self.tm_cols,
-                                 ('value', 'DECIMAL'), 'fl', 'nd', 'pt',
-                                 ('value_posneg', 'DECIMAL')]
-                                 + [(c, 'VARCHAR')
-                                    for c in self.sw_columns]),
-                                 schema=self.sc_out,
-                                 ref_schema=self.sc_out, db=self.db)
+        self.aql.init_table(tb_name, (['sy', 'ca_id', 'pp_id', 'bool_out', 'run_id',
+                                      'pwrerg_cat', 'nd_id', 'fl_id', 'pt_id',
+                                      * self.tm_cols,
+                                      ('value', 'DECIMAL'), 'fl', 'nd', 'pt',
+                                      ('value_posneg', 'DECIMAL')]
+                                      + [(c, 'VARCHAR')
+                                         for c in self.sw_columns]),
+                                      schema=self.sc_out,
+                                      ref_schema=self.sc_out, db=self.db)
 
         if not energy_only:
             print('Inserting power...')
@@ -84,7 +86,7 @@ class SqlAnalysisHourly():
                         SELECT * FROM {sc_out}.analysis_time_series_view_power
                         WHERE run_id IN {in_run_id};
                         ''').format(tb_name=tb_name, **self.format_kw)
-            aql.exec_sql(exec_str, db=self.db)
+            self.aql.exec_sql(exec_str, db=self.db)
 
 
             print('Inserting cross-sector consumption...')
@@ -94,10 +96,10 @@ class SqlAnalysisHourly():
                         SELECT * FROM {sc_out}.analysis_time_series_view_crosssector
                         WHERE run_id IN {in_run_id};
                         ''').format(tb_name=tb_name, **self.format_kw)
-            aql.exec_sql(exec_str, db=self.db)
+            self.aql.exec_sql(exec_str, db=self.db)
 
 
-        if 'var_sy_erg_st' in aql.get_sql_tables(self.sc_out, self.db):
+        if 'var_sy_erg_st' in self.aql.get_sql_tables(self.sc_out, self.db):
             print('Inserting energy...')
             exec_str = ('''
                         INSERT INTO {sc_out}.{tb_name}
@@ -106,11 +108,11 @@ class SqlAnalysisHourly():
                         WHERE run_id IN {in_run_id};
 
                         ''').format(tb_name=tb_name, **self.format_kw)
-            aql.exec_sql(exec_str, db=self.db)
+            self.aql.exec_sql(exec_str, db=self.db)
 
         # add timemap indices
-        aql.joinon(self.db, [c for c in self.tm_cols if (not c == 'sy')], ['sy'],
-                   [self.sc_out, tb_name], [self.sc_out, 'tm_soy_full'], new_columns=False)
+        self.aql.joinon(self.db, [c for c in self.tm_cols if (not c == 'sy')], ['sy'],
+                        [self.sc_out, tb_name], [self.sc_out, 'tm_soy_full'], new_columns=False)
 
         return exec_str
 
@@ -128,19 +130,19 @@ class SqlAnalysisHourly():
                                            for c in list_sw_not_st])
 
 
-        slct_pp_id_st = aql.read_sql(self.db, self.sc_out, 'def_plant',
-                               filt=[('pp', ['%STO%'], ' LIKE '),
-                                     ('nd_id', self._nd_id)])['pp_id']
+        slct_pp_id_st = self.aql.read_sql(self.db, self.sc_out, 'def_plant',
+                                    filt=[('pp', ['%STO%'], ' LIKE '),
+                                          ('nd_id', self._nd_id)])['pp_id']
         lst_pp_id_st = self.list_to_str(slct_pp_id_st)
 
         slct_pp_id_non_st = [pp for pp in self.slct_pp_id
                              if not pp in slct_pp_id_st.tolist()]
         lst_pp_id_non_st = self.list_to_str(slct_pp_id_non_st)
 
-        run_id_zero_st = self.list_to_str(aql.read_sql(self.db, self.sc_out, 'def_loop',
+        run_id_zero_st = self.list_to_str(self.aql.read_sql(self.db, self.sc_out, 'def_loop',
                                       filt=[('swst', [0]),
-                                            ('run_id', self.slct_run_id)])['run_id'])
-        run_id_nonzero_st = self.list_to_str(aql.read_sql(self.db, self.sc_out, 'def_loop',
+                                                 ('run_id', self.slct_run_id)])['run_id'])
+        run_id_nonzero_st = self.list_to_str(self.aql.read_sql(self.db, self.sc_out, 'def_loop',
                                         filt=[('swst', [0], ' <> '),
                                             ('run_id', self.slct_run_id)])['run_id'])
 
@@ -163,12 +165,12 @@ class SqlAnalysisHourly():
         if not use_views_only:
 
 
-            aql.init_table('temp_analysis_time_series_subset',
-                           ['sy', 'ca_id', 'pp_id', 'bool_out', 'value', 'run_id',
-                            ('value_posneg', 'DECIMAL'), ('value_diff', 'DECIMAL'),
+            self.aql.init_table('temp_analysis_time_series_subset',
+                                ['sy', 'ca_id', 'pp_id', 'bool_out', 'value', 'run_id',
+                                 ('value_posneg', 'DECIMAL'), ('value_diff', 'DECIMAL'),
     #                        ('value_ref', 'DECIMAL')
-                            ],
-                           ref_schema=self.sc_out)
+                                 ],
+                                ref_schema=self.sc_out)
             exec_str = '''
                         /* FILTER TIME SERIES TABLE */
                         INSERT INTO temp_analysis_time_series_subset
@@ -183,11 +185,11 @@ class SqlAnalysisHourly():
                               AND dfpp.pp_id IN {list_slct_pp_id};
                         '''.format(**self.format_kw)
     #        print(exec_str)
-            aql.exec_sql(exec_str, time_msg='Filter var_sy_pwr and write to table')
+            self.aql.exec_sql(exec_str, time_msg='Filter var_sy_pwr and write to table')
 
 
-            aql.init_table('temp_tbrf', ['sy', 'pp_id', 'bool_out', 'run_id', ('value_ref', 'DECIMAL')],
-                           ref_schema=self.sc_out)
+            self.aql.init_table('temp_tbrf', ['sy', 'pp_id', 'bool_out', 'run_id', ('value_ref', 'DECIMAL')],
+                                ref_schema=self.sc_out)
             exec_str = '''
                         /* CREATE TABLE WITH NO-STORAGE REFERENCE VALUES */
                         INSERT INTO temp_tbrf (sy, pp_id, bool_out, run_id, value_ref)
@@ -195,16 +197,16 @@ class SqlAnalysisHourly():
                         FROM temp_analysis_time_series_subset
                         WHERE run_id IN {run_id_zero_st};
                         '''.format(**self.format_kw)
-            aql.exec_sql(exec_str, time_msg='Write data to ref table')
-            aql.exec_sql('''ALTER TABLE temp_tbrf
-                            ADD PRIMARY KEY(sy, pp_id, bool_out, run_id)''',
-                         time_msg='Add pk to temp_tbrf')
-
-            aql.init_table('temp_map_run_id_ref',
-                           ['run_id',
-                            ('run_id_ref', 'SMALLINT',
-                             self.sc_out + '.def_loop(run_id)')],
-                           ref_schema=self.sc_out, pk=['run_id'])
+            self.aql.exec_sql(exec_str, time_msg='Write data to ref table')
+            self.aql.exec_sql('''ALTER TABLE temp_tbrf
+                                 ADD PRIMARY KEY(sy, pp_id, bool_out, run_id)''',
+                              time_msg='Add pk to temp_tbrf')
+
+            self.aql.init_table('temp_map_run_id_ref',
+                                ['run_id',
+                                 ('run_id_ref', 'SMALLINT',
+                                  self.sc_out + '.def_loop(run_id)')],
+                                ref_schema=self.sc_out, pk=['run_id'])
             exec_str = '''
                         /* CREATE MAP BETWEEN run_ids and reference run_ids */
                         INSERT INTO temp_map_run_id_ref (run_id, run_id_ref)
@@ -216,12 +218,12 @@ class SqlAnalysisHourly():
                         NATURAL JOIN ref_st
                         ORDER BY run_id;
                         '''.format(**self.format_kw)
-            aql.exec_sql(exec_str, time_msg='Create reference run_id map')
+            self.aql.exec_sql(exec_str, time_msg='Create reference run_id map')
 
 
-            aql.joinon(['run_id_ref'], ['run_id'],
-                       ['public', 'temp_analysis_time_series_subset'],
-                       ['public', 'temp_map_run_id_ref'])
+            self.aql.joinon(['run_id_ref'], ['run_id'],
+                            ['public', 'temp_analysis_time_series_subset'],
+                            ['public', 'temp_map_run_id_ref'])
 
             exec_str = '''
                         UPDATE temp_analysis_time_series_subset AS ts
@@ -233,13 +235,13 @@ class SqlAnalysisHourly():
                             AND rf.bool_out = ts.bool_out
                         '''.format(**self.format_kw)
     #        print(exec_str)
-            aql.exec_sql(exec_str, time_msg='Add difference column to ts table')
+            self.aql.exec_sql(exec_str, time_msg='Add difference column to ts table')
 
 
-            aql.init_table('temp_tbst',
-                           ['run_id', 'sy', ('pp_id_st', 'SMALLINT'),
-                            ('bool_out_st', 'BOOLEAN'), ('value_mask', 'DECIMAL')],
-                           ref_schema=self.sc_out, pk=['run_id', 'pp_id_st', 'sy', 'bool_out_st'])
+            self.aql.init_table('temp_tbst',
+                                ['run_id', 'sy', ('pp_id_st', 'SMALLINT'),
+                                 ('bool_out_st', 'BOOLEAN'), ('value_mask', 'DECIMAL')],
+                                ref_schema=self.sc_out, pk=['run_id', 'pp_id_st', 'sy', 'bool_out_st'])
             exec_str = '''IF EXISTS
                         /* GET CHARGING/DISCHARGING MASK */
                         INSERT INTO temp_tbst
@@ -252,14 +254,14 @@ class SqlAnalysisHourly():
                         ORDER BY sy, run_id, pp_id, bool_out;
                         '''.format(**self.format_kw)
             print(exec_str)
-            aql.exec_sql(exec_str)
+            self.aql.exec_sql(exec_str)
 
 
 
 
-            aql.exec_sql('''ALTER TABLE temp_analysis_time_series_subset
-                            ADD PRIMARY KEY(sy, ca_id, pp_id, bool_out, run_id)''',
-                         time_msg='Add pk to temp_analysis_time_series_subset')
+            self.aql.exec_sql('''ALTER TABLE temp_analysis_time_series_subset
+                                 ADD PRIMARY KEY(sy, ca_id, pp_id, bool_out, run_id)''',
+                              time_msg='Add pk to temp_analysis_time_series_subset')
 
 
 
@@ -267,12 +269,12 @@ class SqlAnalysisHourly():
 
             # expand temp_tbst to pp_id, bool_out, best on creation/insertion
 
-            aql.init_table(self.format_kw['out_tb'],
-                           ['pp_id', ('pp_id_st', 'SMALLINT'), 'bool_out', ('bool_out_st', 'BOOLEAN'), 'run_id', ('run_id_ref', 'SMALLINT'), ('swst_vl_ref', 'VARCHAR(5)'), 'value'],
-                           schema=self.sc_out,
-                           ref_schema=self.sc_out, pk=['pp_id', 'pp_id_st',
-                                                       'bool_out', 'bool_out_st',
-                                                       'run_id'])
+            self.aql.init_table(self.format_kw['out_tb'],
+                                ['pp_id', ('pp_id_st', 'SMALLINT'), 'bool_out', ('bool_out_st', 'BOOLEAN'), 'run_id', ('run_id_ref', 'SMALLINT'), ('swst_vl_ref', 'VARCHAR(5)'), 'value'],
+                                schema=self.sc_out,
+                                ref_schema=self.sc_out, pk=['pp_id', 'pp_id_st',
+                                                            'bool_out', 'bool_out_st',
+                                                            'run_id'])
             exec_str = '''
                         INSERT INTO {sc_out}.{out_tb}
                             (pp_id, pp_id_st, bool_out, bool_out_st, run_id, run_id_ref, value)
@@ -291,7 +293,7 @@ class SqlAnalysisHourly():
                         GROUP BY pp_id, pp_id_st, bool_out, bool_out_st, run_id, run_id_ref;
                         '''.format(**self.format_kw)
             print(exec_str)
-            aql.exec_sql(exec_str)
+            self.aql.exec_sql(exec_str)
 #
 #            exec_str = '''
 #                        UPDATE {sc_out}.analysis_agg_filtdiff AS tb
@@ -313,19 +315,19 @@ class SqlAnalysisHourly():
 
         else:
 
-            aql.init_table(self.format_kw['out_tb'],
-                           ['pp_id',
-                            ('pp_id_st', 'SMALLINT'),
-                            'bool_out',
-                            ('bool_out_st', 'BOOLEAN'),
-                            'run_id',
-                            ('run_id_ref', 'SMALLINT'),
-                            ('swst_vl_ref', 'VARCHAR(5)'),
-                            'value'],
-                           schema=self.sc_out,
-                           ref_schema=self.sc_out, pk=['pp_id', 'pp_id_st',
-                                                       'bool_out', 'bool_out_st',
-                                                       'run_id'], db=self.db)
+            self.aql.init_table(self.format_kw['out_tb'],
+                                ['pp_id',
+                                 ('pp_id_st', 'SMALLINT'),
+                                 'bool_out',
+                                 ('bool_out_st', 'BOOLEAN'),
+                                 'run_id',
+                                 ('run_id_ref', 'SMALLINT'),
+                                 ('swst_vl_ref', 'VARCHAR(5)'),
+                                 'value'],
+                                schema=self.sc_out,
+                                ref_schema=self.sc_out, pk=['pp_id', 'pp_id_st',
+                                                            'bool_out', 'bool_out_st',
+                                                            'run_id'], db=self.db)
 
             exec_str = '''
                         /* CREATE MAP BETWEEN run_ids and reference run_ids */
@@ -404,58 +406,58 @@ class SqlAnalysisHourly():
                         INTO {sc_out}.{out_tb}
                         FROM temp_analysis_time_series_subset_reffilt
                         '''.format(**self.format_kw)
-            aql.exec_sql(exec_str, db=self.db)
-
-        aql.exec_sql('''
-                     DROP VIEW IF EXISTS temp_map_run_id_ref CASCADE;
-                     DROP TABLE IF EXISTS temp_analysis_time_series_subset CASCADE;
-                     DROP VIEW IF EXISTS temp_tbrf CASCADE;
-                     DROP VIEW IF EXISTS temp_tbst CASCADE;
-                     DROP TABLE IF EXISTS temp_analysis_time_series_subset_ref CASCADE;
-                     ''', db=self.db)
-
-        aql.exec_sql('''
-                     /* ADD PP_TYPE COLUMN FOR STORAGE FILTER PLANTS */
-                     ALTER TABLE {sc_out}.{out_tb}
-                             DROP COLUMN IF EXISTS pt_st,
-                             DROP COLUMN IF EXISTS pp_st,
-                             ADD COLUMN pp_st VARCHAR(15),
-                             ADD COLUMN pt_st VARCHAR(15);
-                     UPDATE {sc_out}.{out_tb} AS tb
-                     SET pt_st = map_pt.pt, pp_st = map_pt.pp
-                     FROM (
-                         SELECT pp_id AS pp_id, pt, pp
-                             FROM {sc_out}.def_plant AS dfpp
-                         LEFT JOIN {sc_out}.def_pp_type AS dfpt
-                        ON dfpp.pt_id = dfpt.pt_id
-                     ) AS map_pt
-                     WHERE map_pt.pp_id = tb.pp_id_st;
-                     '''.format(**self.format_kw), db=self.db)
+            self.aql.exec_sql(exec_str, db=self.db)
+
+        self.aql.exec_sql('''
+                          DROP VIEW IF EXISTS temp_map_run_id_ref CASCADE;
+                          DROP TABLE IF EXISTS temp_analysis_time_series_subset CASCADE;
+                          DROP VIEW IF EXISTS temp_tbrf CASCADE;
+                          DROP VIEW IF EXISTS temp_tbst CASCADE;
+                          DROP TABLE IF EXISTS temp_analysis_time_series_subset_ref CASCADE;
+                          ''', db=self.db)
+
+        self.aql.exec_sql('''
+                          /* ADD PP_TYPE COLUMN FOR STORAGE FILTER PLANTS */
+                          ALTER TABLE {sc_out}.{out_tb}
+                                  DROP COLUMN IF EXISTS pt_st,
+                                  DROP COLUMN IF EXISTS pp_st,
+                                  ADD COLUMN pp_st VARCHAR(15),
+                                  ADD COLUMN pt_st VARCHAR(15);
+                          UPDATE {sc_out}.{out_tb} AS tb
+                          SET pt_st = map_pt.pt, pp_st = map_pt.pp
+                          FROM (
+                              SELECT pp_id AS pp_id, pt, pp
+                                  FROM {sc_out}.def_plant AS dfpp
+                              LEFT JOIN {sc_out}.def_pp_type AS dfpt
+                             ON dfpp.pt_id = dfpt.pt_id
+                          ) AS map_pt
+                          WHERE map_pt.pp_id = tb.pp_id_st;
+                          '''.format(**self.format_kw), db=self.db)
 
         # add loop indices
-        aql.joinon(self.db, self.sw_columns, ['run_id'],
-                   [self.sc_out, self.format_kw['out_tb']],
-                   [self.sc_out, 'def_loop'])
+        self.aql.joinon(self.db, self.sw_columns, ['run_id'],
+                        [self.sc_out, self.format_kw['out_tb']],
+                        [self.sc_out, 'def_loop'])
         # add pp indices
-        aql.joinon(self.db, ['pt_id', 'fl_id', 'nd_id'], ['pp_id'],
-                   [self.sc_out, self.format_kw['out_tb']],
-                   [self.sc_out, 'def_plant'])
+        self.aql.joinon(self.db, ['pt_id', 'fl_id', 'nd_id'], ['pp_id'],
+                        [self.sc_out, self.format_kw['out_tb']],
+                        [self.sc_out, 'def_plant'])
         # add pt indices
-        aql.joinon(self.db, ['pt'], ['pt_id'], [self.sc_out, self.format_kw['out_tb']],
-                   [self.sc_out, 'def_pp_type'])
+        self.aql.joinon(self.db, ['pt'], ['pt_id'], [self.sc_out, self.format_kw['out_tb']],
+                        [self.sc_out, 'def_pp_type'])
         # add fl indices
-        aql.joinon(self.db, ['fl'], ['fl_id'], [self.sc_out, self.format_kw['out_tb']],
-                   [self.sc_out, 'def_fuel'])
+        self.aql.joinon(self.db, ['fl'], ['fl_id'], [self.sc_out, self.format_kw['out_tb']],
+                        [self.sc_out, 'def_fuel'])
         # add nd indices
-        aql.joinon(self.db, ['nd'], ['nd_id'], [self.sc_out, self.format_kw['out_tb']],
-                   [self.sc_out, 'def_node'])
+        self.aql.joinon(self.db, ['nd'], ['nd_id'], [self.sc_out, self.format_kw['out_tb']],
+                        [self.sc_out, 'def_node'])
 
 
     def append_nd_id_columns(f):
         def wrapper(self, *args, **kwargs):
             f(self, *args, **kwargs)
-            aql.joinon(self.db, ['nd'], ['nd_id'],
-                       [self.sc_out, f.__name__], [self.sc_out, 'def_node'])
+            self.aql.joinon(self.db, ['nd'], ['nd_id'],
+                            [self.sc_out, f.__name__], [self.sc_out, 'def_node'])
         return wrapper
 
 
@@ -481,22 +483,22 @@ class SqlAnalysisHourly():
         join_ref = ' AND ' + '\nAND '.join(['tbrel.{} = tbrf.{}'.format(c, c)
                                             for c in list_sw_not_st])
 
-        slct_pp_id_st = aql.read_sql(self.db, self.sc_out, 'def_plant',
-                               filt=[('pp', ['%STO%'], ' LIKE '),
-                                     ('pp_id', self.slct_pp_id),
-                                     ('nd_id', self._nd_id)])['pp_id'].tolist()
+        slct_pp_id_st = self.aql.read_sql(self.db, self.sc_out, 'def_plant',
+                                    filt=[('pp', ['%STO%'], ' LIKE '),
+                                          ('pp_id', self.slct_pp_id),
+                                          ('nd_id', self._nd_id)])['pp_id'].tolist()
         lst_pp_id_st = self.list_to_str(slct_pp_id_st)
 
         slct_pp_id_non_st = [pp for pp in self.slct_pp_id
                              if not pp in slct_pp_id_st]
         lst_pp_id_non_st = self.list_to_str(slct_pp_id_non_st)
 
-        run_id_zero_st = self.list_to_str(aql.read_sql(self.db, self.sc_out, 'def_loop',
+        run_id_zero_st = self.list_to_str(self.aql.read_sql(self.db, self.sc_out, 'def_loop',
                                       filt=[('swst', [0]),
-                                            ('run_id', self.slct_run_id)])['run_id'])
-        run_id_nonzero_st = self.list_to_str(aql.read_sql(self.db, self.sc_out, 'def_loop',
+                                                 ('run_id', self.slct_run_id)])['run_id'])
+        run_id_nonzero_st = self.list_to_str(self.aql.read_sql(self.db, self.sc_out, 'def_loop',
                                         filt=[('swst', [0], ' <> '),
-                                              ('run_id', self.slct_run_id)])['run_id'])
+                                                   ('run_id', self.slct_run_id)])['run_id'])
 
 
         self.format_kw.update({'sw_not_st': sw_not_st,
@@ -508,24 +510,24 @@ class SqlAnalysisHourly():
                                'out_tb': 'analysis_agg_filtdiff'})
 
 
-        cols = aql.init_table('analysis_agg_filtdiff',
+        cols = self.aql.init_table('analysis_agg_filtdiff',
                [
-                ('sy', 'SMALLINT'),
-                ('pp_id', 'SMALLINT'),
-                ('bool_out', 'BOOLEAN'),
-                ('run_id', 'SMALLINT'),
-                ('run_id_rf', 'SMALLINT'),
-                ('pp_id_st', 'SMALLINT'),
-                ('bool_out_st', 'BOOLEAN'),
-                ('value_st', 'DOUBLE PRECISION'),
-                ('value', 'DOUBLE PRECISION'),
-                ('value_ref', 'DOUBLE PRECISION'),
-                ('value_diff', 'DOUBLE PRECISION'),
+                     ('sy', 'SMALLINT'),
+                     ('pp_id', 'SMALLINT'),
+                     ('bool_out', 'BOOLEAN'),
+                     ('run_id', 'SMALLINT'),
+                     ('run_id_rf', 'SMALLINT'),
+                     ('pp_id_st', 'SMALLINT'),
+                     ('bool_out_st', 'BOOLEAN'),
+                     ('value_st', 'DOUBLE PRECISION'),
+                     ('value', 'DOUBLE PRECISION'),
+                     ('value_ref', 'DOUBLE PRECISION'),
+                     ('value_diff', 'DOUBLE PRECISION'),
                ],
                schema=self.sc_out,
                ref_schema=self.sc_out,
                pk=['sy', 'pp_id', 'bool_out', 'run_id', 'run_id_rf',
-                   'pp_id_st', 'bool_out_st'],
+                        'pp_id_st', 'bool_out_st'],
                db=self.db)
 
 
@@ -544,7 +546,7 @@ class SqlAnalysisHourly():
         WHERE run_id IN {run_id_nonzero_st}
         ORDER BY run_id;
         '''.format(**self.format_kw)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
 
         exec_strg = '''
         /* FILTER TIME SERIES TABLE */
@@ -558,7 +560,7 @@ class SqlAnalysisHourly():
         LEFT JOIN temp_map_run_id_ref AS run_id_ref ON run_id_ref.run_id = ts.run_id
         WHERE dfpp.pp_id IN {list_slct_pp_id} AND ts.run_id IN {in_run_id};
         '''.format(**self.format_kw)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
 
         exec_strg = '''
         WITH mask_st AS (
@@ -595,27 +597,27 @@ class SqlAnalysisHourly():
                                 AND mask_st.run_id = tb_pp.run_id
         WHERE ABS(value_st) > 1;
         '''.format(**self.format_kw, cols=cols)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
 
-        aql.joinon(self.db, ['mt_id', 'season'], ['sy'],
-                   [self.sc_out, 'analysis_agg_filtdiff'],
-                   [self.sc_out, 'tm_soy_full'])
+        self.aql.joinon(self.db, ['mt_id', 'season'], ['sy'],
+                        [self.sc_out, 'analysis_agg_filtdiff'],
+                        [self.sc_out, 'tm_soy_full'])
 
         # aggregated table
-        cols = aql.init_table('analysis_agg_filtdiff_agg',
+        cols = self.aql.init_table('analysis_agg_filtdiff_agg',
                [
-                ('pp_id', 'SMALLINT'),
-                ('bool_out', 'BOOLEAN'),
-                ('run_id', 'SMALLINT'),
-                ('run_id_rf', 'SMALLINT'),
-                ('pp_id_st', 'SMALLINT'),
-                ('bool_out_st', 'BOOLEAN'),
-                ('value_diff_agg', 'DOUBLE PRECISION'),
+                     ('pp_id', 'SMALLINT'),
+                     ('bool_out', 'BOOLEAN'),
+                     ('run_id', 'SMALLINT'),
+                     ('run_id_rf', 'SMALLINT'),
+                     ('pp_id_st', 'SMALLINT'),
+                     ('bool_out_st', 'BOOLEAN'),
+                     ('value_diff_agg', 'DOUBLE PRECISION'),
                ],
                schema=self.sc_out,
                ref_schema=self.sc_out,
                pk=['pp_id', 'bool_out', 'run_id', 'run_id_rf',
-                   'pp_id_st', 'bool_out_st'],
+                        'pp_id_st', 'bool_out_st'],
                db=self.db)
 
         exec_strg = '''
@@ -625,20 +627,20 @@ class SqlAnalysisHourly():
         FROM {sc_out}.analysis_agg_filtdiff
         GROUP BY pp_id, bool_out, run_id, run_id_rf, pp_id_st, bool_out_st
         '''.format(**self.format_kw, cols=cols)
-        aql.exec_sql(exec_strg, db=self.db)
+        self.aql.exec_sql(exec_strg, db=self.db)
 
         for tb in ['analysis_agg_filtdiff_agg',
                    'analysis_agg_filtdiff']:
 
-            aql.joinon(self.db,
-                       {'pp': 'pp_st', 'pt_id': 'pt_id_st'},
-                       {'pp_id': 'pp_id_st'},
-                       [self.sc_out, tb], [self.sc_out, 'def_plant'])
+            self.aql.joinon(self.db,
+                            {'pp': 'pp_st', 'pt_id': 'pt_id_st'},
+                            {'pp_id': 'pp_id_st'},
+                            [self.sc_out, tb], [self.sc_out, 'def_plant'])
 
-            aql.joinon(self.db,
-                       {'pt': 'pt_st'},
-                       {'pt_id': 'pt_id_st'},
-                       [self.sc_out, tb], [self.sc_out, 'def_pp_type'])
+            self.aql.joinon(self.db,
+                            {'pt': 'pt_st'},
+                            {'pt_id': 'pt_id_st'},
+                            [self.sc_out, tb], [self.sc_out, 'def_pp_type'])
 
 
     def generate_analysis_time_series_diff(self):
@@ -667,7 +669,7 @@ class SqlAnalysisHourly():
                     ''').format(run_id_1=self.run_id[0],
                                 run_id_2=self.run_id[1],
 								sff=self._suffix)
-        aql.exec_sql(exec_str, db=self.db)
+        self.aql.exec_sql(exec_str, db=self.db)
         return exec_str
 
 
@@ -730,13 +732,13 @@ class SqlAnalysisHourly():
                     SELECT * FROM analysis_time_series_transmission_0;
                     ''').format(sc_out=self.sc_out, in_run_id=self.in_run_id,
     								 sff=self._suffix)
-        aql.exec_sql(exec_str, db=self.db)
+        self.aql.exec_sql(exec_str, db=self.db)
 
 
         # add timemap indices
-        aql.joinon(self.db, [c for c in self.tm_cols if (not c == 'sy')], ['sy'],
-                   ['public', 'analysis_time_series_transmission' + self._suffix],
-                   ['public', 'timemap_' + str(self.time_res)])
+        self.aql.joinon(self.db, [c for c in self.tm_cols if (not c == 'sy')], ['sy'],
+                        ['public', 'analysis_time_series_transmission' + self._suffix],
+                        ['public', 'timemap_' + str(self.time_res)])
 
 
         return exec_str
@@ -788,7 +790,7 @@ class SqlAnalysisHourly():
                     UNION ALL
                     SELECT * FROM profile
                     ''').format(sc_out=self.sc_out, sff=self._suffix)
-        aql.exec_sql(exec_str, db=self.db)
+        self.aql.exec_sql(exec_str, db=self.db)
         return exec_str
 
 
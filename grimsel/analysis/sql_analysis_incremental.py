@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Incremental refresh of analysis tables.
+
+With ``SqlAnalysis(incremental=True)``, the methods decorated with
+:meth:`grimsel.analysis.decorators.DecoratorsSqlAnalysis.incremental`
+only compute the model runs which were added or replaced since the
+last call. The covered runs of each analysis table are recorded in the
+table ``{sc_out}.analysis_run_log`` together with a fingerprint of the
+corresponding ``def_run`` rows:
+
+* A run is finished once its ``def_run`` row exists, since the row is
+  appended after all output tables of the run are written. For parquet
+  output written by parallel workers, the rows are in the worker csv files
+  until the end of the loop; these are read by the
+  :class:`grimsel.analysis.file_backend.FileBackend`.
+* A replaced run (``replace_runs_if_exist``) has a new ``def_run`` row
+  (solver time, objective, etc.) and hence a new fingerprint.
+* Runs which are missing from ``def_run`` (e.g. while being replaced)
+  are removed from the analysis tables.
+
+"""
+
+import hashlib
+import warnings
+
+import pandas as pd
+
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+TB_RUN_LOG = 'analysis_run_log'
+
+
+class SqlAnalysisIncremental():
+    '''
+    Mixin class for :class:`grimsel.analysis.sql_analysis.SqlAnalysis`.
+    '''
+
+    def _get_run_hashes(self):
+        '''
+        Returns the fingerprints of the finished model runs.
+
+        Only the runs of the ``slct_run_id`` argument are included, if
+        provided; otherwise all runs of the ``def_run`` table.
+
+        Returns
+        -------
+        dict
+            ``{run_id: fingerprint}``
+
+        '''
+
+        if hasattr(self.aql, 'refresh'):
+            # file backend: include files of new model runs
+            self.aql.refresh()
+
+        df_run = self.aql.read_sql(self.db, self.sc_out, 'def_run')
+
+        if self._slct_run_id_arg:
+            df_run = df_run.loc[df_run.run_id.isin(self._slct_run_id_arg)]
+
+        # duplicate rows of replaced runs are included in the hash
+        df_run = df_run.sort_values(list(df_run.columns))
+        row_hash = pd.util.hash_pandas_object(df_run, index=False)
+
+        return {int(run_id): hashlib.sha1(hsh.values.tobytes()).hexdigest()
+                for run_id, hsh in row_hash.groupby(df_run.run_id.values)}
+
+    def _get_run_log(self, tb):
+        ''' Returns the logged runs ``{run_id: fingerprint}`` of a table. '''
+
+        df_log = self.aql.read_sql(self.db, self.sc_out, TB_RUN_LOG,
+                                   filt=[('tb_name', [tb])])
+
+        return dict(zip(df_log.run_id.astype(int), df_log.run_hash))
+
+    def _update_run_log(self, tb, list_del, dict_add):
+        '''
+        Replaces the logged runs ``list_del`` (all if ``None``) of a table
+        by the fingerprints ``dict_add``.
+        '''
+
+        filt_del = ('' if list_del is None else
+                    'AND run_id IN ' + self.list_to_str(list(list_del) + [-1]))
+
+        exec_str = ('''
+                    DELETE FROM {sc_out}.{tb_log}
+                    WHERE tb_name = '{tb}' {filt_del};
+                    ''').format(sc_out=self.sc_out, tb_log=TB_RUN_LOG, tb=tb,
+                                filt_del=filt_del)
+
+        if dict_add:
+            exec_str += ('''
+                         INSERT INTO {sc_out}.{tb_log} (tb_name, run_id, run_hash)
+                         VALUES {values};
+                         ''').format(sc_out=self.sc_out, tb_log=TB_RUN_LOG,
+                                     values=', '.join('(\'%s\', %d, \'%s\')'
+                                                      %(tb, run_id, hsh)
+                                                      for run_id, hsh
+                                                      in dict_add.items()))
+
+        self.aql.exec_sql(exec_str, db=self.db, ret_res=False)
+
+    def _set_run_selection(self, list_run_id):
+        ''' Sets the run ids used by the analysis queries. '''
+
+        self.slct_run_id = list(list_run_id)
+        self.in_run_id = '(' + ', '.join(map(str, self.slct_run_id)) + ')'
+        self.format_kw['in_run_id'] = self.in_run_id
+
+    def _merge_incremental(self, tb, tb_prev, list_new, list_del):
+        '''
+        Copies the rows of the unchanged runs into the new table.
+
+        Rows of other runs are removed from the new table first, since not
+        all analysis methods filter their input tables by run_id. Columns
+        which are missing in the new table are not copied, same as for a
+        complete re-calculation.
+        '''
+
+        cols_new = self.aql.get_sql_cols(tb, self.sc_out, self.db)
+        cols_prev = self.aql.get_sql_cols(tb_prev, self.sc_out, self.db)
+        cols = ', '.join(c for c in cols_new if c in cols_prev)
+
+        exec_str = ('''
+                    DELETE FROM {sc_out}.{tb}
+                    WHERE NOT run_id IN {in_new};
+                    INSERT INTO {sc_out}.{tb} ({cols})
+                    SELECT {cols} FROM {sc_out}.{tb_prev}
+                    WHERE NOT run_id IN {in_del};
+                    DROP TABLE {sc_out}.{tb_prev} CASCADE;
+                    ''').format(sc_out=self.sc_out, tb=tb, tb_prev=tb_prev,
+                                cols=cols, in_new=self.list_to_str(list_new),
+                                in_del=self.list_to_str(list_del))
+
+        self.aql.exec_sql(exec_str, db=self.db, ret_res=False)
+
+    def _call_for_runs(self, f, list_run_id, list_tb_incr, *args, **kwargs):
+        '''
+        Calls ``f`` for the selected runs.
+
+        The existing tables ``list_tb_incr`` are kept as ``{tb}_prev``
+        and restored if ``f`` fails.
+        '''
+
+        for tb in list_tb_incr:
+            self.aql.exec_sql('''
+                              DROP TABLE IF EXISTS {sc_out}.{tb}_prev CASCADE;
+                              ALTER TABLE {sc_out}.{tb} RENAME TO {tb}_prev;
+                              '''.format(sc_out=self.sc_out, tb=tb),
+                              db=self.db, ret_res=False)
+
+        slct_run_id = self.slct_run_id
+
+        try:
+            self._set_run_selection(list_run_id)
+            f(self, *args, **kwargs)
+
+        except Exception as e:
+            for tb in list_tb_incr:
+                self.aql.exec_sql('''
+                                  DROP TABLE IF EXISTS {sc_out}.{tb} CASCADE;
+                                  ALTER TABLE {sc_out}.{tb}_prev RENAME TO {tb};
+                                  '''.format(sc_out=self.sc_out, tb=tb),
+                                  db=self.db, ret_res=False)
+            raise(e)
+
+        finally:
+            self._set_run_selection(slct_run_id)
+
+    def run_incremental(self, f, list_tb, *args, **kwargs):
+        '''
+        Calls the analysis method ``f`` for new and replaced runs only.
+
+        Parameters
+        ----------
+        f : function
+            undecorated analysis method
+        list_tb : list
+            names of the analysis tables generated by ``f``; all need to
+            have a ``run_id`` column
+
+        '''
+
+        dict_hash = self._get_run_hashes()
+
+        self.aql.exec_sql('''
+                          CREATE TABLE IF NOT EXISTS {sc_out}.{tb_log} (
+                              tb_name VARCHAR, run_id SMALLINT,
+                              run_hash VARCHAR);
+                          '''.format(sc_out=self.sc_out, tb_log=TB_RUN_LOG),
+                          db=self.db, ret_res=False)
+
+        list_tb_exist = self.aql.get_sql_tables(self.sc_out, self.db)
+        dict_log = {tb: (self._get_run_log(tb) if tb in list_tb_exist else {})
+                    for tb in list_tb}
+
+        # runs to be computed and runs to be deleted from the tables
+        list_new = sorted({run_id for tb in list_tb
+                           for run_id, hsh in dict_hash.items()
+                           if not dict_log[tb].get(run_id) == hsh})
+        list_del = sorted(set(list_new)
+                          | {run_id for tb in list_tb for run_id in dict_log[tb]
+                             if not run_id in dict_hash})
+
+        if not list_del:
+            logger.info('Analysis tables {} are up to date.'.format(list_tb))
+            return
+
+        logger.info('Analysis tables {}: computing run_ids {}, removing '
+                    '{}.'.format(list_tb, list_new,
+                                 sorted(set(list_del) - set(list_new))))
+
+        # tables without log are replaced entirely
+        list_tb_incr = [tb for tb in list_tb
+                        if tb in list_tb_exist and dict_log[tb]]
+
+        if list_new:
+            self._call_for_runs(f, list_new, list_tb_incr, *args, **kwargs)
+
+            # all finished runs are used by subsequent analyses
+            self._set_run_selection(sorted(dict_hash))
+            try:
+                self.generate_view_time_series_subset()
+            except Exception:
+                warnings.warn('Method generate_view_time_series_subset '
+                              'could not be executed.')
+
+        for tb in list_tb:
+
+            if tb in list_tb_incr and list_new:
+                self._merge_incremental(tb, tb + '_prev', list_new,
+                                        list_del)
+            elif tb in list_tb_incr:
+                self.aql.exec_sql('''
+                                  DELETE FROM {sc_out}.{tb}
+                                  WHERE run_id IN {in_del};
+                                  '''.format(sc_out=self.sc_out, tb=tb,
+                                             in_del=self.list_to_str(list_del)),
+                                  db=self.db, ret_res=False)
+
+            self._update_run_log(tb, list_del if tb in list_tb_incr else None,
+                                 {run_id: dict_hash[run_id]
+                                  for run_id in list_new})
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of model build, solve, and output writing.
+
+:class:`Benchmark` builds :class:`grimsel.core.model_loop.ModelLoop`
+instances from synthetic input data (:class:`SyntheticInput`) of
+increasing size and measures
+
+* the time of each ``ModelLoop`` runlevel,
+* the LP size (variables, constraints, non-zeros if reported by the
+  solver),
+* the solve time with an open-source solver and the solver statistics
+  (see :mod:`grimsel.core.solver_log`), and
+* the write time for each ``output_target``.
+
+One record per size vector is appended to a JSON lines history file, which
+is read by :func:`read_history`. Since each record holds the package
+version and git commit, the history shows scaling curves as well as
+performance changes between versions.
+
+"""
+
+import os
+import json
+import time
+import shutil
+import platform
+import tempfile
+import datetime
+import subprocess
+
+import pandas as pd
+
+from grimsel.auxiliary.synthetic import SyntheticInput
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+HISTORY_FILE = 'benchmark_history.jsonl'
+
+# default output collections relative to the benchmark working directory
+DICT_CL_OUT = {'fastparquet': 'out_parquet',
+               'hdf5': 'out.hdf5',
+               'duckdb': 'out.duckdb',
+               'psql': 'out_benchmark'}
+
+
+def get_version_info():
+    '''
+    Package version and git commit of the grimsel source tree.
+
+    Returns
+    -------
+    dict
+        with keys ``version`` and ``git_commit``; values are ``None`` if
+        not available
+
+    '''
+
+    try:
+        from importlib.metadata import version
+        grimsel_version = version('Grimsel')
+    except Exception:
+        grimsel_version = None
+
+    try:
+        path = os.path.dirname(os.path.abspath(__file__))
+        git_commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                    cwd=path, capture_output=True, text=True,
+                                    timeout=10).stdout.strip() or None
+    except Exception:
+        git_commit = None
+
+    return {'version': grimsel_version, 'git_commit': git_commit}
+
+
+def read_history(fn=HISTORY_FILE):
+    '''
+    Reads a benchmark history file.
+
+    Nested record entries (runlevel and write times) are flattened to
+    columns like ``tdiff_runlevels.m.add_all_constraints`` or
+    ``tdiff_write.fastparquet``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        one row per benchmark record
+
+    '''
+
+    with open(fn, 'r') as f:
+        list_rec = [json.loads(line) for line in f if line.strip()]
+
+    return pd.json_normalize(list_rec)
+
+
+class Benchmark():
+    '''
+    Times synthetic models of several sizes.
+
+    Parameters
+    ----------
+    list_size : list of dict
+        size vectors passed to :class:`SyntheticInput`, e.g.
+        ``[{'nodes': 2, 'plants': 5, 'carriers': 1, 'hours': 168}]``
+    output_targets : list of str
+        output targets whose write time is measured; ``'psql'``
+        requires a ``sql_connector`` in ``iokwargs``
+    solver : str or None
+        name of the Pyomo solver, e.g. ``'glpk'``, ``'cbc'``, or
+        ``'highs'``; ``None`` skips solving and writing
+    history_file : str or None
+        JSON lines file the records are appended to; ``None`` doesn't
+        write the history
+    label : str
+        free text stored with each record, e.g. the name of a branch
+    work_dir : str or None
+        directory for the input data and output collections; a temporary
+        directory which is removed afterwards if ``None``
+    seed : int
+        seed of the synthetic input data
+    mkwargs : dict or None
+        additional :class:`ModelBase` keyword arguments
+    iokwargs : dict or None
+        additional :class:`grimsel.core.io.IO` keyword arguments
+
+    Example
+    -------
+    >>> bm = Benchmark([{'nodes': nd, 'plants': 5, 'hours': 168}
+    ...                 for nd in (1, 5, 20)],
+    ...                output_targets=['fastparquet', 'duckdb'],
+    ...                solver='cbc', label='master')
+    >>> df = bm.run()
+    >>> df_hist = read_history()
+
+    '''
+
+    def __init__(self, list_size, output_targets=('fastparquet',),
+                 solver='glpk', history_file=HISTORY_FILE, label='',
+                 work_dir=None, seed=0, mkwargs=None, iokwargs=None):
+
+        self.list_size = [dict(size) for size in list_size]
+        self.output_targets = list(output_targets)
+        self.solver = solver
+        self.history_file = history_file
+        self.label = label
+        self.work_dir = work_dir
+        self.seed = seed
+        self.mkwargs = mkwargs if mkwargs else {}
+        self.iokwargs = iokwargs if iokwargs else {}
+
+        unknown = set(self.output_targets) - set(DICT_CL_OUT)
+        if unknown:
+            raise ValueError('Benchmark: unknown output_targets {}; must '
+                             'be in {}.'.format(unknown, list(DICT_CL_OUT)))
+
+    def _get_solver(self):
+
+        from pyomo.opt import SolverFactory
+
+        solver = SolverFactory(self.solver)
+        if not solver.available(exception_flag=False):
+            raise RuntimeError('Benchmark: solver {} is not '
+                               'available.'.format(self.solver))
+
+        return solver
+
+    def _build(self, syn, data_path, work_dir):
+
+        from grimsel.core.model_loop import ModelLoop
+
+        mkwargs = {'tm_filt': syn.get_tm_filt(), 'verbose_solver': False,
+                   'keepfiles': False, **self.mkwargs}
+
+        # the model loop itself doesn't write; see _write
+        iokwargs = {'data_path': data_path, 'output_target': 'fastparquet',
+                    'cl_out': os.path.join(work_dir, 'out_build'),
+                    'dev_mode': True, **self.iokwargs, 'no_output': True,
+                    'resume_loop': False}
+
+        ml = ModelLoop(nsteps=[], mkwargs=mkwargs, iokwargs=iokwargs)
+        ml.build_model()
+
+        return ml
+
+    def _solve(self, ml):
+
+        ml.m.solver = self._get_solver()
+
+        t = time.time()
+        ml.m.run()
+        tdiff_solve = time.time() - t
+
+        results = ml.m.results
+        termination = str(results.solver.termination_condition)
+
+        try:
+            nnonzeros = int(results.problem[0].number_of_nonzeros)
+        except (TypeError, ValueError, AttributeError, IndexError):
+            nnonzeros = None
+
+        return tdiff_solve, termination, nnonzeros
+
+    def _write(self, ml, output_target, work_dir):
+
+        import grimsel.core.io as io
+
+        cl_out = DICT_CL_OUT[output_target]
+        if output_target != 'psql':
+            cl_out = os.path.join(work_dir, cl_out)
+
+        iokwargs = {**self.iokwargs, 'output_target': output_target,
+                    'cl_out': cl_out, 'dev_mode': True, 'no_output': False,
+                    'resume_loop': False, 'model': ml.m}
+
+        writer = io.IO(**iokwargs)
+        writer.init_output_tables()
+
+        t = time.time()
+        writer.write_run(run_id=0)
+        tdiff_write = time.time() - t
+
+        t = time.time()
+        writer.finalize_output_tables()
+        tdiff_finalize = time.time() - t
+
+        return tdiff_write, tdiff_finalize
+
+    def run_size(self, size, work_dir):
+        '''
+        Builds, solves, and writes the model of a single size vector.
+
+        Parameters
+        ----------
+        size : dict
+            size vector passed to :class:`SyntheticInput`
+        work_dir : str
+            directory for input data and output collections
+
+        Returns
+        -------
+        dict
+            benchmark record
+
+        '''
+
+        syn = SyntheticInput(seed=self.seed, **size)
+
+        data_path = os.path.join(work_dir, 'input')
+        shutil.rmtree(data_path, ignore_errors=True)
+        syn.write(data_path)
+
+        rec = {'timestamp': datetime.datetime.now().isoformat(
+                                                    timespec='seconds'),
+               'label': self.label, **get_version_info(),
+               'python': platform.python_version(),
+               'platform': platform.platform(), 'solver': self.solver,
+               **syn.size, 'seed': self.seed}
+
+        logger.info('Benchmark: size {}'.format(syn.size))
+
+        ml = self._build(syn, data_path, work_dir)
+
+        rec['tdiff_runlevels'] = ml.tdiff_runlevels
+        rec['tdiff_build'] = sum(ml.tdiff_runlevels.values())
+        rec['nvariables'] = ml.m.nvariables()
+        rec['nconstraints'] = ml.m.nconstraints()
+
+        rec['tdiff_solve'] = rec['termination'] = rec['nnonzeros'] = None
+        rec['run_stats'] = None
+        rec['tdiff_write'], rec['tdiff_finalize'] = {}, {}
+
+        if self.solver:
+            (rec['tdiff_solve'], rec['termination'],
+             rec['nnonzeros']) = self._solve(ml)
+            rec['run_stats'] = ml.m.run_stats
+
+            if rec['termination'] == 'optimal':
+                for output_target in self.output_targets:
+                    (rec['tdiff_write'][output_target],
+                     rec['tdiff_finalize'][output_target]) = \
+                            self._write(ml, output_target, work_dir)
+            else:
+                logger.warning('Benchmark: skipping output writing; solver '
+                               'termination condition '
+                               '{}.'.format(rec['termination']))
+
+        return rec
+
+    def _append_history(self, rec):
+
+        if not self.history_file:
+            return
+
+        with open(self.history_file, 'a') as f:
+            f.write(json.dumps(rec, default=str) + '\n')
+
+    def run(self):
+        '''
+        Runs the benchmark for all size vectors.
+
+        Each record is appended to the history file as soon as it is
+        complete.
+
+        Returns
+        -------
+        pandas.DataFrame
+            one row per size vector, flattened as by :func:`read_history`
+
+        '''
+
+        if self.solver:
+            self._get_solver()  # fail before building any model
+
+        work_dir = (self.work_dir if self.work_dir
+                    else tempfile.mkdtemp(prefix='grimsel_benchmark_'))
+
+        list_rec = []
+        try:
+            for size in self.list_size:
+                rec = self.run_size(size, work_dir)
+                self._append_history(rec)
+                list_rec.append(rec)
+        finally:
+            if not self.work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        return pd.json_normalize(list_rec)
+
+
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark synthetic '
+                                                 'grimsel models.')
+    parser.add_argument('--nodes', type=int, nargs='+', default=[1, 2, 5])
+    parser.add_argument('--plants', type=int, nargs='+', default=[5])
+    parser.add_argument('--carriers', type=int, nargs='+', default=[1])
+    parser.add_argument('--hours', type=int, nargs='+', default=[24, 168])
+    parser.add_argument('--output-targets', nargs='+',
+                        default=['fastparquet'])
+    parser.add_argument('--solver', default='glpk')
+    parser.add_argument('--history-file', default=HISTORY_FILE)
+    parser.add_argument('--label', default='')
+    args = parser.parse_args()
+
+    list_size = [{'nodes': nd, 'plants': pp, 'carriers': ca, 'hours': hy}
+                 for nd in args.nodes for pp in args.plants
+                 for ca in args.carriers for hy in args.hours]
+
+    df = Benchmark(list_size, output_targets=args.output_targets,
+                   solver=args.solver, history_file=args.history_file,
+                   label=args.label).run()
+
+    cols = ['nodes', 'plants', 'carriers', 'hours', 'nvariables',
+            'nconstraints', 'tdiff_build', 'tdiff_solve']
+    print(df[cols].to_string(index=False))
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared filtering of input tables.
+
+Filters are lists of ``(column, values)`` tuples, as used by
+:func:`grimsel.auxiliary.sqlutils.aux_sql_func.read_sql`. ``column`` can be
+a tuple of column names, in which case ``values`` is a list of tuples, e.g.
+``[(('nd_id', 'nd_2_id'), [(0, 1), (1, 0)])]``. All filters of a list are
+combined with ``AND``; an empty value list selects no rows.
+
+A :class:`Filter` compiles the value lists once into (multi-)indices. It
+can then be applied to any DataFrame as vectorized semi-joins, or
+translated into SQL ``WHERE`` clauses and parquet row group predicates.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _to_sql_literal(val):
+
+    if isinstance(val, (bool, np.bool_)):
+        return 'TRUE' if val else 'FALSE'
+    elif isinstance(val, str):
+        return '\'%s\''%val.replace('\'', '\'\'')
+
+    return str(val)
+
+
+class Filter():
+    '''
+    Compiled list of ``(column, values)`` filters.
+
+    Parameters
+    ----------
+    filt : list or Filter
+        list of ``(column, values)`` tuples; ``column`` is a column name
+        or a tuple of column names
+
+    Example
+    -------
+    >>> flt = Filter([('nd_id', [0, 1]),
+    ...               (('nd_id', 'nd_2_id'), [(0, 1), (1, 0)])])
+    >>> df = flt.apply(df)
+    >>> flt.to_sql()
+    '(nd_id IN (0, 1)) AND ((nd_id, nd_2_id) IN ((0, 1), (1, 0)))'
+
+    '''
+
+    def __init__(self, filt=None):
+
+        if isinstance(filt, Filter):
+            filt = filt.filt
+
+        self.filt = list(filt) if filt else []
+        self.list_idx = [(self._get_cols(col), self._get_index(col, vals))
+                         for col, vals in self.filt]
+
+    @staticmethod
+    def _get_cols(col):
+
+        return [col] if isinstance(col, str) else list(col)
+
+    def _get_index(self, col, vals):
+
+        vals = list(vals)
+        cols = self._get_cols(col)
+
+        if len(cols) == 1:
+            return pd.Index(vals, tupleize_cols=False)
+
+        if not vals:
+            return pd.MultiIndex.from_arrays([[]] * len(cols), names=cols)
+
+        return pd.MultiIndex.from_tuples(vals, names=cols)
+
+    @property
+    def columns(self):
+        ''' List of all columns required for filtering. '''
+
+        return list(dict.fromkeys(c for cols, _ in self.list_idx
+                                  for c in cols))
+
+    def __bool__(self):
+
+        return bool(self.filt)
+
+    def __repr__(self):
+
+        return 'Filter({})'.format(self.filt)
+
+    def mask(self, df):
+        '''
+        Boolean mask of the rows of ``df`` passing all filters.
+
+        Returns
+        -------
+        numpy.ndarray
+
+        '''
+
+        mask = np.ones(len(df), dtype=bool)
+
+        for cols, idx in self.list_idx:
+
+            if len(cols) == 1:
+                mask &= df[cols[0]].isin(idx).values
+            else:
+                mask &= pd.MultiIndex.from_frame(df[cols]).isin(idx)
+
+        return mask
+
+    def apply(self, df):
+        ''' Returns the rows of ``df`` passing all filters. '''
+
+        if not self.filt:
+            return df
+
+        return df.loc[self.mask(df)]
+
+    def to_sql(self):
+        '''
+        Translates the filters into the argument of a SQL ``WHERE``.
+
+        Returns
+        -------
+        str
+
+        '''
+
+        list_str = []
+        for col, vals in self.filt:
+
+            vals = list(vals)
+            if not vals:
+                list_str.append('(FALSE)')
+                continue
+
+            if isinstance(col, str):
+                col_str = col
+                val_str = ', '.join(map(_to_sql_literal, vals))
+            else:
+                col_str = '(%s)'%', '.join(col)
+                val_str = ', '.join('(%s)'%', '.join(map(_to_sql_literal, val))
+                                    for val in vals)
+
+            list_str.append('(%s IN (%s))'%(col_str, val_str))
+
+        return ' AND '.join(list_str) if list_str else 'TRUE'
+
+    def to_parquet(self):
+        '''
+        Translates the filters into parquet row group predicates.
+
+        Multi-column filters are translated into a predicate for each
+        column; this selects a superset of the row groups, so the
+        :meth:`apply` method still needs to be applied to the result.
+
+        Returns
+        -------
+        list
+            list of ``(column, 'in', values)`` tuples
+
+        '''
+
+        list_pred = []
+        for cols, idx in self.list_idx:
+            if not len(idx):
+                continue
+
+            if len(cols) == 1:
+                list_pred.append((cols[0], 'in', idx.tolist()))
+            else:
+                list_pred += [(col, 'in', idx.unique(level=col).tolist())
+                              for col in cols]
+
+        return list_pred
+
+    def to_hdf5(self, data_columns=None):
+        '''
+        Translates the filters into a PyTables ``where`` condition.
+
+        As for :meth:`to_parquet`, multi-column filters select a superset
+        of the rows.
+
+        Parameters
+        ----------
+        data_columns : list or None
+            queryable columns of the HDF5 table; filters on other columns
+            are skipped
+
+        Returns
+        -------
+        list
+            list of condition strings, combined with ``AND`` by
+            :meth:`pandas.HDFStore.select`
+
+        '''
+
+        return ['%s in %s'%(col, list(vals)) for col, _, vals
+                in self.to_parquet()
+                if data_columns is None or col in data_columns]
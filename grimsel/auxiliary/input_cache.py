@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reading of input tables from csv, parquet, and feather files.
+
+If a cache directory is provided (see :func:`get_cache_dir`), CSV files
+are converted to parquet files the first time they are read. A cache file
+is re-generated if the modification time of the CSV file changed and its
+content hash differs from the one stored in the cache meta data, or if
+its column types don't match the meta data. Reading from the parquet
+files avoids the CSV parsing and type inference and allows for column
+projection and row group filtering.
+
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+import pandas as pd
+import fastparquet
+
+from grimsel import _get_logger
+from grimsel.auxiliary.filters import Filter
+
+logger = _get_logger(__name__)
+
+
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME',
+                                         os.path.join('~', '.cache')),
+                         'grimsel')
+CACHE_FORMAT_VERSION = 1
+ROW_GROUP_SIZE = 2**16
+
+# file suffix -> format; same table in several formats: first one is used
+DICT_SUFFIX_FORMAT = {'.parquet': 'parquet',
+                      '.parq': 'parquet',
+                      '.feather': 'feather',
+                      '.csv': 'csv'}
+
+
+def split_table_fn(fn):
+    '''
+    Returns the table name and format of an input file.
+
+    Parameters
+    ----------
+    fn : str
+        file or directory name, e.g. ``'profdmnd.csv'``
+
+    Returns
+    -------
+    tuple
+        ``(table name, format)`` or ``None`` if the suffix is not supported
+
+    '''
+
+    name, suffix = os.path.splitext(os.path.basename(fn))
+
+    if not suffix in DICT_SUFFIX_FORMAT:
+        return None
+
+    return name, DICT_SUFFIX_FORMAT[suffix]
+
+
+def _get_file_hash(fn):
+
+    hsh = hashlib.sha1()
+    with open(fn, 'rb') as f:
+        for chunk in iter(lambda: f.read(2**20), b''):
+            hsh.update(chunk)
+
+    return hsh.hexdigest()
+
+
+def _write_atomic(fn, write_func):
+    ''' Writes to a temporary file first; safe for parallel workers. '''
+
+    fn_tmp = '{}.{}.{}.tmp'.format(fn, os.getpid(), threading.get_ident())
+    try:
+        write_func(fn_tmp)
+        os.replace(fn_tmp, fn)
+    finally:
+        if os.path.exists(fn_tmp):
+            os.remove(fn_tmp)
+
+
+def get_cache_dir(input_cache):
+    '''
+    Returns the cache directory for the ``input_cache`` model parameter.
+
+    Parameters
+    ----------
+    input_cache : bool or str
+        ``True``: user cache directory :data:`CACHE_DIR`; ``str``: custom
+        directory; ``False``: no cache
+
+    Returns
+    -------
+    str or None
+        absolute path of the cache directory
+
+    '''
+
+    if not input_cache:
+        return None
+
+    cache_dir = CACHE_DIR if input_cache is True else input_cache
+
+    return os.path.abspath(os.path.expanduser(cache_dir))
+
+
+def get_cache_fn(fn, cache_dir):
+    ''' Returns the names of the parquet cache file and its meta file. '''
+
+    dirc, name = os.path.split(os.path.abspath(fn))
+
+    # one sub-directory per input directory
+    key = hashlib.sha1(dirc.encode()).hexdigest()[:16]
+    cache_fn = os.path.join(cache_dir, key, name + '.parq')
+
+    return cache_fn, cache_fn + '.json'
+
+
+def _get_parquet_dtypes(fn):
+    ''' Returns the column types of a parquet file from its footer. '''
+
+    return {col: str(dtype) for col, dtype
+            in fastparquet.ParquetFile(fn).dtypes.items()}
+
+
+def _is_valid_cache(cache_fn, meta):
+
+    try:
+        dtypes = _get_parquet_dtypes(cache_fn)
+    except Exception as e:
+        logger.warning('Could not read input cache {}: {}'.format(cache_fn,
+                                                                  e))
+        return False
+
+    if dtypes != meta['dtypes']:
+        logger.warning('Column types of input cache {} don\'t match its '
+                       'meta data.'.format(cache_fn))
+        return False
+
+    return True
+
+
+def _get_cached_csv(fn, cache_dir):
+    '''
+    Returns the name of a valid parquet cache file of a CSV file.
+
+    The cache file is generated or updated if required. Returns ``None``
+    if the cache is not writable or if the table can't be stored as
+    parquet.
+    '''
+
+    cache_fn, meta_fn = get_cache_fn(fn, cache_dir)
+    stat = os.stat(fn)
+
+    meta = None
+    if os.path.isfile(meta_fn) and os.path.isfile(cache_fn):
+        with open(meta_fn, 'r') as f:
+            meta = json.load(f)
+
+    if (meta and meta.get('version') == CACHE_FORMAT_VERSION
+            and _is_valid_cache(cache_fn, meta)):
+
+        if (meta['mtime'] == stat.st_mtime and meta['size'] == stat.st_size):
+            return cache_fn
+
+        if (meta['size'] == stat.st_size
+                and meta['sha1'] == _get_file_hash(fn)):
+
+            meta['mtime'] = stat.st_mtime
+            _write_atomic(meta_fn, lambda fn_tmp: json.dump(meta,
+                                                            open(fn_tmp, 'w')))
+            return cache_fn
+
+    logger.info('Generating input cache {}'.format(cache_fn))
+
+    df = pd.read_csv(fn)
+
+    meta = {'version': CACHE_FORMAT_VERSION, 'mtime': stat.st_mtime,
+            'size': stat.st_size, 'sha1': _get_file_hash(fn),
+            'dtypes': df.dtypes.astype(str).to_dict()}
+
+    try:
+        os.makedirs(os.path.dirname(cache_fn), exist_ok=True)
+
+        _write_atomic(cache_fn,
+                      lambda fn_tmp: df.to_parquet(
+                                        fn_tmp, engine='fastparquet',
+                                        index=False,
+                                        row_group_offsets=ROW_GROUP_SIZE))
+        _write_atomic(meta_fn,
+                      lambda fn_tmp: json.dump(meta, open(fn_tmp, 'w')))
+
+    except Exception as e:
+        logger.warning('Could not write input cache for {}: {}'.format(fn, e))
+        return None
+
+    return cache_fn
+
+
+def read_table(fn, filt=None, columns=None, cache_dir=None):
+    '''
+    Reads an input table from a csv, parquet, or feather file.
+
+    Parameters
+    ----------
+    fn : str
+        file name; parquet datasets can also be directories
+    filt : list or Filter
+        list of ``(column, values)`` filters, see
+        :class:`grimsel.auxiliary.filters.Filter`
+    columns : list or None
+        columns to be read; all if ``None``
+    cache_dir : str or None
+        read CSV files through the parquet cache in this directory, see
+        :func:`get_cache_dir`
+
+    Returns
+    -------
+    DataFrame
+        filtered table
+
+    '''
+
+    filt = Filter(filt)
+    fmt = split_table_fn(fn)[1]
+
+    # filter columns need to be read, even if they are not selected
+    cols_read = columns
+    if columns is not None:
+        cols_read = list(columns) + [c for c in filt.columns
+                                     if not c in columns]
+
+    if fmt == 'csv' and cache_dir:
+        cache_fn = _get_cached_csv(fn, cache_dir)
+        if cache_fn:
+            fn, fmt = cache_fn, 'parquet'
+
+    if fmt == 'parquet':
+        df = pd.read_parquet(fn, engine='fastparquet', columns=cols_read,
+                             filters=filt.to_parquet())
+    elif fmt == 'feather':
+        df = pd.read_feather(fn, columns=cols_read)
+    else:
+        df = pd.read_csv(fn, usecols=cols_read)
+
+    df = filt.apply(df)
+
+    if columns is not None:
+        df = df[list(columns)]
+
+    return df
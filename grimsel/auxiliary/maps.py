@@ -16,6 +16,175 @@ logger = _get_logger(__name__)
 rev_dict = lambda dct: {val: key for key, val in dct.items()}
 
 
+class IdLookup():
+    '''
+    Dictionary of integer ids compiled to a dense lookup array.
+
+    The dictionary keys are used as positions in an array holding the
+    dictionary values. Translating a column then reduces to a single
+    :func:`numpy.take`. Dictionaries with keys which are not non-negative
+    integers (or which are too sparse) fall back to a hash based
+    :meth:`pandas.Series.map`.
+
+    As for :meth:`pandas.Series.replace`, values which are not keys of the
+    dictionary are left unchanged and numerical columns keep their dtype
+    if it can hold the dictionary values.
+
+    Parameters
+    ----------
+    dct : dict
+        translation dictionary ``{id (int): value}``
+    max_size : int
+        upper limit for the lookup array length relative to the number of
+        dictionary keys
+
+    '''
+
+    def __init__(self, dct, max_size=100):
+
+        self.dct = dct
+        self.lookup = None
+        self.is_set = None
+        self.val_range = None  # integer values only; see _get_result_dtype
+
+        keys = pd.Series(list(dct.keys()), dtype=object)
+        vals = pd.Series(list(dct.values()))
+
+        if keys.empty:
+            return
+
+        if (vals.dtype.kind in 'iu' or (vals.dtype.kind == 'f'
+                                        and np.isfinite(vals).all()
+                                        and (vals % 1 == 0).all())):
+            self.val_range = (vals.min(), vals.max())
+
+        keys = pd.to_numeric(keys, errors='coerce')
+
+        if (keys.isna().any() or (keys < 0).any()
+            or (keys % 1 != 0).any()
+            or keys.max() > max_size * (len(keys) + 10)):
+            return
+
+        keys = keys.astype(np.int64).values
+
+        self.lookup = np.empty(keys.max() + 1, dtype=vals.dtype)
+        if self.lookup.dtype.kind == 'O':
+            self.lookup[:] = None
+        else:
+            self.lookup[:] = 0
+        self.lookup[keys] = vals.values
+
+        self.is_set = np.zeros(keys.max() + 1, dtype=bool)
+        self.is_set[keys] = True
+
+    def _get_result_dtype(self, dtype):
+        '''
+        Dtype of translated numerical columns of dtype ``dtype``.
+
+        Same as for :meth:`pandas.Series.replace`: the column dtype is
+        kept if it can hold all dictionary values. Otherwise it is
+        promoted, e.g. ``int16`` to ``int32`` for values > 32767.
+        '''
+
+        if self.val_range is None or dtype.kind not in 'iuf':
+            return None
+
+        vmin, vmax = self.val_range
+        prefix = 'uint' if dtype.kind == 'u' and vmin >= 0 else 'int'
+        val_dtype = [np.dtype(prefix + nbits) for nbits in ('8', '16', '32')
+                     if np.iinfo(prefix + nbits).min <= vmin
+                     and vmax <= np.iinfo(prefix + nbits).max]
+
+        return np.promote_types(dtype, val_dtype[0] if val_dtype
+                                       else np.dtype(prefix + '64'))
+
+    def _translate_array(self, arr):
+
+        result = self._lookup_array(arr)
+        dtype = self._get_result_dtype(arr.dtype)
+
+        if dtype is not None and result.dtype.kind in 'iuf':
+            return result.astype(dtype, copy=False)
+
+        return result
+
+    def _lookup_array(self, arr):
+
+        if not self.dct:
+            return arr.copy()
+
+        if self.lookup is None or arr.dtype.kind not in 'iuf':
+
+            srs = pd.Series(arr)
+            mask = srs.isin(self.dct.keys())
+            if mask.all():
+                return srs.map(self.dct).values
+
+            srs = srs.astype(object)
+            srs.loc[mask] = srs.loc[mask].map(self.dct)
+            return srs.infer_objects().values
+
+        nlookup = len(self.lookup)
+
+        if arr.dtype.kind == 'f':
+            valid = np.isfinite(arr) & (arr >= 0) & (arr < nlookup)
+            valid[valid] = arr[valid] % 1 == 0
+        else:
+            valid = (arr >= 0) & (arr < nlookup)
+
+        idx = np.where(valid, arr, 0).astype(np.int64)
+        valid &= self.is_set[idx]
+
+        result = self.lookup[idx]
+
+        if valid.all():
+            return result
+
+        return np.where(valid, result, arr)
+
+    def translate(self, column, categorical=False):
+        '''
+        Translates a column using the compiled dictionary.
+
+        Parameters
+        ----------
+        column : pandas.Series or array-like
+            ids to be translated
+        categorical : bool
+            if ``True``, return the result as a :class:`pandas.Categorical`;
+            this is preferable for name columns of long tables
+
+        Returns
+        -------
+        pandas.Series or numpy.ndarray
+            same type as the input ``column``
+
+        '''
+
+        values = column.values if isinstance(column, pd.Series) else column
+        result = self._translate_array(np.asarray(values))
+
+        if categorical:
+            result = pd.Categorical(result)
+
+        if isinstance(column, pd.Series):
+            return pd.Series(result, index=column.index, name=column.name)
+
+        return result
+
+
+def translate(column, mapping, categorical=False):
+    '''
+    Translates a column using the dictionary ``mapping``.
+
+    Fast replacement for ``column.replace(mapping)`` based on
+    :class:`IdLookup`. For repeated translations with the same mapping
+    use :meth:`Maps.translate` or keep the :class:`IdLookup` instance.
+    '''
+
+    return IdLookup(mapping).translate(column, categorical)
+
+
 class Maps():
     '''
     Transforms definition tables into dictionaries.
@@ -52,6 +221,9 @@ class Maps():
         self.sc = sc
         self.db = db
 
+        self._dict_lookup = {}
+        self._dict_node_to_plant = {}
+
         if not dict_tb:
             self._dict_tb = self._read_tables_sql()
         else:
@@ -124,6 +296,27 @@ class Maps():
 
         return self
 
+    @classmethod
+    def from_duckdb(cls, fn):
+
+        import duckdb
+
+        if not os.path.isfile(fn):
+            raise IOError('File %s not found.'%fn)
+
+        with duckdb.connect(fn, read_only=True) as con:
+
+            list_tb = [tb[0] for tb in con.execute('SHOW TABLES').fetchall()]
+
+            dict_tb = {tb.replace('def_', ''):
+                       con.execute('SELECT * FROM %s'%tb).df()
+                       for tb in list_tb
+                       if tb.replace('def_', '') in Maps.list_id_tbs}
+
+        self = cls(None, None, dict_tb)
+
+        return self
+
     @classmethod
     def from_parquet(cls, dirc):
 
@@ -312,12 +505,88 @@ class Maps():
             if idict:
 
                 col_name = iid + ('_id' if not keep_cols else '')
-                df.loc[:, col_name] = df[iid + '_id'].replace(idict)
+                df.loc[:, col_name] = self.translate(df[iid + '_id'],
+                                                     'dict_' + iid)
             elif iid == 'run':
                 df = self.run_id_to_names(df)
 
         return df
 
+    def get_lookup(self, mapping):
+        '''
+        Returns the cached :class:`IdLookup` for the dictionary ``mapping``.
+
+        Parameters
+        ----------
+        mapping : str or dict
+            name of a dictionary attribute (e.g. ``'dict_pp'``) or a
+            dictionary; lookups compiled from dictionaries are not cached
+
+        '''
+
+        if not isinstance(mapping, str):
+            return IdLookup(mapping)
+
+        if not mapping in self._dict_lookup:
+            self._dict_lookup[mapping] = IdLookup(getattr(self, mapping))
+
+        return self._dict_lookup[mapping]
+
+    def translate(self, column, mapping, categorical=False):
+        '''
+        Translates a column using the compiled dictionary ``mapping``.
+
+        Parameters
+        ----------
+        column : pandas.Series or array-like
+            ids to be translated
+        mapping : str or dict
+            see :meth:`get_lookup`
+        categorical : bool
+            return a :class:`pandas.Categorical`
+
+        '''
+
+        return self.get_lookup(mapping).translate(column, categorical)
+
+    def node_to_plant(self, pt):
+        '''
+        Dictionary ``{nd_id: pp_id}`` for the plants of a given type.
+
+        This is used to translate demand and inter-nodal transmission to
+        the corresponding "power plants" of the *pwr* table. The
+        dictionaries are cached for each plant type.
+
+        Parameters
+        ----------
+        pt : str
+            selected plant type, e.g. ``'DMND'`` or ``'TRNS'``; the
+            suffix *_ST* of the plant type names is ignored
+
+        '''
+
+        if not pt in self._dict_node_to_plant:
+
+            df_pt = self._dict_tb['pp_type']
+            mask_pt = df_pt.pt.str.replace('_ST', '', regex=False) == pt
+            slct_pp_type = int(df_pt.index[mask_pt][0])
+
+            df_pp = self._dict_tb['plant']
+            df_pp = df_pp.loc[df_pp.pt_id == slct_pp_type]
+
+            dct = pd.Series(df_pp.index, index=df_pp.nd_id).to_dict()
+            self._dict_node_to_plant[pt] = dct
+            self._dict_lookup[('node_to_plant', pt)] = IdLookup(dct)
+
+        return self._dict_node_to_plant[pt]
+
+    def translate_node_to_plant(self, column, pt):
+        ''' Translates a ``nd_id`` column to the ``pp_id`` of type ``pt``. '''
+
+        self.node_to_plant(pt)
+
+        return self._dict_lookup[('node_to_plant', pt)].translate(column)
+
     def run_id_to_names(self, df):
 
         if 'run' in self._dict_tb:
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory accounting of built models.
+
+:func:`get_memory_report` lists the size of
+
+* each :class:`grimsel.core.model_base.ModelBase` attribute (input and
+  intermediate DataFrames, dictionaries, ``TimeMap`` objects,
+  ``ParameterAdder`` instances, ...),
+* each Pyomo component (sets, parameters, variables, constraints), and
+* each :class:`grimsel.core.io.CompIO` buffer (component index tables
+  and component data lists).
+
+Sizes are obtained by traversing the objects and summing the
+``sys.getsizeof`` values of all referenced objects, using
+``DataFrame.memory_usage(deep=True)`` and ``ndarray.nbytes`` for
+pandas and numpy objects. Every object is counted once, under the first
+entry it is found in: components are traversed before the model
+attributes, so e.g. the variables referenced by constraint expressions
+are counted with the variables. Memory-mapped arrays (see
+:mod:`grimsel.auxiliary.profile_store`) are file-backed and shared
+between processes; they are not counted.
+
+"""
+
+import sys
+import types
+import weakref
+from collections.abc import Sized
+
+import numpy as np
+import pandas as pd
+
+import pyomo.environ as po
+from pyomo.core.base.component import Component, ComponentData
+
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+# traversal order of the Pyomo components
+LIST_CTYPE = [po.Set, po.Param, po.Var, po.Constraint, po.Objective]
+
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType,
+               types.BuiltinFunctionType, types.MethodType,
+               weakref.ref, str, bytes, int, float, bool, type(None))
+
+
+def _is_memmap(arr):
+
+    while isinstance(arr, np.ndarray):
+        if isinstance(arr, np.memmap):
+            return True
+        arr = arr.base
+
+    return False
+
+
+def get_sizeof(obj, seen=None, stop=None):
+    '''
+    Total size of an object and all objects referenced by it.
+
+    Parameters
+    ----------
+    obj : object
+        object to be measured
+    seen : set or None
+        ids of objects which are already counted; updated in place
+    stop : tuple of types or None
+        types which are not traversed; the root object ``obj`` is always
+        traversed
+
+    Returns
+    -------
+    int
+        size in bytes
+
+    '''
+
+    seen = set() if seen is None else seen
+    stop = stop if stop else ()
+
+    nbytes = 0
+    stack = [(obj, True)]
+    while stack:
+        obj, is_root = stack.pop()
+
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+
+        if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+            nbytes += int(np.sum(obj.memory_usage(deep=True)))
+            continue
+
+        if isinstance(obj, np.ndarray):
+            nbytes += 0 if _is_memmap(obj) else obj.nbytes
+            continue
+
+        nbytes += sys.getsizeof(obj)
+
+        if isinstance(obj, _SKIP_TYPES) or (not is_root
+                                            and isinstance(obj, stop)):
+            continue
+
+        if isinstance(obj, dict):
+            stack += [(o, False) for kv in obj.items() for o in kv]
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack += [(o, False) for o in obj]
+
+        if hasattr(obj, '__dict__'):
+            stack.append((obj.__dict__, False))
+
+        for cls in type(obj).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                if slot in ('__weakref__', '__dict__'):
+                    continue
+                try:
+                    stack.append((getattr(obj, slot), False))
+                except Exception:  # unset slot
+                    pass
+
+    return nbytes
+
+
+def _get_component_rows(m, seen):
+
+    list_rows = []
+    for ctype in LIST_CTYPE:
+        for comp in m.component_objects(ctype, descend_into=False):
+
+            nbytes = get_sizeof(comp, seen, stop=(Component,))
+            list_rows.append(('component', comp.name, ctype.__name__,
+                              len(comp), nbytes))
+
+    return list_rows
+
+
+def _get_attribute_rows(m, seen):
+
+    # attributes of the Pyomo block itself
+    skip = set(vars(po.ConcreteModel()))
+
+    list_rows = []
+    for name, val in vars(m).items():
+
+        if name in skip or isinstance(val, Component):
+            continue
+
+        nbytes = get_sizeof(val, seen, stop=(Component, ComponentData))
+        list_rows.append(('attribute', name, type(val).__name__,
+                          len(val) if isinstance(val, Sized) else None,
+                          nbytes))
+
+    return list_rows
+
+
+def _get_compio_rows(io, seen):
+
+    modwr = getattr(io, 'modwr', io)
+
+    list_rows = []
+    for tb, compio in getattr(modwr, 'dict_comp_obj', {}).items():
+
+        buffers = {key: val for key, val in vars(compio).items()
+                   if not key in ('comp_obj', 'model', 'connect')}
+
+        nbytes = get_sizeof(buffers, seen, stop=(Component, ComponentData))
+        list_rows.append(('compio', tb, type(compio).__name__,
+                          len(compio._list_compdata)
+                          if compio._list_compdata is not None else None,
+                          nbytes))
+
+    return list_rows
+
+
+def get_memory_report(m, io=None, components=True):
+    '''
+    Size of the model attributes, Pyomo components, and output buffers.
+
+    Parameters
+    ----------
+    m : ModelBase
+        model instance
+    io : IO or ModelWriter or None
+        output instance; its ``CompIO`` objects are included if not None
+    components : bool
+        include the Pyomo components; traversing the constraint
+        expressions can take a while for large models
+
+    Returns
+    -------
+    pandas.DataFrame
+        columns ``kind`` (``'component'``, ``'attribute'``, or
+        ``'compio'``), ``name``, ``type``, ``length``, ``nbytes``; sorted
+        by ``nbytes``
+
+    Example
+    -------
+    >>> df = get_memory_report(ml.m, ml.io)
+    >>> df.groupby('kind').nbytes.sum() / 1e6
+
+    '''
+
+    seen = {id(m)}
+
+    list_rows = (_get_component_rows(m, seen) if components else [])
+    list_rows += _get_attribute_rows(m, seen)
+    if io is not None:
+        list_rows += _get_compio_rows(io, seen)
+
+    df = pd.DataFrame(list_rows, columns=['kind', 'name', 'type',
+                                          'length', 'nbytes'])
+    df = df.sort_values('nbytes', ascending=False).reset_index(drop=True)
+
+    logger.info('Memory report: {}'.format(
+                    ', '.join('{} {:.1f} MB'.format(kind, nbytes / 1e6)
+                              for kind, nbytes
+                              in df.groupby('kind').nbytes.sum().items())))
+
+    return df
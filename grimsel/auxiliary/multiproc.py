@@ -8,13 +8,42 @@ Created on Tue Nov  5 21:31:46 2019
 from multiprocessing import Pool
 from multiprocessing import current_process
 import contextlib
+import functools
+import time
 from grimsel.core.model_loop import logger_parallel
+import grimsel.auxiliary.tracing as tracing
 from grimsel import logger
 
+def _call_run_id(func, run_id):
+
+    with tracing.trace_run(run_id):
+        func(run_id)
+
 def _call_list_run_id(func, list_run_id):
 
     for run_id in list_run_id:
-        func(run_id)
+        _call_run_id(func, run_id)
+
+
+@contextlib.contextmanager
+def _tracing(ml, trace, profile):
+    '''
+    Enables tracing for the model loop if `trace`; yields the trace
+    directory or None.
+    '''
+
+    if not trace:
+        yield None
+        return
+
+    trace_dir = (trace if isinstance(trace, str)
+                 else tracing.get_trace_dir(ml.io.cl_out))
+
+    tracing.start(trace_dir, profile)
+    try:
+        yield trace_dir
+    finally:
+        tracing.stop()
 
 
 
@@ -37,18 +66,28 @@ def _adjust_logger_levels(do, ml, grimsel_level, parallel_level, verbose_solver)
     logger_parallel.setLevel(old_parallel_level)
 
 
-def run_sequential(ml, func, adjust_logger_levels=True):
-    ''' Sequential execution of all model runs. '''
+def run_sequential(ml, func, adjust_logger_levels=True, trace=False,
+                   profile=False):
+    '''
+    Sequential execution of all model runs.
+
+    See :func:`run_parallel` for the `trace` and `profile` parameters.
+    '''
 
-    with _adjust_logger_levels(adjust_logger_levels,
-                               ml, 'DEBUG', 'ERROR', True):
+    with _tracing(ml, trace, profile):
 
-        _call_list_run_id(func, ml.get_list_run_id())
+        with _adjust_logger_levels(adjust_logger_levels,
+                                   ml, 'DEBUG', 'ERROR', True):
+
+            _call_list_run_id(func, ml.get_list_run_id())
+
+        with tracing.span('ModelWriter.finalize_output_tables'):
+            ml.io.finalize_output_tables()
 
 
 
 def run_parallel(ml, func, nproc=None, groupby=None,
-                 adjust_logger_levels=True):
+                 adjust_logger_levels=True, trace=False, profile=False):
     '''
     Parameters
     ----------
@@ -59,29 +98,46 @@ def run_parallel(ml, func, nproc=None, groupby=None,
     groupby : list of `ModelLoop.df_run` columns
         Determines the groups of runs which are passed to the processes. This
         is necessary if certain model runs depend on each other.
+    trace : bool or str
+        Record the timeline of all model runs (see
+        :mod:`grimsel.auxiliary.tracing`). The spans of all workers are
+        merged into a single Chrome trace file ``trace.json`` in the
+        directory `trace` or, if True, in the directory next to the output
+        collection (e.g. ``out_parquet_trace``).
+    profile : bool
+        If tracing, also write a cProfile file for each model run to the
+        trace directory.
     '''
 
-    with _adjust_logger_levels(adjust_logger_levels,
-                               ml, 'ERROR', 'INFO', False):
+    with _tracing(ml, trace, profile) as trace_dir:
+
+        with _adjust_logger_levels(adjust_logger_levels,
+                                   ml, 'ERROR', 'INFO', False):
+
+            kwargs_pool = ({'initializer': tracing.init_worker,
+                            'initargs': (trace_dir, profile, time.time())}
+                           if trace_dir else {})
+            p = Pool(nproc, **kwargs_pool)
 
-        p = Pool(nproc)
+            if groupby:
+                # list of lists of run_ids grouped by groupby
+                grouped_run_id = (ml.df_def_run.groupby(groupby)
+                                               .run_id.apply(list).tolist())
 
-        if groupby:
-            # list of lists of run_ids grouped by groupby
-            grouped_run_id = (ml.df_def_run.groupby(groupby)
-                                           .run_id.apply(list).tolist())
+                args = zip([func] * len(grouped_run_id), grouped_run_id)
+                p.starmap(_call_list_run_id, args)
 
-            args = zip([func] * len(grouped_run_id), grouped_run_id)
-            p.starmap(_call_list_run_id, args)
+            else:
+                list_run_id = ml.get_list_run_id()
+                p.map(functools.partial(_call_run_id, func), list_run_id)
 
-        else:
-            list_run_id = ml.get_list_run_id()
-            p.map(func, list_run_id)
+            p.close()
+            p.join()
 
-        p.close()
-        p.join()
+            ml._merge_df_run_files()
 
-        ml._merge_df_run_files()
+        with tracing.span('ModelWriter.finalize_output_tables'):
+            ml.io.finalize_output_tables()
 
 
 
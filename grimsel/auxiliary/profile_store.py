@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dense storage of hourly profiles.
+
+Input profiles are provided in long format (one row per profile and hour).
+The :class:`ProfileStore` holds them as a dense matrix with one row per
+profile and one column per hour of the year. This allows to map profiles
+to the model's time resolution through vectorized segment means.
+
+Stores can be saved as ``.npy`` files and re-loaded as read-only memory
+maps. All processes loading the same file (e.g. the
+:func:`grimsel.auxiliary.multiproc.run_parallel` workers) share the same
+physical memory pages. The size of a store directory can be limited through
+:meth:`ProfileStore.prune`, which deletes the least recently used stores.
+
+"""
+
+import os
+import json
+import hashlib
+from glob import glob
+
+import numpy as np
+import pandas as pd
+
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+STORE_FORMAT_VERSION = 1
+
+
+class ProfileStore():
+    '''
+    Dense matrix of profiles.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        2D array; one row per profile, one column per hour (or time slot)
+    index : pandas.Index or pandas.MultiIndex
+        profile keys of the rows
+    columns : numpy.ndarray
+        hours (or time slots) of the columns
+
+    '''
+
+    def __init__(self, values, index, columns):
+
+        self.values = values
+        self.index = index
+        self.columns = np.asarray(columns)
+
+    def __repr__(self):
+
+        return 'ProfileStore({} profiles x {} columns, {})'.format(
+                    *self.values.shape, self.values.dtype)
+
+    @classmethod
+    def from_long(cls, df, id_cols, col='hy', val='value', dtype=np.float32):
+        '''
+        Generates a store from a long table.
+
+        Missing hours are ``nan``. If a profile has several rows for the
+        same hour, the last one is used.
+
+        Parameters
+        ----------
+        df : DataFrame
+            long table with columns ``id_cols + [col, val]``
+        id_cols : list of str
+            profile key columns, e.g. ``['dmnd_pf_id']``
+        col : str
+            hour column
+        val : str
+            value column
+        dtype : numpy.dtype
+            data type of the matrix
+
+        '''
+
+        keys = (pd.Index(df[id_cols[0]]) if len(id_cols) == 1
+                else pd.MultiIndex.from_frame(df[id_cols]))
+
+        rows, index = pd.factorize(keys, sort=True)
+        cols, columns = pd.factorize(df[col], sort=True)
+
+        index.names = id_cols
+
+        values = np.full((len(index), len(columns)), np.nan, dtype=dtype)
+        values[rows, cols] = df[val].values
+
+        return cls(values, index, np.asarray(columns))
+
+    def to_long(self, col='hy', val='value', dropna=True):
+        '''
+        Returns the store as a long DataFrame sorted by profile and column.
+        '''
+
+        nrows, ncols = self.values.shape
+
+        df = self.index.to_frame(index=False).iloc[np.repeat(np.arange(nrows),
+                                                             ncols)]
+        df = df.reset_index(drop=True)
+        df[col] = np.tile(self.columns, nrows)
+        df[val] = np.asarray(self.values, dtype=np.float64).ravel()
+
+        if dropna:
+            df = df.loc[df[val].notna()].reset_index(drop=True)
+
+        return df
+
+    def take(self, rows):
+        '''
+        Returns a store with the selected rows.
+
+        Parameters
+        ----------
+        rows : array-like
+            boolean mask or integer positions
+
+        '''
+
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            if rows.all():
+                return self
+            rows = np.flatnonzero(rows)
+
+        return ProfileStore(self.values[rows], self.index[rows], self.columns)
+
+    def segment_mean(self, target):
+        '''
+        Averages the columns over segments with identical target values.
+
+        This corresponds to the mean over all hours mapped to the same time
+        slot. ``nan`` values are ignored.
+
+        Parameters
+        ----------
+        target : array-like
+            target column (e.g. time slot ``sy``) of each column of the
+            store; ``nan`` drops the column
+
+        Returns
+        -------
+        ProfileStore
+            float64 store with the sorted unique target values as columns
+
+        '''
+
+        target = np.asarray(target, dtype=np.float64)
+
+        pos = np.flatnonzero(~np.isnan(target))
+        order = pos[np.argsort(target[pos], kind='stable')]
+
+        if not len(order):
+            return ProfileStore(np.empty((len(self.index), 0)), self.index,
+                                np.empty(0))
+
+        tgt_sorted = target[order]
+        starts = np.flatnonzero(np.r_[True, tgt_sorted[1:] != tgt_sorted[:-1]])
+
+        # avoid the copy of memory-mapped data if columns are in order
+        if len(order) == self.values.shape[1] and (np.diff(order) == 1).all():
+            values = self.values
+        else:
+            values = self.values[:, order]
+
+        is_val = ~np.isnan(values)
+
+        sums = np.add.reduceat(np.where(is_val, values, 0), starts, axis=1,
+                               dtype=np.float64)
+        cnts = np.add.reduceat(is_val, starts, axis=1, dtype=np.int64)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = sums / cnts
+
+        return ProfileStore(mean, self.index, tgt_sorted[starts])
+
+    @staticmethod
+    def get_hash(df):
+        ''' Content hash of a long profile table. '''
+
+        hsh = pd.util.hash_pandas_object(df, index=False).values
+
+        return hashlib.sha1(hsh.tobytes()
+                            + ','.join(df.columns).encode()).hexdigest()
+
+    def save(self, fn):
+        '''
+        Saves the store as ``fn + '.npy'`` and the index as
+        ``fn + '.json'``. Both files are replaced atomically.
+        '''
+
+        meta = {'version': STORE_FORMAT_VERSION,
+                'names': list(self.index.names),
+                'index': [list(key) if isinstance(key, tuple) else [key]
+                          for key in self.index.tolist()],
+                'columns': self.columns.tolist()}
+
+        dirc = os.path.dirname(os.path.abspath(fn))
+        os.makedirs(dirc, exist_ok=True)
+
+        for suffix, write in [('.npy', lambda f: np.save(f, self.values)),
+                              ('.json', lambda f: f.write(
+                                                    json.dumps(meta).encode()))]:
+            fn_tmp = '{}{}.{}.tmp'.format(fn, suffix, os.getpid())
+            try:
+                with open(fn_tmp, 'wb') as f:
+                    write(f)
+                os.replace(fn_tmp, fn + suffix)
+            finally:
+                if os.path.exists(fn_tmp):
+                    os.remove(fn_tmp)
+
+    @classmethod
+    def load(cls, fn, mmap_mode='r'):
+        '''
+        Loads a store saved by :meth:`save`.
+
+        Parameters
+        ----------
+        fn : str
+            file name without suffix
+        mmap_mode : str or None
+            ``'r'`` (default) memory maps the matrix read-only
+
+        '''
+
+        with open(fn + '.json', 'r') as f:
+            meta = json.load(f)
+
+        if not meta.get('version') == STORE_FORMAT_VERSION:
+            raise ValueError('ProfileStore {}: unknown format '
+                             'version.'.format(fn))
+
+        names = meta['names']
+        if len(names) == 1:
+            index = pd.Index([key[0] for key in meta['index']],
+                             name=names[0])
+        else:
+            index = pd.MultiIndex.from_tuples(
+                            [tuple(key) for key in meta['index']], names=names)
+
+        values = np.load(fn + '.npy', mmap_mode=mmap_mode)
+
+        return cls(values, index, np.asarray(meta['columns']))
+
+    @classmethod
+    def from_long_cached(cls, df, id_cols, path, name, col='hy',
+                         val='value', max_gb=None):
+        '''
+        Returns the memory-mapped float32 store of a long table.
+
+        The store is saved in the directory ``path`` the first time. The
+        file name includes the content hash of the table, so changed input
+        data results in a new store file. Stores of outdated input data are
+        removed by :meth:`prune` once the directory exceeds ``max_gb``.
+        '''
+
+        hsh = cls.get_hash(df[id_cols + [col, val]])
+        fn = os.path.join(path, '{}_{}'.format(name, hsh[:16]))
+
+        if not (os.path.isfile(fn + '.npy') and os.path.isfile(fn + '.json')):
+            logger.info('Writing profile store {}'.format(fn))
+            cls.from_long(df, id_cols, col, val).save(fn)
+        else:
+            # modification time marks the last use for prune
+            os.utime(fn + '.npy')
+
+        store = cls.load(fn)
+
+        if max_gb is not None:
+            cls.prune(path, max_gb, keep=[fn])
+
+        return store
+
+    @staticmethod
+    def prune(path, max_gb, keep=()):
+        '''
+        Deletes the least recently used stores of a directory.
+
+        Stores are deleted until the total size of the remaining stores is
+        below ``max_gb``. Memory maps of other processes remain valid on
+        POSIX systems; stores which can't be deleted (e.g. opened on
+        Windows) are skipped.
+
+        Parameters
+        ----------
+        path : str
+            store directory
+        max_gb : float
+            maximum total size of the store files in GB
+        keep : list of str
+            file names (without suffix) of stores which are never deleted
+
+        Returns
+        -------
+        list
+            file names of the deleted stores
+
+        '''
+
+        keep = [os.path.abspath(fn) for fn in keep]
+
+        list_store = []
+        for fn_npy in glob(os.path.join(path, '*.npy')):
+            fn = os.path.abspath(fn_npy[:-len('.npy')])
+            list_fn = [fn + sfx for sfx in ('.npy', '.json')
+                       if os.path.isfile(fn + sfx)]
+            try:
+                size = sum(os.path.getsize(f) for f in list_fn)
+                mtime = os.path.getmtime(fn_npy)
+            except OSError:  # deleted by another process
+                continue
+            list_store.append((mtime, size, fn, list_fn))
+
+        # most recently used first
+        list_store.sort(reverse=True)
+
+        total = sum(size for _, size, fn, _ in list_store if fn in keep)
+        list_del = []
+        for _, size, fn, list_fn in list_store:
+
+            if fn in keep:
+                continue
+
+            if total + size <= max_gb * 1024**3:
+                total += size
+                continue
+
+            try:
+                for f in list_fn:
+                    os.remove(f)
+                logger.info('Deleted profile store {}'.format(fn))
+                list_del.append(fn)
+            except OSError as e:
+                logger.warning('Could not delete profile store {}: '
+                               '{}'.format(fn, e))
+                total += size
+
+        return list_del
@@ -4,11 +4,23 @@ TODO: Make this a class with a single db connection.
 '''
 
 import psycopg2 as pg
+import psycopg2.pool
+import re
+import itertools
 import time
+import threading
+from contextlib import contextmanager
+import io
+import struct
+import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine
 import sqlalchemy
 from collections import OrderedDict
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
 
 
 import subprocess
@@ -21,9 +33,158 @@ except:
 import os
 
 import grimsel.grimsel_config as config
+from grimsel.auxiliary.filters import Filter
 
 # %%
 
+# Process-wide connection pools and engines. Keys include the process id:
+# connections inherited through fork() (e.g. run_parallel workers) are
+# never reused in the child process.
+
+POOL_MAXCONN = 16
+CATALOG_TTL = 60  # seconds
+
+_dict_pool = {}
+_dict_engine = {}
+_dict_catalog = {}
+_pool_lock = threading.Lock()
+
+_RE_DDL = re.compile(r'\b(CREATE|DROP|ALTER|RENAME)\b', re.IGNORECASE)
+
+
+def _reset_after_fork():
+    '''
+    Discards pools and engines inherited from the parent process.
+
+    The inherited connections are not closed, since this would affect the
+    parent's connections.
+    '''
+
+    _dict_pool.clear()
+    _dict_engine.clear()
+    _dict_catalog.clear()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_pool(db):
+    ''' Returns the connection pool of database ``db`` for this process. '''
+
+    key = (os.getpid(), SqlConnector(db).pg_str)
+
+    with _pool_lock:
+        if not key in _dict_pool:
+            _dict_pool[key] = psycopg2.pool.ThreadedConnectionPool(
+                                    0, POOL_MAXCONN, key[1])
+
+    return _dict_pool[key]
+
+
+def get_engine(db=None, sqlal_str=None):
+    '''
+    Returns the shared SQLAlchemy engine of database ``db`` for this
+    process. Engines maintain their own connection pools and must not be
+    disposed by the callers.
+    '''
+
+    sqlal_str = sqlal_str if sqlal_str else SqlConnector(db).sqlal_str
+    key = (os.getpid(), sqlal_str)
+
+    with _pool_lock:
+        if not key in _dict_engine:
+            _dict_engine[key] = create_engine(sqlal_str)
+
+    return _dict_engine[key]
+
+
+@contextmanager
+def pooled_connection(db):
+    '''
+    Context manager yielding a connection from the pool of ``db``.
+
+    Open transactions are rolled back if an exception is raised. If the pool
+    is exhausted, a separate connection is opened and closed after use.
+    '''
+
+    pool = get_pool(db)
+
+    try:
+        conn = pool.getconn()
+    except psycopg2.pool.PoolError:
+        pool, conn = None, pg.connect(SqlConnector(db).pg_str)
+
+    try:
+        yield conn
+    except BaseException:
+        # includes GeneratorExit of partially consumed chunk iterators
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        if pool is None:
+            conn.close()
+        else:
+            pool.putconn(conn, close=bool(conn.closed))
+
+
+def close_pools():
+    ''' Closes all connections of the pools and engines of this process. '''
+
+    pid = os.getpid()
+    with _pool_lock:
+        for key in [key for key in _dict_pool if key[0] == pid]:
+            _dict_pool.pop(key).closeall()
+        for key in [key for key in _dict_engine if key[0] == pid]:
+            _dict_engine.pop(key).dispose()
+
+
+def _get_catalog_key(con_cur, db):
+
+    return (os.getpid(), con_cur[0].dsn if con_cur else db)
+
+
+def _cached_catalog(kind, key, func):
+    '''
+    Returns the cached result of the catalog query ``func``.
+
+    The result is re-queried if it is older than :data:`CATALOG_TTL`
+    seconds.
+    '''
+
+    key = (kind,) + key
+    cached = _dict_catalog.get(key)
+
+    if cached and time.monotonic() - cached[0] < CATALOG_TTL:
+        return cached[1]
+
+    result = func()
+    _dict_catalog[key] = (time.monotonic(), result)
+
+    return result
+
+
+def clear_catalog_cache():
+    '''
+    Clears the cached table lists, column lists, and coldicts.
+
+    This is called automatically after statements changing the database
+    structure through :func:`exec_sql`.
+    '''
+
+    _dict_catalog.clear()
+
+
+def invalidate_catalog_cache(sc, tb):
+    '''
+    Removes the cached column list of table ``sc.tb`` as well as the cached
+    table list and coldict of schema ``sc``.
+    '''
+
+    for key in list(_dict_catalog):
+        if ((key[0] == 'cols' and key[-2:] == (sc, tb))
+                or (key[0] in ('tables', 'coldict') and key[-1] == sc)):
+            _dict_catalog.pop(key, None)
 
 
 def close_con(conn):
@@ -54,7 +215,7 @@ class SqlConnector():
         self.__dict__.update(**kwargs)
 
         self.pg_str = ('dbname={db} user={user} password={password} '
-                      'host={host}').format(**self.__dict__)
+                      'host={host} port={port}').format(**self.__dict__)
 
         self.sqlal_str = ('postgresql://{user}:{password}'
                           '@{host}:{port}/{db}').format(**self.__dict__)
@@ -62,17 +223,38 @@ class SqlConnector():
         self._sqlalchemy_engine = None
         self._conn = None
         self._cur = None
+        self._pid = os.getpid()
+
+    def _reset_after_fork(self):
+        '''
+        Drops connections inherited from a parent process.
+
+        Connections must not be shared between processes (e.g. the
+        :func:`grimsel.auxiliary.multiproc.run_parallel` workers). The
+        inherited objects are discarded without closing them, since closing
+        would affect the parent's connection.
+        '''
+
+        if self._pid != os.getpid():
+            self._sqlalchemy_engine = None
+            self._conn = None
+            self._cur = None
+            self._pid = os.getpid()
 
     def get_sqlalchemy_engine(self):
 
+        self._reset_after_fork()
+
         if not self._sqlalchemy_engine:
-            self._sqlalchemy_engine = create_engine(self.sqlal_str)
+            self._sqlalchemy_engine = get_engine(sqlal_str=self.sqlal_str)
 
         return self._sqlalchemy_engine
 
     def get_pg_con_cur(self):
 
-        if not self._conn:
+        self._reset_after_fork()
+
+        if not self._conn or self._conn.closed:
             self._conn = pg.connect(self.pg_str)
             self._cur = self._conn.cursor()
 
@@ -83,12 +265,7 @@ class SqlConnector():
         return(strg)
 
 
-def exec_sql(exec_str, ret_res=True, time_msg=False, db=None, con_cur=None):
-    t = time.time()
-    ''' Pass sql query to the server. '''
-
-    conn, cur = (SqlConnector(db).get_pg_con_cur()
-                 if not con_cur else con_cur)
+def _execute(conn, cur, exec_str, clear_cache=True):
 
     cur.execute(exec_str)
     conn.commit()
@@ -99,8 +276,31 @@ def exec_sql(exec_str, ret_res=True, time_msg=False, db=None, con_cur=None):
         pass
 #        print("No results")
 
-    if con_cur is None:
-        conn.close()
+    if clear_cache and _RE_DDL.search(exec_str):
+        clear_catalog_cache()
+
+    return result
+
+
+def exec_sql(exec_str, ret_res=True, time_msg=False, db=None, con_cur=None,
+             clear_cache=True):
+    '''
+    Pass sql query to the server.
+
+    Uses the connection pool of ``db`` unless a ``con_cur`` tuple is
+    provided. The catalog cache is cleared after statements changing the
+    database structure, unless ``clear_cache`` is False (the caller then
+    invalidates the affected entries, see :func:`invalidate_catalog_cache`).
+    '''
+
+    t = time.time()
+
+    if con_cur:
+        result = _execute(*con_cur, exec_str, clear_cache)
+    else:
+        with pooled_connection(db) as conn:
+            with conn.cursor() as cur:
+                result = _execute(conn, cur, exec_str, clear_cache)
 
     if time_msg:
         print(time_msg, time.time() - t, 'seconds')
@@ -137,7 +337,8 @@ def get_column_string(cols, kind):
 
 def get_sql_tables(sc, db=None, con_cur=None):
     '''
-    Returns list of tables in schema
+    Returns list of tables in schema. Cached for :data:`CATALOG_TTL`
+    seconds.
     '''
 
     exec_str = '''
@@ -146,7 +347,12 @@ def get_sql_tables(sc, db=None, con_cur=None):
                WHERE table_schema = \'{sc}\'
                AND table_type = \'BASE TABLE\'
                '''.format(sc=sc)
-    return [itb[0] for itb in exec_sql(exec_str, db=db, con_cur=con_cur)]
+
+    func = lambda: [itb[0] for itb in exec_sql(exec_str, db=db,
+                                               con_cur=con_cur)]
+    key = _get_catalog_key(con_cur, db) + (sc,)
+
+    return list(_cached_catalog('tables', key, func))
 
 
 # %%
@@ -154,7 +360,7 @@ def get_sql_tables(sc, db=None, con_cur=None):
 def get_sql_cols(tb, sc='public', db=None, con_cur=None):
     '''
     Returns the names and data types of the selected table as a dictionary
-    {'col_name': 'col_type', ...}
+    {'col_name': 'col_type', ...}. Cached for :data:`CATALOG_TTL` seconds.
     '''
 
     exec_str = '''
@@ -167,8 +373,10 @@ def get_sql_cols(tb, sc='public', db=None, con_cur=None):
     exec_sql_kwargs = {'exec_str': exec_str}
     exec_sql_kwargs.update({'con_cur': con_cur} if con_cur else {'db': db})
 
-    dict_col = OrderedDict(exec_sql(**exec_sql_kwargs))
-    return dict_col
+    func = lambda: OrderedDict(exec_sql(**exec_sql_kwargs))
+    key = _get_catalog_key(con_cur, db) + (sc, tb)
+
+    return OrderedDict(_cached_catalog('cols', key, func))
 
 
 # %%
@@ -220,11 +428,7 @@ def write_sql(df, db=None, sc=None, tb=None, if_exists=None,
               engine=None, chunksize=None, con_cur=None):
 
 
-    if not engine:
-        sqlc = SqlConnector(db)
-        _engine = sqlc.get_sqlalchemy_engine()
-    else:
-        _engine = engine
+    _engine = engine if engine else get_engine(db)
 
     if con_cur:
         exec_sql_kwargs = dict(con_cur=con_cur)
@@ -269,13 +473,146 @@ def write_sql(df, db=None, sc=None, tb=None, if_exists=None,
                         ALTER TABLE {sc}.{tb}
                         {add_str};
                         '''.format(sc=sc, tb=tb, add_str=add_str)
-            exec_sql(**dict(exec_str=exec_strg, **exec_sql_kwargs))
+            exec_sql(**dict(exec_str=exec_strg, clear_cache=False,
+                            **exec_sql_kwargs))
 
     df.to_sql(name=tb, con=_engine, schema=sc, if_exists=if_exists,
               index=False, chunksize=chunksize)
 
-    if not engine:
-        _engine.dispose()
+    if if_exists == 'replace' or not add_str == '':
+        invalidate_catalog_cache(sc, tb)
+
+# %%
+
+# SQL data types -> big-endian numpy dtypes of the binary COPY format
+DICT_COPY_BINARY_DTYPES = {'SMALLINT': '>i2',
+                           'INTEGER': '>i4',
+                           'BIGINT': '>i8',
+                           'REAL': '>f4',
+                           'FLOAT': '>f8',
+                           'DOUBLE PRECISION': '>f8',
+                           'BOOLEAN': 'u1'}
+
+COPY_BINARY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+COPY_BINARY_TRAILER = struct.pack('>h', -1)
+
+
+def _df_to_copy_binary(df, coltypes):
+    '''
+    Encodes a DataFrame as PostgreSQL binary COPY stream.
+
+    The tuples are assembled as a single numpy structured array, which
+    avoids any per-row Python overhead.
+
+    Parameters
+    ----------
+    df : pandas DataFrame
+        table to be encoded; must not contain null values
+    coltypes : dict
+        ``{column: SQL data type}``, data types must be keys of
+        :data:`DICT_COPY_BINARY_DTYPES`
+
+    Returns
+    -------
+    io.BytesIO
+        binary COPY buffer
+
+    '''
+
+    dtypes = [('nfields', '>i2')]
+    for ncol, col in enumerate(df.columns):
+        dtypes += [('len_%d'%ncol, '>i4'),
+                   ('val_%d'%ncol, DICT_COPY_BINARY_DTYPES[coltypes[col]])]
+
+    arr = np.empty(len(df), dtype=dtypes)
+    arr['nfields'] = len(df.columns)
+
+    for ncol, col in enumerate(df.columns):
+        arr['len_%d'%ncol] = arr.dtype['val_%d'%ncol].itemsize
+        arr['val_%d'%ncol] = df[col].values
+
+    return io.BytesIO(COPY_BINARY_HEADER + arr.tobytes()
+                      + COPY_BINARY_TRAILER)
+
+
+def copy_from_df(df, sc, tb, con_cur, fmt='csv', coltypes=None,
+                 commit=False):
+    '''
+    Appends a DataFrame to an existing table using ``COPY FROM STDIN``.
+
+    This is much faster than ``DataFrame.to_sql`` and doesn't require
+    any catalog lookups, since the columns are provided explicitly.
+
+    Parameters
+    ----------
+    df : pandas DataFrame
+        table to be written; column names must exist in the target table
+    sc : str
+        target schema
+    tb : str
+        target table
+    con_cur : tuple
+        psycopg2 ``(connection, cursor)``
+    fmt : str, one of ``('csv', 'binary')``
+        ``COPY`` format; ``'binary'`` requires the ``coltypes`` of all
+        columns; falls back to ``'csv'`` if the table contains null values
+        or data types which are not in :data:`DICT_COPY_BINARY_DTYPES`
+    coltypes : dict
+        ``{column: SQL data type}``, only used for the binary format
+    commit : bool
+        commit the transaction after copying; if False, the caller is
+        responsible for committing, e.g. to write a whole model run in
+        a single transaction
+
+    '''
+
+    conn, cur = con_cur
+
+    if fmt == 'binary':
+        coltypes = coltypes if coltypes else {}
+        if (not all(coltypes.get(col) in DICT_COPY_BINARY_DTYPES
+                    for col in df.columns)
+                or df.isnull().values.any()):
+            fmt = 'csv'
+
+    cols = ', '.join('"%s"'%c for c in df.columns)
+    exec_str = ('COPY {sc}.{tb} ({cols}) FROM STDIN '
+                'WITH (FORMAT {fmt})').format(sc=sc, tb=tb, cols=cols,
+                                              fmt=fmt)
+
+    if fmt == 'binary':
+        buf = _df_to_copy_binary(df, coltypes)
+    elif fmt == 'csv':
+        buf = io.StringIO()
+        df.to_csv(buf, index=False, header=False)
+        buf.seek(0)
+    else:
+        raise ValueError('copy_from_df: Unknown COPY format %s.'%fmt)
+
+    cur.copy_expert(exec_str, buf)
+
+    if commit:
+        conn.commit()
+
+
+def append_sql(df, db, sc, tb):
+    '''
+    Appends a small DataFrame (e.g. a row of the ``def_run`` table) to
+    table ``sc.tb`` using ``COPY FROM STDIN``.
+
+    The columns of the table are taken from the catalog cache
+    (:func:`get_sql_cols`). If the table doesn't exist or lacks some of the
+    columns, the DataFrame is written through :func:`write_sql` instead,
+    which creates the missing columns.
+
+    '''
+
+    if set(df.columns).issubset(get_sql_cols(tb, sc, db=db)):
+        with pooled_connection(db) as conn:
+            with conn.cursor() as cur:
+                copy_from_df(df, sc, tb, (conn, cur), commit=True)
+    else:
+        write_sql(df, db, sc, tb, 'append')
 
 # %%
 
@@ -334,8 +671,14 @@ def assemble_filt_sql(filt, func):
     default 'OR', hence the necessity for the explicit
     secondary_binary_operator.
     Note: empty value sublists mean all (filter ignored).
+    Plain (column, values) filters without functions are translated by
+    :class:`grimsel.auxiliary.filters.Filter`; this also supports tuples of
+    columns, e.g. (('nd_id', 'nd_2_id'), [(0, 1), (1, 0)]).
     '''
 
+    if not func and all(len(f) == 2 for f in filt):
+        return Filter([f for f in filt if len(f[1]) > 0]).to_sql()
+
     filt = [list(f) if len(f) >= 3 else list(f) + [' = '] for f in filt]
     filt = [list(f) if len(f) >= 4 else list(f) + [' OR '] for f in filt]
     filt = [f for f in filt if not len(f[1]) is 0]
@@ -468,22 +811,95 @@ def copy_table_structure(sc, tb, sc0, db, verbose=False):
 
 
 
+_cursor_counter = itertools.count()
+
+
+def iter_sql_chunks(exec_str, db, chunksize=None):
+    '''
+    Executes a query and yields the result as DataFrames.
+
+    Parameters
+    ----------
+    exec_str : str
+        SQL query
+    db : str
+        database name
+    chunksize : int or None
+        if not None, the rows are fetched through a named server-side
+        cursor ``chunksize`` rows at a time; otherwise a single DataFrame
+        is yielded
+
+    Yields
+    ------
+    DataFrame
+        columns from the cursor description; at least one (possibly empty)
+        DataFrame is yielded
+
+    '''
+
+    with pooled_connection(db) as conn:
+
+        if chunksize:
+            cur = conn.cursor(name='grimsel_cur_%d'%next(_cursor_counter))
+            cur.itersize = chunksize
+        else:
+            cur = conn.cursor()
+
+        with cur:
+            cur.execute(exec_str)
+
+            nchunks = 0
+            while True:
+                rows = cur.fetchmany(chunksize) if chunksize else cur.fetchall()
+
+                if nchunks and not rows:
+                    break
+
+                cols = [desc[0] for desc in cur.description]
+                yield pd.DataFrame.from_records(rows, columns=cols,
+                                                coerce_float=True)
+                nchunks += 1
+
+                if not chunksize or not rows:
+                    break
+
+        conn.commit()
+
+
+def _to_arrow(df, chunked):
+
+    if pa is None:
+        raise ImportError('read_sql output \'arrow\' requires the pyarrow '
+                          'package.')
+
+    return (pa.RecordBatch.from_pandas(df, preserve_index=False) if chunked
+            else pa.Table.from_pandas(df, preserve_index=False))
+
+
 def read_sql(db=None, sc=None, tb=None, filt=False, filt_func=False, drop=False,
              keep=False, copy=False, tweezer=False, distinct=False, verbose=False,
-             engine=None, limit=None):
+             engine=None, limit=None, chunksize=None, output='pandas'):
     '''
     Keyword arguments:
     tweezer -- list; filter (exclude or include) single combinations of values
                 tweezer = [' AND ', ({'nd': 'IT0', 'bool_out': True}, ' NOT '),
                                     ({'nd': 'FR0', 'bool_out': False}, ' NOT ')]
+    keep -- list; columns to be selected (projection in the SQL query)
+    limit -- int; maximum number of rows; limit=0 returns an empty
+             DataFrame with the table's columns (schema probe)
+    chunksize -- int; if not None, the table is streamed through a
+                 server-side cursor; returns an iterator over DataFrames
+                 (or Arrow record batches) of at most chunksize rows
+    output -- 'pandas' (default) or 'arrow' (pyarrow Table/RecordBatches)
     '''
 
-    if not engine:
-        sqlc = SqlConnector(db)
-        _engine = sqlc.get_sqlalchemy_engine()
-    else:
-        _engine = engine
+    if not output in ('pandas', 'arrow'):
+        raise ValueError('read_sql: Unknown output {}'.format(output))
 
+    if chunksize and copy:
+        raise ValueError('read_sql: copy can\'t be combined with chunksize.')
+
+    _keep = [keep] if isinstance(keep, str) else keep
 
     limit_str = 'LIMIT %d'%limit if isinstance(limit, int) else ''
 
@@ -501,17 +917,19 @@ def read_sql(db=None, sc=None, tb=None, filt=False, filt_func=False, drop=False,
         if verbose:
             print('tweez_str', tweez_str)
 
-    cols = keep if keep else get_sql_cols(tb, sc, db)
-
-    # filtering through sql
-    if filt and not any(not list(ff[1]) for ff in filt):
+    if filt and any(not list(ff[1]) for ff in filt):
+        # one of the value lists is empty... return empty result
+        filt_str = 'FALSE'
+    elif filt:
+        filt_str = assemble_filt_sql(filt, filt_func if filt_func else {})
+    else:
+        filt_str = 'TRUE'
 
-        if not filt_func:
-            filt_func = {}
+    if filt or _keep or limit is not None or chunksize or output == 'arrow':
 
+        # filtering and projection through sql
         distinct_str = 'DISTINCT ' if distinct else ''
-        keep_str = ', '.join(keep) if keep else '*'
-        filt_str = assemble_filt_sql(filt, filt_func)
+        keep_str = ', '.join(_keep) if _keep else '*'
         exec_str = ('''
                     SELECT {distinct_str} {keep_str}
                     FROM {sc}.{tb}
@@ -525,16 +943,20 @@ def read_sql(db=None, sc=None, tb=None, filt=False, filt_func=False, drop=False,
         if verbose:
             print(exec_str)
 
-        df = pd.DataFrame(exec_sql(exec_str, db=db), columns=cols)
+        iter_df = iter_sql_chunks(exec_str, db, chunksize)
 
-    elif filt:
-        # one of the value lists is empty... return empty DataFrame
-        df = pd.DataFrame(columns=cols)
+        if chunksize:
+            iter_df = (df.drop(drop, axis=1) if drop else df
+                       for df in iter_df)
+            return ((_to_arrow(df, True) for df in iter_df)
+                    if output == 'arrow' else iter_df)
+
+        df = next(iter_df)
+        iter_df.close()
 
     else:
+        _engine = engine if engine else get_engine(db)
         df = pd.read_sql_table(tb, _engine, schema=sc)
-        if keep:
-            df = df.loc[:, keep]
 
         if distinct:
             df = df.drop_duplicates()
@@ -546,10 +968,10 @@ def read_sql(db=None, sc=None, tb=None, filt=False, filt_func=False, drop=False,
     if drop:
         df = df.drop(drop, axis=1)
 
-    if not engine:
-        _engine.dispose()
+    if output == 'arrow':
+        return _to_arrow(df, False)
 
-    return df
+    return df[keep] if isinstance(keep, str) else df
 
 
 
@@ -638,18 +1060,28 @@ def get_coldict(sc=None, db=None, fk_include_missing=False, con_cur=None):
 
 
     if sc:
-        _coldict = {}
-        for kk, vv in coldict.items():
-            _val = tuple(ivv.format(sc=sc) for ivv in vv)
-            if len(_val) > 1:
-                if (not _val[1].split('.')[1].split('(')[0]
-                         in get_sql_tables(sc, db, con_cur=con_cur)):
-                    _val = (_val[0],)
-            _coldict[kk] = [iv.format(sc) for iv in _val]
+        key = _get_catalog_key(con_cur, db) + (sc,)
+        _coldict = _cached_catalog('coldict', key,
+                                   lambda: _get_coldict_sc(sc, db, con_cur))
     else:
         _coldict = {col: [coltype[0]] for col, coltype in coldict.items()}
 
 
+    return {col: list(val) for col, val in _coldict.items()}
+
+
+def _get_coldict_sc(sc, db, con_cur):
+
+    list_tb = get_sql_tables(sc, db, con_cur=con_cur)
+
+    _coldict = {}
+    for kk, vv in coldict.items():
+        _val = tuple(ivv.format(sc=sc) for ivv in vv)
+        if len(_val) > 1:
+            if not _val[1].split('.')[1].split('(')[0] in list_tb:
+                _val = (_val[0],)
+        _coldict[kk] = [iv.format(sc) for iv in _val]
+
     return _coldict
 
 
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic model input data of scalable size.
+
+:class:`SyntheticInput` generates a consistent set of input tables
+(``def_*``, ``plant_encar``, ``node_encar``, ``fuel_node_encar``,
+``node_connect``, ``prof*``) for a given size vector. The tables are
+written as CSV files to a ``data_path`` directory, from where they are
+read by :class:`grimsel.core.io.IO` like any other file-based input.
+
+The generated models are linear (no plants with linear supply curves) and
+always feasible, since each node and energy carrier has a gas plant with
+unlimited capacity additions.
+
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+# plant types: (pt, fl, set_def columns, plant_encar values)
+PLANT_TYPES = [
+    ('GAS_NEW', 'natural_gas', ['pp', 'add'],
+     {'pp_eff': 0.55, 'cap_pwr_leg': 0., 'vc_om': 2.,
+      'fc_om': 24000., 'fc_cp_ann': 70000.}),
+    ('HCO_ELC', 'hard_coal', ['pp'],
+     {'pp_eff': 0.4, 'cap_pwr_leg': 0.3, 'vc_om': 4.}),
+    ('WIND', 'wind', ['pr', 'add'],
+     {'cap_pwr_leg': 0.2, 'fc_om': 38000., 'fc_cp_ann': 120000.}),
+    ('SOLAR', 'solar', ['pr', 'add'],
+     {'cap_pwr_leg': 0.2, 'fc_om': 20000., 'fc_cp_ann': 60000.}),
+    ('STO', 'storage', ['st', 'add'],
+     {'pp_eff': 0.85, 'cap_pwr_leg': 0.05, 'discharge_duration': 6.,
+      'st_lss_hr': 0., 'st_lss_rt': 0., 'fc_om': 10000.,
+      'fc_cp_ann': 50000.}),
+    ]
+
+# fuels: (fl, co2_int, vc_fl)
+FUELS = [('natural_gas', 0.2, 40.), ('hard_coal', 0.34, 12.),
+         ('wind', 0., None), ('solar', 0., None), ('storage', 0., None)]
+
+
+class SyntheticInput():
+    '''
+    Generates model input tables for a size vector.
+
+    Each node has a demand profile for each energy carrier and
+    ``plants`` power plants per energy carrier, cycling through
+    :data:`PLANT_TYPES`. Legacy capacities are scaled with the peak demand
+    of the node. Wind and solar plants have individual supply profiles.
+    If ``nodes > 1`` the nodes are connected by a ring of electricity
+    transmission lines.
+
+    Parameters
+    ----------
+    nodes : int
+        number of nodes
+    plants : int
+        number of power plants per node and energy carrier
+    carriers : int
+        number of energy carriers; the first one is ``'EL'``
+    hours : int
+        number of hours of the profiles, starting January 1; pass
+        :meth:`get_tm_filt` as ``ModelBase`` keyword argument ``tm_filt``
+    seed : int
+        seed of the random profiles and costs
+
+    Example
+    -------
+    >>> syn = SyntheticInput(nodes=5, plants=4, carriers=1, hours=168)
+    >>> syn.write('synthetic_input')
+    >>> ml = ModelLoop(mkwargs={'tm_filt': syn.get_tm_filt()},
+    ...                iokwargs={'data_path': 'synthetic_input', ...})
+
+    '''
+
+    def __init__(self, nodes=2, plants=4, carriers=1, hours=24, seed=0):
+
+        if min(nodes, plants, carriers, hours) < 1:
+            raise ValueError('SyntheticInput: all sizes must be positive; '
+                             'got nodes={}, plants={}, carriers={}, '
+                             'hours={}.'.format(nodes, plants,
+                                                carriers, hours))
+        if hours > 8760:
+            raise ValueError('SyntheticInput: hours must not exceed 8760.')
+
+        self.nodes = nodes
+        self.plants = plants
+        self.carriers = carriers
+        self.hours = hours
+        self.seed = seed
+
+        self.rnd = np.random.RandomState(seed)
+
+    @property
+    def size(self):
+        ''' Size vector as dictionary. '''
+
+        return {'nodes': self.nodes, 'plants': self.plants,
+                'carriers': self.carriers, 'hours': self.hours}
+
+    def get_tm_filt(self):
+        ''' ``tm_filt`` restricting the model to the generated hours. '''
+
+        return [('hy', range(self.hours))]
+
+    def _make_def_tables(self):
+
+        self.df_def_node = pd.DataFrame(
+                {'nd_id': range(self.nodes),
+                 'nd': ['ND%03d'%nd for nd in range(self.nodes)],
+                 'price_co2': self.rnd.uniform(20, 60, self.nodes).round(1),
+                 'nd_weight': 1})
+
+        self.df_def_encar = pd.DataFrame(
+                {'ca_id': range(self.carriers),
+                 'ca': ['EL'] + ['CA%d'%ca for ca in range(1, self.carriers)]})
+
+        self.df_def_pp_type = pd.DataFrame(
+                {'pt_id': range(len(PLANT_TYPES)),
+                 'pt': [pt for pt, _, _, _ in PLANT_TYPES]})
+
+        self.df_def_fuel = pd.DataFrame(
+                {'fl_id': range(len(FUELS)),
+                 'fl': [fl for fl, _, _ in FUELS],
+                 'co2_int': [co2 for _, co2, _ in FUELS]})
+
+        hoy_month = (pd.Series(np.arange(8760),
+                               index=pd.date_range('2015-01-01', freq='H',
+                                                   periods=8760))
+                       .groupby(lambda x: x.month - 1).min())
+        self.df_def_month = pd.DataFrame(
+                {'mt_id': hoy_month.index,
+                 'month': ['%02d'%(mt + 1) for mt in hoy_month.index],
+                 'month_min_hoy': hoy_month.values})
+
+    def _make_plants(self):
+
+        # set_def_tr is required to exclude the transmission plants added by
+        # the autocompletion from the ppall set
+        set_cols = sorted({'set_def_' + st for _, _, list_st, _ in PLANT_TYPES
+                           for st in list_st} | {'set_def_tr'})
+        dict_fl = self.df_def_fuel.set_index('fl').fl_id.to_dict()
+
+        list_pp = []
+        for nd_id, nd in self.df_def_node[['nd_id', 'nd']].values:
+            for ca_id, ca in self.df_def_encar[['ca_id', 'ca']].values:
+                for ipp in range(self.plants):
+                    pt_id = ipp % len(PLANT_TYPES)
+                    pt, fl, list_st, dict_val = PLANT_TYPES[pt_id]
+                    list_pp.append(
+                        {'pp': '%s_%s_%s_%d'%(nd, ca, pt, ipp),
+                         'nd_id': nd_id, 'ca_id': ca_id, 'pt_id': pt_id,
+                         'fl_id': dict_fl[fl],
+                         **{col: int(col[8:] in list_st) for col in set_cols},
+                         **dict_val})
+
+        df = pd.DataFrame(list_pp)
+        df.index.name = 'pp_id'
+        df = df.reset_index()
+
+        self.df_def_plant = df[['pp_id', 'pp', 'pt_id', 'nd_id', 'fl_id']
+                               + set_cols]
+
+        cols_pe = [col for _, _, _, dict_val in PLANT_TYPES
+                   for col in dict_val]
+        self.df_plant_encar = df.reindex(columns=['pp_id', 'ca_id']
+                                         + list(dict.fromkeys(cols_pe)))
+
+        # costs vary slightly between plants to avoid degenerate solutions
+        cols_cost = ['vc_om', 'fc_om', 'fc_cp_ann']
+        self.df_plant_encar[cols_cost] *= self.rnd.uniform(
+                        0.95, 1.05, (len(df), len(cols_cost)))
+
+    def _make_profiles(self):
+
+        hy = np.arange(self.hours)
+        hod = hy % 24
+
+        # demand
+        df_ndca = self.df_def_node[['nd_id']].assign(key=1).merge(
+                      self.df_def_encar[['ca_id']].assign(key=1),
+                      on='key').drop('key', axis=1)
+        df_ndca['pf'] = ('DMND_' + df_ndca.nd_id.map('ND{:03d}'.format)
+                         + '_' + df_ndca.ca_id.astype(str))
+        df_ndca['dmnd_pf_id'] = range(len(df_ndca))
+
+        dmnd_max = self.rnd.uniform(1000, 10000, len(df_ndca))
+        shape = (0.75 + 0.15 * np.sin((hod - 6) / 24 * 2 * np.pi)
+                 + 0.1 * self.rnd.uniform(size=(len(df_ndca), self.hours)))
+        self.df_profdmnd = pd.DataFrame(
+                {'dmnd_pf_id': np.repeat(df_ndca.dmnd_pf_id.values,
+                                         self.hours),
+                 'hy': np.tile(hy, len(df_ndca)),
+                 'value': (shape * dmnd_max[:, None] / shape.max(axis=1,
+                                        keepdims=True)).ravel().round(2)})
+
+        self.df_node_encar = df_ndca[['nd_id', 'ca_id', 'dmnd_pf_id']].assign(
+                grid_losses=0.05)
+
+        # legacy capacities are given relative to the peak demand
+        dict_dmnd_max = dict(zip(zip(df_ndca.nd_id, df_ndca.ca_id), dmnd_max))
+        df = self.df_plant_encar.join(
+                        self.df_def_plant.set_index('pp_id').nd_id,
+                        on='pp_id')
+        self.df_plant_encar['cap_pwr_leg'] = (
+                self.df_plant_encar.cap_pwr_leg
+                * [dict_dmnd_max[key] for key in zip(df.nd_id, df.ca_id)]
+                ).round(-1)
+
+        # supply profiles of variable renewables
+        dict_pt = self.df_def_pp_type.set_index('pt_id').pt.to_dict()
+        df_pr = self.df_def_plant.loc[self.df_def_plant.set_def_pr == 1,
+                                      ['pp_id', 'pp', 'pt_id']]
+        df_pr['supply_pf_id'] = range(len(df_ndca), len(df_ndca) + len(df_pr))
+        df_pr['pf'] = 'SUPPLY_' + df_pr.pp
+
+        list_prof = []
+        for pt_id in df_pr.pt_id:
+            if dict_pt[pt_id] == 'SOLAR':
+                prof = np.clip(np.sin((hod - 6) / 12 * np.pi), 0, None)
+                prof *= self.rnd.uniform(0.5, 1, self.hours)
+            else:
+                prof = np.clip(0.3 + 0.2 * np.cumsum(
+                               self.rnd.normal(0, 0.05, self.hours)), 0, 1)
+            list_prof.append(prof.round(4))
+
+        self.df_profsupply = pd.DataFrame(
+                {'supply_pf_id': np.repeat(df_pr.supply_pf_id.values,
+                                           self.hours),
+                 'hy': np.tile(hy, len(df_pr)),
+                 'value': (np.concatenate(list_prof)
+                           if list_prof else np.array([]))})
+
+        self.df_plant_encar = self.df_plant_encar.join(
+                df_pr.set_index('pp_id').supply_pf_id, on='pp_id')
+
+        self.df_def_profile = pd.concat([df_ndca[['dmnd_pf_id', 'pf']]
+                                            .rename(columns={'dmnd_pf_id':
+                                                             'pf_id'}),
+                                         df_pr[['supply_pf_id', 'pf']]
+                                            .rename(columns={'supply_pf_id':
+                                                             'pf_id'})])
+
+    def _make_fuel_node_encar(self):
+
+        df_fl = pd.DataFrame([(fl, vc_fl) for fl, _, vc_fl in FUELS
+                              if vc_fl is not None], columns=['fl', 'vc_fl'])
+        df_fl = df_fl.join(self.df_def_fuel.set_index('fl').fl_id, on='fl')
+
+        # fuel costs vary by node only (parameter index fl_id, nd_id)
+        df = (df_fl[['fl_id', 'vc_fl']].assign(key=1)
+                   .merge(self.df_def_node[['nd_id']].assign(key=1), on='key'))
+        df['vc_fl'] *= self.rnd.uniform(0.9, 1.1, len(df))
+        df = (df.merge(self.df_def_encar[['ca_id']].assign(key=1), on='key')
+                .drop('key', axis=1))
+
+        self.df_fuel_node_encar = df[['fl_id', 'nd_id', 'ca_id', 'vc_fl']]
+
+    def _make_node_connect(self):
+
+        if self.nodes == 1:
+            self.df_node_connect = None
+            return
+
+        nd_id = np.arange(self.nodes)
+        nd_2_id = (nd_id + 1) % self.nodes
+        if self.nodes == 2:
+            nd_id, nd_2_id = nd_id[:1], nd_2_id[:1]
+
+        cap = self.rnd.uniform(500, 2000, len(nd_id)).round(-1)
+        df = pd.DataFrame({'nd_id': nd_id, 'nd_2_id': nd_2_id, 'ca_id': 0,
+                           'cap_trme_leg': cap, 'cap_trmi_leg': cap})
+
+        self.df_node_connect = (df.assign(key=1)
+                                  .merge(self.df_def_month[['mt_id']]
+                                             .assign(key=1), on='key')
+                                  .drop('key', axis=1))
+
+    def get_tables(self):
+        '''
+        Generates all input tables.
+
+        Returns
+        -------
+        dict
+            ``{table name: DataFrame}``; tables which are not generated
+            (``node_connect`` for single nodes) are omitted
+
+        '''
+
+        self.rnd = np.random.RandomState(self.seed)
+
+        self._make_def_tables()
+        self._make_plants()
+        self._make_profiles()
+        self._make_fuel_node_encar()
+        self._make_node_connect()
+
+        list_tb = ['def_node', 'def_encar', 'def_pp_type', 'def_fuel',
+                   'def_month', 'def_plant', 'def_profile', 'plant_encar',
+                   'node_encar', 'fuel_node_encar', 'node_connect',
+                   'profdmnd', 'profsupply']
+
+        return {tb: getattr(self, 'df_' + tb) for tb in list_tb
+                if getattr(self, 'df_' + tb) is not None}
+
+    def write(self, data_path):
+        '''
+        Writes all input tables as CSV files to the directory ``data_path``.
+
+        Existing files of the same names are replaced. Other tables with
+        the same ``data_path`` are not removed, so a dedicated directory
+        should be used.
+
+        Returns
+        -------
+        dict
+            ``{table name: DataFrame}`` as returned by :meth:`get_tables`
+
+        '''
+
+        os.makedirs(data_path, exist_ok=True)
+
+        dict_tb = self.get_tables()
+        for tb, df in dict_tb.items():
+            df.to_csv(os.path.join(data_path, tb + '.csv'), index=False)
+
+        logger.info('SyntheticInput: wrote {} tables for size {} to '
+                    '{}'.format(len(dict_tb), self.size, data_path))
+
+        return dict_tb
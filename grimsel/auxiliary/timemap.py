@@ -5,11 +5,22 @@ The timemap module contains the TimeMap class for
 * convenient mapping between time slots/hours and other temporal indices
   (month ids, week ids, seasons, hours of the week/month, etc)
 
+Generated time maps can be cached on disk in the directory
+``TM_CACHE_DIR``. The cache is disabled by default; it is enabled through
+the environment variable ``GRIMSEL_TIMEMAP_CACHE`` or by setting
+``TM_CACHE_DIR``. Cache files are only invalidated by the
+``TM_FORMAT_VERSION`` and the pandas version.
+
 '''
 
+import os
+import pickle
+import hashlib
+
 import pandas as pd
 import numpy as np
 from grimsel import _get_logger
+from grimsel.auxiliary.input_cache import _write_atomic
 
 logger = _get_logger(__name__)
 
@@ -26,11 +37,193 @@ DOW_TYPE_DICT = {**{d: 'WEEKDAY' for d in range(5)}, **{5: 'SAT', 6: 'SUN'}}
 
 TM_DICT = {}
 
-def _tm_hash(nhours, freq, start, stop, tm_filt):
+# Directory of the on-disk TimeMap cache; ``None`` disables the cache.
+TM_CACHE_DIR = os.environ.get('GRIMSEL_TIMEMAP_CACHE') or None
+TM_FORMAT_VERSION = 1
+
+def _tm_hash(nhours, freq, start, stop, tm_filt, slices=None):
+    '''
+    Content hash of the TimeMap parameters.
+
+    Unlike the builtin ``hash`` of strings, the value is the same in all
+    processes, so it can be used as the key of the on-disk cache.
+    '''
+
+    norm = lambda x: float(x) if isinstance(x, (int, float, np.number)) else x
+    key = repr((norm(nhours), norm(freq), start, stop, str(tm_filt)))
+
+    if slices is not None:
+        key += hashlib.sha1(np.asarray(slices, dtype=np.int64).tobytes()
+                            ).hexdigest()
 
-    hash_val = hash((nhours, freq, start, stop, str(tm_filt)))
+    hash_val = int(hashlib.sha1(key.encode()).hexdigest()[:15], 16)
     return hash_val
 
+def get_adaptive_slices(values, max_len, error_budget=0.05, keep=None,
+                        breaks=None):
+    '''
+    Start positions of variable-length time slots.
+
+    The time steps are first split into slots of ``max_len`` steps,
+    starting anew at each break. Slots are then halved until the
+    within-slot variance of the profiles is at most ``error_budget`` (the
+    profiles are normalized to unit variance) and until all ``keep``
+    steps are single-step slots. Calm periods thus end up in long slots,
+    volatile periods in short ones.
+
+    Since each slot satisfies the variance limit, the share of the total
+    profile variance lost by averaging over the slots is at most
+    ``error_budget``.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        profiles; one row per time step, one column per profile; ``nan``
+        values are ignored
+    max_len : int
+        maximum number of time steps per slot
+    error_budget : float
+        maximum within-slot variance of the normalized profiles
+    keep : numpy.ndarray or None
+        boolean array; time steps kept at the original resolution (e.g.
+        peak demand)
+    breaks : numpy.ndarray or None
+        boolean array; time steps which always start a new slot (e.g. the
+        first hour of each month)
+
+    Returns
+    -------
+    numpy.ndarray
+        sorted start positions of the slots; the first one is always 0
+
+    '''
+
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    nrows = len(values)
+
+    # normalize profiles; constant profiles are irrelevant
+    with np.errstate(invalid='ignore'):
+        std = np.nanstd(values, axis=0)
+    values = values[:, std > 0]
+    values = (values - np.nanmean(values, axis=0)) / std[std > 0]
+    values[np.isnan(values)] = 0
+    ncols = values.shape[1]
+
+    cum_1 = np.concatenate([np.zeros((1, ncols)), values.cumsum(axis=0)])
+    cum_2 = np.concatenate([np.zeros((1, ncols)),
+                            (values**2).cumsum(axis=0)])
+    cum_keep = (np.r_[0, np.cumsum(keep, dtype=np.int64)]
+                if keep is not None else None)
+
+    pos = np.arange(nrows)
+    is_break = (np.zeros(nrows, dtype=bool) if breaks is None
+                else np.array(breaks, dtype=bool))
+    is_break[:1] = True
+
+    last_break = np.maximum.accumulate(np.where(is_break, pos, 0))
+    is_start = (pos - last_break) % max(int(max_len), 1) == 0
+
+    while True:
+
+        starts = np.flatnonzero(is_start)
+        ends = np.r_[starts[1:], nrows]
+        lens = ends - starts
+
+        sum_1 = cum_1[ends] - cum_1[starts]
+        sse = (cum_2[ends] - cum_2[starts] - sum_1**2 / lens[:, None]).sum(1)
+
+        split = sse > error_budget * ncols * lens
+        if cum_keep is not None:
+            split |= cum_keep[ends] - cum_keep[starts] > 0
+        split &= lens > 1
+
+        if not split.any():
+            return starts
+
+        is_start[starts[split] + lens[split] // 2] = True
+
+
+def get_peak_steps(values, peak_share):
+    '''
+    Boolean mask of the time steps with the largest values.
+
+    Exactly ``ceil(peak_share * n)`` steps are selected, ``n`` being the
+    number of non-``nan`` values. Ties at the threshold (e.g. the zero
+    night-time values of a solar profile) are broken arbitrarily.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        one value per time step
+    peak_share : float
+        share of the time steps to be selected
+
+    Returns
+    -------
+    numpy.ndarray
+        boolean array of the same length as ``values``
+
+    '''
+
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(values))
+
+    # rounding avoids an extra step due to floating point errors
+    npeak = min(int(np.ceil(round(peak_share * len(valid), 9))), len(valid))
+
+    keep = np.zeros(len(values), dtype=bool)
+    if npeak > 0:
+        sel = np.argpartition(-values[valid], npeak - 1)[:npeak]
+        keep[valid[sel]] = True
+
+    return keep
+
+def _get_cache_fn(key, keep_datetime, minimum):
+
+    return os.path.join(TM_CACHE_DIR,
+                        'tm_{:015x}_{:d}{:d}_v{}.pkl'.format(
+                            key, bool(keep_datetime), bool(minimum),
+                            TM_FORMAT_VERSION))
+
+def _read_cache(cls, fn):
+    ''' Returns the cached ``TimeMap`` instance or ``None``. '''
+
+    if not os.path.isfile(fn):
+        return None
+
+    try:
+        with open(fn, 'rb') as f:
+            data = pickle.load(f)
+    except Exception as e:
+        logger.warning('Could not read TimeMap cache {}: {}'.format(fn, e))
+        return None
+
+    if not (data.get('version') == TM_FORMAT_VERSION
+            and data.get('pandas') == pd.__version__):
+        return None
+
+    tm = cls.__new__(cls)
+    tm.__dict__.update(data['state'])
+
+    return tm
+
+def _write_cache(tm, fn):
+
+    data = {'version': TM_FORMAT_VERSION, 'pandas': pd.__version__,
+            'state': tm.__dict__}
+
+    try:
+        os.makedirs(os.path.dirname(fn), exist_ok=True)
+        def write(fn_tmp):
+            with open(fn_tmp, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        _write_atomic(fn, write)
+    except Exception as e:
+        logger.warning('Could not write TimeMap cache {}: {}'.format(fn, e))
+
 class _UniqueInstancesMeta(type):
     '''
     Load ``TimeMap`` instance from the module dictionary, if exists.
@@ -39,21 +232,44 @@ class _UniqueInstancesMeta(type):
     parameters, they are stored in the ``TM_DICT`` module attribute
     and retrieved when appropriate.
 
+    If the module attribute ``TM_CACHE_DIR`` is not ``None``, instances
+    are also pickled to this directory. The file names contain the
+    :func:`_tm_hash` key and the ``TM_FORMAT_VERSION``, so all processes
+    (e.g. parallel model runs or analysis instances) share the same
+    time maps. Cache files written by a different pandas version are
+    ignored.
+
     '''
 
     def __call__(cls, nhours=1, freq=1,
                  start='2015-1-1 00:00', stop='2015-12-31 23:59',
-                 tm_filt=False, *args, **kwargs):
+                 tm_filt=False, keep_datetime=False, minimum=False,
+                 slices=None):
 
-        key = _tm_hash(nhours, freq, start, stop, tm_filt)
+        key = _tm_hash(nhours, freq, start, stop, tm_filt, slices)
 
         if key in TM_DICT:
             logger.warning(('TimeMap (%s) exists. Reading time '
                          'map from module dict.')%key)
             return TM_DICT[key]
-        else:
-            return super().__call__(nhours, freq, start, stop, tm_filt,
-                                    *args, **kwargs)
+
+        fn = (_get_cache_fn(key, keep_datetime, minimum)
+              if TM_CACHE_DIR and nhours else None)
+
+        tm = _read_cache(cls, fn) if fn else None
+
+        if tm is not None:
+            logger.info('Reading TimeMap (%s) from %s'%(key, fn))
+            TM_DICT[key] = tm
+            return tm
+
+        tm = super().__call__(nhours, freq, start, stop, tm_filt,
+                              keep_datetime, minimum, slices)
+
+        if fn:
+            _write_cache(tm, fn)
+
+        return tm
 
 class TimeMap(metaclass=_UniqueInstancesMeta):
     '''
@@ -90,6 +306,10 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
         Remove the *DateTime* column if False
     minimum : bool
         don't generate non-essential columns
+    slices : array-like or None
+        start positions (rows of ``df_time_map``) of variable-length time
+        slots, e.g. from :func:`get_adaptive_slices`; ``nhours`` is then
+        only used as label (maximum slot length)
 
     Raises
     ------
@@ -157,11 +377,12 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
     def __hash__(self):
 
         return _tm_hash(self.nhours, self.freq, self.start,
-                       self.stop, self.tm_filt)
+                       self.stop, self.tm_filt, self.slices)
 
     def __init__(self, nhours=1, freq=1,
                  start='2015-1-1 00:00', stop='2015-12-31 23:59',
-                 tm_filt=False, keep_datetime=False, minimum=False):
+                 tm_filt=False, keep_datetime=False, minimum=False,
+                 slices=None):
 
         self.freq = freq
         self.num_freq = (float(self.freq[:-1])
@@ -177,6 +398,9 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
 
         self.minimum = minimum
 
+        self.slices = (np.asarray(slices, dtype=np.int64)
+                       if slices is not None else None)
+
         self.df_time_red = pd.DataFrame()
         self.df_hoy_soy = pd.DataFrame()
         self.df_time_map = pd.DataFrame()
@@ -186,86 +410,121 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
         if nhours:
             self.gen_soy_timemap()
 
+    def _get_datetime(self):
+        ''' Returns the ``datetime64[ns]`` array from start to stop. '''
+
+        start = np.datetime64(pd.Timestamp(self.start).to_datetime64(), 'ns')
+        stop = np.datetime64(pd.Timestamp(self.stop).to_datetime64(), 'ns')
+        step = np.timedelta64(int(round(self.num_freq * 3600e9)), 'ns')
+
+        nsteps = (stop - start) // step + 1 if stop >= start else 0
+
+        return start + np.arange(nsteps) * step
+
+    @staticmethod
+    def _get_week_of_month(wk_id, mt_id):
+        '''
+        Week of the month.
+
+        Each week is assigned to the median month of its rows. The week of
+        the month is the difference between the week and the last week of
+        the previous month.
+        '''
+
+        # median month by week: middle elements of the sorted month ids
+        order = np.lexsort((mt_id, wk_id))
+        mt_sorted = mt_id[order]
+        wk_unq, starts, cnts = np.unique(wk_id[order], return_index=True,
+                                         return_counts=True)
+        wk_mt = (mt_sorted[starts + (cnts - 1) // 2]
+                 + mt_sorted[starts + cnts // 2]) / 2
+
+        dict_wk_max = {mt + 1: wk_unq[wk_mt == mt].max() + 1
+                       for mt in np.unique(wk_mt)}
+        wk_max = np.array([dict_wk_max.get(mt, 0) for mt in wk_mt],
+                          dtype=np.float64)
+
+        wom = np.zeros(wk_unq.max() + 1)
+        wom[wk_unq] = wk_unq - wk_max
+
+        return wom[wk_id]
+
     def gen_hoy_timemap(self):
+        '''
+        Generates the *hy*-indexed ``df_time_map``.
 
+        All columns are derived from the datetime array through NumPy
+        datetime arithmetic.
+        '''
 
         logger.info('Generating time map with freq='
                     '{} nhours={} from {} to {}'.format(self.freq, self.nhours,
                                                         self.start, self.stop))
 
-        df_time_map = pd.DataFrame(index=pd.date_range(self.start, self.stop,
-                                                       freq=self.str_freq))
-        df_time_map = (df_time_map.reset_index()
-                                  .rename(columns={'index': 'DateTime'}))
+        dt = self._get_datetime()
+
+        days = dt.astype('M8[D]')
+        years = days.astype('M8[Y]')
+        months = days.astype('M8[M]')
 
-        df_time_map['hour'] = df_time_map['DateTime'].dt.hour
-        df_time_map['doy'] = df_time_map['DateTime'].dt.dayofyear
-        df_time_map['mt_id'] = df_time_map['DateTime'].dt.month - 1
-        df_time_map['day'] = df_time_map['DateTime'].dt.day
-        df_time_map['year'] = df_time_map['DateTime'].dt.year
-        df_time_map['dow'] = df_time_map['DateTime'].dt.weekday
-        df_time_map['how'] = df_time_map['dow'] * 24 + df_time_map['hour']
-        df_time_map['hom'] = (df_time_map['day'] - 1) * 24 + df_time_map['hour']
-        df_time_map['wk_id'] = df_time_map['DateTime'].dt.week - 1
+        hour = ((dt - days) // np.timedelta64(1, 'h')).astype(np.int64)
+        minute = ((dt - days) // np.timedelta64(1, 'm')
+                  - hour * 60).astype(np.int64)
+        doy = (days - years).astype(np.int64) + 1
+        mt_id = months.astype(np.int64) % 12
+        day = (days - months).astype(np.int64) + 1
+        year = years.astype(np.int64) + 1970
+        # 1970-01-01 was a Thursday
+        dow = (days.astype(np.int64) + 3) % 7
 
-        # add number of hours per week
-        df_time_map = (df_time_map
-            .join(df_time_map.pivot_table(values='how', index='wk_id', aggfunc=len)
-            .rename(columns={'how': 'wk_weight'}), on='wk_id'))
+        # ISO week: week of the year of the week's Thursday
+        thursday = days + (3 - dow)
+        wk_id = (thursday - thursday.astype('M8[Y]')).astype(np.int64) // 7
 
+        # number of hours per week
+        wk_weight = np.bincount(wk_id)[wk_id]
 
         # remove February 29
-        mask_feb29 = ((df_time_map.mt_id == 1) & (df_time_map.day == 29))
-        df_time_map = df_time_map.loc[-mask_feb29].reset_index(drop=True)
+        mask = ~((mt_id == 1) & (day == 29))
 
+        dict_cols = {'DateTime': dt, 'hour': hour, 'doy': doy,
+                     'mt_id': mt_id, 'day': day, 'year': year, 'dow': dow,
+                     'how': dow * 24 + hour, 'hom': (day - 1) * 24 + hour,
+                     'wk_id': wk_id, 'wk_weight': wk_weight,
+                     'hy': hour + 24 * (doy - 1) + minute / 60}
+        dict_cols = {col: val[mask] for col, val in dict_cols.items()}
 
-        # add hour of the year column
-        get_hoy = lambda x: ((x.hour + 24 * (x.doy - 1)
-                             + x.DateTime.dt.minute / 60).rename('hy')
-                             .reset_index())
-        df_time_map['hy'] = (df_time_map.groupby(['year']).apply(get_hoy)
-                                        .reset_index(drop=True)['hy'])
         if not self.minimum:
 
-            df_time_map['month'] = df_time_map['DateTime'].dt.month
-            df_time_map['mt'] = df_time_map['mt_id'].map(MONTH_DICT)
-            df_time_map['season'] = df_time_map['mt'].map(SEASON_DICT)
-            df_time_map['wk'] = df_time_map['wk_id']
-            df_time_map['dow_name'] = df_time_map['dow'].replace(DOW_DICT)
-            df_time_map['dow_type'] = df_time_map['dow'].replace(DOW_TYPE_DICT)
-
-            # week of the month
-            dfwom = df_time_map[['wk_id', 'mt_id']]
-            dfwkmt = (df_time_map[['wk_id', 'mt_id']]
-                            .pivot_table(index='wk_id', values=['mt_id'],
-                                         aggfunc=np.median))
-            dfwkmt = dfwkmt.rename(columns={'mt_id': 'wk_mt'})
-            dfwom = (dfwom.drop('mt_id', axis=1).drop_duplicates()
-                          .join(dfwkmt, on=dfwkmt.index.names))
-            dfwk_max = (dfwom.pivot_table(index='wk_mt', values=['wk_id'],
-                                         aggfunc=max)
-                             .rename(columns={'wk_id': 'wk_max'})
-                             .reset_index() + 1)
-            dfwk_max = dfwk_max.set_index('wk_mt')
-            dfwom = dfwom.join(dfwk_max, on=dfwk_max.index.names).fillna(0)
-            dfwom['wom'] = dfwom['wk_id'] - dfwom['wk_max']
-            dfwom = dfwom.set_index('wk_id')['wom']
-            df_time_map = df_time_map.join(dfwom, on=dfwom.index.names)
-
-            df_time_map_ndays = pd.DataFrame(df_time_map.loc[:,['mt', 'year', 'day']]
-                                            .drop_duplicates()
-                                            .pivot_table(values='day',
-                                                         index=['year','mt'],
-                                                               aggfunc=len))['day'].rename('ndays')
-            df_time_map = df_time_map.join(df_time_map_ndays,
-                                           on=df_time_map_ndays.index.names)
-
+            mt_id, wk_id = dict_cols['mt_id'], dict_cols['wk_id']
+            arr_mt = np.array([MONTH_DICT[mt] for mt in range(12)],
+                              dtype=object)
+            arr_dow = np.array([DOW_DICT[dw] for dw in range(7)],
+                               dtype=object)
+            arr_dow_type = np.array([DOW_TYPE_DICT[dw] for dw in range(7)],
+                                    dtype=object)
+
+            dict_cols['month'] = mt_id + 1
+            dict_cols['mt'] = arr_mt[mt_id]
+            dict_cols['season'] = np.array([SEASON_DICT[mt] for mt in arr_mt],
+                                           dtype=object)[mt_id]
+            dict_cols['wk'] = wk_id
+            dict_cols['dow_name'] = arr_dow[dict_cols['dow']]
+            dict_cols['dow_type'] = arr_dow_type[dict_cols['dow']]
+            dict_cols['wom'] = self._get_week_of_month(wk_id, mt_id)
+
+            # number of days by year and month
+            ym = (dict_cols['year'] - dict_cols['year'].min()) * 12 + mt_id
+            ym_unq = np.unique(ym * 32 + dict_cols['day']) // 32
+            dict_cols['ndays'] = np.bincount(ym_unq)[ym]
+
+        df_time_map = pd.DataFrame(dict_cols)
 
         # apply filtering
-        mask = df_time_map.mt_id.apply(lambda x: True).rename('mask')
+        mask = np.ones(len(df_time_map), dtype=bool)
         if self.tm_filt:
             for ifilt in self.tm_filt:
-                mask &= df_time_map[ifilt[0]].isin(ifilt[1])
+                mask &= df_time_map[ifilt[0]].isin(ifilt[1]).values
 
         if mask.sum() == 0:
             raise RuntimeError('Trying to generate and TimeMap which is empty '
@@ -287,13 +546,15 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
               original *hy*-indexed ``df_time_map`` rows
             - The *weight* is the number of hours per reduced time slot. It is used
               to calculate energy from average power.
+          With ``slices``, the time slots have variable length.
         * Generates an attribute ``df_time_red``, which is *sy* indexed. For any given
           *sy*, the minimum value of the temporal columns (e.g. *mt_id*, *how*, etc)
-          over the corresponding *hy* is selected.
+          over the corresponding *hy* is selected. Non-numeric columns are taken
+          from the first *hy* of each time slot.
 
         '''
 
-        assert (self.nhours / self.num_freq)%1 == 0, \
+        assert self.slices is not None or (self.nhours / self.num_freq)%1 == 0, \
                 ('TimeMap.gen_soy_timemap: The time slot duration nhours must '
                  'be a multiple of the original time map frequency freq. '
                  'num_freq=%f, nhours=%f'%(self.num_freq, self.nhours))
@@ -303,36 +564,52 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
 
         df_time_map = self.df_time_map
 
-        # add soy column to dataframe, based on nhours
-        len_rep = self.nhours / self.num_freq
-        len_rge = np.ceil(len(df_time_map)/ len_rep)
-        df_tm = pd.DataFrame(np.repeat(np.arange(len_rge), [len_rep]),
-                             columns=['sy']).iloc[:len(df_time_map)]
-        df_time_map['sy'] = df_tm
+        # add soy column to dataframe, based on nhours or slices
+        if self.slices is None:
+            len_rep = int(round(self.nhours / self.num_freq))
+            sy = np.arange(len(df_time_map)) // len_rep
+        else:
+            if len(self.slices) and not (0 <= self.slices.min()
+                                         and self.slices.max()
+                                             < len(df_time_map)):
+                raise ValueError('TimeMap: slices must be positions of the '
+                                 '%d rows of df_time_map.'%len(df_time_map))
+            is_start = np.zeros(len(df_time_map), dtype=bool)
+            is_start[self.slices] = True
+            is_start[0] = True
+            sy = np.cumsum(is_start) - 1
+        df_time_map['sy'] = sy.astype(np.float64)
 
         # add weight column to dataframe
-        df_weight = df_time_map.pivot_table(values=['hy'], index='sy',
-                                            aggfunc=len)
-        df_weight = df_weight.rename(columns={'hy': 'weight'}) * self.num_freq
-        df_time_map = df_time_map.join(df_weight, on='sy')
+        weight = np.bincount(sy)[sy] * self.num_freq
+        df_time_map = df_time_map.assign(weight=weight)
 
         self.df_hoy_soy = df_time_map[['sy', 'hy']]
 
-        if self.nhours == self.num_freq:
+        if self.nhours == self.num_freq and self.slices is None:
             self.df_time_red = df_time_map
         else:
 
+            # rows are sorted by year and sy; new segment if either changes
+            year = df_time_map['year'].values
+            starts = np.flatnonzero(np.r_[True, (sy[1:] != sy[:-1])
+                                               | (year[1:] != year[:-1])])
+
             df_time_map_num = df_time_map.select_dtypes(include=['integer',
                                                                  'floating'])
+            cols_num = (['year', 'sy']
+                        + sorted(c for c in df_time_map_num.columns
+                                 if not c in ['year', 'sy']))
             col_nonnum = [c for c in df_time_map.columns
                           if not c in df_time_map_num.columns]
-            df_time_map_oth = df_time_map[col_nonnum + ['hy']].set_index('hy')
 
-            self.df_time_red = (df_time_map_num
-                        .pivot_table(aggfunc=min, index=['year', 'sy'])
-                        .reset_index())
+            dict_red = {col: np.minimum.reduceat(df_time_map_num[col].values,
+                                                 starts)
+                        for col in cols_num}
+            dict_red.update({col: df_time_map[col].values[starts]
+                             for col in col_nonnum})
 
-            self.df_time_red = self.df_time_red.join(df_time_map_oth, on='hy')
+            self.df_time_red = pd.DataFrame(dict_red)
 
     def get_year_share(self):
         '''
@@ -349,6 +626,9 @@ class TimeMap(metaclass=_UniqueInstancesMeta):
 
         '''
 
+        if self.slices is not None:
+            return self.df_time_red.weight.sum() / 8760
+
         return len(self.df_time_red) / (8760 / self.nhours)
 
     def _get_dst_days(self, list_months=['MAR', 'OCT']):
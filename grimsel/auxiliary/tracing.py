@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Span tracing of model runs.
+
+Tracing is enabled per process by :func:`start` (e.g. through the
+``trace`` argument of :func:`grimsel.auxiliary.multiproc.run_parallel`).
+While enabled, the instrumented methods (``ModelLoop.perform_model_run``,
+``ModelBase.run`` and the solver phases, ``ModelWriter.write_all``, each
+``CompIO.write``, ``ModelLoop.append_row``, ...) record their start time
+and duration. Without an active tracer, :func:`span` and :func:`traced`
+only add a function call.
+
+Each process buffers its spans and appends them to its own
+``trace_<pid>.jsonl`` file in the trace directory after every model run
+(:func:`trace_run`). :func:`stop` merges these files into a single
+``trace.json`` file in the Chrome trace event format, which can be
+opened in ``chrome://tracing`` or https://ui.perfetto.dev. Optionally,
+a cProfile file ``profile_run_id_<run_id>.prof`` is written for each
+model run; see :mod:`pstats` or ``snakeviz``.
+
+"""
+
+import os
+import json
+import time
+import cProfile
+import functools
+import threading
+import contextlib
+from glob import glob
+from multiprocessing import current_process
+
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+TRACE_FILE = 'trace.json'
+
+# active Tracer of the current process
+_tracer = None
+
+
+def _get_tid():
+
+    return getattr(threading, 'get_native_id', threading.get_ident)()
+
+
+class Tracer():
+    '''
+    Span buffer of a single process.
+
+    Parameters
+    ----------
+    trace_dir : str
+        directory of the trace files
+    profile : bool
+        write a cProfile file for each model run
+
+    '''
+
+    def __init__(self, trace_dir, profile=False):
+
+        self.trace_dir = trace_dir
+        self.profile = profile
+        self.pid = os.getpid()
+
+        os.makedirs(trace_dir, exist_ok=True)
+
+        self.list_event = [{'name': 'process_name', 'ph': 'M',
+                            'pid': self.pid, 'tid': 0,
+                            'args': {'name': current_process().name}}]
+
+    def add_span(self, name, ts, dur, args=None):
+        '''
+        Adds a complete event; ``ts`` and ``dur`` in seconds.
+        '''
+
+        event = {'name': name, 'cat': 'grimsel', 'ph': 'X',
+                 'ts': ts * 1e6, 'dur': dur * 1e6,
+                 'pid': self.pid, 'tid': _get_tid()}
+        if args:
+            event['args'] = args
+
+        self.list_event.append(event)
+
+    def flush(self):
+        '''
+        Appends the buffered spans to the file of this process.
+        '''
+
+        if not self.list_event:
+            return
+
+        fn = os.path.join(self.trace_dir, 'trace_%d.jsonl'%self.pid)
+        with open(fn, 'a') as f:
+            for event in self.list_event:
+                f.write(json.dumps(event, default=str) + '\n')
+
+        self.list_event = []
+
+
+def is_enabled():
+
+    return _tracer is not None
+
+
+def get_trace_dir(cl_out):
+    '''
+    Default trace directory next to the output collection ``cl_out``.
+
+    E.g. ``out.hdf5 -> out_trace`` or ``out_parquet -> out_parquet_trace``;
+    for PostgreSQL schemas the directory is created in the working
+    directory.
+
+    '''
+
+    return os.path.splitext(os.path.normpath(cl_out))[0] + '_trace'
+
+
+def start(trace_dir, profile=False):
+    '''
+    Enables tracing in the current process.
+
+    Parameters
+    ----------
+    trace_dir : str
+        directory of the trace files; existing per-process and merged
+        trace files are removed
+    profile : bool
+        write a cProfile file for each model run (see :func:`trace_run`)
+
+    '''
+
+    global _tracer
+
+    for fn in (glob(os.path.join(trace_dir, 'trace_*.jsonl'))
+               + [os.path.join(trace_dir, TRACE_FILE)]):
+        if os.path.isfile(fn):
+            os.remove(fn)
+
+    _tracer = Tracer(trace_dir, profile)
+
+    logger.info('Tracing model runs to {}'.format(trace_dir))
+
+
+def init_worker(trace_dir, profile, t_fork):
+    '''
+    ``multiprocessing.Pool`` initializer.
+
+    Replaces the tracer inherited from the parent process and records the
+    time from the pool creation ``t_fork`` until the worker is ready.
+
+    '''
+
+    global _tracer
+
+    _tracer = Tracer(trace_dir, profile)
+    _tracer.add_span('Pool.fork', t_fork, time.time() - t_fork)
+
+
+def stop(merge=True):
+    '''
+    Disables tracing in the current process.
+
+    Parameters
+    ----------
+    merge : bool
+        merge the files of all processes into a single trace file
+
+    Returns
+    -------
+    str or None
+        name of the merged trace file
+
+    '''
+
+    global _tracer
+
+    if _tracer is None:
+        return None
+
+    _tracer.flush()
+    trace_dir = _tracer.trace_dir
+    _tracer = None
+
+    return merge_traces(trace_dir) if merge else None
+
+
+def merge_traces(trace_dir):
+    '''
+    Merges all per-process trace files into ``trace.json``.
+
+    The per-process files are removed.
+
+    Returns
+    -------
+    str
+        name of the merged trace file
+
+    '''
+
+    list_fn = sorted(glob(os.path.join(trace_dir, 'trace_*.jsonl')))
+
+    list_event = []
+    for fn in list_fn:
+        with open(fn, 'r') as f:
+            list_event += [json.loads(line) for line in f if line.strip()]
+
+    list_event.sort(key=lambda event: event.get('ts', 0))
+
+    fn_trace = os.path.join(trace_dir, TRACE_FILE)
+    with open(fn_trace, 'w') as f:
+        json.dump({'traceEvents': list_event, 'displayTimeUnit': 'ms'}, f)
+
+    for fn in list_fn:
+        os.remove(fn)
+
+    logger.info('Merged {} spans of {} processes to {}'.format(
+                    sum(event['ph'] == 'X' for event in list_event),
+                    len(list_fn), fn_trace))
+
+    return fn_trace
+
+
+@contextlib.contextmanager
+def span(name, **args):
+    '''
+    Records the duration of the context as a span.
+
+    Parameters
+    ----------
+    name : str
+        span name
+    args :
+        keyword arguments shown with the span, e.g. ``tb='var_sy_pwr'``
+
+    Example
+    -------
+    >>> with span('CompIO.write', tb=self.tb):
+    ...     self._finalize(df)
+
+    '''
+
+    if _tracer is None:
+        yield
+        return
+
+    t = time.time()
+    try:
+        yield
+    finally:
+        # the tracer might have been stopped inside the context
+        if _tracer is not None:
+            _tracer.add_span(name, t, time.time() - t, args)
+
+
+def traced(name=None):
+    '''
+    Decorator recording each call of a function as a span.
+
+    Parameters
+    ----------
+    name : str or None
+        span name; defaults to the qualified name of the function, e.g.
+        ``'ModelBase.run'``
+
+    '''
+
+    def decorator(func):
+
+        span_name = name if name else func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+
+            if _tracer is None:
+                return func(*args, **kwargs)
+
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextlib.contextmanager
+def trace_run(run_id):
+    '''
+    Span of a complete model run, including the model modifications.
+
+    Writes the cProfile file of the model run if enabled and flushes the
+    spans to the trace file of the process.
+
+    '''
+
+    if _tracer is None:
+        yield
+        return
+
+    prof = cProfile.Profile() if _tracer.profile else None
+    tracer = _tracer
+
+    try:
+        with span('run_id %d'%run_id, run_id=run_id):
+            if prof:
+                prof.enable()
+            try:
+                yield
+            finally:
+                if prof:
+                    prof.disable()
+    finally:
+        if prof:
+            prof.dump_stats(os.path.join(tracer.trace_dir,
+                                         'profile_run_id_%04d.prof'%run_id))
+        tracer.flush()
@@ -6,6 +6,8 @@ Created on Mon May 14 07:41:11 2018
 @author: mcsoini
 """
 
+import os
+import hashlib
 import pandas as pd
 import itertools as it
 import matplotlib as mpl
@@ -13,59 +15,256 @@ import matplotlib.pyplot as plt
 import abc
 
 from grimsel import _get_logger
+from grimsel.auxiliary.input_cache import _write_atomic
 
 logger = _get_logger(__name__)
 
 
+AUTOCOMPLETE_CACHE_VERSION = 1
+
+# model tables the autocompletion results depend on
+LIST_INPUT_TABLES = ['df_def_pp_type', 'df_def_encar', 'df_def_fuel',
+                     'df_def_node', 'df_def_plant', 'df_node_connect',
+                     'df_plant_encar']
+
+
+def _anti_join(df, df_other, cols):
+    '''
+    Returns the rows of ``df`` whose ``cols`` values are not in ``df_other``.
+    '''
+
+    if len(cols) == 1:
+        mask = df[cols[0]].isin(df_other[cols[0]])
+    else:
+        mask = pd.MultiIndex.from_frame(df[cols]).isin(
+                    pd.MultiIndex.from_frame(df_other[cols]))
+
+    return df.loc[~mask]
+
+
+def set_fuel_is_ca(df_def_fuel, df_def_encar):
+    '''
+    Sets the column ``is_ca`` of fuels which correspond to energy carriers.
+    '''
+
+    df_def_fuel['is_ca'] = 0
+    if 'fl_id' in df_def_encar.columns:
+        mask_ca = df_def_fuel.fl_id.isin(df_def_encar.fl_id)
+        df_def_fuel.loc[mask_ca, 'is_ca'] = 1
+
+
+class AutoCompleteAdditions():
+    '''
+    Collects the rows added by a sequence of autocompletion passes.
+
+    Subsequent passes see the model tables including all pending
+    additions (e.g. the fuel ids of fuels added by an earlier pass). The
+    :meth:`apply` method concatenates all additions of a table to the
+    model attribute at once.
+    '''
+
+    def __init__(self, m):
+
+        self.m = m
+
+        self.dict_add = {}  # table name -> list of added DataFrames
+        self.dict_new_cols = {}  # table name -> {new column: default value}
+        self._dict_table = {}  # table name -> table including additions
+
+    def get_table(self, name):
+        ''' Returns model table ``name`` including pending additions. '''
+
+        if not name in self.dict_add:
+            return getattr(self.m, name)
+
+        if not name in self._dict_table:
+
+            df = pd.concat([getattr(self.m, name)] + self.dict_add[name],
+                           sort=False)
+
+            for col, def_val in self.dict_new_cols[name].items():
+                df[col] = df[col].fillna(def_val)
+
+            self._dict_table[name] = df
+
+        return self._dict_table[name]
+
+    def add(self, name, df_add, new_cols=None):
+        '''
+        Adds rows to table ``name``.
+
+        Only the columns of ``df_add`` which exist in the table are kept,
+        plus the ``new_cols``, whose values are filled with their default
+        values for the other rows.
+        '''
+
+        new_cols = new_cols if new_cols else {}
+
+        cols_tb = self.get_table(name).columns
+        add_cols = [c for c in df_add.columns
+                    if c in cols_tb or c in new_cols]
+
+        self.dict_add.setdefault(name, []).append(df_add[add_cols])
+        self.dict_new_cols.setdefault(name, {}).update(new_cols)
+        self._dict_table.pop(name, None)
+
+    def apply(self):
+        ''' Sets the completed tables as model attributes. '''
+
+        for name in self.dict_add:
+            setattr(self.m, name, self.get_table(name))
+
+        self.dict_add, self.dict_new_cols, self._dict_table = {}, {}, {}
+
+    @staticmethod
+    def get_cache_key(m, autocomplete_curtailment):
+        ''' Hash of all model tables the autocompletion depends on. '''
+
+        hsh = hashlib.sha1(str((AUTOCOMPLETE_CACHE_VERSION,
+                                bool(autocomplete_curtailment))).encode())
+
+        for name in LIST_INPUT_TABLES:
+            df = getattr(m, name, None)
+            if df is None:
+                hsh.update(b'None')
+            else:
+                hsh.update(str(df.dtypes.to_dict()).encode())
+                hsh.update(pd.util.hash_pandas_object(df).values.tobytes())
+
+        return hsh.hexdigest()
+
+    def to_pickle(self, fn):
+        ''' Saves the pending additions; atomic for parallel workers. '''
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(fn)), exist_ok=True)
+            _write_atomic(fn, lambda fn_tmp: pd.to_pickle(
+                                (self.dict_add, self.dict_new_cols), fn_tmp))
+        except Exception as e:
+            logger.warning('Could not write autocompletion cache '
+                           '{}: {}'.format(fn, e))
+
+    def read_pickle(self, fn):
+
+        self.dict_add, self.dict_new_cols = pd.read_pickle(fn)
+        self._dict_table = {}
+
+
+def autocomplete(m, autocomplete_curtailment=False, cache_dir=None):
+    '''
+    Runs all autocompletion passes and adds the rows to the model tables.
+
+    The additions of all passes are concatenated to each model table at
+    once.
+
+    Parameters
+    ----------
+    m : ModelBase
+        model instance holding the input tables
+    autocomplete_curtailment : bool
+        add curtailment plants and fuels
+    cache_dir : str or None
+        if not None, the additions are cached in this directory; they are
+        re-used as long as the input tables are unchanged
+
+    '''
+
+    additions = AutoCompleteAdditions(m)
+
+    fn = None
+    if cache_dir:
+        key = additions.get_cache_key(m, autocomplete_curtailment)
+        fn = os.path.join(cache_dir, 'autocomplete_{}.pkl'.format(key[:16]))
+
+    if fn and os.path.isfile(fn):
+
+        logger.info('Autocompletion from cache {}'.format(fn))
+
+        set_fuel_is_ca(m.df_def_fuel, m.df_def_encar)
+        additions.read_pickle(fn)
+
+    else:
+
+        AutoCompletePpType(m, autocomplete_curtailment, additions=additions)
+        AutoCompleteFuelTrns(m, additions=additions)
+        AutoCompleteFuelDmnd(m, autocomplete_curtailment, additions=additions)
+        AutoCompletePlantTrns(m, additions=additions)
+        AutoCompletePlantDmnd(m, autocomplete_curtailment,
+                              additions=additions)
+        if 'fl_id' in m.df_def_encar:
+            AutoCompletePlantCons(m, additions=additions)
+        AutoCompletePpCaFlex(m, autocomplete_curtailment, additions=additions)
+
+        if fn:
+            additions.to_pickle(fn)
+
+    additions.apply()
+
 
 class AutoComplete(abc.ABC):
     '''
     Base class for the autocompletion of model input DataFrames.
+
+    Candidate rows are generated as a DataFrame (:meth:`get_row_list`) and
+    filtered against the existing rows through anti-joins on the
+    ``_add_col`` columns.
+
+    Parameters
+    ----------
+    m : ModelBase
+        model instance
+    additions : AutoCompleteAdditions or None
+        collection of the additions of several passes; if None, the rows
+        are directly added to the model table
+
     '''
 
     new_cols = {}
 
-    def __init__(self, m):
+    def __init__(self, m, additions=None):
 
         format_list = [self.df_name, type(self).__name__]
         logger.info('Autocompletion '
                     '{} in {}'.format(*format_list))
 
         self.m = m
+        self._additions = (additions if additions is not None
+                           else AutoCompleteAdditions(m))
 
         flag_feas, lst_mss_df = self._check_feasible()
 
         if flag_feas:
-            # Control attributes need to be assigned in child
-            # classes, otherwise they are None, which won't work.
-            if not hasattr(self, '_df'):
-                self._df = None # DataFrame to be completed
-            if not hasattr(self, '_add_col'):
-                self._add_col = None # Reference column(s)
+
+            self._df = self._get_table(self.df_name)
+            self.prepare()
 
             self.df_add = None
-            self.lst_add = []
 
             self.get_row_list()
             self.filter_rows()
 
-            if self.lst_add:
+            if not self.df_add.empty:
+
+                lst_add = self.df_add[self._get_add_cols()].values.tolist()
 
-                self.generate_df_add()
                 self.reset_index()
                 self.complement_columns()
                 self._set_pf_id_nan()
                 self.concatenate()
 
+                lst_add = [add[0] if len(add) == 1 else add
+                           for add in lst_add]
                 logger.info('done. Added: '
-                             '{}'.format(', '.join(map(str, self.lst_add))))
+                             '{}'.format(', '.join(map(str, lst_add))))
             else:
                 logger.info('nothing added.')
         else:
             logger.warning('infeasible. Missing model DataFrames: '
                            '{}'.format(', '.join(lst_mss_df)))
 
-
+        if additions is None:
+            self._additions.apply()
+            self._df = getattr(self.m, self.df_name, None)
 
     def _check_feasible(self):
         '''
@@ -96,45 +295,47 @@ class AutoComplete(abc.ABC):
 
         return flag_feas, lst_mss_df
 
+    def _get_table(self, name):
+        ''' Model table ``name`` including additions of earlier passes. '''
+
+        return self._additions.get_table(name)
+
+    def _get_add_cols(self):
+
+        return (self._add_col if type(self._add_col) is list
+                else [self._add_col])
+
+    def prepare(self):
+        ''' Overridden by child classes to modify ``_df`` beforehand. '''
+        pass
+
     @abc.abstractmethod
     def get_row_list(self):
-        ''' List of rows to potentially be added. Implemented in children. '''
+        '''
+        Sets the DataFrame ``df_add`` of rows to potentially be added.
+        Implemented in children.
+        '''
 
         pass
 
+    def _set_rows(self, lst_add):
+        ''' Sets ``df_add`` from a list of ``_add_col`` values. '''
+
+        self.df_add = pd.DataFrame(list(lst_add), columns=self._get_add_cols())
+
     def filter_rows_existing(self):
         ''' Remove rows already included in _df. By names in _add_col. '''
 
-        # filter for existing rows
-        # everything based on list of tuples; converted accordingly if necessary
-        ttt = lambda x: tuple(x)
-        slct_col = ([self._add_col]
-                    if not type(self._add_col) is list
-                    else self._add_col)
-        self.lst_add = [pc for pc in self.lst_add
-                        if not tuple([pc]
-                                     if not type(pc) is list
-                                     else pc)
-                        in self._df[slct_col].apply(ttt, axis=1).tolist()]
+        cols = self._get_add_cols()
+
+        self.df_add = _anti_join(self.df_add.drop_duplicates(cols),
+                                 self._df, cols)
 
     def filter_rows(self):
         ''' Overridden by child classes if other filters need to be applied '''
 
         self.filter_rows_existing()
 
-    def generate_df_add(self):
-        '''
-        Generate full DataFrame to be appended to _df.
-        '''
-
-        # some children assign df_add before this (e.g. for pp name generation)
-        if self.df_add is None:
-
-            cols = (self._add_col
-                    if type(self._add_col) is list
-                    else [self._add_col])
-            self.df_add = pd.DataFrame(self.lst_add, columns=cols)
-
     def _set_pf_id_nan(self):
         '''
         Set the values of profile ids in all values to None.
@@ -167,18 +368,13 @@ class AutoComplete(abc.ABC):
 
         _cmap = plt.cm.get_cmap(cmap)
 
-        self.df_add['color'] = ''
-
-        # reset index so we can iterate using loc
+        # reset index so colors are assigned by position
         self.df_add = self.df_add.reset_index(drop=True)
 
-        for irow in range(self.df_add.iloc[:, 0].size):
-            if cmap is None:
-                color = '#ffffff'
-            else:
-                color = mpl.colors.to_hex(_cmap(irow))
-
-            self.df_add.loc[irow, 'color'] = color
+        nrows = len(self.df_add)
+        self.df_add['color'] = (['#ffffff'] * nrows if cmap is None else
+                                [mpl.colors.to_hex(_cmap(irow))
+                                 for irow in range(nrows)])
 
 
     def add_zero_cols(self):
@@ -193,25 +389,17 @@ class AutoComplete(abc.ABC):
 
     def concatenate(self):
         '''
-        Concatenate existing and new rows.
+        Adds the new rows to the table.
 
         Fills the values of the new columns with default values as specified
-        in the ``new_cols`` class attribute dictionary.
+        in the ``new_cols`` class attribute dictionary. The model attribute
+        is updated once all passes are done (see
+        :class:`AutoCompleteAdditions`).
 
         '''
 
-        add_cols = set(c for c in self.df_add.columns
-                       if c in self._df.columns) | set(self.new_cols)
-
-        add_cols = list(add_cols)
-
-        df_new = pd.concat([self._df, self.df_add[add_cols]], sort=False)
-
-        for col, def_val in self.new_cols.items():
-            df_new[col] = df_new[col].fillna(def_val)
-
-        setattr(self.m, self.df_name, df_new)
-        self._df = getattr(self.m, self.df_name)
+        self._additions.add(self.df_name, self.df_add, self.new_cols)
+        self._df = self._get_table(self.df_name)
 
     def complement_columns(self):
         ''' Implemented in child classes if additional columns are required '''
@@ -244,20 +432,21 @@ class AutoCompletePpType(AutoComplete):
 
     df_name = 'df_def_pp_type'
 
-    def __init__(self, m, autocomplete_curtailment):
+    def __init__(self, m, autocomplete_curtailment, additions=None):
 
-        self._df = getattr(m, self.df_name)
         self._add_col = 'pt'
 
         self.autocomplete_curtailment = autocomplete_curtailment
 
-        super().__init__(m)
+        super().__init__(m, additions)
 
     def get_row_list(self):
         ''' Static pt names plus one for each energy carrier in def_encar. '''
 
-        self.lst_add = ['TRNS'] + self._get_dmnd_list('plant')
-        self.lst_add += ['CONS_' + ca for ca in self.m.df_def_encar.ca]
+        lst_add = ['TRNS'] + self._get_dmnd_list('plant')
+        lst_add += ['CONS_' + ca for ca in self.m.df_def_encar.ca]
+
+        self._set_rows(lst_add)
 
 
     def reset_index(self):
@@ -274,18 +463,16 @@ class AutoCompletePpType(AutoComplete):
 class AutoCompleteFuel(AutoComplete):
 
     df_name = 'df_def_fuel'
-    def __init__(self, m):
+    def __init__(self, m, additions=None):
 
-        self._df = getattr(m, self.df_name)
         self._add_col = 'fl'
 
-        # define column is_ca based on entries of df_def_encar
-        self._df['is_ca'] = 0
-        if 'fl_id' in m.df_def_encar.columns:
-            mask_ca = self._df.fl_id.isin(m.df_def_encar.fl_id)
-            self._df.loc[mask_ca, 'is_ca'] = 1
+        super().__init__(m, additions)
+
+    def prepare(self):
+        ''' Define column is_ca based on entries of df_def_encar. '''
 
-        super().__init__(m)
+        set_fuel_is_ca(self._df, self.m.df_def_encar)
 
     def reset_index(self):
         ''' Calls parent class _reset_index '''
@@ -303,20 +490,19 @@ class AutoCompleteTrns():
     def filter_multi_node(self):
         ''' Delete all entries if there is only one node.'''
 
-        self.lst_add = (self.lst_add
-                        if self.m.df_def_node.nd_id.count() > 1
-                        else [])
+        if not self.m.df_def_node.nd_id.count() > 1:
+            self.df_add = self.df_add.iloc[:0]
 
 class AutoCompleteFuelTrns(AutoCompleteFuel, AutoCompleteTrns):
 
-    def __init__(self, m):
+    def __init__(self, m, additions=None):
 
-        super().__init__(m)
+        super().__init__(m, additions)
 
     def get_row_list(self):
         ''' Static fl names. '''
 
-        self.lst_add = ['exchange']
+        self._set_rows(['exchange'])
 
     def filter_rows(self):
 
@@ -327,26 +513,24 @@ class AutoCompleteFuelTrns(AutoCompleteFuel, AutoCompleteTrns):
 
 class AutoCompleteFuelConsumed(AutoCompleteFuel):
 
-    def __init__(self, m):
+    def __init__(self, m, additions=None):
 
-        super().__init__(m)
+        super().__init__(m, additions)
 
     def get_row_list(self):
         ''' fl names generated from ca names in df_def_encar. '''
 
-        self.lst_add = self.m.df_def_encar['ca'].tolist()
-        self.lst_add = ['consumed_' + fl.lower() for fl in self.lst_add
-                        if not fl in self._df[self._add_col]]
+        self._set_rows('consumed_' + fl.lower()
+                       for fl in self.m.df_def_encar['ca'])
 
 class AutoCompletePlant(AutoComplete):
 
     df_name = 'df_def_plant'
-    def __init__(self, m):
+    def __init__(self, m, additions=None):
 
-        self._df = getattr(m, self.df_name)
         self._add_col = 'pp'
 
-        super().__init__(m)
+        super().__init__(m, additions)
 
     def reset_index(self):
         ''' Calls parent class _reset_index '''
@@ -376,39 +560,34 @@ class AutoCompletePlant(AutoComplete):
             if ((not _id in self.df_add.columns)
                 and (_name in self.df_add.columns)):
 
-                mp = getattr(self.m, df_def).set_index(_name)[_id]
+                mp = self._get_table(df_def).set_index(_name)[_id]
                 self.df_add = self.df_add.join(mp, on=_name)
 
 class AutoCompletePlantTrns(AutoCompletePlant, AutoCompleteTrns):
 
-    def __init__(self, m):
+    def __init__(self, m, additions=None):
         # list of required model dataframes
 
         self.lst_req_df = ('df_node_connect',)
 
-        super().__init__(m)
+        super().__init__(m, additions)
 
     def get_row_list(self):
         ''' pp names from reshaped df_node_connect table. '''
 
         mask_trns = ((self.m.df_node_connect.cap_trmi_leg != 0) |
                      (self.m.df_node_connect.cap_trme_leg != 0))
-        self.df_add = (self.m.df_node_connect
-                           .loc[mask_trns, ['nd_id', 'nd_2_id']]
-                           .drop_duplicates()
-                           .stack()
-                           .reset_index()
-                           .rename(columns={'level_1': 'imex', 0: 'nd_id'})
-                           .join(self.m.df_def_node.set_index('nd_id')['nd'],
-                                 on='nd_id')[['imex', 'nd_id', 'nd']]
-                           .drop_duplicates())
+        df_nd = self.m.df_node_connect.loc[mask_trns, ['nd_id', 'nd_2_id']]
+        nd_id = pd.unique(df_nd.values.ravel())
+
+        self.df_add = (self.m.df_def_node.set_index('nd_id')
+                           .reindex(nd_id)[['nd']]
+                           .rename_axis('nd_id').reset_index())
 
         self.df_add['pt'] = 'TRNS'
         self.df_add['fl'] = 'exchange'
         self.df_add['pp'] = self.df_add['nd'] + '_' + self.df_add['pt']
 
-        self.lst_add = self.df_add['pp'].tolist()
-
     def filter_rows(self):
 
         super().filter_multi_node()
@@ -425,65 +604,57 @@ class AutoCompletePlantTrns(AutoCompletePlant, AutoCompleteTrns):
 
 class AutoCompleteFuelDmnd(AutoCompleteFuel):
 
-    def __init__(self, m, autocomplete_curtailment):
+    def __init__(self, m, autocomplete_curtailment, additions=None):
 
         self.autocomplete_curtailment = autocomplete_curtailment
 
-        super().__init__(m)
+        super().__init__(m, additions)
 
 
     def get_row_list(self):
         ''' Static fl names. '''
 
-        self.lst_add = self._get_dmnd_list('fuel')
+        self._set_rows(self._get_dmnd_list('fuel'))
 
 class AutoCompletePlantDmnd(AutoCompletePlant):
 
     new_cols = {'set_def_dmd': 0, 'set_def_curt': 0}
 
-    def __init__(self, m, autocomplete_curtailment):
+    def __init__(self, m, autocomplete_curtailment, additions=None):
 
         self.autocomplete_curtailment = autocomplete_curtailment
 
-        super().__init__(m)
+        super().__init__(m, additions)
 
     def get_row_list(self):
         ''' Cross product fixed pt names and nodes. '''
 
-        self.lst_add = self.m.df_def_node['nd'].tolist()
-        self.lst_add = ['_'.join(pp) for pp in
-                        list(it.product(self.lst_add,
-                                        self._get_dmnd_list('plant')))]
+        self.df_add = pd.DataFrame(list(it.product(
+                                            self.m.df_def_node['nd'],
+                                            self._get_dmnd_list('plant'))),
+                                   columns=['nd', 'pt'])
+        self.df_add['pp'] = self.df_add['nd'] + '_' + self.df_add['pt']
 
     def complement_columns(self):
         '''
 
         '''
 
-        get_nd = lambda x: x.replace('_DMND', '').replace('_FLEX', '')
-        self.df_add['nd'] = self.df_add.pp.apply(get_nd)
-
-        get_pt = lambda x: x.pp.replace(x.nd + '_', '')
-        self.df_add['pt'] = self.df_add[['pp', 'nd']].apply(get_pt, axis=1)
-
-        self.df_add['fl'] = self.df_add['pt'].apply(str.lower)
+        self.df_add['fl'] = self.df_add['pt'].str.lower()
 
         self.add_id_cols()
         self.add_zero_cols()
 
-        self.df_add['set_def_dmd'] = self.df_add['set_def_curt'] = 0
-        mask_dmnd = ~self.df_add.pt.str.contains('FLEX')
-        self.df_add.loc[mask_dmnd, 'set_def_dmd'] = 1
-
         mask_flex = self.df_add.pt.str.contains('FLEX')
-        self.df_add.loc[mask_flex, 'set_def_curt'] = 1
+        self.df_add['set_def_dmd'] = (~mask_flex).astype(int)
+        self.df_add['set_def_curt'] = mask_flex.astype(int)
 
 
 class AutoCompletePlantCons(AutoCompletePlant):
 
-    def __init__(self, m):
+    def __init__(self, m, additions=None):
 
-        super().__init__(m)
+        super().__init__(m, additions)
 
     def get_row_list(self):
         ''' Plants in df_def_plant which consume energy carriers. '''
@@ -500,8 +671,6 @@ class AutoCompletePlantCons(AutoCompletePlant):
         self.df_add['pt'] = 'CONS_' + self.df_add['ca']
         self.df_add['pp'] = self.df_add.nd + '_' + self.df_add.pt
 
-        self.lst_add = self.df_add.pp.tolist()
-
     def complement_columns(self):
 
         self.add_id_cols()
@@ -513,12 +682,11 @@ class AutoCompletePpCa(AutoComplete):
     df_name = 'df_plant_encar'
     completion_type = ''
 
-    def __init__(self, m):
+    def __init__(self, m, additions=None):
 
-        self._df = getattr(m, self.df_name)
         self._add_col = ['pp_id', 'ca_id']
 
-        super().__init__(m)
+        super().__init__(m, additions)
 
     def filter_rows(self):
         self.filter_rows_existing()
@@ -531,24 +699,25 @@ class AutoCompletePpCa(AutoComplete):
 
 class AutoCompletePpCaFlex(AutoCompletePpCa):
 
-    def __init__(self, m, autocomplete_curtailment):
+    def __init__(self, m, autocomplete_curtailment, additions=None):
 
         self.autocomplete_curtailment = autocomplete_curtailment
 
-        super().__init__(m)
+        super().__init__(m, additions)
 
     def get_row_list(self):
-        ''' . '''
+        ''' Cross product of curtailment plants and energy carriers. '''
 
         if self.autocomplete_curtailment:
 
-            mask_flex = self.m.df_def_plant.pp.str.contains('FLEX')
-            list_pp = self.m.df_def_plant.loc[mask_flex, 'pp_id'].tolist()
-            list_ca = self.m.df_def_encar['ca_id'].tolist()
+            df_def_plant = self._get_table('df_def_plant')
+            mask_flex = df_def_plant.pp.str.contains('FLEX')
+            list_pp = df_def_plant.loc[mask_flex, 'pp_id']
+            list_ca = self.m.df_def_encar['ca_id']
 
-            self.lst_add = [list(pc) for pc in it.product(list_pp, list_ca)]
+            self._set_rows(it.product(list_pp, list_ca))
         else:
-            self.lst_add = []
+            self._set_rows([])
 
 
 if __name__ == '__main__':
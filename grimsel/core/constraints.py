@@ -185,8 +185,8 @@ class Constraints:
               use ``trm[tm, sy, nd, nd_2, ca]``
             * **Case 2**: ``nd`` has lower time resolution (not min) |rarr|
               average ``avg(trm[tm, sy_2, nd, nd_2, ca])`` for all ``sy_2``
-              defined by the
-               ``grimsel.core.model_base.ModelBase.dict_sysy[nd, nd_2, sy]``
+              defined by the CSR arrays
+              ``grimsel.core.model_base.ModelBase.dict_sysy[nd, nd_2]``
 
             Parameters
             ----------
@@ -208,11 +208,12 @@ class Constraints:
                 return trm
 
             else: # average over all of the other sy
-                list_sy2 = self.dict_sysy[nd if export else nd_2,
-                                          nd_2 if export else nd, sy]
+                indptr, indices = self.dict_sysy[nd if export else nd_2,
+                                                 nd_2 if export else nd]
+                list_sy2 = indices[indptr[int(sy)]:indptr[int(sy) + 1]]
 
                 avg = 1/len(list_sy2) * sum(self.trm[_sy, nd, nd_2, ca]
-                                            for _sy in list_sy2)
+                                            for _sy in list_sy2.tolist())
                 return avg
 
         def supply_rule(self, sy, nd, ca):
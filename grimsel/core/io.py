@@ -7,6 +7,8 @@ Created on Wed Jan  2 15:03:42 2019
 """
 import time
 import itertools
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
 import os
 import tables
 import shutil
@@ -16,11 +18,18 @@ import fastparquet as pq
 import numpy as np
 import pandas as pd
 import psycopg2 as pg
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
 
 import grimsel
 import grimsel.auxiliary.sqlutils.aux_sql_func as aql
+import grimsel.auxiliary.input_cache as input_cache
+import grimsel.auxiliary.tracing as tracing
 import grimsel.core.autocomplete as ac
 import grimsel.core.table_struct as table_struct
+from grimsel.auxiliary.filters import Filter
 from grimsel import _get_logger
 
 logger = _get_logger(__name__)
@@ -29,6 +38,59 @@ logger = _get_logger(__name__)
 FORMAT_RUN_ID = '{:04d}'  # modify for > 9999 model runs
 
 
+def get_reduced_index(idx, spec):
+    '''
+    Returns the index of an output table after applying a reduction spec.
+
+    Parameters
+    ----------
+    idx : tuple
+        index columns of the full output table
+    spec : dict or None
+        reduction specification, see :meth:`CompIO.reduce`
+
+    Returns
+    -------
+    tuple
+        the hourly index ``sy`` is replaced by the time aggregation column;
+        columns missing from ``spec['cols']`` are dropped
+
+    Raises
+    ------
+    ValueError
+        if a time aggregation is defined for a table without ``sy`` column
+
+    '''
+
+    if not spec:
+        return tuple(idx)
+
+    idx = list(idx)
+    time_col = None
+
+    if spec.get('time') is not None:
+        if not 'sy' in idx:
+            raise ValueError('get_reduced_index: time aggregation requires '
+                             'a table with sy column; got %s.'%str(idx))
+
+        time_col = _get_time_bucket_name(spec['time'])
+        idx = [time_col if c == 'sy' else c for c in idx]
+
+    if spec.get('cols') is not None:
+        idx = [c for c in idx if c in spec['cols'] or c == time_col]
+
+    return tuple(idx)
+
+
+def _get_time_bucket_name(time):
+    ''' Column name of the temporal aggregation (str or DataFrame). '''
+
+    if isinstance(time, str):
+        return time
+
+    return [c for c in time.columns if not c in ('tm_id', 'sy')][0]
+
+
 class _HDFWriter:
     ''' Mixing class for :class:`CompIO` and :class:`DataReader`. '''
 
@@ -89,14 +151,194 @@ class _ParqWriter:
 
 
 
-class CompIO(_HDFWriter, _ParqWriter):
+class _DuckDBWriter:
+    '''
+    Mixing class for :class:`CompIO`, :class:`DataReader`, and :class:`IO`.
+
+    All tables are written to a single DuckDB database file ``cl_out``.
+    Within a :meth:`duckdb_session` all writes to this file share a single
+    connection.
+    '''
+
+    # seconds to wait for the file lock of other processes; IO parameter
+    duckdb_lock_timeout = 600
+
+    # open session connections by database file
+    _dict_duckdb_session = {}
+
+    @staticmethod
+    def _connect_duckdb(fn, timeout=600, wait=0.2):
+        '''
+        Opens the DuckDB database file.
+
+        DuckDB allows for a single writing process only. Parallel model
+        runs wait for the lock held by other processes to be released.
+
+        Parameters
+        ----------
+        fn: str
+            database file name
+        timeout: float
+            maximum waiting time for the lock in seconds
+        wait: float
+            time between two connection attempts in seconds
+
+        '''
+
+        if duckdb is None:
+            raise ImportError('Output target duckdb requires the duckdb '
+                              'package.')
+
+        with tracing.span('duckdb.connect'):
+            t_end = time.time() + timeout
+            while True:
+                try:
+                    return duckdb.connect(fn)
+                except duckdb.IOException as e:
+                    if time.time() >= t_end:
+                        raise(e)
+                    time.sleep(wait)
+
+    @contextmanager
+    def _get_duckdb_con(self):
+        '''
+        Yields the connection of the current session or a new connection,
+        which is closed on exit.
+        '''
+
+        con = self._dict_duckdb_session.get(self.cl_out)
+
+        if con is not None:
+            yield con
+        else:
+            con = self._connect_duckdb(self.cl_out, self.duckdb_lock_timeout)
+            try:
+                yield con
+            finally:
+                con.close()
+
+    @contextmanager
+    def duckdb_session(self):
+        '''
+        Keeps a single connection to the DuckDB output file open.
+
+        All writes within the ``with`` block use this connection and are
+        committed as a single transaction. The file lock is held by this
+        process until the end of the block. Nested sessions are merged
+        with the outer session.
+        '''
+
+        if self.cl_out in self._dict_duckdb_session:
+            yield
+            return
+
+        con = self._connect_duckdb(self.cl_out, self.duckdb_lock_timeout)
+        self._dict_duckdb_session[self.cl_out] = con
+
+        try:
+            con.begin()
+            try:
+                yield
+            except Exception as e:
+                con.rollback()
+                raise(e)
+            con.commit()
+        finally:
+            del self._dict_duckdb_session[self.cl_out]
+            con.close()
+
+    @staticmethod
+    def _duckdb_table_exists(con, tb):
+
+        return bool(con.execute('SELECT COUNT(*) FROM information_schema.tables '
+                                'WHERE table_name = ?', [tb]).fetchone()[0])
+
+    @staticmethod
+    def _add_duckdb_columns(con, tb):
+        ''' Adds the new columns of the registered DataFrame to a table. '''
+
+        cols_tb = [col for col, in con.execute(
+                        'SELECT column_name FROM information_schema.columns '
+                        'WHERE table_name = ?', [tb]).fetchall()]
+        cols_df = con.execute('DESCRIBE SELECT * FROM _df_write').fetchall()
+
+        for col, dtype, *_ in cols_df:
+            if not col in cols_tb:
+                logger.info('Adding column {} {} to table {}'.format(
+                                                        col, dtype, tb))
+                con.execute('ALTER TABLE {} ADD COLUMN "{}" {}'.format(
+                                                        tb, col, dtype))
+
+    def init_duckdb_table(self, tb, cols):
+        '''
+        Drops and re-creates a table of the DuckDB output file.
+
+        Parameters
+        ----------
+        tb: str
+            table name
+        cols: list
+            list of tuples ``(column name, SQL data type)``
+
+        '''
+
+        col_str = ', '.join('"%s" %s'%(col, dtype) for col, dtype in cols)
+
+        with self._get_duckdb_con() as con:
+            con.execute('DROP TABLE IF EXISTS %s'%tb)
+            con.execute('CREATE TABLE {tb} ({cols})'.format(tb=tb,
+                                                            cols=col_str))
+
+    def write_duckdb(self, tb, df, if_exists='append'):
+        '''
+        Writes a DataFrame to the DuckDB output file.
+
+        The DataFrame is registered with the DuckDB connection and read
+        directly through its columnar scan; the columns are matched by
+        name. Missing tables are created from the DataFrame's data types.
+        Columns missing in the DataFrame are filled with NULL values, new
+        columns are added to the existing table.
+
+        Parameters
+        ----------
+        tb: str
+            table name
+        df: pandas DataFrame
+            table to be written
+        if_exists: str, one of `('append', 'replace')`
+            Append to existing table or replace it
+
+        '''
+
+        with self._get_duckdb_con() as con:
+
+            con.register('_df_write', df)
+
+            if if_exists == 'replace':
+                con.execute('DROP TABLE IF EXISTS %s'%tb)
+
+            if not self._duckdb_table_exists(con, tb):
+                con.execute('CREATE TABLE %s AS SELECT * FROM _df_write '
+                            'LIMIT 0'%tb)
+            else:
+                self._add_duckdb_columns(con, tb)
+
+            cols = ', '.join('"%s"'%c for c in df.columns)
+            con.execute('INSERT INTO {tb} ({cols}) SELECT {cols} '
+                        'FROM _df_write'.format(tb=tb, cols=cols))
+
+            con.unregister('_df_write')
+
+
+class CompIO(_HDFWriter, _ParqWriter, _DuckDBWriter):
     '''
     A CompIO instance takes care of extracting a single variable/parameter from
     the model and of writing a single table to the database.
     '''
 
     def __init__(self, tb, cl_out, comp_obj, idx, connect, output_target,
-                 model=None):
+                 model=None, copy_format='csv', reduction=None,
+                 reduce_buffer=None):
 
         self.tb = tb
         self.cl_out = cl_out
@@ -104,10 +346,19 @@ class CompIO(_HDFWriter, _ParqWriter):
         self.output_target = output_target
         self.connect = connect
         self.model = model
+        self.copy_format = copy_format
+        self.reduction = reduction if reduction else {}
+        # {table: [(CompIO, DataFrame)]} shared by all CompIO instances of
+        # a ModelWriter; see ModelWriter._write_reduced
+        self.reduce_buffer = reduce_buffer
 
         self.columns = None  # set in index setter
         self.run_id = None  # set in call to self.write_run
 
+        # component index table and data objects, see _init_index
+        self._df_idx = None
+        self._list_compdata = None
+
         self.index = tuple(idx) if not isinstance(idx, tuple) else idx
 
         self.coldict = aql.get_coldict()
@@ -127,6 +378,28 @@ class CompIO(_HDFWriter, _ParqWriter):
         return self._to_df(self.comp_obj,
                            [c for c in self.index if not c == 'bool_out'])
 
+    def _init_index(self):
+        '''
+        Collects the component index table and the component data objects.
+
+        These are used to map value arrays (e.g. dual values or
+        :class:`grimsel.core.solution.SolutionArrays`) to the component
+        index. The index is re-generated if the component size changes.
+        '''
+
+        if (self._list_compdata is not None
+                and len(self._list_compdata) == len(self.comp_obj)):
+            return
+
+        cols = [c for c in self.columns if not c == 'value']
+        items = list(self.comp_obj.items())
+
+        keys = [key if isinstance(key, tuple) else (key,)
+                for key, _ in items]
+
+        self._df_idx = pd.DataFrame(keys, columns=cols)
+        self._list_compdata = [compdata for _, compdata in items]
+
     def init_output_table(self):
         '''
         Initialization of output table.
@@ -140,9 +413,18 @@ class CompIO(_HDFWriter, _ParqWriter):
         '''
 
         logger.info('Generating output table {}'.format(self.tb))
-        col_names = self.index + ('value',)
-        cols = [(c,) + (self.coldict[c][0],) for c in col_names]
+        col_names = (get_reduced_index(self.index,
+                                       self.reduction.get(self.tb))
+                     + ('value',))
+        # custom time buckets of reduced tables default to INTEGER
+        cols = [(c,) + (self.coldict.get(c, ['INTEGER'])[0],)
+                for c in col_names]
         cols += [('run_id', 'SMALLINT')]
+
+        if self.output_target == 'duckdb':
+            self.init_duckdb_table(self.tb, cols)
+            return
+
         pk = []  # pk added later for writing/appending performance
         unique = []
 
@@ -153,6 +435,18 @@ class CompIO(_HDFWriter, _ParqWriter):
                        con_cur=self.connect.get_pg_con_cur())
 
 
+    @staticmethod
+    def _cast_dtypes(df):
+        ''' Casts the data types of the output table. '''
+
+        dtype_dict = {'value': np.dtype('float64'),
+                      'bool_out': np.dtype('bool')}
+        dtype_dict.update({col: np.dtype('int32') for col in df.columns
+                           if not col in ('value', 'bool_out')})
+
+        return df.astype({col: dtype for col, dtype in dtype_dict.items()
+                          if col in df.columns})
+
     def _to_file(self, df, tb):
         '''
         Casts the data types of the output table and writes the
@@ -160,13 +454,7 @@ class CompIO(_HDFWriter, _ParqWriter):
 
         '''
 
-        dtype_dict = {'value': np.dtype('float64'),
-                      'bool_out': np.dtype('bool')}
-        dtype_dict.update({col: np.dtype('int32') for col in df.columns
-                           if not col in ('value', 'bool_out')})
-
-        df = df.astype({col: dtype for col, dtype in dtype_dict.items()
-                        if col in df.columns})
+        df = self._cast_dtypes(df)
 
 
         if self.output_target == 'hdf5':
@@ -179,15 +467,34 @@ class CompIO(_HDFWriter, _ParqWriter):
 
             self.write_parquet(fn, df, engine=self.output_target)
 
+        elif self.output_target == 'duckdb':
+
+            self.write_duckdb(tb, df)
+
         else:
             raise RuntimeError('_to_file: no '
                                'output_target applicable')
 
 
     def _to_sql(self, df, tb):
+        '''
+        Streams the output table to the database using ``COPY FROM STDIN``.
+
+        The data is written through the single connection of the
+        ``SqlConnector``. The transaction is committed by
+        :func:`ModelWriter.write_all` once all tables of the model run
+        are written.
+
+        '''
 
-        df.to_sql(tb, self.connect.get_sqlalchemy_engine(),
-                  schema=self.cl_out, if_exists='append', index=False)
+        coltypes = {col: self.coldict[col][0] for col in df.columns
+                    if col in self.coldict}
+        coltypes['run_id'] = 'SMALLINT'
+
+        df = self._cast_dtypes(df)
+
+        aql.copy_from_df(df, self.cl_out, tb, self.connect.get_pg_con_cur(),
+                         fmt=self.copy_format, coltypes=coltypes)
 
     def _finalize(self, df, tb=None):
         ''' Add run_id column and write to database table '''
@@ -199,11 +506,25 @@ class CompIO(_HDFWriter, _ParqWriter):
         # value always positive, directionalities expressed through bool_out
         df['value'] = df['value'].abs()
 
+        if tb in self.reduction:
+
+            if self.reduce_buffer is not None:
+                # tables like var_sy_pwr are written by several CompIO
+                # instances; reduced once all of them are collected
+                self.reduce_buffer.setdefault(tb, []).append((self, df))
+                return
+
+            df = self.reduce(df, self.reduction[tb])
+
+        self._write_table(df, tb)
+
+    def _write_table(self, df, tb):
+
         df['run_id'] = self.run_id
 
         t = time.time()
 
-        if self.output_target in ['hdf5', 'fastparquet']:
+        if self.output_target in ['hdf5', 'fastparquet', 'duckdb']:
             self._to_file(df, tb)
         elif self.output_target == 'psql':
             self._to_sql(df, tb)
@@ -231,36 +552,145 @@ class CompIO(_HDFWriter, _ParqWriter):
 
         return df
 
+    def reduce(self, df, spec):
+        '''
+        Reduces an output table prior to writing.
+
+        The reduction is defined through the ``reduction`` parameter of the
+        :class:`ModelWriter`, a dictionary ``{table name: spec}``, e.g.
+
+        .. code-block:: python
+
+            reduction = {'var_sy_pwr': {'filt': {'nd_id': [0, 1]},
+                                        'time': 'mt_id',
+                                        'cols': ['pp_id', 'bool_out']},
+                         'var_sy_erg_st': {'time': 'wk_id', 'agg': 'mean'}}
+
+        Parameters
+        ----------
+        df : DataFrame
+            output table with ``value`` column
+        spec : dict
+            reduction specification with the optional keys
+
+            * ``filt``: ``{column: list of ids or callable}``; rows are
+              selected by ``isin`` or by the boolean mask returned by the
+              callable. A ``nd_id`` filter can be applied to tables with
+              ``pp_id`` column.
+            * ``time``: temporal aggregation to a column of the model's
+              ``df_tm_soy`` table (e.g. ``'mt_id'`` or ``'wk_id'``) or to
+              custom integer buckets defined by a DataFrame with columns
+              ``tm_id``, ``sy``, and the bucket column.
+            * ``agg``: ``'sum'`` (default) for the time slot weighted sum,
+              e.g. energy from power, ``'mean'`` for the weighted mean.
+            * ``cols``: index columns to keep in addition to the time
+              aggregation column; the values are summed over all other
+              index columns.
+
+        Returns
+        -------
+        DataFrame
+            reduced table with index :func:`get_reduced_index`
+
+        '''
+
+        if not spec.get('agg', 'sum') in ('sum', 'mean'):
+            raise ValueError('CompIO.reduce: agg must be one of '
+                             '"sum", "mean"; got %s.'%spec['agg'])
+
+        idx = [c for c in df.columns if not c == 'value']
+
+        for col, slct in spec.get('filt', {}).items():
+
+            if col in df.columns:
+                srs = df[col]
+            elif col == 'nd_id' and 'pp_id' in df.columns:
+                srs = self.model.mps.translate(df.pp_id,
+                                               'dict_plant_2_node_id')
+            else:
+                raise ValueError('CompIO.reduce: table {} has no column '
+                                 '{}.'.format(self.tb, col))
+
+            mask = slct(srs) if callable(slct) else srs.isin(slct)
+            df = df.loc[mask]
+
+        if spec.get('time') is not None:
+
+            df = self._aggregate_time(df, idx, spec['time'],
+                                      spec.get('agg', 'sum'))
+
+        idx_red = list(get_reduced_index(idx, spec))
+
+        if len(idx_red) < len(df.columns) - 1:
+
+            df = df.groupby(idx_red, as_index=False)['value'].sum()
+
+        return df.reset_index(drop=True)
+
+    def _aggregate_time(self, df, idx, time, agg):
+        '''
+        Aggregates the ``sy`` column to the time buckets ``time``.
+
+        The time slot weights of the ``df_tm_soy`` table are used, so the
+        result is independent of the time resolution of the nodes.
+        '''
+
+        if not 'sy' in df.columns:
+            raise ValueError('CompIO.reduce: time aggregation requires '
+                             'a table with sy column; got %s.'%self.tb)
+
+        time_col = _get_time_bucket_name(time)
+
+        df_tm = self.model.df_tm_soy[['tm_id', 'sy', 'weight']]
+        if isinstance(time, str):
+            if not time in self.model.df_tm_soy.columns:
+                raise ValueError('CompIO.reduce: unknown time column '
+                                 '%s.'%time)
+            df_tm = df_tm.assign(**{time: self.model.df_tm_soy[time]})
+        else:
+            df_tm = df_tm.merge(time[['tm_id', 'sy', time_col]],
+                                on=['tm_id', 'sy'], how='left')
+
+        df = self.model._add_tm_columns(df).merge(df_tm, on=['tm_id', 'sy'],
+                                                  how='left')
+
+        if df[time_col].isna().any():
+            raise ValueError('CompIO.reduce: missing time buckets {} for '
+                             'table {}.'.format(time_col, self.tb))
+
+        df['value'] *= df.weight
+
+        idx_time = [time_col if c == 'sy' else c for c in idx]
+        df = df.groupby(idx_time, as_index=False)[['value', 'weight']].sum()
+
+        if agg == 'mean':
+            df['value'] /= df.weight
+
+        return df[idx_time + ['value']]
+
     def write(self, run_id):
 
         self.run_id = run_id
 
-        df = self.get_df()
+        with tracing.span('CompIO.write', tb=self.tb):
 
-        self._finalize(df)
+            with tracing.span('CompIO.get_df', tb=self.tb):
+                df = self.get_df()
+
+            self._finalize(df)
 
     def _node_to_plant(self, pt):
         '''
-        TODO: THIS SHOULD BE IN MAPS!!!!
-        TODO: THIS SHOULD ALSO INCLUDE ca_id FOR DMND!
         Method for translation of node_id to respective plant_id
         in the cases of demand and inter-node transmission. This is used to
         append demand/inter-nodal transmission to pwr table.
-        Returns a dictionary node -> plant
+        Returns a dictionary node -> plant; see :meth:`Maps.node_to_plant`.
         Keyword arguments:
 
         * pt -- string, selected plant type for translation
         '''
-        df_np = self.model.df_def_plant[['nd_id', 'pp_id', 'pp', 'pt_id']]
-        df_pt = self.model.df_def_pp_type[['pt_id', 'pt']]
-        mask_pt = df_pt.pt.apply(lambda x: x.replace('_ST', '')) == pt
-        slct_pp_type = df_pt.loc[mask_pt, 'pt_id'].astype(int).iloc[0]
 
-        mask_tech = df_np['pt_id'] == slct_pp_type
-        df_np_slct = df_np.loc[mask_tech]
-        dict_node_plant_slct = df_np_slct.set_index('nd_id')
-        dict_node_plant_slct = dict_node_plant_slct['pp_id'].to_dict()
-        return dict_node_plant_slct
+        return self.model.mps.node_to_plant(pt)
 
     def __repr__(self):
 
@@ -271,14 +701,34 @@ class DualIO(CompIO):
     '''
     Base class for dual values. Performs the data extraction of constraint
     shadow prices.
+
+    The constraint index table and the list of constraint data objects are
+    generated once. For each model run, the activity flags and the values
+    of the imported ``dual`` suffix (or the dual array of the model's
+    :class:`grimsel.core.solution.SolutionArrays`) are then read into
+    arrays.
     '''
 
     def to_df(self):
 
-        dat = [ico + (self.model.dual[self.comp_obj[ico]],)
-               for ico in self.comp_obj
-               if self.comp_obj[ico].active]
-        return pd.DataFrame(dat, columns=self.columns)
+        self._init_index()
+
+        list_condata = self._list_compdata
+        ncondata = len(list_condata)
+
+        active = np.fromiter((condata.active for condata
+                              in list_condata), bool, ncondata)
+
+        if getattr(self.model, 'solution', None):
+            value = self.model.solution.get_dual_values(list_condata)
+        else:
+            value = np.fromiter(map(self.model.dual.get, list_condata,
+                                    itertools.repeat(np.nan)),
+                                float, ncondata)
+
+        df = self._df_idx.loc[active].assign(value=value[active])
+
+        return df.reset_index(drop=True)
 
 
 class VariabIO(CompIO):
@@ -300,6 +750,23 @@ class VariabIO(CompIO):
 
         return df
 
+    def to_df(self):
+        '''
+        Uses the model's solution arrays if available.
+
+        See :class:`grimsel.core.solution.SolutionArrays`. Otherwise the
+        values are extracted from the pyomo variable.
+        '''
+
+        if not getattr(self.model, 'solution', None):
+            return super().to_df()
+
+        self._init_index()
+
+        value = self.model.solution.get_variable_values(self._list_compdata)
+
+        return self._df_idx.assign(value=np.nan_to_num(value, nan=0))
+
     def post_processing(self, df):
         '''
         Calls _set_bool_out prior to writing.
@@ -376,58 +843,63 @@ class TransmIO(VariabIO):
         '''
         Aggregates trm table over all secondary nodes for simplification and
         to append to the pwr table.
+
+        The transmission variable is defined for the time slots of the node
+        with the higher time resolution. For the other node, the values are
+        averaged to its own time slots using the map
+        ``ModelBase.df_sysy_ndcnn``.
         '''
+
         # mirror table to get both directions
         dfall = pd.concat([dfall,
                            dfall.assign(nd_2_id=dfall.nd_id,
                                         nd_id=dfall.nd_2_id,
                                         value=-dfall.value)])
 
-        dict_nhours = {nd_id:
-                       self.model._tm_objs[self.model.dict_nd_tm_id[nd_id]].nhours
-                       for nd_id in dfall.nd_id.unique()}
-
-        def avg_to_nhours(x):
-
-            if self.model.is_min_node[x.name]:
-                return x.reset_index()
-            else:  # reduce time resolution
-                nhours = dict_nhours[x.name[0]]
-                nhours_2 = dict_nhours[x.nd_2_id.iloc[0]]
-
-                x['sy'] = np.repeat(np.arange(
-                                    np.ceil(len(x) / (nhours / nhours_2))),
-                                    nhours / nhours_2)
-
-                idx = [c for c in x.columns if not c == 'value']
-                x = x.pivot_table(index=idx, values='value', aggfunc=np.mean)
-                return x.reset_index()
-
-        dfall = (dfall.groupby(['nd_id', 'nd_2_id'], as_index=True)
-                      .apply(avg_to_nhours)
-                      .reset_index(drop=True))
-
-        dfexp = dfall.loc[dfall.value > 0]
-        dfexp = dfexp.groupby(['sy', 'nd_id', 'ca_id'])['value'].sum()
-        dfexp = dfexp.reset_index()
-        dfexp['bool_out'] = True
-
-        dfimp = dfall.loc[dfall.value < 0]
-        dfimp = dfimp.groupby(['sy', 'nd_id', 'ca_id'])['value'].sum()
-        dfimp = dfimp.reset_index()
-        dfimp['bool_out'] = False
-
-        dfagg = pd.concat([dfexp, dfimp], axis=0)
+        idx_ndnd = pd.MultiIndex.from_frame(dfall[['nd_id', 'nd_2_id']])
+        is_min = (pd.Series(self.model.is_min_node).reindex(idx_ndnd)
+                    .fillna(True).astype(bool).values)
+
+        dfred = dfall.loc[~is_min]
+
+        if not dfred.empty:
+            # reduce time resolution: map slots of the node with the higher
+            # time resolution (sy_2) to the node's own time slots (sy)
+            cols = ['nd_id', 'nd_2_id', 'ca_id', 'sy', 'sy_2']
+            df_sysy = self.model.df_sysy_ndcnn.rename(columns={'sy2': 'sy_2'})
+            df_sysy = pd.concat([df_sysy[cols],
+                                 df_sysy.assign(nd_id=df_sysy.nd_2_id,
+                                                nd_2_id=df_sysy.nd_id,
+                                                sy=df_sysy.sy_2,
+                                                sy_2=df_sysy.sy)[cols]])
+            df_sysy = df_sysy.drop_duplicates(cols[:-2] + ['sy_2'])
+
+            dfred = dfred.rename(columns={'sy': 'sy_2'})
+            dfred = dfred.join(df_sysy.set_index(cols[:-2] + ['sy_2']),
+                               on=cols[:-2] + ['sy_2'])
+
+            idx = ['nd_id', 'nd_2_id', 'sy', 'ca_id']
+            dfred = dfred.groupby(idx)['value'].mean().reset_index()
+
+        dfall = pd.concat([dfall.loc[is_min], dfred], sort=False)
+        dfall = dfall.sort_values(['nd_id', 'nd_2_id'], kind='mergesort')
+
+        # exports and imports in a single aggregation
+        dfall = dfall.loc[dfall.value != 0]
+        dfall = dfall.assign(bool_imp=dfall.value < 0)
+        dfagg = dfall.groupby(['bool_imp', 'sy', 'nd_id', 'ca_id'])['value']
+        dfagg = dfagg.sum().reset_index()
+        dfagg['bool_out'] = ~dfagg.pop('bool_imp')
 
         dict_nd_weight = {key: self.model.nd_weight[key].value
                           for key in self.model.nd_weight}
-        dfagg['value'] /= dfagg.nd_id.replace(dict_nd_weight)
+        dfagg['value'] /= dfagg.nd_id.map(dict_nd_weight)
 
         return dfagg
 
     def _translate_trm(self, df):
 
-        df['pp_id'] = df.nd_id.replace(self._node_to_plant('TRNS'))
+        df['pp_id'] = self.model.mps.translate_node_to_plant(df.nd_id, 'TRNS')
         df.drop('nd_id', axis=1, inplace=True)
 
         return df
@@ -467,8 +939,7 @@ class DmndIO(ParamIO):
         ``ModelBase.df_def_plant`` table.
         '''
 
-        dict_ndpp = self._node_to_plant('DMND')
-        df['pp_id'] = df.nd_id.replace(dict_ndpp)
+        df['pp_id'] = self.model.mps.translate_node_to_plant(df.nd_id, 'DMND')
 
         return df
 
@@ -494,7 +965,7 @@ def skip_if_no_output(f):
     return wrapper
 
 
-class ModelWriter():
+class ModelWriter(_DuckDBWriter):
     '''
     The IO singleton class manages the TableIO instances and communicates with
     other classes. Manages database connection.
@@ -517,6 +988,10 @@ class ModelWriter():
                      'coll_out': None,
                      'keep': None,
                      'drop': None,
+                     'copy_format': 'csv',
+                     'reduction': None,
+                     'duals': None,
+                     'duckdb_lock_timeout': 600,
                      'db': None}
 
     def __init__(self, **kwargs):
@@ -525,6 +1000,7 @@ class ModelWriter():
 
         self.run_id = None  # set in call to self.write_run
         self.dict_comp_obj = {}
+        self._dict_reduce_buffer = {}  # see _write_reduced
 
 
         # define instance attributes and update with kwargs
@@ -550,7 +1026,16 @@ class ModelWriter():
         therefore module function.
         '''
 
-        keep = list(table_struct.DICT_COMP_IDX) if not keep else keep
+        duals = self.duals if self.duals else []
+        options_dual = [comp[0] for comp in table_struct.dual_opt]
+        unknowns = [comp for comp in duals if not comp in options_dual]
+        if unknowns:
+            raise RuntimeError(('Unknown duals %s. Possible options '
+                               'are %s')%(str(unknowns), str(options_dual)))
+
+        keep = ([comp for comp in table_struct.DICT_COMP_IDX
+                 if not comp in options_dual or comp in duals]
+                if not keep else keep)
         keep = set(keep) - set(drop if drop else [])
 
         options = list(table_struct.DICT_COMP_IDX)
@@ -577,12 +1062,19 @@ class ModelWriter():
             self._reset_hdf_file()
         elif self.output_target in ['fastparquet']:
             self._reset_parquet_file()
+        elif self.output_target == 'duckdb':
+            self._reset_duckdb_file()
 
     @skip_if_resume_loop
     def _reset_hdf_file(self):
 
         ModelWriter.reset_hdf_file(self.cl_out, not self.dev_mode)
 
+    @skip_if_resume_loop
+    def _reset_duckdb_file(self):
+
+        ModelWriter.reset_duckdb_file(self.cl_out, not self.dev_mode)
+
     def _reset_parquet_file(self):
 
         ModelWriter.reset_parquet_file(self.cl_out, not self.dev_mode,
@@ -628,6 +1120,49 @@ Hit enter to proceed.
             logger.info('Dropping output file {}'.format(fn))
             os.remove(fn)
 
+    @staticmethod
+    def reset_duckdb_file(fn, warn):
+        '''
+        Deletes existing DuckDB database file.
+
+        Parameters
+        ----------
+        fn: str
+            filename
+        warn: bool
+            prompt user input if the file exists
+
+        '''
+
+        if os.path.isfile(fn):
+
+            try:
+                with ModelWriter._connect_duckdb(fn) as con:
+                    max_run_id = con.execute('SELECT MAX(run_id) '
+                                             'FROM def_run').fetchone()[0]
+            except Exception as e:
+                logger.error(e)
+                logger.warn('reset_duckdb_file: Could not determine '
+                            'max_run_id ... setting to None.')
+                max_run_id = None
+
+            if warn:
+                input(
+'''
+~~~~~~~~~~~~~~~   WARNING:  ~~~~~~~~~~~~~~~~
+You are about to delete existing file {fn}.
+The maximum run_id is {max_run_id}.
+
+Hit enter to proceed.
+'''.format(fn=fn, max_run_id=max_run_id)
+)
+
+            logger.info('Dropping output file {}'.format(fn))
+            os.remove(fn)
+
+            if os.path.isfile(fn + '.wal'):
+                os.remove(fn + '.wal')
+
     def reset_parquet_file(dirc, warn, resume_loop, ):
         '''
         Deletes existing parquet file folder and creates empty one.
@@ -687,6 +1222,14 @@ Hit enter to proceed.
                 df_def_run = df_def_run.reset_index(drop=True)
                 pq.write(fn_run, df_def_run, append=False, compression='GZIP')
 
+                fn_stats = os.path.join(dirc, 'run_stats.parq')
+                if os.path.exists(fn_stats):
+                    df_stats = pd.read_parquet(fn_stats)
+                    df_stats = df_stats.query('run_id < %d'%resume_loop)
+                    df_stats = df_stats.reset_index(drop=True)
+                    pq.write(fn_stats, df_stats, append=False,
+                             compression='GZIP')
+
             else:
                 logger.info('... nothing to delete.')
 
@@ -737,18 +1280,79 @@ Hit enter to proceed.
                                       idx=idx,
                                       connect=self.sql_connector,
                                       output_target=self.output_target,
-                                      model=self.model)
+                                      model=self.model,
+                                      copy_format=self.copy_format,
+                                      reduction=self.reduction,
+                                      reduce_buffer=self._dict_reduce_buffer)
 
                 self.dict_comp_obj[comp] = io_class(**io_class_kwars)
 
     @skip_if_no_output
+    @tracing.traced()
     def write_all(self):
 
-        ''' Calls the write methods of all CompIO objects. '''
+        '''
+        Calls the write methods of all CompIO objects.
+
+        For the ``psql`` and ``duckdb`` output targets all tables of a model
+        run are written in a single transaction. DuckDB writes share a single
+        connection (see :meth:`_DuckDBWriter.duckdb_session`).
+        '''
+
+        self._dict_reduce_buffer.clear()
+
+        if self.output_target == 'psql':
+
+            conn, _ = self.sql_connector.get_pg_con_cur()
+
+            try:
+                for comp, io_obj in self.dict_comp_obj.items():
+                    io_obj.write(self.run_id)
+                self._write_reduced()
+            except Exception as e:
+                conn.rollback()
+                raise(e)
+            finally:
+                self._dict_reduce_buffer.clear()
+
+            conn.commit()
 
-        for comp, io_obj in self.dict_comp_obj.items():
+        else:
+
+            session = (self.duckdb_session()
+                       if self.output_target == 'duckdb' else nullcontext())
 
-            io_obj.write(self.run_id)
+            try:
+                with session:
+                    for comp, io_obj in self.dict_comp_obj.items():
+
+                        io_obj.write(self.run_id)
+
+                    self._write_reduced()
+            finally:
+                self._dict_reduce_buffer.clear()
+
+    def _write_reduced(self):
+        '''
+        Reduces and writes the tables with ``reduction`` spec.
+
+        The rows of all CompIO instances writing to the same table (e.g.
+        *pwr*, *pwr_st_ch*, demand, and transmission for *var_sy_pwr*) are
+        reduced together. Otherwise, a spec whose ``cols`` drop the
+        columns distinguishing these rows (e.g. ``pp_id``) would result in
+        duplicate keys.
+        '''
+
+        for tb, list_df in self._dict_reduce_buffer.items():
+
+            io_obj = list_df[0][0]
+
+            with tracing.span('CompIO.reduce', tb=tb):
+                df = pd.concat([df for _, df in list_df],
+                               ignore_index=True, sort=False)
+                df = io_obj.reduce(df, self.reduction[tb])
+
+            io_obj._write_table(df, tb)
 
     @skip_if_no_output
     def init_all(self):
@@ -767,6 +1371,13 @@ Hit enter to proceed.
                 io_obj.coldict = coldict
                 io_obj.init_output_table()
 
+        elif self.output_target == 'duckdb':
+
+            with self.duckdb_session():
+                for comp, io_obj in self.dict_comp_obj.items():
+
+                    io_obj.init_output_table()
+
         elif self.output_target in ['hdf5', 'fastparquet']:
 
             pass
@@ -783,7 +1394,7 @@ Hit enter to proceed.
         TODO: The SQL part would be better fit with the aux_sql_func module.
         '''
 
-        if run_id:
+        if run_id is not False and run_id is not None:
 
 
 
@@ -793,29 +1404,61 @@ Hit enter to proceed.
                                   if not len(itb) == 3)
                              for itb_list in table_struct.list_collect]
             self.list_all_tb = list(itertools.chain(*list_all_tb_0))
+            self.list_all_tb += ['dual_' + comp for comp in
+                                 (self.duals if self.duals else [])]
             self.list_all_tb += ['def_run']
 
-            for itb in self.list_all_tb:
+            # solver statistics table, only written if a solver was run
+            list_tb_run_stats = ['run_stats']
+            if self.output_target == 'psql':
+                list_tb_run_stats = [tb for tb in list_tb_run_stats if tb in
+                                     aql.get_sql_tables(self.cl_out, self.db)]
+            elif self.output_target == 'fastparquet':
+                list_tb_run_stats = []  # like def_run, no per-run files
+            self.list_all_tb += list_tb_run_stats
 
-                if self.output_target == 'fastparquet':
+            session = (self.duckdb_session()
+                       if self.output_target == 'duckdb' else nullcontext())
 
-                    self._delete_run_id_parquet(tb=itb, run_id=run_id)
+            with session:
+                for itb in self.list_all_tb:
 
-                elif self.output_target == 'psql':
+                    if self.output_target == 'fastparquet':
 
-                    logger.info('Deleting from ' + self.cl_out + '.' + itb
-                                + ' where run_id {} {}'.format(operator,
-                                                               str(run_id)))
-                    exec_strg = '''
-                                DELETE FROM {cl_out}.{tb}
-                                WHERE run_id {op} {run_id};
-                                '''.format(cl_out=self.cl_out, tb=itb,
-                                           run_id=run_id, op=operator)
-                    try:
-                        aql.exec_sql(exec_strg, db=self.db)
-                    except pg.ProgrammingError as e:
-                        logger.error(e)
-                        raise(e)
+                        self._delete_run_id_parquet(tb=itb, run_id=run_id)
+
+                    elif self.output_target == 'psql':
+
+                        logger.info('Deleting from ' + self.cl_out + '.' + itb
+                                    + ' where run_id {} {}'.format(operator,
+                                                                   str(run_id)))
+                        exec_strg = '''
+                                    DELETE FROM {cl_out}.{tb}
+                                    WHERE run_id {op} {run_id};
+                                    '''.format(cl_out=self.cl_out, tb=itb,
+                                               run_id=run_id, op=operator)
+                        try:
+                            aql.exec_sql(exec_strg, db=self.db)
+                        except pg.ProgrammingError as e:
+                            logger.error(e)
+                            raise(e)
+
+                    elif self.output_target == 'duckdb':
+
+                        self._delete_run_id_duckdb(tb=itb, run_id=run_id,
+                                                   operator=operator)
+
+    def _delete_run_id_duckdb(self, tb, run_id, operator):
+
+        with self._get_duckdb_con() as con:
+
+            if self._duckdb_table_exists(con, tb):
+
+                logger.info('Deleting from {} where run_id {} {}'.format(
+                                                    tb, operator, run_id))
+                con.execute('DELETE FROM {tb} WHERE run_id {op} '
+                            '{run_id}'.format(tb=tb, op=operator,
+                                              run_id=run_id))
 
     def _delete_run_id_parquet(self, tb, run_id):
 
@@ -835,67 +1478,118 @@ Hit enter to proceed.
             logger.error(e)
 
 
-#    @classmethod
-#    def post_process_index(cls, sc, db, drop=False):
-#
-#        coldict = aql.get_coldict(sc, db)
-#
-#        dict_idx, dict_table, _ = ModelWriter.get_table_dicts()
-#
-#        list_tables = aql.get_sql_tables(sc, db)
-#
-#        for comp, index in dict_idx.items():
-#
-#            if not dict_table[comp] in list_tables:
-#                logger.warning('Table ' + comp + ' does not exist... skipping '
-#                      'index generation.')
-#            else:
-#
-#                tb_name = dict_table[comp]
-#
-#                logger.info('tb_name:', tb_name)
-#
-#                pk_list = index + ('run_id',)
-#
-#                fk_dict = {}
-#                for c in pk_list:
-#                    if len(coldict[c]) > 1:
-#                        fk_dict[c] = coldict[c][1]
-#
-#
-#                pk_kws = {'pk_list': ', '.join(pk_list),
-#                          'tb': tb_name, 'cl_out': sc}
-#                exec_str = ('''
-#                            ALTER TABLE {cl_out}.{tb}
-#                            DROP CONSTRAINT IF EXISTS {tb}_pkey;
-#                            ''').format(**pk_kws)
-#                if not drop:
-#                    exec_str += ('''
-#                                 ALTER TABLE {cl_out}.{tb}
-#                                 ADD CONSTRAINT {tb}_pkey
-#                                 PRIMARY KEY ({pk_list})
-#                                 ''').format(**pk_kws)
-#                logger.debug(exec_str)
-#                aql.exec_sql(exec_str, db=db)
-#
-#                for fk_keys, fk_vals in fk_dict.items():
-#                    fk_kws = {'cl_out': sc, 'tb': tb_name,
-#                              'fk': fk_keys, 'ref': fk_vals}
-#
-#                    exec_str = ('''
-#                                ALTER TABLE {cl_out}.{tb}
-#                                DROP CONSTRAINT IF EXISTS fk_{tb}_{fk};
-#                                ''').format(**fk_kws)
-#
-#                    if not drop:
-#                        exec_str += ('''
-#                                     ALTER TABLE {cl_out}.{tb}
-#                                     ADD CONSTRAINT fk_{tb}_{fk}
-#                                     FOREIGN KEY ({fk})
-#                                     REFERENCES {ref}
-#                                     ''').format(**fk_kws)
-#                    logger.debug(exec_str)
-#                    aql.exec_sql(exec_str, db=db)
+    def _get_output_table_index(self):
+        '''
+        Returns a dictionary ``{output table: index columns}``.
+
+        Components which are written to the same table (e.g. *pwr* and
+        *pwr_st_ch*) share the index of the table.
+        '''
+
+        if not self.dict_comp_idx:
+            self._make_table_dicts(keep=self.keep, drop=self.drop)
+
+        reduction = self.reduction if self.reduction else {}
+
+        dict_tb_idx = {}
+        for comp, idx in self.dict_comp_idx.items():
+            tb = self.dict_comp_table[comp]
+            dict_tb_idx[tb] = get_reduced_index(idx, reduction.get(tb))
+
+        return dict_tb_idx
+
+    def post_process_index(self, drop=False):
+        '''
+        Adds primary keys and foreign keys to all output tables.
+
+        Keys are not defined in :func:`CompIO.init_output_table` since they
+        slow down the writing of the model results. Instead, they are added
+        once after all model runs are completed.
+
+        Foreign keys are only added if the referenced table exists and the
+        referenced column is unique. Failing foreign keys are skipped with
+        a warning.
+
+        Parameters
+        ----------
+        drop : bool
+            only drop the existing keys, don't add new ones
+
+        '''
+
+        con_cur = self.sql_connector.get_pg_con_cur()
+        conn, _ = con_cur
+
+        coldict = aql.get_coldict(self.cl_out, self.sql_connector.db,
+                                  con_cur=con_cur)
+        list_tables = aql.get_sql_tables(self.cl_out, con_cur=con_cur)
+
+        for tb_name, index in self._get_output_table_index().items():
+
+            if not tb_name in list_tables:
+                logger.warning(('Table {} does not exist... skipping '
+                                'index generation.').format(tb_name))
+                continue
+
+            logger.info('Adding keys to table {}.{}'.format(self.cl_out,
+                                                             tb_name))
+
+            pk_list = tuple(index) + ('run_id',)
+
+            fk_dict = {c: coldict[c][1] for c in pk_list
+                       if c in coldict and len(coldict[c]) > 1}
+
+            pk_kws = {'pk_list': ', '.join(pk_list),
+                      'tb': tb_name, 'cl_out': self.cl_out}
+            exec_str = ('''
+                        ALTER TABLE {cl_out}.{tb}
+                        DROP CONSTRAINT IF EXISTS {tb}_pkey;
+                        ''').format(**pk_kws)
+            if not drop:
+                exec_str += ('''
+                             ALTER TABLE {cl_out}.{tb}
+                             ADD CONSTRAINT {tb}_pkey
+                             PRIMARY KEY ({pk_list});
+                             ''').format(**pk_kws)
+            logger.debug(exec_str)
+            aql.exec_sql(exec_str, con_cur=con_cur)
+
+            for fk_key, fk_ref in fk_dict.items():
+                fk_kws = {'cl_out': self.cl_out, 'tb': tb_name,
+                          'fk': fk_key, 'ref': fk_ref}
+
+                exec_str = ('''
+                            ALTER TABLE {cl_out}.{tb}
+                            DROP CONSTRAINT IF EXISTS fk_{tb}_{fk};
+                            ''').format(**fk_kws)
+
+                if not drop:
+                    exec_str += ('''
+                                 ALTER TABLE {cl_out}.{tb}
+                                 ADD CONSTRAINT fk_{tb}_{fk}
+                                 FOREIGN KEY ({fk})
+                                 REFERENCES {ref};
+                                 ''').format(**fk_kws)
+                logger.debug(exec_str)
+
+                try:
+                    aql.exec_sql(exec_str, con_cur=con_cur)
+                except pg.Error as e:
+                    conn.rollback()
+                    logger.warning('Skipping foreign key fk_{tb}_{fk}: '
+                                   '{e}'.format(**fk_kws, e=e))
+
+    @skip_if_no_output
+    def finalize_output_tables(self):
+        '''
+        Loop-end processing of the output collection.
+
+        For the ``psql`` output target this adds the deferred primary and
+        foreign keys.
+        '''
+
+        if self.output_target == 'psql':
+            self.post_process_index()
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -903,9 +1597,14 @@ class TableReader():
     '''
     Reads tables from input data sources and makes them attributes of the
     model attribute.
+
+    All tables passed to :meth:`df_from_dict` are read concurrently by a
+    pool of ``input_workers`` threads. Subsequent calls act as barriers
+    between the stages of dependent tables.
     '''
 
-    def __init__(self, sql_connector, sc_inp, data_path, model):
+    def __init__(self, sql_connector, sc_inp, data_path, model,
+                 input_cache=False, input_workers=8):
 
         self.sqlc = sql_connector
         self.sc_inp = sc_inp
@@ -913,6 +1612,11 @@ class TableReader():
                           isinstance(data_path, (tuple, list))
                           else [data_path])
         self.model = model
+        self.input_cache = input_cache
+        self.input_workers = input_workers
+
+        # table -> (read time, number of rows, source)
+        self.dict_read_stats = {}
 
         if not self.sc_inp and not self.data_path:
             logger.warning('Falling back to grimsel default csv tables.')
@@ -935,9 +1639,9 @@ class TableReader():
 
         elif self.data_path:
 
-            # path -> tables list
-            dict_pt_tb = {path: [fn.replace('.csv', '')
-                          for fn in next(os.walk(path))[-1]]
+            # path -> {table: file name}; csv, parquet, and feather files
+            # or parquet dataset directories
+            dict_pt_tb = {path: self._get_path_tables(path)
                           for path in self.data_path}
 
             table_set = set(itertools.chain.from_iterable(
@@ -947,8 +1651,41 @@ class TableReader():
             dict_tb_path = {tb: [pt for pt, tb_list in dict_pt_tb.items() if
                             tb in tb_list] for tb in table_set}
 
+            # table -> files
+            self.dict_tb_fn = {tb: [dict_pt_tb[pt][tb] for pt in pts]
+                               for tb, pts in dict_tb_path.items()}
+
             return table_set, dict_tb_path
 
+    @staticmethod
+    def _get_path_tables(path):
+        '''
+        Returns a dictionary ``{table: file name}`` for a data path.
+
+        If a table is available in several formats, parquet is preferred
+        over feather over csv.
+        '''
+
+        priority = list(input_cache.DICT_SUFFIX_FORMAT.values())
+
+        dict_tb_fn = {}
+        for fn in sorted(os.listdir(path)):
+
+            tb_fmt = input_cache.split_table_fn(fn)
+
+            if not tb_fmt:
+                continue
+
+            tb, fmt = tb_fmt
+            fmt_old = (input_cache.split_table_fn(dict_tb_fn[tb])[1]
+                       if tb in dict_tb_fn else None)
+
+            if (not fmt_old
+                    or priority.index(fmt) < priority.index(fmt_old)):
+                dict_tb_fn[tb] = os.path.join(path, fn)
+
+        return dict_tb_fn
+
     def _expand_table_families(self, dct):
         '''
         Searches for tables with identical name + suffix.
@@ -970,15 +1707,29 @@ class TableReader():
         '''
         Reads filtered input tables and assigns them to instance
         attributes.
+
+        The tables are read in parallel threads; the model attributes are
+        set and logged in the order of ``dct`` once all tables are read.
         '''
 
         self._expand_table_families(dct)
 
-        for table, filt in dct.items():
+        if self.input_workers and self.input_workers > 1 and len(dct) > 1:
+            with ThreadPoolExecutor(min(self.input_workers, len(dct)),
+                                    thread_name_prefix='TableReader'
+                                    ) as executor:
+                futures = {table: executor.submit(self._read_table,
+                                                  table, filt)
+                           for table, filt in dct.items()}
+                dict_res = {table: fut.result()
+                            for table, fut in futures.items()}
+        else:
+            dict_res = {table: self._read_table(table, filt)
+                        for table, filt in dct.items()}
 
-            list_df, tb_exists, source_str = self.get_input_table(table, filt)
+        for table, filt in dct.items():
 
-            df = pd.concat(list_df, axis=0, sort=False) if tb_exists else None
+            df, tb_exists, source_str, t_read = dict_res[table]
 
             setattr(self.model, 'df_' + table, df)
 
@@ -987,12 +1738,34 @@ class TableReader():
                             'attribute df_{tb} to None.')
                 logger.warning(warn_str.format(tb=table))
             else:
+                self.dict_read_stats[table] = (t_read, len(df), source_str)
+
                 filt = ('filtered by ' if len(filt) > 0 else '') +\
                    ', '.join([str(vvv[0]) + ' in ' + str(vvv[1]) for vvv in filt
                               if not len(vvv[1]) == 0])
-                logger.info(('Reading input table {tb} {flt} from '
-                       '{source_str}').format(tb=table, flt=filt,
-                                              source_str=source_str))
+                logger.info(('Reading input table {tb} {flt}'
+                       '{source_str} ({nrows} rows, {t:.2f} s)'
+                       ).format(tb=table, flt=filt, source_str=source_str,
+                                nrows=len(df), t=t_read))
+
+    def _read_table(self, table, filt):
+        '''
+        Reads and concatenates a single input table.
+
+        Returns
+        -------
+        tuple
+            ``(DataFrame or None, table exists, source string, read time)``
+
+        '''
+
+        t = time.time()
+
+        list_df, tb_exists, source_str = self.get_input_table(table, filt)
+
+        df = pd.concat(list_df, axis=0, sort=False) if tb_exists else None
+
+        return df, tb_exists, source_str, time.time() - t
 
     def get_input_table(self, table, filt):
         '''
@@ -1013,32 +1786,27 @@ class TableReader():
 
             tb_exists = table in self.dict_tb_path
 
-            paths = self.dict_tb_path[table] if tb_exists else []
+            fns = self.dict_tb_fn[table] if tb_exists else []
 
             source = []
 
-            for path in paths:
+            flt = Filter(filt)
 
-                fn = os.path.join(path, '{}.csv'.format(table))
-                source.append(fn)
+            for fn in fns:
 
-                df = pd.read_csv(fn)
+                source.append(fn)
 
-                logger.debug('Done reading, filtering according to {}'.format(filt))
+                logger.debug('Reading {} filtered by {}'.format(fn, filt))
 
-                for col, vals in filt:
-                    if isinstance(col, str):  # single column filtering
-                        mask = df[col].isin(vals)
-                    elif isinstance(col, (list, tuple)):  # multiple columns
-                        mask = df[list(col)].apply(tuple, axis=1).isin(vals)
-                    df = df.loc[mask]
+                cache_dir = input_cache.get_cache_dir(self.input_cache)
+                df = input_cache.read_table(fn, flt, cache_dir=cache_dir)
 
                 list_df.append(df)
 
         return ((list_df if tb_exists else None), tb_exists,
                 (' from {}'.format(' and '.join(source)) if tb_exists else ''))
 
-class DataReader(_HDFWriter, _ParqWriter):
+class DataReader(_HDFWriter, _ParqWriter, _DuckDBWriter):
     '''
 
     '''
@@ -1059,10 +1827,13 @@ class DataReader(_HDFWriter, _ParqWriter):
                     'no_output': False,
                     'dev_mode': False,
                     'data_path': None,
+                    'input_cache': False,
+                    'input_workers': 8,
                     'sql_connector': None,
                     'sc_inp': None,
                     'cl_out': None,
                     'db': None,
+                    'duckdb_lock_timeout': 600,
                     }
 
         defaults.update(kwargs)
@@ -1080,7 +1851,9 @@ class DataReader(_HDFWriter, _ParqWriter):
         '''
 
         tbrd = TableReader(self.sql_connector, self.sc_inp,
-                           self.data_path, self.model)
+                           self.data_path, self.model,
+                           input_cache=self.input_cache,
+                           input_workers=self.input_workers)
 
         # unfiltered input
         dict_tb_2 = {'def_month': [], 'def_week': [],
@@ -1217,18 +1990,22 @@ class DataReader(_HDFWriter, _ParqWriter):
                 setattr(self.model, tb_name, None)
 
     def data_autocompletion(self):
+        '''
+        Adds demand, curtailment, and transmission plants etc. to the input
+        tables (see :module:`grimsel.core.autocomplete`).
+
+        For file-based input with ``input_cache`` the additions are
+        cached in the input cache directory.
+        '''
 
         if self.autocompletion:
             logger.info('#' * 60)
 
-            ac.AutoCompletePpType(self.model, self.autocomplete_curtailment)
-            ac.AutoCompleteFuelTrns(self.model)
-            ac.AutoCompleteFuelDmnd(self.model, self.autocomplete_curtailment)
-            ac.AutoCompletePlantTrns(self.model)
-            ac.AutoCompletePlantDmnd(self.model, self.autocomplete_curtailment)
-            if 'fl_id' in self.model.df_def_encar:
-                ac.AutoCompletePlantCons(self.model)
-            ac.AutoCompletePpCaFlex(self.model, self.autocomplete_curtailment)
+            cache_dir = (input_cache.get_cache_dir(self.input_cache)
+                         if self.data_path and not self.sc_inp else None)
+
+            ac.autocomplete(self.model, self.autocomplete_curtailment,
+                            cache_dir=cache_dir)
             logger.info('#' * 60)
 
 
@@ -1256,9 +2033,8 @@ class DataReader(_HDFWriter, _ParqWriter):
 
         This allows to combine structurally different tables.
 
-        Filtering is implemented as an iteration over the set_n_name/set_n_id
-        column pairs, each of which is filtered with respect to all elements
-        in the filt parameter.
+        Note: The rows are not removed; only the set values of all
+        set_n_name/set_n_id column pairs are reported.
 
         Parameters
         ==========
@@ -1280,22 +2056,6 @@ class DataReader(_HDFWriter, _ParqWriter):
 
         if df is not None:
 
-            # perform iterative filtering for each name/id column pair
-            for name_col, id_col in [(cc, cc.replace('name', 'id'))
-                                     for cc in df.columns if 'name' in cc]:
-                # init mask
-                mask = False
-
-                # loop over all filter elements
-                iflt = filt[0]
-                for iflt in filt:
-                    mask |= (  # 1. select value for current set_n_name column
-                             ((df[name_col] == iflt[0])
-                              # 2. select corresponding values for set_n_id col
-                               & (df[id_col].isin(iflt[1])))
-                              # 3. skip if this name_col is not relevant
-                             | (df[name_col] == 'na'))
-
             # reporting
             report_df = df[[c for c in df.columns if 'set_' in c]]
             report_df = report_df.drop_duplicates()
@@ -1398,6 +2158,11 @@ class DataReader(_HDFWriter, _ParqWriter):
 
                     fn = os.path.join(self.cl_out, itb + '.parq')
                     self.write_parquet(fn, df, self.output_target)
+
+                elif self.output_target == 'duckdb':
+
+                    self.write_duckdb(itb, df, if_exists='replace')
+
                 else:
                     raise RuntimeError('_write_input_tables_to_output_schema: '
                                        'no output_target applicable')
@@ -1461,6 +2226,10 @@ class DataReader(_HDFWriter, _ParqWriter):
 
                     self.write_parquet(fn, df, engine=self.output_target)
 
+                elif self.output_target == 'duckdb':
+
+                    self.write_duckdb(tb_name, df, if_exists='replace')
+
                 else:
                     raise RuntimeError('write_runtime_tables: no '
                                        'output_target applicable')
@@ -1501,10 +2270,16 @@ class IO:
                     'no_output': False,
                     'dev_mode': False,
                     'data_path': None,
+                    'input_cache': False,
+                    'input_workers': 8,
                     'sc_inp': None,
                     'cl_out': None,
                     'db': 'postgres',
-                    'output_target': 'psql'
+                    'output_target': 'psql',
+                    'copy_format': 'csv',
+                    'reduction': None,
+                    'duals': None,
+                    'duckdb_lock_timeout': 600
                     }
 
         defaults.update(kwargs)
@@ -1573,6 +2348,14 @@ class IO:
         self.modwr.run_id = run_id
         self.modwr.write_all()
 
+    def finalize_output_tables(self):
+
+        self.modwr.finalize_output_tables()
+
+    def delete_run_id(self, run_id, operator='>='):
+
+        self.modwr.delete_run_id(run_id=run_id, operator=operator)
+
     def _init_loop_table(self, cols_id, cols_step, cols_val):
 
         tb_name = 'def_run'
@@ -1600,6 +2383,10 @@ class IO:
         elif self.modwr.output_target == 'fastparquet':
             pass  # parquet table is not initialized
 
+        elif self.modwr.output_target == 'duckdb':
+
+            self.modwr.init_duckdb_table(tb_name, cols)
+
         else:
             raise RuntimeError('_init_loop_table: no '
                                'output_target applicable')
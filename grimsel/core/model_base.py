@@ -6,6 +6,8 @@ import sys
 import os
 from importlib import reload
 import tempfile
+import shutil
+import weakref
 import string
 import pyutilib
 import contextlib
@@ -20,6 +22,8 @@ from pyomo.core.base.objective import SimpleObjective
 from pyomo.opt import SolverFactory
 
 import grimsel.auxiliary.maps as maps
+from grimsel.auxiliary.profile_store import ProfileStore
+from grimsel.auxiliary.memory import get_sizeof
 import grimsel.auxiliary.timemap as timemap
 
 import grimsel.core.constraints as constraints
@@ -27,6 +31,9 @@ import grimsel.core.variables as variables
 import grimsel.core.parameters as parameters
 import grimsel.core.sets as sets
 import grimsel.core.io as io # for class methods
+import grimsel.core.solution as solution
+import grimsel.core.solver_log as solver_log
+import grimsel.auxiliary.tracing as tracing
 from grimsel import _get_logger
 
 logger = _get_logger(__name__)
@@ -34,6 +41,12 @@ logger = _get_logger(__name__)
 
 def get_random_suffix():
     return ''.join(np.random.choice(list(string.ascii_lowercase), 4))
+
+def _remove_lean_dir(path, pid):
+    # forked run_parallel workers share the directory with the parent
+    if os.getpid() == pid:
+        shutil.rmtree(path, ignore_errors=True)
+
 #
 #TEMP_DIR = 'grimsel_temp_' + get_random_suffix()
 
@@ -91,6 +104,23 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
                  ('var_yr_cap_pwr_new', 'cap_pwr_new')]
     list_constr_deact = ['set_win_sol']
 
+    # intermediate attributes released in lean mode; see release_intermediates
+    list_intermediates = (['df_tm_soy_full', 'df_sy_min_all', 'df_symin_ndcnn',
+                           '_tm_objs']
+                          + ['df_prof' + tb + sfx
+                             for tb in ('dmnd', 'supply', 'inflow', 'chp',
+                                        'pricesll', 'pricebuy')
+                             for sfx in ('', '_soy')])
+    list_downcast = ['df_sysy_ndcnn']
+
+    # profile tables and index columns of the time slot tables
+    list_profiles = [('dmnd', ['dmnd_pf_id', 'sy']),
+                     ('inflow', ['pp_id', 'ca_id', 'sy']),
+                     ('supply', ['supply_pf_id', 'sy']),
+                     ('chp', ['nd_id', 'ca_id', 'sy']),
+                     ('pricesll', ['price_pf_id', 'sy']),
+                     ('pricebuy', ['price_pf_id', 'sy'])]
+
 #    db = get_config('sql_connect')['db']
 
 
@@ -104,6 +134,28 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         skip_runs -- boolean; if True, solver calls are skipped, also
                      stops the IO instance from trying to write the model
                      variables.
+        solution_arrays -- boolean; if True, the CPLEX solution file is
+                           parsed into arrays which are used for output
+                           writing; pyomo values are loaded on demand only
+                           (see :module:`grimsel.core.solution`)
+        profile_store -- directory; if not None, the hourly profiles are
+                         stored there as float32 .npy files and
+                         memory-mapped (see
+                         :module:`grimsel.auxiliary.profile_store`); the
+                         profile tables are derived from the stores
+                         on access (see :func:`_init_profile_stores`)
+        profile_store_max_gb -- float; size limit of the profile_store
+                                directory; the least recently used
+                                stores are deleted
+        adaptive_slices -- dict or list of dicts; nodes with variable-length
+                           time slots derived from their profiles (see
+                           :func:`_get_adaptive_time_map`); keys ``nodes``
+                           (list of node names, default all), ``max_nhours``,
+                           ``error_budget``, ``peak_share``; all nodes of
+                           a dict share one time map
+        lean -- boolean; if True, intermediate tables are released once the
+                parameters are built and re-loaded on access (see
+                :func:`release_intermediates`)
         '''
 
         super(ModelBase, self).__init__() # init of po.ConcreteModel
@@ -122,6 +174,11 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
                     'skip_runs': False,
                     'nthreads': False,
                     'keepfiles': True,
+                    'solution_arrays': False,
+                    'profile_store': None,
+                    'profile_store_max_gb': 4,
+                    'adaptive_slices': None,
+                    'lean': False,
                     'tempdir': None}
         for key, val in defaults.items():
             setattr(self, key, val)
@@ -137,6 +194,11 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         logger.info('self.constraint_groups=' + str(self.constraint_groups))
 
         self.warmstartfile = self.solutionfile = None
+        self.solution = None  # SolutionArrays if solution_arrays
+        self.run_stats = None  # solver statistics of the last run
+        self.dict_profile_store = {}  # table -> hourly ProfileStore
+        self._dict_released = {}  # released attribute -> pickle file
+        self._lean_dir = None
 
         # attributes for presolve_fixed_capacities
         self.list_vars = ModelBase.list_vars
@@ -186,6 +248,146 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
 
 
 
+    def __getattr__(self, name):
+
+        dict_released = self.__dict__.get('_dict_released')
+
+        if dict_released and name in dict_released:
+            # the file is kept for other run_parallel workers
+            logger.info('Re-loading released attribute {}'.format(name))
+            val = pd.read_pickle(dict_released.pop(name))
+            setattr(self, name, val)
+
+            return val
+
+        dict_store = self.__dict__.get('dict_profile_store')
+
+        if dict_store and name.startswith('df_prof'):
+            # profile tables released by _init_profile_stores; not kept
+            itb = name[len('df_prof'):]
+            itb, soy = ((itb[:-len('_soy')], True) if itb.endswith('_soy')
+                        else (itb, False))
+
+            if itb in dict_store:
+                if not soy:
+                    return dict_store[itb].to_long()
+
+                idx = dict(self.list_profiles)[itb]
+                return self.map_profile_to_time_resolution(
+                            dict_store[itb].index.to_frame(index=False),
+                            idx, itb)
+
+        return super().__getattr__(name)
+
+    def _init_profile_stores(self):
+        '''
+        Converts the hourly profile tables into memory-mapped profile
+        stores.
+
+        This only applies if the ``profile_store`` directory is set. The
+        stores are saved in this directory (see
+        :meth:`grimsel.auxiliary.profile_store.ProfileStore.from_long_cached`)
+        and kept in ``dict_profile_store``. The long tables
+        ``df_prof{dmnd, supply, ...}`` are deleted. The same holds for the
+        time slot tables ``df_prof..._soy`` once the parameters are built
+        (see :func:`_release_profiles`). On access, both are re-generated
+        from the stores but not kept.
+        '''
+
+        if not self.profile_store:
+            return
+
+        for itb, idx in self.list_profiles:
+
+            name_df = 'df_prof' + itb
+            df = self.__dict__.get(name_df)
+
+            if df is None or df.empty:
+                continue
+
+            id_cols = [c for c in idx if not c == 'sy']
+            self.dict_profile_store[itb] = ProfileStore.from_long_cached(
+                            df, id_cols, self.profile_store, 'prof' + itb,
+                            max_gb=self.profile_store_max_gb)
+
+            del self.__dict__[name_df]
+
+    def _release_profiles(self):
+        ''' Deletes the time slot tables of the profile stores. '''
+
+        for itb in self.dict_profile_store:
+            self.__dict__.pop('df_prof' + itb + '_soy', None)
+
+    def release_intermediates(self, list_attr=None):
+        '''
+        Frees the memory held by intermediate attributes.
+
+        The attributes ``list_intermediates`` (hourly and time slot
+        profiles, full time map tables, ``TimeMap`` objects) are only
+        required to build the sets and parameters. They are pickled to a
+        temporary directory and deleted from the model instance. On first
+        access (e.g. by a model loop modifier) they are re-loaded
+        transparently. The integer columns of the ``list_downcast`` tables,
+        which are used for output writing, are cast to the smallest
+        integer type (float columns holding integers only included).
+
+        This is called by :func:`add_parameters` if the ``lean`` parameter
+        is ``True``. The memory use can be checked with
+        :func:`grimsel.auxiliary.memory.get_memory_report`.
+
+        Parameters
+        ----------
+        list_attr : list of str or None
+            attributes to be released; defaults to ``list_intermediates``
+
+        '''
+
+        list_attr = (self.list_intermediates if list_attr is None
+                     else list_attr)
+
+        if self._lean_dir is None:
+            self._lean_dir = tempfile.mkdtemp(prefix='grimsel_lean_',
+                                              dir=self.tempdir)
+            weakref.finalize(self, _remove_lean_dir, self._lean_dir,
+                             os.getpid())
+
+        nbytes = 0
+        for name in list_attr:
+
+            val = self.__dict__.get(name)
+            if val is None:
+                continue
+
+            fn = os.path.join(self._lean_dir, name + '.pkl')
+            pd.to_pickle(val, fn)
+
+            nbytes += get_sizeof(val)
+            self._dict_released[name] = fn
+            delattr(self, name)
+
+            if name == '_tm_objs':
+                # TimeMap instances are also held by the module dictionary
+                list_tm = list(val.values())
+                for key in [key for key, tm in timemap.TM_DICT.items()
+                            if any(tm is tm_obj for tm_obj in list_tm)]:
+                    del timemap.TM_DICT[key]
+
+        for name in self.list_downcast:
+
+            df = self.__dict__.get(name)
+            if not isinstance(df, pd.DataFrame):
+                continue
+
+            nbytes += get_sizeof(df)
+            df = df.assign(**{col: pd.to_numeric(df[col], downcast='integer')
+                              for col in df.select_dtypes('number').columns})
+            nbytes -= get_sizeof(df)
+            setattr(self, name, df)
+
+        logger.info('Released intermediate attributes {} ({:.1f} MB) to '
+                    '{}'.format(list(self._dict_released), nbytes / 1e6,
+                                self._lean_dir))
+
     @classmethod
     def get_constraint_groups(cls, excl=None):
         '''
@@ -284,7 +486,8 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         df_chpprof = io.IO.param_to_df(self.chpprof, ('sy', 'nd_id', 'ca_id'))
         df_erg_chp = io.IO.param_to_df(self.erg_chp, ('pp_id', 'ca_id'))
         df_erg_chp = df_erg_chp.loc[df_erg_chp.pp_id.isin(pp_chp)]
-        df_erg_chp['nd_id'] = df_erg_chp.pp_id.replace(self.mps.dict_plant_2_node_id)
+        df_erg_chp['nd_id'] = self.mps.translate(df_erg_chp.pp_id,
+                                                 'dict_plant_2_node_id')
 
         # outer join profiles and energy to get a profile for each fuel
         df_chpprof_tot = pd.merge(df_erg_chp.rename(columns={'value': 'erg'}),
@@ -543,16 +746,107 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
 
         self.mps = maps.Maps.from_dicts(dct)
 
+    def _get_tm_sy(self, tm_id, freq, nhours):
+        '''
+        Time slots of a time map for each time step of frequency ``freq``.
+
+        Uses the model's ``TimeMap`` object if it has the frequency
+        ``freq``; otherwise an equivalent uniform time map is generated.
+
+        Raises
+        ------
+        ValueError
+            If a time map with adaptive time slots would be required at a
+            different frequency.
+
+        '''
+
+        tm = getattr(self, '_tm_objs', {}).get(tm_id)
+
+        if tm is None or not tm.num_freq == freq:
+
+            if tm is not None and tm.slices is not None:
+                raise ValueError('Nodes connected to nodes with adaptive time '
+                                 'slots must have the same freq.')
+
+            tm = timemap.TimeMap(tm_filt=self.tm_filt, minimum=True,
+                                 freq=freq, nhours=nhours)
+
+        return tm.df_hoy_soy.sy.values
+
+    def _get_map_sysy(self, freq, tm_id, nhours, tm_2_id, nhours_2):
+        '''
+        Unique pairs of overlapping time slots of two time maps.
+
+        Both time maps are evaluated with the same frequency and filter,
+        so their *hy* rows are aligned.
+
+        Returns
+        -------
+        numpy.ndarray
+            two columns *sy*, *sy2*; sorted by *sy* and *sy2*
+
+        '''
+
+        sysy = np.stack([self._get_tm_sy(tm_id, freq, nhours),
+                         self._get_tm_sy(tm_2_id, freq, nhours_2)], axis=1)
+
+        return np.unique(sysy, axis=0)
+
+    @staticmethod
+    def _get_sysy_csr(sy, sy2):
+        '''
+        CSR-style map from time slots *sy* to the overlapping slots *sy2*.
+
+        Returns
+        -------
+        tuple
+            ``(indptr, indices)``; the slots ``indices[indptr[sy]:indptr[sy + 1]]``
+            overlap with slot ``sy``
+
+        '''
+
+        sy, sy2 = sy.astype(np.int64), sy2.astype(np.int64)
+        order = np.lexsort((sy2, sy))
+
+        indptr = np.r_[0, np.cumsum(np.bincount(sy))]
+
+        return indptr, sy2[order]
+
     def _init_time_map_connect(self):
+        '''
+        Maps the time slots of connected nodes with different time resolutions.
+
+        Generated attributes:
+            * ``is_min_node`` (``dict``): ``(nd_id, nd_2_id) -> bool``; True
+              if ``nd_id`` has the higher (or equal) time resolution
+            * ``dict_ndnd_tm_id`` (``dict``): ``(nd_id, nd_2_id) -> tm_id``
+              of the node with the higher time resolution
+            * ``df_sysy_ndcnn`` (``DataFrame``): unique pairs of
+              overlapping time slots *sy*, *sy2* by node connection
+            * ``dict_sysy`` (``dict``): ``(nd_id, nd_2_id) -> (indptr, indices)``
+              CSR-style arrays; the time slots of ``nd_2_id`` overlapping
+              with slot ``sy`` of ``nd_id`` are
+              ``indices[indptr[sy]:indptr[sy + 1]]``. Arrays are shared by
+              all node pairs with the same time maps.
+            * ``df_symin_ndcnn`` (``DataFrame``): time slots of the node
+              with the higher time resolution by node connection
+
+        '''
 
         df_ndcnn = self.df_node_connect[['nd_id', 'nd_2_id', 'ca_id']].drop_duplicates()
 
-        df_ndcnn['freq'] = df_ndcnn.nd_id.apply(lambda x: {key: frnh[0] for key, frnh in self._dict_nd_tm.items()}[x])
-        df_ndcnn['nhours'] = df_ndcnn.nd_id.apply(lambda x: {key: frnh[1] for key, frnh in self._dict_nd_tm.items()}[x])
-        df_ndcnn['freq_2'] = df_ndcnn.nd_2_id.apply(lambda x: {key: frnh[0] for key, frnh in self._dict_nd_tm.items()}[x])
-        df_ndcnn['nhours_2'] = df_ndcnn.nd_2_id.apply(lambda x: {key: frnh[1] for key, frnh in self._dict_nd_tm.items()}[x])
-        df_ndcnn['tm_id'] = df_ndcnn.nd_id.replace(self.dict_nd_tm_id)
-        df_ndcnn['tm_2_id'] = df_ndcnn.nd_2_id.replace(self.dict_nd_tm_id)
+        dict_freq = {nd: frnh[0] for nd, frnh in self._dict_nd_tm.items()}
+        dict_nhours = {nd: frnh[1] for nd, frnh in self._dict_nd_tm.items()}
+
+        df_ndcnn['freq'] = df_ndcnn.nd_id.map(dict_freq)
+        df_ndcnn['nhours'] = df_ndcnn.nd_id.map(dict_nhours)
+        df_ndcnn['freq_2'] = df_ndcnn.nd_2_id.map(dict_freq)
+        df_ndcnn['nhours_2'] = df_ndcnn.nd_2_id.map(dict_nhours)
+        df_ndcnn['tm_id'] = maps.translate(df_ndcnn.nd_id,
+                                           self.dict_nd_tm_id)
+        df_ndcnn['tm_2_id'] = maps.translate(df_ndcnn.nd_2_id,
+                                             self.dict_nd_tm_id)
 
         # make dict_sy_ndnd_min
         is_min_node = pd.concat([df_ndcnn,
@@ -566,52 +860,69 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
                                    .set_index(['nd_id', 'nd_2_id'])
                                    .is_min).to_dict()
 
-        def get_map_sy(x):
-            tm = timemap.TimeMap(tm_filt=self.tm_filt, minimum=True,
-                                 freq=x[['freq', 'freq_2']].min(axis=1).values[0],
-                                 nhours=x.nhours.iloc[0])
-            tm_2 = timemap.TimeMap(tm_filt=self.tm_filt, minimum=True,
-                                   freq=x[['freq', 'freq_2']].min(axis=1).values[0],
-                                   nhours=x.nhours_2.iloc[0])
-            return pd.merge(tm.df_hoy_soy,
-                            tm_2.df_hoy_soy.rename(columns={'sy': 'sy2'}),
-                            on='hy')[['sy', 'sy2']]
-
-        self.dict_ndnd_tm_id =  df_ndcnn.set_index(['nd_id', 'nd_2_id']).copy()
-        self.dict_ndnd_tm_id['tm_min_id'] = self.dict_ndnd_tm_id.apply(lambda x: x.tm_id if x.nhours <= x.nhours_2 else x.tm_2_id, axis=1)
-        self.dict_ndnd_tm_id = self.dict_ndnd_tm_id.tm_min_id.to_dict()
+        list_ndnd = list(zip(df_ndcnn.nd_id.tolist(),
+                             df_ndcnn.nd_2_id.tolist()))
+
+        tm_min_id = np.where(df_ndcnn.nhours <= df_ndcnn.nhours_2,
+                             df_ndcnn.tm_id, df_ndcnn.tm_2_id).tolist()
+        self.dict_ndnd_tm_id = dict(zip(list_ndnd, tm_min_id))
         self.dict_ndnd_tm_id = {**self.dict_ndnd_tm_id,
                                 **{(key[1], key[0]): val
                                    for key, val
                                    in self.dict_ndnd_tm_id.items()}}
 
-        sysymap = df_ndcnn[[c for c in df_ndcnn.columns if not 'nd' in c]]
-        sysymap = df_ndcnn.drop_duplicates()
-        sysymap = df_ndcnn.groupby(['tm_id', 'tm_2_id']).apply(get_map_sy).reset_index()
-        sysymap = sysymap.drop('level_2', axis=1)
+        # slot maps and CSR arrays once per pair of time maps
+        cols = ['tm_id', 'tm_2_id', 'freq', 'freq_2', 'nhours', 'nhours_2']
+        df_tmtm = df_ndcnn.drop_duplicates(['tm_id', 'tm_2_id'])[cols]
+        list_sysy = []
+        dict_tmtm_csr = {}
+        for tm_id, tm_2_id, freq, freq_2, nhours, nhours_2 \
+                in df_tmtm.itertuples(index=False):
 
-        self.df_sysy_ndcnn = pd.merge(
-                df_ndcnn[['nd_id', 'nd_2_id', 'ca_id', 'tm_id', 'tm_2_id']],
-                sysymap, on=['tm_id', 'tm_2_id'], how='outer')
+            sysy = self._get_map_sysy(min(freq, freq_2), tm_id, nhours,
+                                      tm_2_id, nhours_2)
 
-        self.dict_sysy = {**self.df_sysy_ndcnn.groupby(['nd_id', 'nd_2_id', 'sy']).sy2.apply(lambda x: set((*x,))).to_dict(),
-                          **self.df_sysy_ndcnn.groupby(['nd_2_id', 'nd_id', 'sy2']).sy.apply(lambda x: set((*x,))).to_dict()}
+            # each slot of the finer time map should lie in a single slot
+            # of the coarser one; not guaranteed for adaptive time slots
+            col_min = 0 if nhours <= nhours_2 else 1
+            if len(np.unique(sysy[:, col_min])) < len(sysy):
+                logger.warning('Time slots of time maps {} and {} are not '
+                               'nested. Transmission is averaged over '
+                               'overlapping slots.'.format(tm_id, tm_2_id))
 
-        self.df_symin_ndcnn = self.df_sysy_ndcnn.join(df_ndcnn.set_index(['nd_id', 'nd_2_id'])[['nhours', 'nhours_2']], on=['nd_id', 'nd_2_id'])
+            list_sysy.append(pd.DataFrame(sysy, columns=['sy', 'sy2'])
+                               .assign(tm_id=tm_id, tm_2_id=tm_2_id))
 
-        idx = ['nd_id', 'nd_2_id']
-        cols = ['sy', 'sy2', 'tm_2_id', 'ca_id', 'tm_id', 'nhours', 'nhours_2']
-        list_df = []
-        for nd_id, nd_2_id in set(self.df_symin_ndcnn.set_index(idx).index.values):
-            df = self.df_symin_ndcnn.set_index(idx).loc[[(nd_id, nd_2_id)], cols]
+            dict_tmtm_csr[tm_id, tm_2_id] = self._get_sysy_csr(sysy[:, 0],
+                                                               sysy[:, 1])
+            dict_tmtm_csr[tm_2_id, tm_id] = self._get_sysy_csr(sysy[:, 1],
+                                                               sysy[:, 0])
 
-            nd_smaller = df.nhours.iloc[0] <= df.nhours_2.iloc[0]
-            list_df.append(df.assign(symin = df.sy if nd_smaller else df.sy2,
-                                     tm_min_id = df.tm_id if nd_smaller
-                                                 else df.tm_2_id))
+        sysymap = pd.concat(list_sysy, axis=0, ignore_index=True)
 
-        cols = ['tm_min_id', 'symin', 'nd_id', 'nd_2_id', 'ca_id']
-        self.df_symin_ndcnn = pd.concat(list_df).reset_index()[cols]
+        self.df_sysy_ndcnn = pd.merge(
+                df_ndcnn[['nd_id', 'nd_2_id', 'ca_id', 'tm_id', 'tm_2_id']],
+                sysymap, on=['tm_id', 'tm_2_id'], how='outer')
+
+        list_tmtm = list(zip(df_ndcnn.tm_id.tolist(),
+                             df_ndcnn.tm_2_id.tolist()))
+        self.dict_sysy = {**{ndnd: dict_tmtm_csr[tmtm]
+                             for ndnd, tmtm in zip(list_ndnd, list_tmtm)},
+                          **{ndnd[::-1]: dict_tmtm_csr[tmtm[::-1]]
+                             for ndnd, tmtm in zip(list_ndnd, list_tmtm)}}
+
+        # time slots of the node with the higher time resolution
+        df = self.df_sysy_ndcnn
+        nd_smaller = (df.nd_id.map(dict_nhours).values
+                      <= df.nd_2_id.map(dict_nhours).values)
+
+        self.df_symin_ndcnn = pd.DataFrame(
+                {'tm_min_id': np.where(nd_smaller, df.tm_id, df.tm_2_id),
+                 'symin': np.where(nd_smaller, df.sy, df.sy2),
+                 'nd_id': df.nd_id.values, 'nd_2_id': df.nd_2_id.values,
+                 'ca_id': df.ca_id.values})
+        self.df_symin_ndcnn = (self.df_symin_ndcnn.drop_duplicates()
+                                                  .reset_index(drop=True))
 
     def _init_time_map_input(self):
         '''
@@ -653,7 +964,8 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         self._tm_objs = {}
 
         self.df_def_node['tm_id'] = (self.df_def_node.reset_index().nd_id
-                                         .replace(self.dict_nd_tm_id).values)
+                                         .pipe(maps.translate,
+                                               self.dict_nd_tm_id).values)
 
         unique_tm_id = self.df_def_node['tm_id'].iloc[0]
 
@@ -672,8 +984,8 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
 
         # dict pp_id -> tm
         self.dict_pp_tm_id = (
-            self.df_def_plant.assign(tm_id=self.df_def_plant.nd_id
-                                               .replace(self.dict_nd_tm_id))
+            self.df_def_plant.assign(tm_id=maps.translate(self.df_def_plant.nd_id,
+                                                 self.dict_nd_tm_id))
                              .set_index('pp_id').tm_id.to_dict())
 
         # dict tm_id -> sy
@@ -685,6 +997,160 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
 
 
 
+    def _get_adaptive_slice_groups(self):
+        '''
+        Checks the ``adaptive_slices`` parameter.
+
+        Returns
+        -------
+        list
+            one dict of :func:`_get_adaptive_time_map` arguments per group
+            of nodes; only selected nodes are included
+
+        Raises
+        ------
+        ValueError
+            For unknown keys, nodes in several groups, or groups with
+            different original time resolutions ``freq``.
+
+        '''
+
+        if not self.adaptive_slices:
+            return []
+
+        list_grp = (self.adaptive_slices
+                    if isinstance(self.adaptive_slices, (list, tuple))
+                    else [self.adaptive_slices])
+
+        defaults = {'nodes': None, 'max_nhours': 24, 'error_budget': 0.05,
+                    'peak_share': 0.01}
+
+        list_adaptive = []
+        set_nd = set()
+        for grp in list_grp:
+
+            unknown = set(grp) - set(defaults)
+            if unknown:
+                raise ValueError('Unknown adaptive_slices keys %s.'%unknown)
+
+            grp = {**defaults, **grp}
+
+            nodes = [nd_id for nd_id in self.slct_node_id
+                     if grp['nodes'] is None
+                     or self.mps.dict_nd[nd_id] in grp['nodes']]
+            if not nodes:
+                continue
+
+            if set_nd & set(nodes):
+                raise ValueError('Nodes %s are included in several '
+                                 'adaptive_slices groups.'%(set_nd & set(nodes)))
+            set_nd |= set(nodes)
+
+            freq = {self._dict_nd_tm[nd][0] for nd in nodes}
+            if len(freq) > 1:
+                raise ValueError('Nodes of an adaptive_slices group must '
+                                 'have the same freq; got %s.'%freq)
+
+            list_adaptive.append({**grp, 'nodes': nodes, 'freq': freq.pop()})
+
+        return list_adaptive
+
+    def _get_adaptive_time_map(self, nodes, freq, max_nhours=24,
+                               error_budget=0.05, peak_share=0.01):
+        '''
+        Generates a time map with variable-length time slots.
+
+        The time slots are derived from the demand, supply, and price
+        profiles of the ``nodes`` through
+        :func:`grimsel.auxiliary.timemap.get_adaptive_slices`. Time steps of
+        peak aggregate demand, low aggregate supply (e.g. wind and solar
+        availability), and high mean prices (``peak_share`` of all time
+        steps each) keep the original resolution ``freq``. Time slots
+        don't span more than one month.
+
+        Parameters
+        ----------
+        nodes : list
+            node ids
+        freq : float
+            original time resolution of the profiles
+        max_nhours : float
+            maximum time slot length in hours
+        error_budget : float
+            maximum share of the profile variance lost by averaging
+        peak_share : float
+            share of the time steps kept at the original resolution for
+            each criterion
+
+        Returns
+        -------
+        TimeMap
+
+        '''
+
+        df_tm = timemap.TimeMap(tm_filt=self.tm_filt, freq=freq,
+                                nhours=freq).df_time_map
+        hy = df_tm.hy.values.astype(float)
+
+        get_nd_plant = lambda key: self.mps.dict_plant_2_node_id[key[0]]
+        list_tb = [('df_profdmnd', 'dmnd_pf_id', 'dmnd_pf', lambda key: key[0], 1),
+                   ('df_profsupply', 'supply_pf_id', 'supply_pf', get_nd_plant, -1),
+                   ('df_profpricebuy', 'price_pf_id', 'pricebuy_pf', lambda key: key[1], 1),
+                   ('df_profpricesll', 'price_pf_id', 'pricesll_pf', lambda key: key[1], 1)]
+
+        list_values = []
+        keep = np.zeros(len(hy), dtype=bool)
+        for name_df, col_pf, name_dict, get_nd, sign in list_tb:
+
+            dict_pf = getattr(self, 'dict_' + name_dict, None) or {}
+            list_pf = [pf for key, pf in dict_pf.items() if get_nd(key) in nodes]
+
+            store = self.dict_profile_store.get(name_df[len('df_prof'):])
+
+            if store is not None:
+                store = store.take(store.index.isin(list_pf))
+                if not len(store.index):
+                    continue
+            else:
+                df = getattr(self, name_df, None)
+
+                if df is None or df.empty or not list_pf:
+                    continue
+
+                df = df.loc[df[col_pf].isin(list_pf)]
+                if df.empty:
+                    continue
+
+                store = ProfileStore.from_long(df, [col_pf], dtype=np.float64)
+
+            pos = pd.Index(store.columns.astype(float)).get_indexer(hy)
+            values = np.where(pos >= 0, store.values[:, pos], np.nan).T
+
+            list_values.append(values)
+
+            if peak_share > 0:
+                # time steps with the largest aggregate value times sign
+                total = sign * np.nanmean(values, axis=1)
+                keep |= timemap.get_peak_steps(total, peak_share)
+
+        values = (np.concatenate(list_values, axis=1) if list_values
+                  else np.zeros((len(hy), 0)))
+
+        breaks = np.r_[True, (np.diff(df_tm.mt_id.values) != 0)
+                             | (np.diff(df_tm.year.values) != 0)]
+
+        slices = timemap.get_adaptive_slices(values,
+                                             max_len=round(max_nhours / freq),
+                                             error_budget=error_budget,
+                                             keep=keep, breaks=breaks)
+
+        logger.info('Adaptive time map for nodes {}: {} time slots, '
+                    'max_nhours={}, error_budget={}'.format(
+                        nodes, len(slices), max_nhours, error_budget))
+
+        return timemap.TimeMap(tm_filt=self.tm_filt, nhours=max_nhours,
+                               freq=freq, slices=slices)
+
     def _init_time_map(self):
         '''
         Create a TimeMap instance and obtain derived attributes.
@@ -698,21 +1164,38 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
 
         self._dict_nd_tm = self._get_nhours_nodes(self.nhours)
 
+        list_adaptive = self._get_adaptive_slice_groups()
+        set_nd_adaptive = {nd for grp in list_adaptive for nd in grp['nodes']}
+
         # generate unique time map ids
         dict_tm = {ntm: frnh for ntm, frnh
-                   in enumerate(set(self._dict_nd_tm.values()))}
+                   in enumerate(set(frnh for nd, frnh
+                                    in self._dict_nd_tm.items()
+                                    if not nd in set_nd_adaptive))}
 
         self.dict_nd_tm_id = {nd:
                               {val: key for key, val in dict_tm.items()}[tm]
-                              for nd, tm in self._dict_nd_tm.items()}
+                              for nd, tm in self._dict_nd_tm.items()
+                              if not nd in set_nd_adaptive}
 
         self._tm_objs = {tm_id:
                    timemap.TimeMap(tm_filt=self.tm_filt,
                                    nhours=frnh[1], freq=frnh[0])
                    for tm_id, frnh in dict_tm.items()}
 
+        # adaptive time maps; nhours is the maximum time slot length
+        for igrp, grp in enumerate(list_adaptive):
+
+            tm_id = len(dict_tm) + igrp
+            self._tm_objs[tm_id] = self._get_adaptive_time_map(**grp)
+
+            for nd in grp['nodes']:
+                self.dict_nd_tm_id[nd] = tm_id
+                self._dict_nd_tm[nd] = (grp['freq'], grp['max_nhours'])
+
         self.df_def_node['tm_id'] = (self.df_def_node.reset_index().nd_id
-                                         .replace(self.dict_nd_tm_id).values)
+                                         .pipe(maps.translate,
+                                               self.dict_nd_tm_id).values)
 
         cols_red = ['wk_id', 'mt_id', 'sy', 'weight', 'wk_weight']
 
@@ -745,8 +1228,8 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
 
         # dict pp_id -> tm
         self.dict_pp_tm_id = (
-            self.df_def_plant.assign(tm_id=self.df_def_plant.nd_id
-                                               .replace(self.dict_nd_tm_id))
+            self.df_def_plant.assign(tm_id=maps.translate(self.df_def_plant.nd_id,
+                                                 self.dict_nd_tm_id))
                              .set_index('pp_id').tm_id.to_dict())
 
 
@@ -829,8 +1312,8 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
                                                            on=df.index.name)
             self.df_plant_month['tm_id'] = (
                     self.df_plant_month.pp_id
-                        .replace(self.mps.dict_plant_2_node_id)
-                        .replace(self.dict_nd_tm_id))
+                        .pipe(self.mps.translate, 'dict_plant_2_node_id')
+                        .pipe(maps.translate, self.dict_nd_tm_id))
             df = self.df_hoy_soy.rename(columns={'hy': 'month_min_hoy'})
             df = df.set_index(['month_min_hoy', 'tm_id'])
             self.df_plant_month.month_min_hoy = (
@@ -862,6 +1345,8 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         '''
 
 
+        self._init_profile_stores()
+
         if getattr(self, 'df_tm_soy', None) is not None:  # is none by default, so hasattr doesn't work!z
             self._init_time_map_input()
         else:
@@ -876,20 +1361,21 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
 
 
         # Map profiles and bc to soy
-        for itb, idx in [
-                         ('dmnd', ['dmnd_pf_id', 'sy']),
-                         ('inflow', ['pp_id', 'ca_id', 'sy']),
-                         ('supply', ['supply_pf_id', 'sy']),
-                         ('chp', ['nd_id', 'ca_id', 'sy']),
-                         ('pricesll', ['price_pf_id', 'sy']),
-                         ('pricebuy', ['price_pf_id', 'sy']),
-                        ]:
+        for itb, idx in self.list_profiles:
 
             name_df = 'df_prof' + itb
             logger.info('Averaging {}; nhours={}.'.format(name_df,
                                                           self.nhours))
 
-            if hasattr(self, name_df) and getattr(self, name_df) is not None:
+            if itb in self.dict_profile_store:
+                # profile keys only; the values are read from the store
+                df_tbsoy = self.dict_profile_store[itb].index.to_frame(
+                                                                index=False)
+                setattr(self, 'df_prof' + itb + '_soy',
+                        self.map_profile_to_time_resolution(df=df_tbsoy,
+                                                            idx=idx, itb=itb))
+
+            elif hasattr(self, name_df) and getattr(self, name_df) is not None:
 
                 df_tbsoy = getattr(self, name_df)
 
@@ -943,12 +1429,12 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         if 'pp_id' in df.columns:
 
             dct_p2tm = self.dict_pp_tm_id
-            df['tm_id'] = df.pp_id.replace(dct_p2tm)
+            df['tm_id'] = maps.translate(df.pp_id, dct_p2tm)
 
         elif 'nd_id' in df.columns:
 
             dct_n2tm = self.dict_nd_tm_id
-            df['tm_id'] = df.nd_id.replace(dct_n2tm)
+            df['tm_id'] = maps.translate(df.nd_id, dct_n2tm)
 
         return df[cols + ['tm_id']]
 
@@ -1018,11 +1504,39 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
                 raise IndexError('map_to_time_res: Multiple tm_ids '
                                  'found for pf_ids of %s profiles.'%itb)
 
-        ind = ['hy', 'tm_id']
-        df[ind] = df[ind].astype(float)
-        df = df.join(self.df_hoy_soy.set_index(ind), on=ind)
-        df = df.pivot_table(values=val, index=idx,
-                            aggfunc=np.mean).reset_index()
+        id_cols = [c for c in idx if not c == 'sy']
+
+        if itb in self.dict_profile_store:
+            store = self.dict_profile_store[itb]
+        else:
+            store = ProfileStore.from_long(df, id_cols, dtype=np.float64)
+
+        # tm_id of the store rows
+        tm_id = df.tm_id.values.astype(float)
+        if len(tm_id) and (tm_id == tm_id[0]).all():
+            tm_id = np.full(len(store.index), tm_id[0])
+        else:
+            tm_id = (df.groupby(id_cols).tm_id.first()
+                       .reindex(store.index).values.astype(float))
+
+        list_df = []
+        for itm_id in np.unique(tm_id[~np.isnan(tm_id)]):
+
+            hoy_soy = self.df_hoy_soy.loc[self.df_hoy_soy.tm_id == itm_id]
+            sy = (pd.Series(hoy_soy.sy.values,
+                            index=hoy_soy.hy.values.astype(float))
+                    .reindex(store.columns.astype(float)).values)
+
+            df_tm = (store.take(tm_id == itm_id).segment_mean(sy)
+                          .to_long(col='sy'))
+            list_df.append(df_tm.astype({'sy': self.df_hoy_soy.sy.dtype}))
+
+        if not list_df:
+            return pd.DataFrame(columns=idx + val)
+
+        df = (list_df[0] if len(list_df) == 1
+              else pd.concat(list_df, axis=0).sort_values(idx))
+        df = df.reset_index(drop=True)[idx + val]
 
         if df.empty:
             df = pd.DataFrame(columns=idx + val)
@@ -1099,16 +1613,20 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         '''
         self.dual = po.Suffix(direction=po.Suffix.IMPORT)
 
+        solver_factory = (solution.CPLEXSHELLArrays
+                          if self.solution_arrays else
+                          lambda **kw: SolverFactory("cplex", **kw))
+
         if sys.platform == 'win32':
-            self.solver = SolverFactory("cplex")
+            self.solver = solver_factory()
         elif sys.platform in ['linux2', 'linux']:
             exec_str = ('/opt/ibm/ILOG/CPLEX_Studio1271/cplex/bin/'
                         +'x86-64_linux/cplex')
-            self.solver = SolverFactory("cplex", executable=exec_str)
+            self.solver = solver_factory(executable=exec_str)
         elif sys.platform == 'darwin':
             exec_str = ('/Applications/CPLEX_Studio128/cplex/bin/'
                         'x86-64_osx/cplex')
-            self.solver = SolverFactory("cplex", executable=exec_str)
+            self.solver = solver_factory(executable=exec_str)
 
         if self.nthreads:
             self.solver.set_options('threads=' + str(self.nthreads))
@@ -1194,12 +1712,18 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
             pyutilib.services.TempfileManager.clear_tempfiles()
 
 
+    @tracing.traced()
     def run(self, warmstart=False, tmp_dir=None, logf=None, warmf=None, solnf=None):
         '''
         Run the model. Then switch solution/warmstartfile.
 
         Unless skip_runs is True. Then just create a pro-forma results object.
 
+        Solver statistics (parsed from the solver log) and the time
+        required to write the LP file and to read the solution are stored
+        in the ``run_stats`` dictionary (see
+        :func:`grimsel.core.solver_log.get_run_stats`).
+
         Args:
             warmstart (bool): passed to the Solver solve call
         '''
@@ -1209,6 +1733,7 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
             self.results = Result()
             self.results.Solver = [{'Termination condition':
                                     'Skipped due to skip_runs=True.'}]
+            self.run_stats = None
         else:
 
             slv_kw = dict(tee=self.verbose_solver, keepfiles=self.keepfiles,
@@ -1219,7 +1744,23 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
 #                          warmstart_file=warmf,
 #                          tempdir=tmp_dir
                           )
-            self.results = self.solver.solve(self, **slv_kw)
+
+            if self.solution_arrays:
+                if warmstart:
+                    self.load_solution()
+                slv_kw['load_solutions'] = False
+                self.solution = None
+
+            with solver_log.time_solver_phases(self.solver) as dict_tdiff:
+                self.results = self.solver.solve(self, **slv_kw)
+
+            self.run_stats = solver_log.get_run_stats(self.solver, dict_tdiff)
+
+            if (self.solution_arrays
+                    and getattr(self.solver, 'solution_data', None)):
+                self.solution = solution.SolutionArrays(
+                                    self.solver.solution_data,
+                                    self.results._smap)
 #            self.warmstartfile = self.solutionfile
 #            sf, isf = self.switch_soln_file(self.isolnfile)
 #            self.solutionfile, self.isolnfile = [sf, isf]
@@ -1242,10 +1783,23 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
             for name_obj in list_name_obj:
                 obj = getattr(self, name_obj, False)
                 if obj and isinstance(obj, SimpleObjective) and obj.active:
-                    self.objective_value = po.value(obj)
+                    self.objective_value = (self.solution.objective_value
+                                            if self.solution else
+                                            po.value(obj))
         else:
             self.objective_value = np.nan
 
+    def load_solution(self):
+        '''
+        Loads the solution arrays into the pyomo variables.
+
+        Only relevant if ``solution_arrays`` is ``True``. Called by all
+        methods which depend on the pyomo variable values.
+        '''
+
+        if self.solution and not self.solution.is_loaded:
+            self.solution.load(self)
+
 
     def print_is_fixed(self, variable='cap_pwr_new'):
         '''
@@ -1254,6 +1808,8 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
         Keyword arguments:
         variable -- name string of a pyomo variable
         '''
+        self.load_solution()
+
         vv = getattr(self, variable)
         print('*'*15 + ' ' + variable + ': ' + '*'*15)
         for i in vv:
@@ -1399,6 +1955,7 @@ class ModelBase(po.ConcreteModel, constraints.Constraints,
     def set_variable_fixed(self, bool_fix=True, variable_list=False,
                            subset=False, exclude=False, verbose=False):
 
+        self.load_solution()
 
         for varname in variable_list:
             obj_var = getattr(self, varname)
@@ -14,6 +14,8 @@ import fastparquet as pq
 import grimsel.core.model_base as model_base
 import grimsel.core.io as io
 import grimsel.core.model_loop_modifier as model_loop_modifier
+import grimsel.core.solver_log as solver_log
+import grimsel.auxiliary.tracing as tracing
 import grimsel.auxiliary.sqlutils.aux_sql_func as aql
 import grimsel.auxiliary.maps as maps
 from grimsel import _get_logger
@@ -72,6 +74,7 @@ class ModelLoop():
 
         self.run_id = None  # set later
         self.__runlevel_state = -1
+        self.tdiff_runlevels = {}  # runlevel method -> build time in s
 
         self.m = model_base.ModelBase(**self.mkwargs)
 
@@ -125,6 +128,9 @@ class ModelLoop():
             make modifications to the input dataframes
             `'full'`: complete construction of the model; allows to
             make modications to the Pyomo components
+
+        The time spent in each runlevel is stored in the
+        ``tdiff_runlevels`` dictionary.
         '''
 
         dict_to_runlevel = {'input_data': 2, 'full': 10}
@@ -150,7 +156,10 @@ class ModelLoop():
                         f'Calling method {method}')
             logger.info('%' * 60)
 
+            t = time.time()
             func()
+            self.tdiff_runlevels[self._dict_runlevels[runlevel]] = \
+                time.time() - t
             self._runlevel_state = runlevel
 
 
@@ -199,6 +208,7 @@ class ModelLoop():
         if not self.io.resume_loop:
             self.init_loop_table()
 
+    @tracing.traced()
     def select_run(self, slct_run_id):
         '''
         Get all relevant indices and parameters for a certain slct_run_id
@@ -255,17 +265,17 @@ class ModelLoop():
 
         return df_add.astype(dtypes)
 
-    def get_def_run_name(self):
+    def get_def_run_name(self, tb='def_run'):
 
         # if multiprocessing, locked writing to common parquet file has
         # too much overhead for small models. Therefore writing to files
         # by worker + later merge
         if current_process().name == 'MainProcess':
             suffix = ''
-            fn = os.path.join(self.io.cl_out, 'def_run%s.parq'%suffix)
+            fn = os.path.join(self.io.cl_out, '%s%s.parq'%(tb, suffix))
         elif current_process().name.startswith('ForkPoolWorker'):
             suffix = '_' + current_process().name
-            fn = os.path.join(self.io.cl_out, 'def_run%s.csv'%suffix)
+            fn = os.path.join(self.io.cl_out, '%s%s.csv'%(tb, suffix))
         else:
             raise ValueError('Unexpected current_process name'
                              ' %s'%current_process().name)
@@ -275,6 +285,7 @@ class ModelLoop():
         return fn, csv_def_run
 
 
+    @tracing.traced()
     def append_row(self, **kwargs):
         '''
         Generate single-line pandas.DataFrame to be appended to the
@@ -285,18 +296,42 @@ class ModelLoop():
 
         df_add = self._get_row_df_run(**kwargs)
 
+        self._append_table('def_run', df_add)
+
+
+    @tracing.traced()
+    def append_run_stats(self):
+        '''
+        Append the solver statistics of the current run to the output
+        run_stats table.
+
+        See :mod:`grimsel.core.solver_log` for the columns.
+        '''
+
+        df_add = pd.DataFrame([{'run_id': self.run_id, **self.m.run_stats}],
+                              columns=['run_id'] + solver_log.LIST_STATS)
+
+        self._append_table('run_stats', df_add)
+
+
+    def _append_table(self, tb, df_add):
+        '''
+        Append single-row DataFrames to the loop tables def_run and
+        run_stats.
+        '''
+
         # can't use io method here if we want this to happen when no_output
         if self.io.modwr.output_target == 'psql':
-            aql.write_sql(df_add, self.io.sql_connector.db,
-                          self.io.cl_out, 'def_run', 'append')
+            aql.append_sql(df_add, self.io.sql_connector.db,
+                           self.io.cl_out, tb)
         elif self.io.modwr.output_target == 'hdf5':
             with pd.HDFStore(self.io.cl_out, mode='a') as store:
-                store.append('def_run', df_add, data_columns=True,
+                store.append(tb, df_add, data_columns=True,
                              min_itemsize=150 # set string length!
                              )
         elif self.io.modwr.output_target == 'fastparquet':
 
-            fn, csv_def_run = self.get_def_run_name()
+            fn, csv_def_run = self.get_def_run_name(tb)
 
             if not csv_def_run:
                 pq.write(fn, df_add, append=os.path.isfile(fn))
@@ -309,6 +344,10 @@ class ModelLoop():
                 else:
                     df_add.to_csv(fn, header='column_names', index=False)
 
+        elif self.io.modwr.output_target == 'duckdb':
+
+            self.io.modwr.write_duckdb(tb, df_add)
+
         else:
             raise ValueError('Unknown output_target '
                              '%s'%self.io.modwr.output_target)
@@ -317,17 +356,22 @@ class ModelLoop():
     def _merge_df_run_files(self):
         '''
         Merge all files with name out_dir/def_run_ForkPoolWorker-%d into single
-        def_run.
+        def_run. Same for the run_stats table.
         '''
 
-        list_fn = glob(os.path.join(self.io.cl_out,
-                                    'def_run_ForkPoolWorker-[0-9]*.csv'))
+        for tb in ['def_run', 'run_stats']:
+
+            list_fn = glob(os.path.join(self.io.cl_out,
+                                        '%s_ForkPoolWorker-[0-9]*.csv'%tb))
 
-        df_def_run = pd.concat(pd.read_csv(fn) for fn in list_fn)
-        df_def_run = df_def_run.sort_values('run_id').reset_index(drop=True)
+            if not list_fn:
+                continue
 
-        fn = os.path.join(self.io.cl_out, 'def_run.parq')
-        pq.write(fn, df_def_run, append=False)
+            df_tb = pd.concat(pd.read_csv(fn) for fn in list_fn)
+            df_tb = df_tb.sort_values('run_id').reset_index(drop=True)
+
+            fn = os.path.join(self.io.cl_out, '%s.parq'%tb)
+            pq.write(fn, df_tb, append=False)
 
 
     def _print_run_title(self, warmstartfile, solutionfile):
@@ -368,6 +412,7 @@ class ModelLoop():
                           len(self.df_def_run.run_id.tolist())))
 
 
+    @tracing.traced()
     def perform_model_run(self, warmstart=False):
         """
         TODO: This is a mess.
@@ -401,6 +446,10 @@ class ModelLoop():
             self.append_row(info=stat,
                             tdiff_solve=tdiff_solve, tdiff_write=tdiff_write)
 
+            # append to run_stats table
+            if self.m.run_stats is not None:
+                self.append_run_stats()
+
 
 
 
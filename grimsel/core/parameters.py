@@ -88,6 +88,8 @@ class ParameterAdder:
 
         self.index_cols = (par.index_cols
                            if par.index_cols else self._get_index_cols())
+        # index columns of the source dataframe (without monthly factors)
+        self.index_cols_input = self.index_cols
 
         self.df, self.flag_infeasible = self._get_param_data()
 
@@ -190,17 +192,63 @@ class ParameterAdder:
 
         return df.loc[-df[self.value_col].isna()].set_index(self.index_cols)[self.value_col].to_dict()
 
-    def _get_param_data(self):
+    @_if_is_feasible
+    def get_variant_data(self, variant):
         '''
-        Performs various checks
+        Returns the data dictionary of a parameter variant.
+
+        The variant values are read from the column ``value_col + '_' +
+        variant`` of the source dataframe, e.g. ``vc_fl_yr2016``. Monthly
+        factors are read from the column ``'mt_fact_' + variant`` of the
+        ``df_parameter_month`` table, if it exists.
 
         Parameters
         ----------
-        source_dataframe : pandas.Dataframe
+        variant : str
+            variant name, e.g. ``'yr2016'``
+
+        Returns
+        -------
+        dict or None
+            ``None`` if the source dataframe has no variant column
+
+        '''
+
+        value_col = '%s_%s'%(self.value_col, variant)
+
+        df, flag_empty = self._get_param_data(value_col, check_col=True)
+
+        if flag_empty:
+            return None
+
+        df = df.rename(columns={value_col: self.value_col})
+
+        if not self.has_monthly_factors:
+            return self._get_data_dict(df)
+
+        mt_fact_col = 'mt_fact_%s'%variant
+        if not mt_fact_col in self.m.df_parameter_month.columns:
+            mt_fact_col = 'mt_fact'
+
+        return self._get_data_dict(df, mt_fact_col)
+
+    def _get_param_data(self, value_col=None, check_col=False):
+        '''
+        Performs various checks
 
+        Parameters
+        ----------
+        value_col : str or None
+            value column; defaults to the ``value_col`` attribute
+        check_col : bool
+            if ``True``, a missing value column results in an empty
+            return value without warning and missing values are not
+            filled with the default
 
         '''
 
+        value_col = value_col if value_col else self.value_col
+
         df = pd.DataFrame()
         flag_empty = False
 
@@ -236,10 +284,12 @@ class ParameterAdder:
 
         # check if column exists in table
         if not flag_empty:
-            if self.value_col not in df.columns:
+            if check_col and value_col not in df.columns:
+                flag_empty = True
+            elif value_col not in df.columns:
                 if self.default is not None:
                     # make nan column which will be filled with default later
-                    df[self.value_col] = np.nan
+                    df[value_col] = np.nan
                     logger.warning(' column doesn\'t exist but default '
                                    'value provided...')
                 else:
@@ -247,10 +297,10 @@ class ParameterAdder:
                     flag_empty = True
 
         if not flag_empty:
-            df = df[self.index_cols + [self.value_col]]
+            df = df[self.index_cols_input + [value_col]]
 
-            if self.default is not None:
-                df.loc[df[self.value_col].isna(), self.value_col] = self.default
+            if self.default is not None and not check_col:
+                df.loc[df[value_col].isna(), value_col] = self.default
 
         return df, flag_empty
 
@@ -407,6 +457,147 @@ class ParameterAdder:
         return df1[list(sets_new + (self.value_col,))], sets_new
 
 
+# %%
+class ParameterBank:
+    '''
+    Precomputed parameter values of scenario variants.
+
+    For each parameter and variant (e.g. the historic year ``'yr2016'``),
+    the values from :meth:`ParameterAdder.get_variant_data` are aligned
+    with the base values as arrays over the parameter indices. Switching
+    between variants then compares these arrays with the current values of
+    the Pyomo parameters and assigns the changed values. Parameters
+    without variant column keep their base values, so switching to a
+    variant always resets all other parameters of the bank.
+
+    Parameters
+    ----------
+    m : :class:`grimsel.core.model_base.ModelBase`
+        model instance with added parameters
+    variants : list of str
+        variant names, e.g. ``['yr2016', 'yr2030']``
+    list_par : list of str or None
+        names of the parameters included in the bank; all parameters in
+        ``m.dict_par`` by default
+
+    Example
+    -------
+    >>> bank = ParameterBank(ml.m, ['yr2016', 'yr2030'])
+    >>> bank.switch('yr2030')
+    >>> bank.reset()
+
+    '''
+
+    def __init__(self, m, variants, list_par=None):
+
+        self.m = m
+        self.variants = list(variants)
+
+        list_par = list_par if list_par else list(m.dict_par)
+
+        # {parameter name: (pyomo parameter, list of indices, base values,
+        #                   {variant: values})}
+        self.dict_bank = {}
+        for name in list_par:
+            bank = self._get_bank(m.dict_par[name])
+            if bank:
+                self.dict_bank[name] = bank
+
+        self.variant = None
+
+        logger.info('ParameterBank: variants {} of parameters {}'.format(
+                        self.variants, list(self.dict_bank)))
+
+    def _get_bank(self, par):
+
+        dict_data = {variant: par.get_variant_data(variant)
+                     for variant in self.variants}
+        dict_data = {variant: data for variant, data in dict_data.items()
+                     if data}
+
+        if not dict_data:
+            return None
+
+        obj_par = getattr(self.m, par.parameter_name)
+
+        if not par.param_kwargs['mutable']:
+            logger.warning('ParameterBank: skipping immutable parameter '
+                           '{}.'.format(par.parameter_name))
+            return None
+
+        base = par._get_data_dict()
+
+        # parameter indices of all variants; the default value is used if
+        # the base data has no value
+        keys = [key for key in dict.fromkeys(itertools.chain(
+                                                base, *dict_data.values()))
+                if key in obj_par
+                and (key in base or par.default is not None)]
+
+        base = np.array([base.get(key, par.default) for key in keys],
+                        dtype=np.float64)
+        dict_arr = {variant: np.array([data.get(key, base_val) for key, base_val
+                                       in zip(keys, base)], dtype=np.float64)
+                    for variant, data in dict_data.items()}
+
+        return obj_par, keys, base, dict_arr
+
+    @staticmethod
+    def _get_current(obj_par, keys):
+        '''
+        Current values of the Pyomo parameter.
+
+        Read on each switch, since the parameters might have been modified
+        by other means between two model runs, e.g. by
+        :meth:`Parameters.reset_all_parameters` or by scaling in a model
+        loop modifier.
+        '''
+
+        return np.array([obj_par[key].value for key in keys],
+                        dtype=np.float64)
+
+    def switch(self, variant=None):
+        '''
+        Sets all parameters of the bank to the values of a variant.
+
+        Parameters
+        ----------
+        variant : str or None
+            one of the ``variants``; ``None`` resets the base values
+
+        '''
+
+        if variant is not None and not variant in self.variants:
+            raise ValueError('ParameterBank: unknown variant {}; must be one '
+                             'of {}.'.format(variant, self.variants))
+
+        nchanged = 0
+        for name, (obj_par, keys, base, dict_arr) in self.dict_bank.items():
+
+            values = dict_arr.get(variant, base)
+            current = self._get_current(obj_par, keys)
+
+            ind_changed = np.flatnonzero(values != current)
+            # item assignment passes the index to pyomo's validation; the
+            # value setter of the param data objects searches it
+            for ind, val in zip(ind_changed.tolist(),
+                                values[ind_changed].tolist()):
+                obj_par[keys[ind]] = val
+
+            nchanged += len(ind_changed)
+
+        self.variant = variant
+
+        logger.info('ParameterBank: switched to {}, {} values '
+                    'changed.'.format(variant if variant else 'base values',
+                                      nchanged))
+
+    def reset(self):
+        ''' Resets the base values of all parameters of the bank. '''
+
+        self.switch(None)
+
+
 # %%
 class Parameters:
     r'''
@@ -538,6 +729,11 @@ class Parameters:
             self.dict_par[par.parameter_name] = parameter
             parameter.init_update()
 
+        self._release_profiles()
+
+        if self.lean:
+            self.release_intermediates()
+
 
     def reset_all_parameters(self):
         '''
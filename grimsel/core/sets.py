@@ -13,6 +13,7 @@ import numpy as np
 
 from grimsel.auxiliary.aux_general import silence_pd_warning
 from grimsel.auxiliary.aux_m_func import cols2tuplelist
+from grimsel.auxiliary.maps import translate
 from grimsel import _get_logger
 
 logger = _get_logger(__name__)
@@ -277,7 +278,7 @@ class Sets:
         df = pd.merge(self.df_def_node, self.df_node_encar,
                       on='nd_id', how='outer')[['nd_id', 'ca_id']]
         df = df.loc[~df.ca_id.isna()].drop_duplicates()
-        df['tm_id'] = df.nd_id.replace(self.dict_nd_tm_id)
+        df['tm_id'] = translate(df.nd_id, self.dict_nd_tm_id)
         cols = ['sy', 'nd_id', 'ca_id']
         list_syndca = pd.merge(self.df_tm_soy[['tm_id', 'sy']],
                                 df, on='tm_id', how='outer')[cols]
@@ -288,8 +289,8 @@ class Sets:
         mask_pp = self.df_plant_encar.pp_id.isin(self.setlst['ppall'])
         df = self.df_plant_encar.loc[mask_pp, ['pp_id', 'ca_id']].copy()
         df['tm_id'] = (df.pp_id
-                         .replace(self.mps.dict_plant_2_node_id)
-                         .replace(self.dict_nd_tm_id))
+                         .pipe(self.mps.translate, 'dict_plant_2_node_id')
+                         .pipe(translate, self.dict_nd_tm_id))
         cols = ['sy', 'pp_id', 'ca_id']
         list_syppca = pd.merge(self.df_tm_soy[['sy', 'tm_id']],
                                 df, on='tm_id', how='outer')[cols]
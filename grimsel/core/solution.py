@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Direct ingestion of CPLEX solutions into NumPy arrays.
+
+By default, Pyomo parses the solver's solution file into a results object
+and assigns the values to all variable objects of the model. The output
+writing then reads these values back out of the variable objects. With
+``ModelBase(solution_arrays=True)``, the solution file is parsed into
+arrays ordered by the LP column/row indices instead. The arrays are mapped
+to the component indices through the symbol map of the LP writer. Pyomo
+variable values are only loaded on demand (:meth:`SolutionArrays.load`).
+
+"""
+
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+from pyomo.opt import (Solution, SolutionStatus, SolverStatus,
+                       TerminationCondition, ProblemSense)
+from pyomo.solvers.plugins.solvers.CPLEX import CPLEXSHELL
+
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+def parse_cplex_solution(fn):
+    '''
+    Parses a CPLEX XML solution file into arrays.
+
+    Parameters
+    ----------
+    fn : str
+        solution file name
+
+    Returns
+    -------
+    dict
+        * ``header``: attributes of the solution header
+        * ``var_names``, ``var_values``: variable labels and values in the
+          order of the LP columns
+        * ``con_names``, ``con_duals``: constraint labels (without the
+          ``c_e_``, ``r_l_``, etc. prefixes of the LP file) and duals;
+          for range constraints the dual with the larger magnitude is kept
+
+    '''
+
+    header = {}
+    var_names, var_values = [], []
+    con_names, con_duals = [], []
+
+    for _, elem in ET.iterparse(fn, events=('end',)):
+
+        if elem.tag == 'variable':
+            name = elem.get('name')
+            if not name == 'ONE_VAR_CONSTANT':
+                var_names.append(name)
+                var_values.append(elem.get('value'))
+
+        elif elem.tag == 'constraint':
+            con_names.append(elem.get('name'))
+            con_duals.append(elem.get('dual', 'nan'))
+
+        elif elem.tag == 'header':
+            header = dict(elem.attrib)
+
+        elem.clear()
+
+    df_con = pd.DataFrame({'name': con_names,
+                           'dual': np.array(con_duals, dtype=float)})
+    df_con = df_con.loc[~df_con.name.str.endswith('ONE_VAR_CONSTANT')]
+    df_con['name'] = df_con.name.str.slice(4, -1)
+
+    if df_con.name.duplicated().any():
+        # range constraints: keep the non-zero dual of the two rows
+        df_con = (df_con.assign(abs_dual=df_con.dual.abs())
+                        .sort_values('abs_dual', ascending=False,
+                                     kind='mergesort')
+                        .drop_duplicates('name')
+                        .sort_index())
+
+    return {'header': header,
+            'var_names': np.array(var_names, dtype=object),
+            'var_values': np.array(var_values, dtype=float),
+            'con_names': df_con.name.values,
+            'con_duals': df_con.dual.values}
+
+
+class CPLEXSHELLArrays(CPLEXSHELL):
+    '''
+    CPLEX shell interface which parses the solution file into arrays.
+
+    The solution is not added to the results object variable by variable;
+    the results only contain the objective value and the solution status.
+    The parsed data is stored in the ``solution_data`` attribute.
+    '''
+
+    def process_soln_file(self, results):
+
+        self.solution_data = None
+
+        if not os.path.exists(self._soln_file):
+            return
+
+        self.solution_data = parse_cplex_solution(self._soln_file)
+        header = self.solution_data['header']
+
+        soln = Solution()
+        obj_value = float(header.get('objectiveValue', 'nan'))
+        soln.objective['__default_objective__'] = {'Value': obj_value}
+        results.problem.number_of_objectives = 1
+
+        status_value = int(header.get('solutionStatusValue', -1))
+        status_string = header.get('solutionStatusString', '')
+
+        if status_string in ['optimal', 'integer optimal solution',
+                             'integer optimal, tolerance']:
+            soln.status = SolutionStatus.optimal
+            soln.gap = 0.0
+            results.problem.lower_bound = obj_value
+            results.problem.upper_bound = obj_value
+        elif status_value == 3 or status_string == 'infeasible':
+            soln.status = SolutionStatus.infeasible
+            soln.gap = None
+        elif (status_string == 'time limit exceeded'
+              and header.get('primalFeasible') == '1'):
+            soln.status = SolutionStatus.feasible
+            if results.problem.sense == ProblemSense.minimize:
+                results.problem.upper_bound = obj_value
+            else:
+                results.problem.lower_bound = obj_value
+        else:
+            soln.status = SolutionStatus.error
+            soln.gap = None
+
+        if results.solver.status is SolverStatus.error:
+            return
+
+        if (results.solver.termination_condition
+                in [TerminationCondition.unknown,
+                    TerminationCondition.globallyOptimal,
+                    TerminationCondition.locallyOptimal,
+                    TerminationCondition.optimal,
+                    TerminationCondition.other]
+            or (results.solver.termination_condition
+                    is TerminationCondition.maxTimeLimit
+                and not soln.status is SolutionStatus.infeasible)):
+
+            results.solution.insert(soln)
+
+
+class SolutionArrays():
+    '''
+    Solution of a single model run as arrays.
+
+    Parameters
+    ----------
+    solution_data : dict
+        output of :func:`parse_cplex_solution`
+    symbol_map : pyomo.core.expr.symbol_map.SymbolMap
+        symbol map of the LP file, as attached to the results object by
+        Pyomo if the solution is not loaded (``results._smap``)
+
+    '''
+
+    def __init__(self, solution_data, symbol_map):
+
+        self.symbol_map = symbol_map
+        self.header = solution_data['header']
+
+        self.var_values = solution_data['var_values']
+        self.con_duals = solution_data['con_duals']
+
+        self._var_names = solution_data['var_names']
+        self._con_names = solution_data['con_names']
+
+        self._var_index = pd.Index(self._var_names)
+        self._con_index = pd.Index(self._con_names)
+
+        self.is_loaded = False
+
+    @property
+    def objective_value(self):
+
+        return float(self.header.get('objectiveValue', 'nan'))
+
+    def _get_positions(self, list_obj, index):
+        ''' Positions of the component data objects in the solution. '''
+
+        by_object = self.symbol_map.byObject
+        labels = [by_object.get(id(obj)) for obj in list_obj]
+
+        return index.get_indexer(labels)
+
+    def get_variable_values(self, list_vardata):
+        '''
+        Values of a list of variable data objects.
+
+        Variables which are not part of the LP problem (e.g. fixed
+        variables) retain their Pyomo value.
+
+        Returns
+        -------
+        numpy.ndarray
+            float array; ``nan`` for variables without value
+
+        '''
+
+        pos = self._get_positions(list_vardata, self._var_index)
+
+        values = np.full(len(pos), np.nan)
+        values[pos >= 0] = self.var_values[pos[pos >= 0]]
+
+        missing = np.flatnonzero(pos < 0)
+        if len(missing):
+            values[missing] = [np.nan if list_vardata[imiss].value is None
+                               else list_vardata[imiss].value
+                               for imiss in missing]
+
+        return values
+
+    def get_dual_values(self, list_condata):
+        '''
+        Duals of a list of constraint data objects.
+
+        Returns
+        -------
+        numpy.ndarray
+            float array; ``nan`` for constraints not included in the LP
+            problem
+
+        '''
+
+        pos = self._get_positions(list_condata, self._con_index)
+
+        values = np.full(len(pos), np.nan)
+        values[pos >= 0] = self.con_duals[pos[pos >= 0]]
+
+        return values
+
+    def load(self, model):
+        '''
+        Assigns the solution to the Pyomo variables and the dual suffix.
+
+        This is only required if the Pyomo values are needed, e.g. for
+        warm starts or to fix variables at their solution values.
+        '''
+
+        logger.info('Loading solution arrays into model.')
+
+        get_object = self.symbol_map.getObject
+
+        for name, value in zip(self._var_names, self.var_values):
+            obj = get_object(name)
+            if not obj is self.symbol_map.UnknownSymbol:
+                obj.value = value
+
+        dual = getattr(model, 'dual', None)
+        if dual is not None:
+            for name, value in zip(self._con_names, self.con_duals):
+                obj = get_object(name)
+                if not obj is self.symbol_map.UnknownSymbol:
+                    dual[obj] = value
+
+        self.is_loaded = True
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Solver log parsing and run statistics.
+
+After each model run, :func:`get_run_stats` collects
+
+* statistics parsed from the solver log: presolve row/column reductions,
+  presolve time, simplex and barrier iteration counts, crossover time,
+  the algorithm which produced the solution, and the solution time
+  reported by the solver, and
+* the time Pyomo spends writing the LP file, waiting for the solver, and
+  reading and loading the solution (see :func:`time_solver_phases`).
+
+One log parser is implemented per solver backend (:data:`DICT_PARSER`).
+Statistics not found in the log are ``NaN`` (numeric) or ``''``
+(algorithm). The :class:`grimsel.core.model_loop.ModelLoop` writes them
+to the ``run_stats`` output table.
+
+"""
+
+import re
+import time
+import contextlib
+
+import numpy as np
+
+import grimsel.auxiliary.tracing as tracing
+from grimsel import _get_logger
+
+logger = _get_logger(__name__)
+
+
+# columns of the run_stats table besides run_id
+LIST_STATS = ['solver', 'algorithm',
+              'presolve_rows_removed', 'presolve_cols_removed',
+              'presolve_time', 'iterations_simplex', 'iterations_barrier',
+              'crossover_time', 'solver_time',
+              'tdiff_write_lp', 'tdiff_solver', 'tdiff_read_solution']
+
+# solver phases timed by time_solver_phases: OptSolver method -> column
+DICT_PHASES = {'_presolve': 'tdiff_write_lp',
+               '_apply_solver': 'tdiff_solver'}
+
+
+def _sum_matches(pattern, log, group=1):
+
+    vals = [float(m.group(group)) for m in re.finditer(pattern, log,
+                                                       re.MULTILINE)]
+    return sum(vals) if vals else np.nan
+
+
+def _last_match(pattern, log, group=1):
+
+    list_m = list(re.finditer(pattern, log, re.MULTILINE))
+    return list_m[-1].group(group) if list_m else None
+
+
+def _to_float(val):
+
+    return float(val) if val is not None else np.nan
+
+
+def parse_cplex_log(log):
+    '''
+    Parses the log of the CPLEX interactive optimizer.
+
+    Parameters
+    ----------
+    log : str
+        solver output
+
+    Returns
+    -------
+    dict
+        statistics, see :data:`LIST_STATS`
+
+    '''
+
+    alg = _last_match(r'^(Primal simplex|Dual simplex|Barrier|Network'
+                      r'|Sifting) - ', log)
+
+    return {'algorithm': alg.lower() if alg else '',
+            'presolve_rows_removed': _sum_matches(
+                r'Presolve eliminated (\d+) rows and \d+ columns', log),
+            'presolve_cols_removed': _sum_matches(
+                r'Presolve eliminated \d+ rows and (\d+) columns', log),
+            'presolve_time': _sum_matches(
+                r'Presolve time = ([\d.]+) sec', log),
+            'iterations_simplex': _to_float(_last_match(
+                r'Solution time =.*\bIterations = (\d+)', log)),
+            'iterations_barrier': _to_float(_last_match(
+                r'Barrier iterations = (\d+)', log)),
+            'crossover_time': _sum_matches(
+                r'Total crossover time = ([\d.]+) sec', log),
+            'solver_time': _to_float(_last_match(
+                r'Solution time =\s*([\d.]+) sec', log))}
+
+
+def parse_gurobi_log(log):
+    '''
+    Parses the Gurobi log.
+
+    Gurobi reports the cumulative time of each step. The crossover time
+    is the difference between the total solution time and the barrier
+    time. The simplex iterations are the total iterations less the
+    barrier iterations.
+
+    '''
+
+    alg = _last_match(r'^Solved with (dual simplex|primal simplex|barrier)',
+                      log)
+
+    iter_total = _to_float(_last_match(r'^Solved in (\d+) iterations', log))
+    iter_barrier = _to_float(_last_match(
+                        r'^Barrier solved model in (\d+) iterations', log))
+    time_total = _to_float(_last_match(
+                        r'^Solved in \d+ iterations and ([\d.]+) seconds', log))
+    time_barrier = _to_float(_last_match(
+                        r'^Barrier solved model in \d+ iterations and '
+                        r'([\d.]+) seconds', log))
+
+    if not alg and not np.isnan(iter_barrier):
+        alg = 'barrier'
+
+    return {'algorithm': alg if alg else '',
+            'presolve_rows_removed': _sum_matches(
+                r'^Presolve removed (\d+) rows and \d+ columns', log),
+            'presolve_cols_removed': _sum_matches(
+                r'^Presolve removed \d+ rows and (\d+) columns', log),
+            'presolve_time': _sum_matches(r'^Presolve time: ([\d.]+)s', log),
+            'iterations_simplex': (iter_total - np.nan_to_num(iter_barrier)
+                                   if not np.isnan(iter_total) else np.nan),
+            'iterations_barrier': iter_barrier,
+            'crossover_time': (time_total - time_barrier
+                               if 'Crossover log' in log else np.nan),
+            'solver_time': time_total}
+
+
+def parse_glpk_log(log):
+    '''
+    Parses the ``glpsol`` log.
+
+    Presolve reductions are obtained from the problem size before and
+    after the ``Preprocessing...`` step, if the LP presolver is used.
+
+    '''
+
+    is_ipt = 'Interior-Point Optimizer' in log
+    iterations = _to_float(_last_match(r'^\*?\s*(\d+): obj =', log))
+
+    m = re.search(r'(\d+) rows?, (\d+) columns?, \d+ non-zeros?\s*\n'
+                  r'\s*Preprocessing\.\.\.\s*\n'
+                  r'\s*(\d+) rows?, (\d+) columns?', log)
+    presolve = ((int(m.group(1)) - int(m.group(3)),
+                 int(m.group(2)) - int(m.group(4))) if m
+                else (np.nan, np.nan))
+
+    return {'algorithm': ('interior point' if is_ipt
+                          else 'simplex' if 'Simplex Optimizer' in log
+                          else ''),
+            'presolve_rows_removed': presolve[0],
+            'presolve_cols_removed': presolve[1],
+            'presolve_time': np.nan,
+            'iterations_simplex': np.nan if is_ipt else iterations,
+            'iterations_barrier': iterations if is_ipt else np.nan,
+            'crossover_time': np.nan,
+            'solver_time': _to_float(_last_match(
+                r'^Time used:\s*([\d.]+) secs', log))}
+
+
+def parse_cbc_log(log):
+    '''
+    Parses the CBC/CLP log.
+
+    '''
+
+    is_barrier = re.search(r'barrier', log, re.IGNORECASE) is not None
+
+    iterations = _to_float(_last_match(
+                    r'^Optimal objective \S+ - (\d+) iterations', log))
+
+    return {'algorithm': 'barrier' if is_barrier else 'simplex',
+            'presolve_rows_removed': -_sum_matches(
+                r'^Presolve \d+ \((-?\d+)\) rows', log),
+            'presolve_cols_removed': -_sum_matches(
+                r'^Presolve \d+ \(-?\d+\) rows, \d+ \((-?\d+)\) columns', log),
+            'presolve_time': _to_float(_last_match(
+                r'^Optimal objective .* Presolve ([\d.]+)', log)),
+            'iterations_simplex': np.nan if is_barrier else iterations,
+            'iterations_barrier': iterations if is_barrier else np.nan,
+            'crossover_time': np.nan,
+            'solver_time': _to_float(_last_match(
+                r'\(Wallclock seconds\):\s*([\d.]+)', log))}
+
+
+DICT_PARSER = {'cplex': parse_cplex_log,
+               'gurobi': parse_gurobi_log,
+               'glpk': parse_glpk_log,
+               'cbc': parse_cbc_log}
+
+
+def get_solver_log(solver):
+    '''
+    Output of the last solver call.
+
+    Shell solver plugins keep the solver output in memory; if not
+    available, the log file is read (kept if ``ModelBase.keepfiles``).
+
+    Returns
+    -------
+    str or None
+
+    '''
+
+    log = solver.__dict__.get('_log')
+
+    if not log and solver.__dict__.get('_log_file'):
+        try:
+            with open(solver._log_file, 'r') as f:
+                log = f.read()
+        except OSError:
+            log = None
+
+    return log if log else None
+
+
+def parse_log(solver_name, log):
+    '''
+    Parses a solver log with the parser of the corresponding backend.
+
+    Parameters
+    ----------
+    solver_name : str
+        Pyomo solver name, e.g. ``'cplex'`` or ``'gurobi_persistent'``
+    log : str or None
+        solver output
+
+    Returns
+    -------
+    dict
+        statistics; ``NaN`` if the log is not available or the solver
+        is unknown
+
+    '''
+
+    dict_stats = {col: np.nan for col in LIST_STATS[2:]
+                  if not col.startswith('tdiff_')}
+    dict_stats['algorithm'] = ''
+
+    parser = next((func for name, func in DICT_PARSER.items()
+                   if name in solver_name.lower()), None)
+
+    if parser is None or not log:
+        logger.debug('parse_log: no log parser or no log for solver '
+                     '{}'.format(solver_name))
+        return dict_stats
+
+    try:
+        dict_stats.update(parser(log))
+    except Exception as e:
+        logger.warning('parse_log: failed to parse {} log: {}'.format(
+                                                        solver_name, e))
+
+    return dict_stats
+
+
+@contextlib.contextmanager
+def time_solver_phases(solver):
+    '''
+    Times the phases of a Pyomo solver call.
+
+    The ``_presolve`` (LP file writing) and ``_apply_solver`` (solver
+    execution) methods of the solver instance are wrapped for the
+    duration of the context. The remaining time of the context is the
+    time required to read the solution file and load the solution.
+
+    Yields
+    ------
+    dict
+        ``tdiff_write_lp``, ``tdiff_solver``, ``tdiff_read_solution``;
+        complete after the context is closed
+
+    Example
+    -------
+    >>> with time_solver_phases(m.solver) as dict_tdiff:
+    ...     m.results = m.solver.solve(m)
+
+    '''
+
+    dict_tdiff = {col: 0. for col in DICT_PHASES.values()}
+
+    def wrap(func, col):
+        def timed(*args, **kwargs):
+            t = time.time()
+            try:
+                with tracing.span('solver.' + col.replace('tdiff_', '')):
+                    return func(*args, **kwargs)
+            finally:
+                dict_tdiff[col] += time.time() - t
+        return timed
+
+    for name, col in DICT_PHASES.items():
+        setattr(solver, name, wrap(getattr(solver, name), col))
+
+    t = time.time()
+    try:
+        yield dict_tdiff
+    finally:
+        for name in DICT_PHASES:
+            solver.__dict__.pop(name, None)
+
+        dict_tdiff['tdiff_read_solution'] = (time.time() - t
+                                             - sum(dict_tdiff.values()))
+
+
+def get_run_stats(solver, dict_tdiff=None):
+    '''
+    Statistics of the last solver call.
+
+    Parameters
+    ----------
+    solver : pyomo.opt.base.solvers.OptSolver
+        solver instance
+    dict_tdiff : dict or None
+        phase times obtained from :func:`time_solver_phases`
+
+    Returns
+    -------
+    dict
+        keys :data:`LIST_STATS`
+
+    '''
+
+    solver_name = getattr(solver, 'name', None) or type(solver).__name__
+
+    dict_stats = {'solver': solver_name,
+                  **parse_log(solver_name, get_solver_log(solver)),
+                  **{col: np.nan for col in LIST_STATS
+                     if col.startswith('tdiff_')},
+                  **(dict_tdiff if dict_tdiff else {})}
+
+    return {col: dict_stats[col] for col in LIST_STATS}
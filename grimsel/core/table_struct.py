@@ -77,6 +77,11 @@ par = [
     ('capchnge_max', tuple()),
     ]
 dual = [('supply', ('sy', 'nd_id', 'ca_id'))]
+# optional duals, only written if selected through the ``duals`` parameter
+# of the ModelWriter
+dual_opt = [
+    ('ppst_capac', ('sy', 'pp_id', 'ca_id')),
+    ('pp_max_fuel', ('nd_id', 'ca_id', 'fl_id'))]
 
 list_collect = {'var_sy': var_sy,
                 'var_mt': var_mt,
@@ -101,6 +106,8 @@ list_collect = {'var_sy': var_sy,
 DICT_TABLES = {lst: {tb[0]: tuple(tbb for tbb in tb[1:])
                      for tb in list_collect[lst]}
                for lst in list_collect}
+DICT_TABLES['dual'].update({tb[0]: tuple(tbb for tbb in tb[1:])
+                            for tb in dual_opt})
 
 
 # component -> table name
@@ -8,6 +8,7 @@ import numpy as np
 import pandas as pd
 
 from grimsel.core.io import IO
+from grimsel.core.parameters import ParameterBank
 from grimsel.auxiliary.aux_m_func import pdef
 from grimsel.auxiliary.aux_m_func import cols2tuplelist
 import grimsel.auxiliary.maps as maps
@@ -31,6 +32,7 @@ class ModelLoopModifier():
         '''
 
         self.ml = ml
+        self.parameter_bank = None
 
 
     def availability_cf_cap(self):
@@ -534,296 +536,17 @@ class ModelLoopModifier():
 
         slct_hy = self.ml.dct_step['swhy']
 
-        str_hy = '_yr' + str(dict_hy[slct_hy]) if slct_hy > 0 else ''
+        # the parameter bank holds the values of all parameters with year
+        # columns (e.g. ``vc_fl_yr2016``); it is built once per loop and
+        # resets all other parameters to their base year values
+        variants = ['yr%d'%yr for key, yr in dict_hy.items() if key > 0]
 
-        #######################################################################
-        def set_fuel_prices(str_hy=None, reset=False):
-            ''' Select fuel price values for selected year. '''
-
-            if str_hy == None:
-                reset=True
-                str_hy = ''
-
-            slct_col = 'vc_fl' + (str_hy if not reset else '')
-            msg = ('Resetting vc_fl to base year values'
-                   if reset else
-                   'Setting vc_fl to values' + str_hy.replace('_', ' '))
-            msg += ' from column {}'.format(slct_col)
-
-            if 'vc_fl' in self.ml.m.dict_monthly_factors.keys():
-                df_mt = self.ml.m.dict_monthly_factors['vc_fl']
-                df = cols2tuplelist(self.ml.m.df_fuel_node_encar[['fl_id', 'nd_id']],
-                                    df_mt['mt_id'], return_df=True)
-                df = df.join(self.ml.m.df_fuel_node_encar.set_index(['fl_id', 'nd_id'])[slct_col], on=['fl_id', 'nd_id']).fillna(0)
-                df = df.join(df_mt.set_index(['mt_id','fl_id', 'nd_id'])['mt_fact' + (str_hy if not reset else '')], on=['mt_id', 'fl_id', 'nd_id']).fillna(1)
-                df['value'] = df[slct_col] * df['mt_fact' + (str_hy if not reset else '')]
-                dct_prices = df.set_index(['mt_id', 'fl_id', 'nd_id'])['value'].to_dict()
-
-            else:
-                dct_prices = (self.ml.m.df_fuel_node_encar
-                                    .set_index(['fl_id', 'nd_id'])[slct_col]
-                                    .to_dict())
-
-            print(msg)
-            for kk, vv in dct_prices.items():
-                self.ml.m.vc_fl[kk] = vv
-        #######################################################################
-        def set_cap_pwr_leg(str_hy=None, reset=False, excl_pp=[]):
-            ''' Select power plant capacities for selected year. '''
-
-            if str_hy == None:
-                reset=True
-                str_hy = ''
-
-            slct_col = 'cap_pwr_leg' + (str_hy if not reset else '')
-            msg = ('Resetting cap_pwr_leg to base year values.'
-                   if reset else
-                   'Setting cap_pwr_leg to values' + str_hy.replace('_', ' '))
-
-
-            dct_cap = (self.ml.m.df_plant_encar.loc[-self.ml.m.df_plant_encar.pp_id.isin(excl_pp)]
-                             .set_index(['pp_id', 'ca_id'])[slct_col]
-                             .to_dict())
-
-            print(msg)
-            for kk, vv in dct_cap.items():
-                self.ml.m.cap_pwr_leg[kk] = vv
-
-        #######################################################################
-        def set_cf_max(str_hy=None, reset=False, excl_pp=[]):
-            ''' Select maximum capacity factors for selected year. '''
-
-            if str_hy == None:
-                reset=True
-                str_hy = ''
-
-            slct_col = 'cf_max' + (str_hy if not reset else '')
-            msg = ('Resetting cf_max to base year values.'
-                   if reset else
-                   'Setting cf_max to values' + str_hy.replace('_', ' '))
-
-
-            if 'cf_max' in self.ml.m.dict_monthly_factors.keys():
-                df_mt = self.ml.m.dict_monthly_factors['cf_max']
-                df = cols2tuplelist(self.ml.m.df_plant_encar[['pp_id', 'ca_id']].loc[self.ml.m.df_plant_encar.pp_id.isin(self.ml.m.setlst['pp'])],
-                                    df_mt['mt_id'], return_df=True)
-                df = df.join(self.ml.m.df_plant_encar.set_index(['pp_id', 'ca_id'])[slct_col], on=['pp_id', 'ca_id']).fillna(0)
-                df = df.join(df_mt.set_index(['mt_id','ca_id', 'pp_id'])['mt_fact' + (str_hy if not reset else '')], on=['mt_id', 'pp_id', 'ca_id']).fillna(1)
-                df['value'] = df[slct_col] * df['mt_fact' + (str_hy if not reset else '')]
-                dct_cf_max = df.set_index(['mt_id', 'pp_id', 'ca_id'])['value'].to_dict()
-
-            else:
-
-                dct_cf_max = (self.ml.m.df_plant_encar.loc[-self.ml.m.df_plant_encar.pp_id.isin(excl_pp)]
-                                    .loc[self.ml.m.df_plant_encar.pp_id
-                                               .isin(self.ml.m.setlst['pp'])]
-                                    .set_index(['pp_id', 'ca_id'])[slct_col]
-                                    .to_dict())
-
-            print(msg)
-            for kk, vv in dct_cf_max.items():
-                self.ml.m.cf_max[kk] = vv
-
-        #######################################################################
-        def set_priceprof(str_hy=None, reset=False):
-            ''' Select price profile for selected year. '''
-
-            if str_hy == None:
-                reset=True
-                str_hy = ''
-
-            slct_col = 'value' + (str_hy if not reset else '')
-            msg = ('Resetting priceprof to base year values.'
-                   if reset else
-                   'Setting priceprof to values' + str_hy.replace('_', ' '))
-
-            dct_priceprof = (self.ml.m.df_profprice_soy
-                              .set_index(['sy', 'nd_id', 'fl_id'])[slct_col]
-                              .to_dict())
-
-            print(msg)
-            for kk, vv in dct_priceprof.items():
-                self.ml.m.priceprof[kk] = vv
-
-        #######################################################################
-        def set_dmnd(str_hy=None, reset=False):
-            ''' Select demand profiles for selected year. '''
-
-            if str_hy == None:
-                reset=True
-                str_hy = ''
-
-            slct_col = 'value' + (str_hy if not reset else '')
-            msg = ('Resetting dmnd to base year values.'
-                   if reset else
-                   'Setting dmnd to values' + str_hy.replace('_', ' '))
-
-
-
-
-
-            dct_dmnd = (self.ml.m.df_profdmnd_soy
-                              .set_index(['sy', 'nd_id', 'ca_id'])[slct_col]
-                              .to_dict())
-
-            print(msg)
-            for kk, vv in dct_dmnd.items():
-                self.ml.m.dmnd[kk] = vv
-
-        #######################################################################
-        def set_co2_price(str_hy=None, reset=False):
-            ''' Select CO2 price for selected year. '''
-
-            if str_hy == None:
-                reset=True
-                str_hy = ''
-
-            slct_col = 'price_co2' + (str_hy if not reset else '')
-            msg = ('Resetting price_co2 to base year values.'
-                   if reset else
-                   'Setting price_co2 to values' + str_hy.replace('_', ' '))
-
-            if 'price_co2' in self.ml.m.dict_monthly_factors.keys():
-                df_mt = self.ml.m.dict_monthly_factors['price_co2']
-                df = cols2tuplelist(self.ml.m.df_def_node[['nd_id']].loc[self.ml.m.df_def_node.nd_id.isin(self.ml.m.slct_node_id)],
-                                    df_mt['mt_id'], return_df=True)
-                df = df.join(self.ml.m.df_def_node.set_index(['nd_id'])[slct_col], on=['nd_id']).fillna(0)
-                df = df.join(df_mt.set_index(['mt_id','nd_id'])['mt_fact' + (str_hy if not reset else '')], on=['mt_id', 'nd_id']).fillna(1)
-                df['value'] = df[slct_col] * df['mt_fact' + (str_hy if not reset else '')]
-                dct_price_co2 = df.set_index(['mt_id', 'nd_id'])['value'].to_dict()
-
-            else:
-
-
-                dct_price_co2 = (self.ml.m.df_def_node
-                                       .set_index(['nd_id'])[slct_col]
-                                       .to_dict())
-
-            print(msg)
-            for kk, vv in dct_price_co2.items():
-                self.ml.m.price_co2[kk] = vv
-        #######################################################################
-
-        def set_erg_inp(str_hy=None, reset=False, excl_fl=[]):
-            ''' Select exogenous energy production for selected year. '''
-
-            if str_hy == None:
-                reset=True
-                str_hy = ''
-
-            slct_col = 'erg_inp' + (str_hy if not reset else '')
-            msg = ('Resetting erg_inp to base year values.'
-                   if reset else
-                   'Setting erg_inp to values' + str_hy.replace('_', ' '))
-
-            dct_erg_inp = (self.ml.m.df_fuel_node_encar.loc[-self.ml.m.df_fuel_node_encar.fl_id.isin(excl_fl)]
-                               .set_index(['nd_id', 'ca_id',
-                                           'fl_id'])[slct_col]
-                               .to_dict())
-
-            print(msg)
-            for kk, vv in dct_erg_inp.items():
-                self.ml.m.erg_inp[kk] = vv
-        #######################################################################
-
-        def set_erg_chp(str_hy=None, reset=False, excl_fl=[]):
-            ''' Select exogenous chp energy production for selected year. '''
-
-            if str_hy == None:
-                reset=True
-                str_hy = ''
-
-            slct_col = 'erg_chp' + (str_hy if not reset else '')
-            msg = ('Resetting erg_chp to base year values.'
-                   if reset else
-                   'Setting erg_chp to values' + str_hy.replace('_', ' '))
-
-            dct_erg_chp = (self.ml.m.df_fuel_node_encar
-                               .loc[-self.ml.m.df_fuel_node_encar.fl_id.isin(excl_fl)]
-                               .set_index(['nd_id', 'ca_id',
-                                           'fl_id'])[slct_col]
-                               .to_dict())
-
-            print(msg)
-            for kk, vv in dct_erg_chp.items():
-                self.ml.m.erg_chp[kk] = vv
-
-        #######################################################################
-
-        def set_cap_trm_leg(str_hy=None, reset=False):
-            ''' Select exogenous energy production for selected year. '''
-
-            if str_hy == None:
-                reset=True
-                str_hy = ''
-
-            slct_col = 'cap_trm_leg' + (str_hy if not reset else '')
-            msg = ('Resetting cap_trm_leg to base year values.'
-                   if reset else
-                   'Setting cap_trm_leg to values' + str_hy.replace('_', ' '))
-
-            dct_cap_trm_leg = (self.ml.m.df_node_connect
-                                   .set_index(['mt_id', 'nd_id',
-                                               'nd_2_id', 'ca_id'])[slct_col]
-                                   .to_dict())
-
-            print(msg)
-            for kk, vv in dct_cap_trm_leg.items():
-                self.ml.m.cap_trm_leg[kk] = vv
-        #######################################################################
-
-        def set_supprof(str_hy=None, reset=False):
-            '''
-            Select supply profiles for selected year.
-            (Normalized) input profiles are scaled by erg_inp
-            and then divided by cap_pwr_leg to get the hourly capacity
-            factor.
-            '''
-
-            if str_hy == None:
-                reset=True
-                str_hy = ''
-
-            msg = ('Resetting supprof to base year values.'
-                   if reset else
-                   'Setting supprof to values' + str_hy.replace('_', ' '))
-
-            df = self.ml.m.df_profsupply_soy
-            df = df[['sy', 'pp_id', 'ca_id'] + ['value' + str_hy]]
-            df = df.set_index(['sy', 'pp_id', 'ca_id'])
-            dct_supprof = df['value' + str_hy].to_dict()
-
-            print(msg)
-            for kk, vv in dct_supprof.items():
-                self.ml.m.supprof[kk] = vv
-        #######################################################################
+        if (self.parameter_bank is None
+                or self.parameter_bank.variants != variants):
+            self.parameter_bank = ParameterBank(self.ml.m, variants)
 
-        # resetting everything to base year values
-        # Note: inflow profiles are static and scaled by erg_inp in the constraint
-#        set_fuel_prices(reset=True)
-#        set_cap_pwr_leg(reset=True)
-#        set_cf_max(reset=True)
-#        set_dmnd(reset=True)
-#        set_co2_price(reset=True)
-#        set_erg_inp(reset=True)
-#        set_erg_chp(reset=True)
-#        set_cap_trm_leg(reset=True)
-#        set_supprof(reset=True)
-#        set_priceprof(reset=True)
-
-#        excl_pp = []
-#        excl_fl = []
-
-#        set_fuel_prices(str_hy)
-#        set_cap_pwr_leg(str_hy, excl_pp=excl_pp)
-#        set_cf_max(str_hy, excl_pp=excl_pp)
-#        set_dmnd(str_hy)
-#        set_co2_price(str_hy)
-#        set_erg_inp(str_hy, excl_fl=excl_fl)
-#        set_erg_chp(str_hy, excl_fl=excl_fl)
-#        set_cap_trm_leg(str_hy)
-#        set_supprof(str_hy)
-#        set_priceprof(str_hy)
+        self.parameter_bank.switch('yr%d'%dict_hy[slct_hy]
+                                   if slct_hy > 0 else None)
 
         self.ml.dct_vl['swhy_vl'] = 'yr' + str(dict_hy[slct_hy])
 
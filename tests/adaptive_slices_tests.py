@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the variable-length time slots of the adaptive time maps.
+
+"""
+
+import unittest
+
+import numpy as np
+
+from grimsel.auxiliary import timemap
+
+
+class TestPeakSteps(unittest.TestCase):
+
+    def test_ties(self):
+        ''' Solar-like profile: half of the steps share the peak value. '''
+
+        hours = np.arange(8760)
+        supply = np.maximum(0, np.sin(2 * np.pi * hours / 24))
+
+        keep = timemap.get_peak_steps(-supply, 0.01)
+
+        self.assertEqual(keep.sum(), 88)
+        self.assertTrue((supply[keep] == 0).all())
+
+    def test_exact_share(self):
+
+        values = np.random.RandomState(0).rand(8760)
+
+        keep = timemap.get_peak_steps(values, 0.1)
+
+        self.assertEqual(keep.sum(), 876)
+        self.assertGreater(values[keep].min(), values[~keep].max())
+
+    def test_nan(self):
+
+        values = np.array([np.nan, 1, 5, np.nan, 3, 4])
+
+        np.testing.assert_array_equal(timemap.get_peak_steps(values, 0.5),
+                                      [False, False, True, False, False,
+                                       True])
+        self.assertFalse(timemap.get_peak_steps(values, 0).any())
+        self.assertEqual(timemap.get_peak_steps(values, 2).sum(), 4)
+
+
+class TestAdaptiveSlices(unittest.TestCase):
+
+    def test_constant(self):
+        ''' Constant profiles are split at max_len and at the breaks. '''
+
+        breaks = np.zeros(48, dtype=bool)
+        breaks[30] = True
+
+        slices = timemap.get_adaptive_slices(np.ones(48), max_len=12,
+                                             breaks=breaks)
+
+        np.testing.assert_array_equal(slices, [0, 12, 24, 30, 42])
+
+    def test_keep(self):
+
+        keep = np.zeros(48, dtype=bool)
+        keep[[5, 6]] = True
+
+        slices = timemap.get_adaptive_slices(np.ones(48), max_len=24,
+                                             keep=keep)
+
+        self.assertTrue({5, 6, 7} <= set(slices))
+        self.assertEqual(len(slices), len(set(slices)))
+        self.assertEqual(np.diff(np.r_[slices, 48]).max(), 24)
+
+    def test_error_budget(self):
+        ''' Steps are merged only where the profile is calm. '''
+
+        values = np.r_[np.zeros(24), np.random.RandomState(0).rand(24)]
+
+        slices = timemap.get_adaptive_slices(values, max_len=24,
+                                             error_budget=0)
+
+        np.testing.assert_array_equal(slices, np.r_[0, np.arange(24, 48)])
+
+        # the lost variance is within the budget
+        for error_budget in [0.01, 0.1, 0.5]:
+            slices = timemap.get_adaptive_slices(values, max_len=24,
+                                                 error_budget=error_budget)
+            norm = (values - values.mean()) / values.std()
+            means = np.add.reduceat(norm, slices) / np.diff(np.r_[slices, 48])
+            lost = ((norm - np.repeat(means, np.diff(np.r_[slices, 48])))**2
+                    ).sum()
+            self.assertLessEqual(lost, error_budget * 48 + 1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the autocompletion of the model input tables.
+
+"""
+
+import unittest
+from unittest import mock
+
+import os
+from types import SimpleNamespace
+
+import pandas as pd
+
+from helpers import get_tmp_dir
+from grimsel.auxiliary.synthetic import SyntheticInput
+import grimsel.core.autocomplete as ac
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+def get_model(nodes=3, plants=10):
+    ''' Object holding the synthetic input tables as model attributes. '''
+
+    dict_tb = SyntheticInput(nodes=nodes, plants=plants, hours=24).get_tables()
+
+    return SimpleNamespace(**{'df_' + tb: df for tb, df in dict_tb.items()})
+
+
+class TestAntiJoin(unittest.TestCase):
+
+    def test_anti_join(self):
+
+        df = pd.DataFrame({'a': [0, 0, 1, 2], 'b': [0, 1, 1, 1]})
+        df_other = pd.DataFrame({'a': [0, 2, 5], 'b': [1, 0, 0]})
+
+        self.assertEqual(ac._anti_join(df, df_other, ['a']).index.tolist(),
+                         [2])
+        self.assertEqual(ac._anti_join(df, df_other,
+                                       ['a', 'b']).index.tolist(), [0, 2, 3])
+        self.assertEqual(len(ac._anti_join(df, df_other.iloc[:0], ['a'])), 4)
+
+
+class TestAutoComplete(unittest.TestCase):
+
+    def setUp(self):
+
+        self.m = get_model()
+
+    def get_added(self, name, df_before):
+
+        df = getattr(self.m, name)
+
+        return df.iloc[len(df_before):]
+
+    def test_unique(self):
+        '''
+        Candidates from repeated rows (e.g. the monthly rows of
+        node_connect) are added once.
+        '''
+
+        m = self.m
+        df_plant = m.df_def_plant
+
+        ac.autocomplete(m)
+
+        for name, col in [('df_def_plant', 'pp'), ('df_def_plant', 'pp_id'),
+                          ('df_def_fuel', 'fl'), ('df_def_pp_type', 'pt')]:
+            self.assertFalse(getattr(m, name)[col].duplicated().any(),
+                             msg=name)
+
+        df_add = self.get_added('df_def_plant', df_plant)
+        self.assertEqual(sorted(df_add.pp),
+                         ['ND00%d_%s'%(nd, pt) for nd in range(3)
+                          for pt in ['DMND', 'TRNS']])
+        self.assertFalse(df_add[['pt_id', 'fl_id']].isna().any().any())
+
+    def test_existing(self):
+        ''' Existing transmission plants are not duplicated. '''
+
+        m = self.m
+        ac.autocomplete(m)
+
+        m_2 = get_model()
+        df_trns = m.df_def_plant.loc[m.df_def_plant.pp == 'ND001_TRNS']
+        m_2.df_def_plant = pd.concat([m_2.df_def_plant, df_trns])
+        df_plant = m_2.df_def_plant
+
+        ac.autocomplete(m_2)
+
+        df_add = m_2.df_def_plant.iloc[len(df_plant):]
+        self.assertEqual(sorted(df_add.pp.loc[df_add.pp.str.contains('TRNS')]),
+                         ['ND000_TRNS', 'ND002_TRNS'])
+        self.assertEqual((m_2.df_def_plant.pp == 'ND001_TRNS').sum(), 1)
+
+    def test_consumption(self):
+        '''
+        One consumption plant per node, although each node has two plants
+        consuming the energy carrier.
+        '''
+
+        m = self.m
+        # hard coal plants consume the energy carrier EL
+        fl_id = m.df_def_fuel.set_index('fl').fl_id['hard_coal']
+        m.df_def_encar['fl_id'] = fl_id
+        self.assertEqual(m.df_def_plant.groupby('nd_id').fl_id
+                          .apply(lambda x: (x == fl_id).sum()).tolist(),
+                         [2, 2, 2])
+
+        ac.autocomplete(m)
+
+        df_cons = m.df_def_plant.loc[m.df_def_plant.pp.str.contains('CONS')]
+        self.assertEqual(sorted(df_cons.pp),
+                         ['ND000_CONS_EL', 'ND001_CONS_EL', 'ND002_CONS_EL'])
+        self.assertEqual(df_cons.fl_id.unique().tolist(), [fl_id])
+
+        # second pass: nothing added
+        df_plant = m.df_def_plant
+        ac.autocomplete(m)
+        pd.testing.assert_frame_equal(m.df_def_plant, df_plant)
+
+    def test_single_node(self):
+        ''' No transmission fuels and plants for single nodes. '''
+
+        m = get_model(nodes=1)
+        ac.autocomplete(m)
+
+        self.assertNotIn('exchange', m.df_def_fuel.fl.tolist())
+        self.assertFalse(m.df_def_plant.pp.str.contains('TRNS').any())
+
+    def test_curtailment(self):
+
+        m = self.m
+        ac.autocomplete(m, autocomplete_curtailment=True)
+
+        df_flex = m.df_def_plant.loc[m.df_def_plant.pp.str.contains('FLEX')]
+        self.assertEqual(len(df_flex), 3)
+        self.assertEqual(df_flex.set_def_curt.unique().tolist(), [1])
+        self.assertEqual(df_flex.set_def_dmd.unique().tolist(), [0])
+
+        df_ppca = m.df_plant_encar.loc[m.df_plant_encar.pp_id
+                                         .isin(df_flex.pp_id)]
+        self.assertEqual(sorted(df_ppca.pp_id), sorted(df_flex.pp_id))
+
+
+class TestAutoCompleteAdditions(unittest.TestCase):
+
+    def setUp(self):
+
+        self.m = get_model()
+        self.additions = ac.AutoCompleteAdditions(self.m)
+
+    def test_combined(self):
+        ''' Pending additions are visible through ``get_table``. '''
+
+        m, additions = self.m, self.additions
+        df_node = m.df_def_node
+
+        additions.add('df_def_node', pd.DataFrame({'nd_id': [3], 'nd': ['A'],
+                                                   'other': [1],
+                                                   'is_new': [1]}),
+                      new_cols={'is_new': 0})
+        additions.add('df_def_node', pd.DataFrame({'nd_id': [4], 'nd': ['B'],
+                                                   'is_new': [1]}))
+
+        self.assertIs(m.df_def_node, df_node)
+        df = additions.get_table('df_def_node')
+        self.assertEqual(df.nd.tolist()[-2:], ['A', 'B'])
+        self.assertNotIn('other', df.columns)
+        self.assertEqual(df.is_new.tolist(), [0] * 3 + [1] * 2)
+        self.assertIs(additions.get_table('df_def_fuel'), m.df_def_fuel)
+
+        additions.apply()
+
+        pd.testing.assert_frame_equal(m.df_def_node, df)
+        self.assertEqual(additions.dict_add, {})
+
+    def test_set_once(self):
+        ''' Each model table is set once for all passes. '''
+
+        list_set = []
+
+        class Model(SimpleNamespace):
+
+            def __setattr__(self, name, value):
+
+                list_set.append(name)
+                super().__setattr__(name, value)
+
+        m = Model(**vars(self.m))
+        list_set.clear()
+
+        ac.autocomplete(m, autocomplete_curtailment=True)
+
+        self.assertEqual(sorted(list_set),
+                         ['df_def_fuel', 'df_def_plant', 'df_def_pp_type',
+                          'df_plant_encar'])
+
+
+class TestAutoCompleteCache(unittest.TestCase):
+
+    def setUp(self):
+
+        self.cache_dir = get_tmp_dir(self, 'grimsel_test_accache')
+
+    def test_cache(self):
+
+        m = get_model()
+        ac.autocomplete(m, cache_dir=self.cache_dir)
+
+        list_fn = os.listdir(self.cache_dir)
+        self.assertEqual(len(list_fn), 1)
+        self.assertFalse([fn for fn in list_fn if fn.endswith('.tmp')])
+
+        # hit: no autocompletion passes
+        m_cache = get_model()
+        with mock.patch.object(ac, 'AutoCompletePpType') as pp_type:
+            ac.autocomplete(m_cache, cache_dir=self.cache_dir)
+
+        pp_type.assert_not_called()
+        for name in ac.LIST_INPUT_TABLES:
+            pd.testing.assert_frame_equal(getattr(m_cache, name),
+                                          getattr(m, name))
+
+        # miss: modified input table
+        m_mod = get_model()
+        m_mod.df_def_node.loc[0, 'nd'] = 'NDX'
+        with mock.patch.object(ac, 'AutoCompletePpType',
+                               wraps=ac.AutoCompletePpType) as pp_type:
+            ac.autocomplete(m_mod, cache_dir=self.cache_dir)
+
+        pp_type.assert_called_once()
+        self.assertIn('NDX_DMND', m_mod.df_def_plant.pp.tolist())
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_write_failure(self):
+        ''' Failing cache writes are logged, not raised. '''
+
+        m = get_model()
+        with mock.patch.object(ac, '_write_atomic',
+                               side_effect=OSError('Disk full.')):
+            with self.assertLogs(ac.logger, 'WARNING'):
+                ac.autocomplete(m, cache_dir=self.cache_dir)
+
+        self.assertIn('ND000_DMND', m.df_def_plant.pp.tolist())
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the synthetic input data and the benchmark runner.
+
+"""
+
+import unittest
+
+import os
+
+from helpers import get_tmp_dir
+from grimsel.auxiliary.synthetic import SyntheticInput
+from grimsel.auxiliary.benchmark import Benchmark, read_history
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestSyntheticInput(unittest.TestCase):
+
+    def setUp(self):
+
+        self.syn = SyntheticInput(nodes=3, plants=6, carriers=2, hours=48)
+        self.dict_tb = self.syn.get_tables()
+
+    def test_consistent_ids(self):
+
+        dict_tb = self.dict_tb
+
+        self.assertEqual(len(dict_tb['def_plant']), 3 * 6 * 2)
+        self.assertTrue(dict_tb['plant_encar'].pp_id
+                            .isin(dict_tb['def_plant'].pp_id).all())
+        self.assertTrue(dict_tb['def_plant'].fl_id
+                            .isin(dict_tb['def_fuel'].fl_id).all())
+
+        list_pf = (dict_tb['node_encar'].dmnd_pf_id.tolist()
+                   + dict_tb['plant_encar'].supply_pf_id.dropna().tolist())
+        self.assertEqual(sorted(list_pf),
+                         sorted(dict_tb['def_profile'].pf_id.tolist()))
+
+        for tb, col in [('profdmnd', 'dmnd_pf_id'),
+                        ('profsupply', 'supply_pf_id')]:
+            self.assertEqual(dict_tb[tb].groupby(col).hy.count().unique()
+                                                         .tolist(), [48])
+
+    def test_reproducible(self):
+
+        df = SyntheticInput(nodes=3, plants=6, carriers=2,
+                            hours=48).get_tables()['profdmnd']
+
+        self.assertTrue(df.equals(self.dict_tb['profdmnd']))
+
+    def test_single_node(self):
+
+        dict_tb = SyntheticInput(nodes=1, plants=2).get_tables()
+
+        self.assertNotIn('node_connect', dict_tb)
+        self.assertIn('node_connect', self.dict_tb)
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = get_tmp_dir(self, 'grimsel_test_bm')
+
+    def test_build_history(self):
+
+        fn = os.path.join(self.tmp_dir, 'history.jsonl')
+        list_size = [{'nodes': 1, 'plants': 3, 'hours': 24},
+                     {'nodes': 2, 'plants': 5, 'hours': 24}]
+
+        for _ in range(2):
+            Benchmark(list_size, solver=None, history_file=fn,
+                      work_dir=os.path.join(self.tmp_dir, 'work')).run()
+
+        df = read_history(fn)
+
+        self.assertEqual(len(df), 4)
+        self.assertEqual(df.nodes.tolist(), [1, 2, 1, 2])
+        self.assertTrue((df['tdiff_runlevels.m.add_all_constraints']
+                         > 0).all())
+        self.assertTrue(df.nvariables.iloc[1] > df.nvariables.iloc[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
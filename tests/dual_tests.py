@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the selection and the values of the constraint dual output tables.
+
+"""
+
+import unittest
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from helpers import build_model, get_tmp_dir, write_output
+from grimsel.auxiliary.synthetic import SyntheticInput
+import grimsel.core.table_struct as table_struct
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestDuals(unittest.TestCase):
+    '''
+    Fossil fuels are constrained to add the ``pp_max_fuel`` constraints.
+    Dual values are a function of the constraint index; some constraints
+    are deactivated and one supply constraint has no dual value.
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmp_dir = get_tmp_dir(cls, 'grimsel_test_duals')
+
+        dict_tb = SyntheticInput(nodes=2, plants=5, hours=48).get_tables()
+        df_fl = dict_tb['def_fuel']
+        df_fl['is_constrained'] = (df_fl.fl.isin(['natural_gas', 'hard_coal'])
+                                        .astype(int))
+        df_flnd = dict_tb['fuel_node_encar']
+        df_flnd['erg_inp'] = 1e5 * (1 + df_flnd.nd_id)
+
+        cls.ml = build_model(cls.tmp_dir, input_tables={
+                                    'def_fuel': df_fl,
+                                    'fuel_node_encar': df_flnd})
+
+        m = cls.ml.m
+        for comp in ['supply', 'ppst_capac', 'pp_max_fuel']:
+            for nkey, (key, condata) in enumerate(getattr(m, comp).items()):
+                m.dual[condata] = cls.get_dual_value(key)
+                if nkey % 3 == 1:
+                    condata.deactivate()
+
+        del m.dual[m.supply[0, 0, 0]]
+
+    @staticmethod
+    def get_dual_value(key):
+        ''' Unique dual value for each constraint index. '''
+
+        return float(np.dot(key, [1000, 100, 10][:len(key)]) + 0.5)
+
+    def write(self, name, **iokwargs):
+
+        cl_out = os.path.join(self.tmp_dir, name)
+        write_output(self.ml.m, 'fastparquet', cl_out, **iokwargs)
+
+        return cl_out
+
+    def get_dual_tables(self, name, **iokwargs):
+
+        cl_out = self.write(name, **iokwargs)
+
+        return sorted(fn for fn in os.listdir(cl_out)
+                      if fn.startswith('dual_'))
+
+    def test_default(self):
+
+        self.assertEqual(self.get_dual_tables('out_default'),
+                         ['dual_supply_0000.parq'])
+
+    def test_opt_in(self):
+
+        self.assertEqual(self.get_dual_tables('out_opt_in',
+                                              duals=['ppst_capac']),
+                         ['dual_ppst_capac_0000.parq',
+                          'dual_supply_0000.parq'])
+
+        with self.assertRaises(RuntimeError):
+            self.get_dual_tables('out_unknown', duals=['supply_total'])
+
+    def test_values(self):
+        ''' Values of active constraints in component index order. '''
+
+        m = self.ml.m
+        cl_out = self.write('out_values', duals=['ppst_capac', 'pp_max_fuel'])
+
+        dict_idx = dict(table_struct.dual + table_struct.dual_opt)
+        for comp, idx in dict_idx.items():
+
+            self.assertTrue(len(getattr(m, comp)), msg=comp)
+
+            list_row = [key + (m.dual.get(condata, np.nan),)
+                        for key, condata in getattr(m, comp).items()
+                        if condata.active]
+            df_exp = pd.DataFrame(list_row, columns=list(idx) + ['value'])
+
+            df = pd.read_parquet(os.path.join(cl_out,
+                                              'dual_%s_0000.parq'%comp))
+
+            self.assertLess(len(df), len(getattr(m, comp)))
+            pd.testing.assert_frame_equal(df[df_exp.columns], df_exp,
+                                          check_dtype=False)
+
+        df = pd.read_parquet(os.path.join(cl_out, 'dual_supply_0000.parq'))
+        self.assertTrue(np.isnan(df.value.iloc[0]))
+        # supply[0, 1, 0] is deactivated
+        self.assertEqual(df[['sy', 'nd_id']].iloc[1].tolist(), [1, 0])
+        self.assertEqual(df.value.iloc[1], self.get_dual_value((1, 0, 0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the DuckDB output target.
+
+"""
+
+import unittest
+from unittest import mock
+
+import os
+import sys
+import time
+import shutil
+import subprocess
+import tempfile
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+from helpers import (build_model, set_variable_values, write_model_runs,
+                     write_output)
+import grimsel.core.io as grimsel_io
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+@unittest.skipIf(duckdb is None, 'duckdb not installed')
+class TestDuckDBOutput(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp(prefix='grimsel_test_duckdb')
+        self.cl_out = os.path.join(self.tmp_dir, 'out.duckdb')
+
+        self.ml = build_model(self.tmp_dir, nsteps=[('swtc', 3)],
+                              output_target='duckdb', cl_out=self.cl_out,
+                              no_output=False)
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def read(self, tb):
+
+        with duckdb.connect(self.cl_out, read_only=True) as con:
+            return con.execute('SELECT * FROM %s'%tb).df()
+
+    def get_tables(self):
+
+        with duckdb.connect(self.cl_out, read_only=True) as con:
+            return [tb for tb, in con.execute('SHOW TABLES').fetchall()]
+
+    def test_round_trip(self):
+        ''' Same tables as the fastparquet output. '''
+
+        write_model_runs(self.ml, [0])
+
+        cl_out_pq = os.path.join(self.tmp_dir, 'out_pq')
+        write_output(self.ml.m, 'fastparquet', cl_out_pq)
+
+        for tb in ['var_yr_cap_pwr_tot', 'var_yr_erg_yr', 'par_dmnd',
+                   'par_pp_eff', 'dual_supply']:
+            df_pq = pd.read_parquet(os.path.join(cl_out_pq, tb + '_0000.parq'))
+            df = self.read(tb)[df_pq.columns]
+
+            pd.testing.assert_frame_equal(
+                    df.sort_values(list(df.columns)).reset_index(drop=True),
+                    df_pq.sort_values(list(df.columns)).reset_index(drop=True),
+                    check_dtype=False)
+
+        df_run = self.read('def_run')
+        self.assertEqual(df_run.run_id.tolist(), [0])
+        self.assertIn('def_plant', self.get_tables())
+
+    def test_single_connection(self):
+        ''' All tables of a model run are written through one connection. '''
+
+        self.ml.select_run(0)
+
+        with mock.patch.object(grimsel_io.duckdb, 'connect',
+                               wraps=duckdb.connect) as connect:
+            self.ml.io.write_run(run_id=0)
+
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(grimsel_io._DuckDBWriter._dict_duckdb_session, {})
+
+    def test_rollback(self):
+        ''' Failing model runs leave no partial output. '''
+
+        write_model_runs(self.ml, [0])
+        list_io = list(self.ml.io.modwr.dict_comp_obj.values())
+
+        self.ml.select_run(1)
+        with mock.patch.object(list_io[-1], 'write',
+                               side_effect=RuntimeError('Write failed.')):
+            with self.assertRaises(RuntimeError):
+                self.ml.io.write_run(run_id=1)
+
+        self.assertEqual(self.read('var_sy_pwr').run_id.unique().tolist(),
+                         [0])
+        self.assertEqual(grimsel_io._DuckDBWriter._dict_duckdb_session, {})
+
+    def test_schema_evolution(self):
+
+        modwr = self.ml.io.modwr
+
+        modwr.write_duckdb('run_info', pd.DataFrame({'run_id': [0],
+                                                     'a': [1.]}))
+        modwr.write_duckdb('run_info', pd.DataFrame({'run_id': [1],
+                                                     'b': ['x']}))
+
+        df = self.read('run_info').set_index('run_id')
+
+        self.assertEqual(df.columns.tolist(), ['a', 'b'])
+        self.assertEqual(df.a.tolist()[0], 1.)
+        self.assertTrue(pd.isnull(df.a[1]))
+        self.assertEqual(df.b[1], 'x')
+        self.assertTrue(pd.isnull(df.b[0]))
+
+    def test_delete_run_id(self):
+
+        for run_id, value in enumerate([1., 2., 3.]):
+            set_variable_values(self.ml.m, value)
+            write_model_runs(self.ml, [run_id])
+
+        list_tb = [tb for tb in self.get_tables()
+                   if tb.startswith(('var_', 'par_', 'dual_'))
+                   or tb == 'def_run']
+
+        self.ml.io.delete_run_id(1, operator='=')
+        for tb in list_tb:
+            self.assertEqual(sorted(self.read(tb).run_id.unique()), [0, 2],
+                             tb)
+
+        self.ml.io.delete_run_id(0, operator='=')
+        for tb in list_tb:
+            self.assertEqual(self.read(tb).run_id.unique().tolist(), [2], tb)
+
+        self.assertEqual(self.read('var_yr_cap_pwr_tot').value.unique()
+                         .tolist(), [3.])
+
+    def test_lock_timeout(self):
+        ''' Connections wait for the lock of other processes. '''
+
+        write_model_runs(self.ml, [0])
+
+        proc = subprocess.Popen(
+                [sys.executable, '-c',
+                 'import duckdb, time; con = duckdb.connect(%r); '
+                 'print("locked", flush=True); time.sleep(10)'%self.cl_out],
+                stdout=subprocess.PIPE, universal_newlines=True)
+        try:
+            self.assertEqual(proc.stdout.readline().strip(), 'locked')
+
+            t0 = time.time()
+            with self.assertRaises(duckdb.IOException):
+                grimsel_io._DuckDBWriter._connect_duckdb(self.cl_out,
+                                                         timeout=0.5)
+            self.assertGreaterEqual(time.time() - t0, 0.5)
+        finally:
+            proc.kill()
+            proc.wait()
+            proc.stdout.close()
+
+        con = grimsel_io._DuckDBWriter._connect_duckdb(self.cl_out,
+                                                       timeout=5)
+        con.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the DuckDB analysis backend of the file output targets.
+
+"""
+
+import unittest
+
+import os
+
+import numpy as np
+import pandas as pd
+import duckdb
+
+from helpers import (build_model, get_tmp_dir, set_variable_values,
+                     write_model_runs)
+from grimsel.analysis.file_backend import FileBackend, translate_sql
+from grimsel.analysis.sql_analysis import SqlAnalysis
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestTranslateSql(unittest.TestCase):
+
+    def test_select_into(self):
+
+        stmt, = translate_sql('''SELECT a, 'INTO x' AS b INTO sc.tb
+                                 FROM sc.src''')
+        self.assertTrue(stmt.startswith('CREATE TABLE sc.tb AS SELECT'))
+        self.assertIn('\'INTO x\'', stmt)
+
+    def test_insert_into(self):
+
+        stmt, = translate_sql('INSERT INTO sc.tb (a) SELECT a FROM sc.src')
+        self.assertTrue(stmt.startswith('INSERT INTO sc.tb'))
+
+    def test_alter_table(self):
+
+        list_stmt = translate_sql('ALTER TABLE sc.tb ADD COLUMN a FLOAT, '
+                                  'ADD COLUMN b DECIMAL;')
+        self.assertEqual(list_stmt, ['ALTER TABLE sc.tb ADD COLUMN a DOUBLE',
+                                     'ALTER TABLE sc.tb ADD COLUMN b DOUBLE'])
+
+    def test_generate_series(self):
+
+        stmt, = translate_sql('SELECT generate_series(0, 3) AS bucket')
+        self.assertIn('UNNEST(generate_series(0, 3))', stmt)
+
+
+class TestFileBackend(unittest.TestCase):
+    '''
+    Output set with three model runs and the variable values
+    ``run_id + 1``.
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+
+        tmp_dir = get_tmp_dir(cls, 'grimsel_test_fb')
+        cls.cl_out = os.path.join(tmp_dir, 'out')
+
+        cls.ml = build_model(tmp_dir, nsteps=[('swco', 5)],
+                             cl_out=cls.cl_out, no_output=False)
+
+        for run_id in range(3):
+            set_variable_values(cls.ml.m, run_id + 1.)
+            write_model_runs(cls.ml, [run_id])
+
+        cls.backend = FileBackend(cls.cl_out, 'fastparquet', 'out_test',
+                                  slct_run_id=[0, 2])
+
+    @classmethod
+    def tearDownClass(cls):
+
+        cls.backend.close()
+
+    def test_run_id_selection(self):
+
+        for tb in ['def_run', 'var_sy_pwr', 'var_yr_cap_pwr_tot']:
+            df = self.backend.read_sql(None, 'out_test', tb)
+            self.assertEqual(sorted(df.run_id.unique()), [0, 2])
+
+    def test_analysis_table(self):
+
+        self.backend.exec_sql('''
+                              DROP TABLE IF EXISTS out_test.tot CASCADE;
+                              SELECT run_id, SUM(value) AS value, 7 / 2 AS div
+                              INTO out_test.tot
+                              FROM out_test.var_yr_cap_pwr_tot
+                              GROUP BY run_id;
+                              ''')
+        self.backend.joinon(None, ['swco_id'], ['run_id'],
+                            ['out_test', 'tot'], ['out_test', 'def_run'])
+
+        df = (self.backend.read_sql(None, 'out_test', 'tot')
+                          .sort_values('run_id').reset_index(drop=True))
+
+        self.assertEqual(df.value.tolist(), [10., 30.])
+        self.assertEqual(df['div'].tolist(), [3, 3])
+        self.assertEqual(df.swco_id.tolist(), [0, 2])
+        self.assertIn('tot', self.backend.get_sql_tables('out_test'))
+
+    def test_refresh(self):
+
+        backend = FileBackend(self.cl_out, 'fastparquet', 'out_test')
+        self.addCleanup(backend.close)
+
+        set_variable_values(self.ml.m, 4.)
+        write_model_runs(self.ml, [3])
+        backend.refresh()
+
+        df = backend.read_sql(None, 'out_test', 'var_yr_cap_pwr_tot')
+        self.assertEqual(sorted(df.run_id.unique()), [0, 1, 2, 3])
+        self.assertEqual(df.loc[df.run_id == 3].value.unique().tolist(),
+                         [4.])
+
+
+class TestSqlAnalysis(unittest.TestCase):
+    '''
+    Analysis products of a model output set, generated through the
+    FileBackend and compared to the same quantities from pandas.
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+
+        tmp_dir = get_tmp_dir(cls, 'grimsel_test_fb_analysis')
+        cl_out = os.path.join(tmp_dir, 'out.duckdb')
+
+        ml = build_model(tmp_dir, nsteps=[('swtc', 2)],
+                         output_target='duckdb', cl_out=cl_out,
+                         no_output=False)
+        ml.df_def_run['swtc_vl'] = ['GAS', 'WIND']
+
+        for run_id, value in [(0, 1.), (1, 2.)]:
+            set_variable_values(ml.m, value)
+            for condata in ml.m.supply.values():
+                ml.m.dual[condata] = 10 * value
+            write_model_runs(ml, [run_id])
+
+        # columns of the full input data which the synthetic input lacks;
+        # the storage fuel is declared an energy carrier for the
+        # cross-sector consumption
+        con = duckdb.connect(cl_out)
+        con.execute('''
+            ALTER TABLE def_pp_type ADD COLUMN pp_broad_cat VARCHAR;
+            UPDATE def_pp_type SET pp_broad_cat = CASE
+                WHEN pt IN ('GAS_NEW', 'HCO_ELC') THEN 'CONVDISP'
+                WHEN pt IN ('WIND', 'SOLAR') THEN 'VARIABLE'
+                WHEN pt = 'STO' THEN 'NEW_STORAGE'
+                ELSE pt END;
+            ALTER TABLE def_plant ADD COLUMN set_def_sll SMALLINT DEFAULT 0;
+            ALTER TABLE plant_encar ADD COLUMN factor_lin_0 DOUBLE DEFAULT 1;
+            ALTER TABLE plant_encar ADD COLUMN factor_lin_1 DOUBLE DEFAULT 0;
+            ALTER TABLE def_encar ADD COLUMN fl_id SMALLINT;
+            UPDATE def_encar SET fl_id = (SELECT fl_id FROM def_fuel
+                                          WHERE fl = 'storage');
+            UPDATE def_fuel SET is_ca = 1 WHERE fl = 'storage';
+            ''')
+        con.close()
+
+        cls.backend = FileBackend(cl_out, 'duckdb', 'out_test')
+        cls.sqa = SqlAnalysis('out_test', None, backend=cls.backend)
+
+        cls.sqa.build_tables_plant_run()
+        cls.sqa.build_table_plant_run_tot_balance()
+
+    @classmethod
+    def tearDownClass(cls):
+
+        cls.backend.close()
+
+    def read(self, tb):
+
+        return self.backend.read_sql(None, 'out_test', tb)
+
+    def get_erg_yr_sy(self):
+        ''' Weighted annual energy by plant and run from pandas. '''
+
+        df = self.read('var_sy_pwr').merge(self.read('def_plant'),
+                                           on='pp_id')
+        df = df.merge(self.read('def_node')[['nd_id', 'tm_id']], on='nd_id')
+        df = df.merge(self.read('tm_soy')[['sy', 'tm_id', 'weight']],
+                      on=['sy', 'tm_id'])
+        df['erg_yr_sy'] = df.value * df.weight
+
+        return df.groupby(['run_id', 'pp_id', 'bool_out']).erg_yr_sy.sum()
+
+    def test_plant_run(self):
+
+        df = self.read('analysis_plant_run_tot').set_index(
+                                            ['run_id', 'pp_id', 'bool_out'])
+        srs_exp = self.get_erg_yr_sy()
+
+        self.assertEqual(set(df.index), set(srs_exp.index))
+        pd.testing.assert_series_equal(
+                df.erg_yr_sy.sort_index(), srs_exp.sort_index(),
+                check_dtype=False)
+        # all variables and duals are 10 times the run's value
+        pd.testing.assert_series_equal(
+                df.val_yr_sy.sort_index(),
+                (srs_exp * 10 * (srs_exp.index.get_level_values('run_id')
+                                 + 1)).sort_index(),
+                check_dtype=False, check_names=False)
+        cap = df.xs(False, level='bool_out').cap_pwr_tot.dropna()
+        self.assertTrue(((cap == 1) | (cap == 2)).all())
+
+        # helper columns
+        df = df.reset_index()
+        self.assertFalse(df[['pp', 'pt', 'pp_broad_cat', 'fl', 'nd',
+                             'swtc_vl']].isnull().any().any())
+        self.assertEqual(df.groupby('run_id').swtc_vl.unique().map(list)
+                           .to_dict(), {0: ['GAS'], 1: ['WIND']})
+
+    def test_plant_run_tot_balance(self):
+
+        df = self.read('analysis_plant_run_tot_balance')
+        df_pr = self.read('analysis_plant_run_tot')
+
+        df_pp = df.loc[df.pp_broad_cat != 'GRIDLOSSES']
+        self.assertEqual(len(df_pp), len(df_pr))
+        self.assertTrue((df_pp.erg_yr_sy_posneg[~df_pp.bool_out] >= 0).all())
+        self.assertTrue((df_pp.erg_yr_sy_posneg[df_pp.bool_out] <= 0).all())
+
+        # grid losses: VARCHAR cast of the node names
+        df_gl = df.loc[df.pp_broad_cat == 'GRIDLOSSES'].set_index(
+                                                            ['run_id', 'nd'])
+        self.assertEqual(set(df_gl.pp), {'ND000_GRIDLSS', 'ND001_GRIDLSS'})
+
+        df_gl_exp = df_pr.loc[df_pr.pp_broad_cat.isin(['CONVDISP',
+                                                       'VARIABLE',
+                                                       'NEW_STORAGE'])
+                              & ~df_pr.bool_out]
+        df_gl_exp = df_gl_exp.merge(self.read('par_grid_losses')[
+                            ['nd_id', 'ca_id', 'run_id', 'value']],
+                            on=['nd_id', 'ca_id', 'run_id'])
+        srs_gl_exp = - (df_gl_exp.erg_yr_sy * df_gl_exp.value
+                        ).groupby([df_gl_exp.run_id, df_gl_exp.nd]).sum()
+
+        pd.testing.assert_series_equal(
+                df_gl.erg_yr_sy_posneg.sort_index(), srs_gl_exp.sort_index(),
+                check_dtype=False, check_names=False)
+
+    def test_time_series_crosssector(self):
+        ''' Consumption of energy carriers; node names from regexp. '''
+
+        self.sqa.generate_view_time_series_subset()
+
+        df = self.read('analysis_time_series_view_crosssector_0')
+
+        self.assertEqual(set(df.pp), {'ND_CONS_EL', 'ND001_CONS_EL'})
+        self.assertTrue(df.bool_out.all())
+
+        df_sto = self.read('var_sy_pwr').merge(self.read('def_plant'),
+                                               on='pp_id')
+        df_sto = df_sto.merge(self.read('def_fuel'), on='fl_id')
+        df_sto = df_sto.loc[(df_sto.fl == 'storage') & ~df_sto.bool_out]
+        df_sto = df_sto.merge(self.read('plant_encar')[['pp_id', 'pp_eff']],
+                              on='pp_id')
+        srs_exp = (df_sto.value / df_sto.pp_eff).groupby(
+                        [df_sto.run_id, df_sto.nd_id, df_sto.sy]).sum()
+
+        pd.testing.assert_series_equal(
+                df.set_index(['run_id', 'nd_id', 'sy']).value.sort_index(),
+                srs_exp.sort_index(), check_names=False)
+
+    def test_mc_histograms(self):
+
+        self.sqa.mc_histograms(nbins=10, valmin=0, valmax=100)
+
+        df = self.read('analysis_mc_hist')
+
+        # all buckets 0 to nbins + 1 of each storage plant
+        self.assertEqual(df.groupby(['run_id', 'pp_id', 'bool_out']
+                                    ).bucket.nunique().unique().tolist(),
+                         [12])
+        self.assertEqual(set(df.pt), {'STO'})
+
+        # the duals 10 and 20 of the two runs
+        df_cnt = df.loc[df.bucket.isin([2, 3])].pivot_table(
+                            index='run_id', columns='bucket',
+                            values='count', aggfunc='sum')
+        self.assertEqual(df_cnt.loc[0].tolist(), [4 * 48, 0])
+        self.assertEqual(df_cnt.loc[1].tolist(), [0, 4 * 48])
+        self.assertEqual(df['count'].sum(), 2 * 4 * 48)
+        self.assertTrue((df.center == 0.5 * (df.low + df.high)).all())
+
+    def test_weighted_mix(self):
+
+        self.sqa.build_table_weighted_mix()
+
+        df = self.read('analysis_weighted_mix')
+
+        # plants masked by the run's swtc_vl
+        self.assertTrue(df.apply(lambda x: x.swtc_vl in x.pp_mask,
+                                 axis=1).all())
+        self.assertEqual(df.groupby('run_id').pp_mask.nunique().tolist(),
+                         [2, 2])
+
+        # window function shares add up to one
+        srs_sum = df.groupby(['run_id', 'pp_mask', 'bool_out']
+                             ).pwrw_share_all.sum()
+        np.testing.assert_allclose(srs_sum.values, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the shared filter engine: all backends select the same rows.
+
+"""
+
+import unittest
+
+import os
+import itertools
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from helpers import get_tmp_dir
+from grimsel.auxiliary.filters import Filter
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestFilter(unittest.TestCase):
+    '''
+    A ``node_connect``-like table, written to parquet with several row
+    groups and to a queryable HDF5 table.
+    '''
+
+    dict_filt = {
+        'single': [('nd_id', [0, 2])],
+        'single_str': [('nd', ['ND001', 'ND\'X'])],
+        'multi': [(('nd_id', 'nd_2_id'), [(0, 1), (2, 0)])],
+        'combined': [('mt_id', [0, 5, 11]),
+                     (('nd_id', 'nd_2_id'), [(0, 1), (1, 0), (1, 2)]),
+                     ('ca_id', [0])],
+        'no_match': [(('nd_id', 'nd_2_id'), [(0, 0)])],
+        'empty': [('nd_id', [0, 1]), ('mt_id', [])],
+        'empty_multi': [(('nd_id', 'nd_2_id'), [])],
+        'none': []}
+
+    @classmethod
+    def setUpClass(cls):
+
+        tmp_dir = get_tmp_dir(cls, 'grimsel_test_filters')
+
+        cls.df = pd.DataFrame(list(itertools.product(range(3), range(3),
+                                                     range(2), range(12))),
+                              columns=['nd_id', 'nd_2_id', 'ca_id', 'mt_id'])
+        cls.df = cls.df.loc[cls.df.nd_id != cls.df.nd_2_id]
+        cls.df['nd'] = 'ND00' + cls.df.nd_id.astype(str)
+        cls.df['value'] = np.arange(len(cls.df), dtype=float)
+        cls.df = cls.df.reset_index(drop=True)
+
+        cls.fn_parq = os.path.join(tmp_dir, 'node_connect.parq')
+        cls.df.to_parquet(cls.fn_parq, engine='fastparquet',
+                          row_group_offsets=24, index=False)
+
+        cls.fn_h5 = os.path.join(tmp_dir, 'node_connect.h5')
+        cls.df.to_hdf(cls.fn_h5, 'node_connect', format='table',
+                      data_columns=['nd_id', 'nd_2_id', 'mt_id'])
+
+    def get_expected(self, filt):
+        ''' Row-by-row evaluation of the filter list. '''
+
+        mask = np.ones(len(self.df), dtype=bool)
+        for col, vals in filt:
+            cols = [col] if isinstance(col, str) else list(col)
+            mask &= [tuple(row) in [tuple(np.atleast_1d(val)) for val in vals]
+                     for row in self.df[cols].values.tolist()]
+
+        return self.df.loc[mask]
+
+    def select(self, filt, backend):
+
+        flt = Filter(filt)
+
+        if backend == 'mask':
+            return self.df.loc[flt.mask(self.df)]
+        elif backend == 'apply':
+            return flt.apply(self.df)
+        elif backend == 'sql':
+            df = self.df
+            return duckdb.query('SELECT * FROM df WHERE '
+                                + flt.to_sql()).df()
+        elif backend == 'parquet':
+            df = pd.read_parquet(self.fn_parq, engine='fastparquet',
+                                 filters=flt.to_parquet() or None)
+        elif backend == 'hdf5':
+            df = pd.read_hdf(self.fn_h5, 'node_connect',
+                             where=flt.to_hdf5(['nd_id', 'nd_2_id',
+                                                'mt_id']) or None)
+
+        return flt.apply(df)
+
+    def test_backends(self):
+
+        for (name, filt), backend in itertools.product(
+                self.dict_filt.items(),
+                ['mask', 'apply', 'sql', 'parquet', 'hdf5']):
+
+            df_exp = self.get_expected(filt)
+            df = self.select(filt, backend)
+
+            pd.testing.assert_frame_equal(df.reset_index(drop=True),
+                                          df_exp.reset_index(drop=True),
+                                          check_dtype=False,
+                                          obj='%s/%s'%(name, backend))
+
+        self.assertEqual(len(self.get_expected(self.dict_filt['multi'])), 48)
+        self.assertTrue(self.get_expected(self.dict_filt['empty']).empty)
+
+    def test_pushdown(self):
+        ''' Row group and PyTables predicates select supersets. '''
+
+        flt = Filter(self.dict_filt['combined'])
+
+        self.assertEqual(flt.to_parquet(),
+                         [('mt_id', 'in', [0, 5, 11]),
+                          ('nd_id', 'in', [0, 1]), ('nd_2_id', 'in', [1, 0, 2]),
+                          ('ca_id', 'in', [0])])
+        self.assertEqual(flt.to_hdf5(['nd_id', 'mt_id']),
+                         ['mt_id in [0, 5, 11]', 'nd_id in [0, 1]'])
+
+        df = pd.read_parquet(self.fn_parq, engine='fastparquet',
+                             filters=flt.to_parquet())
+        self.assertLess(len(df), len(self.df))
+        self.assertGreater(len(df), len(flt.apply(df)))
+
+    def test_sql(self):
+
+        self.assertEqual(Filter(self.dict_filt['single_str']).to_sql(),
+                         '(nd IN (\'ND001\', \'ND\'\'X\'))')
+        self.assertEqual(Filter(self.dict_filt['multi']).to_sql(),
+                         '((nd_id, nd_2_id) IN ((0, 1), (2, 0)))')
+        self.assertEqual(Filter(self.dict_filt['empty']).to_sql(),
+                         '(nd_id IN (0, 1)) AND (FALSE)')
+        self.assertEqual(Filter().to_sql(), 'TRUE')
+
+    def test_columns(self):
+
+        flt = Filter(Filter(self.dict_filt['combined']))
+
+        self.assertEqual(flt.columns, ['mt_id', 'nd_id', 'nd_2_id', 'ca_id'])
+        self.assertTrue(flt)
+        self.assertFalse(Filter([]))
+
+
+if __name__ == '__main__':
+    unittest.main()
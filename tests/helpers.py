@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared fixtures of the output tests: a small synthetic model with fixed
+variable values, written to any output target.
+
+"""
+
+import os
+import shutil
+import tempfile
+
+import pyomo.environ as po
+
+import grimsel.core.io as grimsel_io
+from grimsel.auxiliary.synthetic import SyntheticInput
+from grimsel.core.model_loop import ModelLoop
+
+
+def get_tmp_dir(case, prefix='grimsel_test'):
+    '''
+    Creates a temporary directory which is removed after the test.
+
+    Parameters
+    ----------
+    case : unittest.TestCase or TestCase class
+        for test case classes (e.g. in ``setUpClass``) the directory is
+        removed after all tests of the class
+    prefix : str
+        prefix of the directory name
+
+    Returns
+    -------
+    str
+        name of the directory
+
+    '''
+
+    tmp_dir = tempfile.mkdtemp(prefix=prefix)
+
+    if isinstance(case, type):
+        case.addClassCleanup(shutil.rmtree, tmp_dir)
+    else:
+        case.addCleanup(shutil.rmtree, tmp_dir)
+
+    return tmp_dir
+
+
+def build_model(tmp_dir, nodes=2, plants=5, hours=48, nsteps=(),
+                mkwargs=None, input_tables=None, **iokwargs):
+    '''
+    Builds a synthetic model, without output by default.
+
+    All variables are set to 1 instead of solving the model.
+
+    Parameters
+    ----------
+    tmp_dir : str
+        directory of the input data and the default output
+    nodes, plants, hours : int
+        size of the :class:`grimsel.auxiliary.synthetic.SyntheticInput`
+    nsteps : iterable
+        ``nsteps`` of the :class:`grimsel.core.model_loop.ModelLoop`
+    mkwargs : dict
+        additional :class:`grimsel.core.model_base.ModelBase` parameters
+    input_tables : dict
+        ``{table name: DataFrame}`` replacing synthetic input tables, e.g.
+        modified tables of :meth:`SyntheticInput.get_tables`
+    iokwargs :
+        override the default :class:`grimsel.core.io.IO` parameters, e.g.
+        ``no_output=False`` and ``cl_out`` to write an output set with
+        :func:`write_model_runs`
+
+    '''
+
+    syn = SyntheticInput(nodes=nodes, plants=plants, hours=hours)
+    data_path = os.path.join(tmp_dir, 'input')
+    syn.write(data_path)
+
+    for tb, df in (input_tables or {}).items():
+        df.to_csv(os.path.join(data_path, tb + '.csv'), index=False)
+
+    mkwargs = {'tm_filt': syn.get_tm_filt(), **(mkwargs or {})}
+    iokwargs = {'data_path': data_path, 'output_target': 'fastparquet',
+                'cl_out': os.path.join(tmp_dir, 'out_build'),
+                'dev_mode': True, 'no_output': True, **iokwargs}
+    ml = ModelLoop(nsteps=list(nsteps), mkwargs=mkwargs, iokwargs=iokwargs)
+    ml.build_model()
+
+    set_variable_values(ml.m, 1.)
+
+    return ml
+
+
+def set_variable_values(m, value):
+    ''' Sets the values of all model variables. '''
+
+    for comp in m.component_objects(po.Var):
+        for vardata in comp.values():
+            vardata.value = value
+
+
+def write_model_runs(ml, run_ids, **kwargs):
+    '''
+    Writes the output tables and the ``def_run`` rows of model runs.
+
+    Same as :meth:`grimsel.core.model_loop.ModelLoop.perform_model_run`,
+    but with the current variable values instead of solving the model.
+
+    Parameters
+    ----------
+    ml : ModelLoop
+        model loop with output, e.g. from :func:`build_model`
+    run_ids : iterable
+        run_ids of the ``ModelLoop.df_def_run`` table
+    kwargs :
+        passed to :meth:`grimsel.core.model_loop.ModelLoop.append_row`,
+        e.g. ``tdiff_solve`` to mark replaced runs
+
+    '''
+
+    for run_id in run_ids:
+        ml.select_run(run_id)
+        ml.io.write_run(run_id=run_id)
+        ml.append_row(**kwargs)
+
+
+def write_output(m, output_target, cl_out, run_ids=(0,), **iokwargs):
+    '''
+    Writes the model output of one or several run_ids.
+
+    Parameters
+    ----------
+    m : ModelBase
+        model, e.g. from :func:`build_model`
+    output_target : str
+        ``'fastparquet'``, ``'hdf5'``, or ``'duckdb'``
+    cl_out : str
+        output collection
+    run_ids : iterable
+        the same model results are written for each run_id
+    iokwargs :
+        additional :class:`grimsel.core.io.IO` parameters, e.g.
+        ``reduction`` or ``keep``
+
+    Returns
+    -------
+    grimsel.core.io.IO
+
+    '''
+
+    iokwargs = {'output_target': output_target, 'cl_out': cl_out,
+                'dev_mode': True, 'no_output': False, 'resume_loop': False,
+                'model': m, **iokwargs}
+
+    writer = grimsel_io.IO(**iokwargs)
+    writer.init_output_tables()
+
+    for run_id in run_ids:
+        writer.write_run(run_id=run_id)
+
+    return writer
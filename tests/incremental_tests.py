@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the incremental refresh of analysis tables on the file backend.
+
+"""
+
+import unittest
+
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+from helpers import build_model, set_variable_values, write_model_runs
+import grimsel.core.io as grimsel_io
+from grimsel.analysis.file_backend import FileBackend
+from grimsel.analysis.sql_analysis import SqlAnalysis
+from grimsel.analysis.decorators import DecoratorsSqlAnalysis
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class ToyAnalysis(SqlAnalysis):
+
+    list_call = []
+    fail = False
+
+    @DecoratorsSqlAnalysis.incremental(['analysis_toy'])
+    def build_table_toy(self):
+
+        self.list_call.append(list(self.slct_run_id))
+
+        exec_str = ('''
+                    DROP TABLE IF EXISTS {sc_out}.analysis_toy CASCADE;
+                    SELECT run_id, SUM(value) AS value
+                    INTO {sc_out}.analysis_toy
+                    FROM {sc_out}.var_yr_cap_pwr_tot
+                    WHERE run_id IN {in_run_id}
+                    GROUP BY run_id;
+                    ''').format(**self.format_kw)
+        self.aql.exec_sql(exec_str, db=self.db)
+
+        if self.fail:
+            raise RuntimeError('Analysis failed.')
+
+
+class TestIncremental(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp(prefix='grimsel_test_incr')
+        self.cl_out = os.path.join(self.tmp_dir, 'out')
+
+        self.ml = build_model(self.tmp_dir, nsteps=[('swco', 5)],
+                              cl_out=self.cl_out, no_output=False)
+        write_model_runs(self.ml, [0, 1, 2])
+
+        self.backend = FileBackend(self.cl_out, 'fastparquet', 'out_test')
+        self.sqa = ToyAnalysis('out_test', None, backend=self.backend,
+                               incremental=True)
+        self.sqa.list_call = []
+
+    def tearDown(self):
+
+        self.backend.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def read(self):
+
+        df = self.backend.read_sql(None, 'out_test', 'analysis_toy')
+
+        return df.set_index('run_id').value.sort_index()
+
+    def test_new_runs(self):
+
+        self.sqa.build_table_toy()
+        self.assertEqual(self.sqa.list_call, [[0, 1, 2]])
+        srs_0 = self.read()
+
+        # up to date
+        self.sqa.build_table_toy()
+        self.assertEqual(len(self.sqa.list_call), 1)
+
+        write_model_runs(self.ml, [3])
+        self.sqa.build_table_toy()
+
+        self.assertEqual(self.sqa.list_call[1:], [[3]])
+        self.assertEqual(self.read().index.tolist(), [0, 1, 2, 3])
+        pd.testing.assert_series_equal(self.read().loc[[0, 1, 2]], srs_0)
+        self.assertEqual(self.sqa.slct_run_id, [0, 1, 2, 3])
+
+    def test_replaced_run(self):
+
+        self.sqa.build_table_toy()
+        srs_0 = self.read()
+
+        # replace_runs_if_exist: the new def_run row has a new hash
+        self.ml.io.delete_run_id(1, operator='=')
+        set_variable_values(self.ml.m, 2.)
+        write_model_runs(self.ml, [1], tdiff_solve=1.)
+
+        self.sqa.build_table_toy()
+
+        self.assertEqual(self.sqa.list_call[1:], [[1]])
+        self.assertAlmostEqual(self.read()[1], 2 * srs_0[1])
+        pd.testing.assert_series_equal(self.read().loc[[0, 2]],
+                                       srs_0.loc[[0, 2]])
+
+    def test_deleted_run(self):
+
+        self.sqa.build_table_toy()
+
+        # resume_loop=2 deletes run 2 from all tables, including def_run
+        grimsel_io.ModelWriter.reset_parquet_file(self.cl_out, False, 2)
+        self.sqa.build_table_toy()
+
+        self.assertEqual(len(self.sqa.list_call), 1)
+        self.assertEqual(self.read().index.tolist(), [0, 1])
+
+    def test_failure(self):
+
+        self.sqa.build_table_toy()
+        srs_0 = self.read()
+
+        write_model_runs(self.ml, [3])
+        self.sqa.fail = True
+
+        with self.assertRaises(RuntimeError):
+            self.sqa.build_table_toy()
+
+        # the previous table is restored
+        pd.testing.assert_series_equal(self.read(), srs_0)
+        list_tb = self.backend.get_sql_tables('out_test')
+        self.assertNotIn('analysis_toy_prev', list_tb)
+
+        self.sqa.fail = False
+        self.sqa.build_table_toy()
+        self.assertEqual(self.sqa.list_call[-1], [3])
+        self.assertEqual(self.read().index.tolist(), [0, 1, 2, 3])
+
+    def test_worker_files(self):
+        ''' Runs of parallel workers are included before the merge. '''
+
+        self.sqa.build_table_toy()
+
+        df_run = pd.read_parquet(os.path.join(self.cl_out, 'def_run.parq'))
+        write_model_runs(self.ml, [3])
+
+        # same as the run_parallel workers: row of run 3 in a csv file
+        df_run.to_parquet(os.path.join(self.cl_out, 'def_run.parq'),
+                          engine='fastparquet')
+        self.ml._get_row_df_run().to_csv(
+                os.path.join(self.cl_out, 'def_run_ForkPoolWorker-1.csv'),
+                index=False)
+
+        self.sqa.build_table_toy()
+
+        self.assertEqual(self.sqa.list_call[1:], [[3]])
+        self.assertEqual(self.read().index.tolist(), [0, 1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
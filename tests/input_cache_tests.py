@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the parquet cache of the CSV input tables.
+
+"""
+
+import unittest
+from unittest import mock
+
+import os
+import json
+import shutil
+import tempfile
+
+import pandas as pd
+
+from helpers import build_model
+from grimsel.auxiliary import input_cache
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestInputCache(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp(prefix='grimsel_test_inpcache')
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.fn = os.path.join(self.tmp_dir, 'input', 'profdmnd.csv')
+
+        os.makedirs(os.path.dirname(self.fn))
+        self.df = pd.DataFrame({'dmnd_pf_id': [0, 0, 1, 1],
+                                'hy': [0, 1, 0, 1],
+                                'value': [1.5, 2., 3., 4.]})
+        self.df.to_csv(self.fn, index=False)
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def read(self, **kwargs):
+
+        return input_cache.read_table(self.fn, cache_dir=self.cache_dir,
+                                      **kwargs)
+
+    def test_cache_dir(self):
+
+        self.assertIsNone(input_cache.get_cache_dir(False))
+        self.assertEqual(input_cache.get_cache_dir(self.cache_dir),
+                         self.cache_dir)
+
+        with mock.patch.object(input_cache, 'CACHE_DIR',
+                               os.path.join('~', 'cache_grimsel')):
+            self.assertEqual(input_cache.get_cache_dir(True),
+                             os.path.join(os.path.expanduser('~'),
+                                          'cache_grimsel'))
+
+    def test_read(self):
+
+        pd.testing.assert_frame_equal(self.read(), self.df)
+
+        cache_fn, meta_fn = input_cache.get_cache_fn(self.fn, self.cache_dir)
+        self.assertTrue(os.path.isfile(cache_fn))
+        self.assertEqual(os.listdir(os.path.dirname(self.fn)),
+                         ['profdmnd.csv'])
+
+        df = self.read(filt=[('dmnd_pf_id', [1])], columns=['value'])
+        self.assertEqual(df.value.tolist(), [3., 4.])
+
+    def test_no_cache(self):
+
+        df = input_cache.read_table(self.fn)
+
+        pd.testing.assert_frame_equal(df, self.df)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_changed_csv(self):
+
+        self.read()
+
+        df_new = self.df.assign(value=self.df.value * 2)
+        df_new.to_csv(self.fn, index=False)
+
+        pd.testing.assert_frame_equal(self.read(), df_new)
+
+    def test_dtypes(self):
+        ''' Cache files with other column types than the meta are replaced. '''
+
+        self.read()
+
+        cache_fn, meta_fn = input_cache.get_cache_fn(self.fn, self.cache_dir)
+        with open(meta_fn, 'r') as f:
+            self.assertEqual(json.load(f)['dtypes'],
+                             {'dmnd_pf_id': 'int64', 'hy': 'int64',
+                              'value': 'float64'})
+
+        # e.g. cache written by an other pandas version
+        self.df.astype(str).to_parquet(cache_fn, engine='fastparquet',
+                                       index=False)
+
+        pd.testing.assert_frame_equal(self.read(), self.df)
+        self.assertEqual(input_cache._get_parquet_dtypes(cache_fn)['value'],
+                         'float64')
+
+
+class TestModelInputCache(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp(prefix='grimsel_test_inpcache')
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def test_default(self):
+        ''' No files are written to the data path. '''
+
+        ml = build_model(self.tmp_dir)
+        data_path = ml.io.datrd.data_path
+
+        self.assertFalse(ml.io.datrd.input_cache)
+        self.assertTrue(all(fn.endswith('.csv')
+                            for fn in os.listdir(data_path)))
+
+    def test_cache(self):
+
+        m_ref = build_model(os.path.join(self.tmp_dir, 'ref')).m
+        m = build_model(os.path.join(self.tmp_dir, 'cache_model'),
+                        input_cache=self.cache_dir).m
+
+        self.assertTrue(os.listdir(self.cache_dir))
+        for name_df in ['df_def_plant', 'df_plant_encar', 'df_profdmnd']:
+            pd.testing.assert_frame_equal(getattr(m, name_df),
+                                          getattr(m_ref, name_df))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the translation of id columns through compiled lookup arrays.
+
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from grimsel.auxiliary.maps import IdLookup, translate
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestIdLookup(unittest.TestCase):
+
+    def assertReplace(self, srs, dct, **kwargs):
+        ''' Same values and dtype as ``pandas.Series.replace``. '''
+
+        pd.testing.assert_series_equal(translate(srs, dct, **kwargs),
+                                       srs.replace(dct))
+
+    def test_dense(self):
+
+        lookup = IdLookup({0: 'ND000', 1: 'ND001', 3: 'ND003'})
+
+        self.assertIsNotNone(lookup.lookup)
+        self.assertEqual(lookup.translate(np.array([3, 0, 1, 0])).tolist(),
+                         ['ND003', 'ND000', 'ND001', 'ND000'])
+
+    def test_unmapped(self):
+        ''' Ids which are not keys are left unchanged. '''
+
+        srs = pd.Series([0, 2, 1, 7, -1], name='pp_id', index=range(3, 8))
+
+        self.assertReplace(srs, {0: 10, 1: 11})
+        self.assertReplace(srs, {0: 'A', 1: 'B'})
+
+    def test_fallback(self):
+        ''' Sparse and non-integer keys use pandas.Series.map. '''
+
+        dict_case = {'sparse': {0: 5, 10**9: 6},
+                     'negative': {-1: 5, 1: 6},
+                     'float': {0.5: 5, 1: 6},
+                     'str': {'a': 5, 1: 6}}
+
+        for name, dct in dict_case.items():
+
+            self.assertIsNone(IdLookup(dct).lookup, msg=name)
+
+            for srs in [pd.Series([0, 1, 1, 2, -1, 10**9]),
+                        pd.Series([0, 1, 1, 2, -1, 10**9]).iloc[1:4]]:
+                self.assertReplace(srs, dct)
+
+        srs = pd.Series(['a', 'b', 'a'])
+        self.assertReplace(srs, {'a': 'x'})
+        self.assertReplace(srs, {'a': 'x', 'b': 'y'})
+
+    def test_float_column(self):
+        ''' NaN, non-integer, and out-of-range floats are left unchanged. '''
+
+        srs = pd.Series([0., 1., np.nan, 1.5, 2., 100., -1., np.inf])
+
+        self.assertReplace(srs, {0: 10, 1: 11, 2: 12})
+        self.assertReplace(srs, {0: 'A', 1: 'B'})
+        self.assertReplace(srs, {0: 0.25, 2: 2.5})
+
+    def test_object_values(self):
+
+        srs = pd.Series([0, 1, 1, 0], dtype=np.int16)
+        dct = {0: ('ND000', 'EL'), 1: ('ND001', 'EL')}
+
+        result = translate(srs, dct)
+
+        self.assertEqual(result.dtype, object)
+        self.assertEqual(result.tolist(), [dct[key] for key in srs])
+
+    def test_categorical(self):
+
+        srs = pd.Series([2, 0, 2, 1], index=list('abcd'), name='nd_id')
+        result = translate(srs, {0: 'ND000', 1: 'ND001', 2: 'ND002'},
+                           categorical=True)
+
+        self.assertEqual(result.dtype, 'category')
+        self.assertEqual(list(result.cat.categories),
+                         ['ND000', 'ND001', 'ND002'])
+        self.assertEqual(result.tolist(), ['ND002', 'ND000', 'ND002', 'ND001'])
+        self.assertEqual(result.index.tolist(), list('abcd'))
+        self.assertEqual(result.name, 'nd_id')
+
+    def test_dtype(self):
+        ''' Column dtypes are kept if they can hold the values. '''
+
+        for dtype, dct in [('int16', {3: 0, 4: 1}), ('int8', {3: 0, 5: 1}),
+                           ('int16', {3: 70000}), ('int16', {3: -1}),
+                           ('uint8', {3: 200}), ('uint8', {3: -1}),
+                           ('int16', {3: 2.}), ('int16', {3: 0.5}),
+                           ('int64', {3: 0}), ('float32', {3: 0, 4: 1}),
+                           ('int32', {3: 0, 10**9: 1}), ('int32', {3: 'a'})]:
+
+            srs = pd.Series([3, 4, 5], dtype=dtype)
+
+            self.assertEqual(translate(srs, dct).dtype,
+                             srs.replace(dct).dtype, msg=(dtype, dct))
+            self.assertReplace(srs, dct)
+
+        self.assertEqual(translate(np.array([3, 4], dtype=np.int16),
+                                   {3: 0, 4: 1}).dtype, np.int16)
+
+    def test_empty(self):
+
+        srs = pd.Series([0, 1], dtype=np.int16)
+
+        self.assertReplace(srs, {})
+        self.assertReplace(srs.iloc[:0], {0: 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
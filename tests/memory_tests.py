@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the memory report and the lean model mode.
+
+"""
+
+import unittest
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from helpers import build_model, get_tmp_dir
+from grimsel.auxiliary.memory import get_memory_report, get_sizeof
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestGetSizeof(unittest.TestCase):
+
+    def test_shared_objects(self):
+
+        arr = np.zeros(1000)
+        seen = set()
+
+        nbytes_0 = get_sizeof({'a': arr, 'b': arr}, seen)
+        nbytes_1 = get_sizeof([arr], seen)
+
+        self.assertGreater(nbytes_0, arr.nbytes)
+        self.assertLess(nbytes_1, arr.nbytes)
+
+
+class TestLean(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        tmp_dir = get_tmp_dir(cls, 'grimsel_test_lean')
+
+        cls.m = build_model(os.path.join(tmp_dir, 'full')).m
+        cls.m_lean = build_model(os.path.join(tmp_dir, 'lean'),
+                                 mkwargs={'lean': True}).m
+
+    def test_report(self):
+
+        df = get_memory_report(self.m_lean, components=False)
+        df_full = get_memory_report(self.m, components=False)
+
+        self.assertEqual(set(df.kind), {'attribute'})
+        self.assertNotIn('df_profdmnd_soy', df.name.tolist())
+        self.assertLess(df.nbytes.sum(), df_full.nbytes.sum())
+
+        df = get_memory_report(self.m)
+        self.assertEqual(df.set_index('name').loc['pwr', 'kind'], 'component')
+
+    def test_reload(self):
+
+        self.assertNotIn('df_profsupply_soy', vars(self.m_lean))
+
+        pd.testing.assert_frame_equal(self.m_lean.df_profsupply_soy,
+                                      self.m.df_profsupply_soy)
+        self.assertIn('df_profsupply_soy', vars(self.m_lean))
+
+        self.m_lean.release_intermediates(['df_profsupply_soy'])
+        self.assertNotIn('df_profsupply_soy', vars(self.m_lean))
+
+        with self.assertRaises(AttributeError):
+            self.m_lean.df_unknown
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the switching of parameter variants through the ParameterBank.
+
+"""
+
+import unittest
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from grimsel.auxiliary.synthetic import SyntheticInput
+from grimsel.core.model_loop import ModelLoop
+from grimsel.core.parameters import ParameterBank
+from grimsel.core import table_struct
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestParameterBank(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmp_dir = tempfile.mkdtemp(prefix='grimsel_test_bank')
+
+        # monthly factors change the output indices of vc_fl and cap_avlb
+        cls.addClassCleanup(table_struct.DICT_COMP_IDX.update,
+                            dict(table_struct.DICT_COMP_IDX))
+        data_path = os.path.join(cls.tmp_dir, 'input')
+
+        syn = SyntheticInput(nodes=2, plants=5, hours=48)
+        dict_tb = syn.write(data_path)
+
+        # fuel prices: variant yr2016 doubles all prices but one (missing)
+        df = dict_tb['fuel_node_encar']
+        df['vc_fl_yr2016'] = 2 * df.vc_fl
+        df.loc[(df.fl_id == 1) & (df.nd_id == 1), 'vc_fl_yr2016'] = np.nan
+        df.to_csv(os.path.join(data_path, 'fuel_node_encar.csv'), index=False)
+
+        # legacy capacities of the yr2016 variant
+        df = dict_tb['plant_encar']
+        df['cap_pwr_leg_yr2016'] = df.cap_pwr_leg + 1
+        df.to_csv(os.path.join(data_path, 'plant_encar.csv'), index=False)
+
+        # monthly factors of the natural gas price in node 0: January
+        # factor 3 for the yr2016 variant; cap_avlb is monthly if vc_fl is
+        df = pd.DataFrame({'parameter': 'vc_fl', 'mt_id': range(12),
+                           'set_1_name': 'fl_id', 'set_1_id': 0,
+                           'set_2_name': 'nd_id', 'set_2_id': 0,
+                           'mt_fact': 1., 'mt_fact_yr2016': 1.})
+        df.loc[df.mt_id == 0, 'mt_fact_yr2016'] = 3.
+        df = pd.concat([df, df.assign(parameter='cap_avlb',
+                                      set_1_name='pp_id', set_2_name='ca_id',
+                                      mt_fact_yr2016=1.)])
+        df.to_csv(os.path.join(data_path, 'parameter_month.csv'),
+                  index=False)
+
+        mkwargs = {'tm_filt': syn.get_tm_filt()}
+        iokwargs = {'data_path': data_path, 'output_target': 'fastparquet',
+                    'cl_out': os.path.join(cls.tmp_dir, 'out'),
+                    'dev_mode': True, 'no_output': True}
+        ml = ModelLoop(nsteps=[], mkwargs=mkwargs, iokwargs=iokwargs)
+        ml.build_model()
+
+        cls.m = ml.m
+        cls.df_fuel = dict_tb['fuel_node_encar']
+
+    @classmethod
+    def tearDownClass(cls):
+
+        shutil.rmtree(cls.tmp_dir)
+
+    def setUp(self):
+
+        self.bank = ParameterBank(self.m, ['yr2016'])
+
+    def tearDown(self):
+
+        self.m.reset_all_parameters()
+
+    def get_vc_fl(self, mt_id, fl_id, nd_id):
+
+        return self.m.vc_fl[mt_id, fl_id, nd_id].value
+
+    def get_base_vc_fl(self, fl_id, nd_id):
+
+        return self.df_fuel.set_index(['fl_id', 'nd_id']
+                                      ).vc_fl[(fl_id, nd_id)]
+
+    def test_round_trip(self):
+
+        self.assertEqual(set(self.bank.dict_bank), {'vc_fl', 'cap_pwr_leg'})
+
+        cap_0 = {key: par.value for key, par in self.m.cap_pwr_leg.items()}
+
+        self.bank.switch('yr2016')
+        self.assertAlmostEqual(self.get_vc_fl(5, 1, 0),
+                               2 * self.get_base_vc_fl(1, 0))
+        for key, val in cap_0.items():
+            self.assertAlmostEqual(self.m.cap_pwr_leg[key].value, val + 1)
+
+        self.bank.reset()
+        self.assertAlmostEqual(self.get_vc_fl(5, 1, 0),
+                               self.get_base_vc_fl(1, 0))
+        for key, val in cap_0.items():
+            self.assertAlmostEqual(self.m.cap_pwr_leg[key].value, val)
+
+        with self.assertRaises(ValueError):
+            self.bank.switch('yr2030')
+
+    def test_fallback(self):
+
+        self.bank.switch('yr2016')
+
+        self.assertAlmostEqual(self.get_vc_fl(5, 1, 1),
+                               self.get_base_vc_fl(1, 1))
+
+    def test_monthly_factors(self):
+
+        self.bank.switch('yr2016')
+
+        self.assertAlmostEqual(self.get_vc_fl(0, 0, 0),
+                               6 * self.get_base_vc_fl(0, 0))
+        self.assertAlmostEqual(self.get_vc_fl(1, 0, 0),
+                               2 * self.get_base_vc_fl(0, 0))
+
+    def test_external_modification(self):
+        ''' Values modified between switches are re-applied. '''
+
+        self.bank.switch('yr2016')
+        self.m.reset_all_parameters()
+        self.m.cap_pwr_leg[0, 0] = 100
+
+        self.bank.switch('yr2016')
+        self.assertAlmostEqual(self.get_vc_fl(5, 1, 0),
+                               2 * self.get_base_vc_fl(1, 0))
+
+        self.bank.reset()
+        self.assertNotEqual(self.m.cap_pwr_leg[0, 0].value, 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the memory-mapped profile stores.
+
+"""
+
+import unittest
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from helpers import build_model
+from grimsel.auxiliary.profile_store import ProfileStore
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestModelProfileStore(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmp_dir = tempfile.mkdtemp(prefix='grimsel_test_profstore')
+        cls.dir_store = os.path.join(cls.tmp_dir, 'store')
+
+        cls.m_ref = build_model(os.path.join(cls.tmp_dir, 'ref')).m
+        cls.m = build_model(os.path.join(cls.tmp_dir, 'store_model'),
+                            mkwargs={'profile_store': cls.dir_store}).m
+
+    @classmethod
+    def tearDownClass(cls):
+
+        shutil.rmtree(cls.tmp_dir)
+
+    def test_released(self):
+        ''' Only the stores are kept. '''
+
+        self.assertEqual(set(self.m.dict_profile_store),
+                         {'dmnd', 'supply'})
+
+        for itb in self.m.dict_profile_store:
+            self.assertNotIn('df_prof' + itb, self.m.__dict__)
+            self.assertNotIn('df_prof' + itb + '_soy', self.m.__dict__)
+            self.assertIsInstance(self.m.dict_profile_store[itb].values,
+                                  np.memmap)
+
+        self.assertEqual(len(os.listdir(self.dir_store)), 4)
+
+    def test_profiles(self):
+        ''' Profile tables derived from the stores on access. '''
+
+        for name_df, cols in [('df_profdmnd', ['dmnd_pf_id', 'hy']),
+                              ('df_profsupply', ['supply_pf_id', 'hy']),
+                              ('df_profdmnd_soy', ['dmnd_pf_id', 'sy']),
+                              ('df_profsupply_soy', ['supply_pf_id', 'sy'])]:
+
+            df_ref = getattr(self.m_ref, name_df)
+            df = getattr(self.m, name_df)
+
+            df_ref = df_ref.set_index(cols).value.sort_index()
+            df = df.set_index(cols).value.sort_index()
+
+            pd.testing.assert_index_equal(df.index, df_ref.index,
+                                          exact=False)
+            np.testing.assert_allclose(df.values, df_ref.values, rtol=1e-6)
+
+            self.assertNotIn(name_df, self.m.__dict__)
+
+    def test_parameters(self):
+
+        for par in ['dmnd', 'supprof']:
+            dict_ref = getattr(self.m_ref, par).extract_values()
+            dict_par = getattr(self.m, par).extract_values()
+
+            self.assertEqual(set(dict_par), set(dict_ref))
+            np.testing.assert_allclose([dict_par[key] for key in dict_ref],
+                                       list(dict_ref.values()), rtol=1e-6)
+
+
+class TestPrune(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp(prefix='grimsel_test_prune')
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def get_store(self, value, max_gb=None):
+        ''' Returns the file name of the store with constant value. '''
+
+        df = pd.DataFrame({'pf_id': np.repeat([0, 1], 1000),
+                           'hy': np.tile(np.arange(1000), 2),
+                           'value': value})
+
+        list_fn_0 = self.get_files()
+        ProfileStore.from_long_cached(df, ['pf_id'], self.tmp_dir, 'prof',
+                                      max_gb=max_gb)
+
+        return (set(self.get_files()) - set(list_fn_0)).pop()
+
+    def get_files(self):
+
+        return sorted(os.path.join(self.tmp_dir, fn[:-len('.npy')])
+                      for fn in os.listdir(self.tmp_dir)
+                      if fn.endswith('.npy'))
+
+    def test_prune(self):
+
+        list_fn = [self.get_store(value) for value in [1., 2., 3.]]
+
+        # value 1 is the least recently used store
+        t0 = os.path.getmtime(list_fn[0] + '.npy') - 100
+        for ifn, fn in enumerate(list_fn):
+            os.utime(fn + '.npy', (t0 + ifn, t0 + ifn))
+
+        size = sum(os.path.getsize(list_fn[0] + sfx)
+                   for sfx in ('.npy', '.json'))
+        gb = size / 1024**3
+
+        self.assertEqual(ProfileStore.prune(self.tmp_dir, 3 * gb), [])
+        self.assertEqual(ProfileStore.prune(self.tmp_dir, 2.5 * gb),
+                         [list_fn[0]])
+        self.assertEqual(self.get_files(), sorted(list_fn[1:]))
+
+        # re-generated store is kept, value 2 is now the least recent
+        self.assertEqual(self.get_store(1., max_gb=2.5 * gb), list_fn[0])
+        self.assertEqual(self.get_files(), sorted([list_fn[0], list_fn[2]]))
+        self.assertFalse(os.path.isfile(list_fn[1] + '.json'))
+
+    def test_last_use(self):
+        ''' Re-used stores are marked as recently used. '''
+
+        list_fn = [self.get_store(value) for value in [1., 2.]]
+
+        t0 = os.path.getmtime(list_fn[0] + '.npy') - 100
+        for ifn, fn in enumerate(list_fn):
+            os.utime(fn + '.npy', (t0 + ifn, t0 + ifn))
+
+        df = pd.DataFrame({'pf_id': np.repeat([0, 1], 1000),
+                           'hy': np.tile(np.arange(1000), 2),
+                           'value': 1.})
+        ProfileStore.from_long_cached(df, ['pf_id'], self.tmp_dir, 'prof')
+
+        size = sum(os.path.getsize(list_fn[0] + sfx)
+                   for sfx in ('.npy', '.json'))
+
+        self.assertEqual(ProfileStore.prune(self.tmp_dir,
+                                            1.5 * size / 1024**3),
+                         [list_fn[1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
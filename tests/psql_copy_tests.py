@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the PostgreSQL output target. A throwaway PostgreSQL cluster is
+initialized in a temporary directory using the ``initdb`` and ``pg_ctl``
+executables. The tests are skipped if these are not available.
+
+"""
+
+import unittest
+from unittest import mock
+
+import os
+import shutil
+import socket
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+from helpers import get_tmp_dir
+import grimsel.grimsel_config as config
+import grimsel.auxiliary.sqlutils.aux_sql_func as aql
+import grimsel.core.io as grimsel_io
+from grimsel import logger
+logger.setLevel('ERROR')
+
+HAS_POSTGRES = bool(shutil.which('initdb') and shutil.which('pg_ctl'))
+
+DB = 'postgres'
+SC = 'out_test_copy'
+
+
+def _get_free_port():
+
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+
+@unittest.skipIf(not HAS_POSTGRES, 'PostgreSQL executables not found.')
+class PsqlTestCase(unittest.TestCase):
+    '''
+    Runs a PostgreSQL server for the tests of the derived class. Each test
+    starts with an empty ``var_sy_pwr`` table.
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmp_dir = get_tmp_dir(cls, 'grimsel_test_pg')
+        cls.data_dir = os.path.join(cls.tmp_dir, 'data')
+        cls.port = _get_free_port()
+
+        subprocess.run(['initdb', '-D', cls.data_dir, '-U', 'postgres',
+                        '--auth=trust'], check=True,
+                       stdout=subprocess.DEVNULL)
+        opts = "-p %d -k %s -c listen_addresses=localhost"%(cls.port,
+                                                            cls.tmp_dir)
+        subprocess.run(['pg_ctl', '-D', cls.data_dir, '-o', opts, '-w',
+                        '-l', os.path.join(cls.tmp_dir, 'log'), 'start'],
+                       check=True, stdout=subprocess.DEVNULL)
+
+        config.PSQL_USER = 'postgres'
+        config.PSQL_PASSWORD = 'postgres'
+        config.PSQL_HOST = 'localhost'
+        config.PSQL_PORT = cls.port
+
+        cls.sqlc = aql.SqlConnector(DB)
+
+    @classmethod
+    def tearDownClass(cls):
+
+        cls.sqlc.get_pg_con_cur()[0].close()
+        aql.close_pools()
+        subprocess.run(['pg_ctl', '-D', cls.data_dir, '-m', 'immediate',
+                        'stop'], check=True, stdout=subprocess.DEVNULL)
+
+    def setUp(self):
+
+        aql.reset_schema(SC, DB, warn=False)
+
+        cols = [('sy', 'INTEGER'), ('pp_id', 'SMALLINT'),
+                ('ca_id', 'SMALLINT'), ('bool_out', 'BOOLEAN'),
+                ('value', 'DOUBLE PRECISION'), ('run_id', 'SMALLINT')]
+        aql.init_table('var_sy_pwr', cols, SC, db=DB)
+
+        self.df = pd.DataFrame({'sy': np.arange(100),
+                                'pp_id': np.arange(100) % 4,
+                                'ca_id': 0,
+                                'bool_out': np.arange(100) % 2 == 0,
+                                'value': np.linspace(0, 1, 100),
+                                'run_id': 3})
+        self.coltypes = dict(cols)
+
+    def _fill(self):
+
+        aql.copy_from_df(self.df, SC, 'var_sy_pwr',
+                         self.sqlc.get_pg_con_cur(), commit=True)
+
+    def _read(self):
+
+        exec_str = 'SELECT * FROM %s.var_sy_pwr ORDER BY sy'%SC
+        df = pd.DataFrame(aql.exec_sql(exec_str, db=DB),
+                          columns=self.df.columns)
+        return df.astype(self.df.dtypes.to_dict())
+
+
+class TestPsqlCopy(PsqlTestCase):
+
+    def test_copy_csv(self):
+
+        aql.copy_from_df(self.df, SC, 'var_sy_pwr',
+                         self.sqlc.get_pg_con_cur(), fmt='csv', commit=True)
+
+        pd.testing.assert_frame_equal(self._read(), self.df)
+
+    def test_copy_binary(self):
+
+        aql.copy_from_df(self.df, SC, 'var_sy_pwr',
+                         self.sqlc.get_pg_con_cur(), fmt='binary',
+                         coltypes=self.coltypes, commit=True)
+
+        pd.testing.assert_frame_equal(self._read(), self.df)
+
+    def test_copy_uncommitted(self):
+
+        conn, cur = self.sqlc.get_pg_con_cur()
+        aql.copy_from_df(self.df, SC, 'var_sy_pwr', (conn, cur),
+                         fmt='binary', coltypes=self.coltypes)
+        conn.rollback()
+
+        self.assertEqual(len(self._read()), 0)
+
+    def test_post_process_index(self):
+
+        modwr = grimsel_io.ModelWriter(output_target='psql', cl_out=SC,
+                                       sql_connector=self.sqlc,
+                                       resume_loop=True, keep=['pwr'])
+
+        self._fill()
+
+        modwr.finalize_output_tables()
+
+        exec_str = ('''
+                    SELECT kcu.column_name
+                    FROM information_schema.table_constraints tc
+                    JOIN information_schema.key_column_usage kcu
+                    ON tc.constraint_name = kcu.constraint_name
+                    WHERE tc.table_schema = '{sc}'
+                    AND tc.table_name = 'var_sy_pwr'
+                    AND tc.constraint_type = 'PRIMARY KEY'
+                    ''').format(sc=SC)
+        pk = {c[0] for c in aql.exec_sql(exec_str, db=DB)}
+
+        self.assertEqual(pk, {'sy', 'pp_id', 'ca_id', 'bool_out', 'run_id'})
+
+    def test_append_sql(self):
+
+        df = pd.DataFrame({'run_id': [0], 'swvr_vl': ['yr2015']})
+
+        # first row creates the table
+        aql.append_sql(df, DB, SC, 'def_run')
+        self.assertEqual(list(aql.get_sql_cols('def_run', SC, db=DB)),
+                         ['run_id', 'swvr_vl'])
+
+        # further rows are copied; the catalog cache is kept
+        aql.get_sql_cols('var_sy_pwr', SC, db=DB)
+        dict_catalog = dict(aql._dict_catalog)
+        aql.append_sql(df.assign(run_id=1), DB, SC, 'def_run')
+        self.assertEqual(aql._dict_catalog, dict_catalog)
+
+        # new columns are added
+        aql.append_sql(df.assign(run_id=2, swtc_vl='x'), DB, SC, 'def_run')
+        self.assertIn('swtc_vl', aql.get_sql_cols('def_run', SC, db=DB))
+
+        exec_str = 'SELECT run_id, swtc_vl FROM %s.def_run ORDER BY run_id'%SC
+        self.assertEqual(aql.exec_sql(exec_str, db=DB),
+                         [(0, None), (1, None), (2, 'x')])
+
+
+class TestPsqlPool(PsqlTestCase):
+
+    def test_pool_reuse(self):
+        ''' exec_sql and read_sql share the pooled connection. '''
+
+        self._fill()
+
+        pool = aql.get_pool(DB)
+        self.assertIs(aql.get_pool(DB), pool)
+
+        aql.exec_sql('SELECT 1', db=DB)
+        self.assertEqual(len(pool._pool), 1)
+        conn = pool._pool[0]
+
+        df = aql.read_sql(DB, SC, 'var_sy_pwr', keep=['sy', 'value'])
+        aql.exec_sql('SELECT 1', db=DB)
+
+        self.assertEqual(len(df), len(self.df))
+        self.assertEqual(pool._pool, [conn])
+        self.assertEqual(pool._used, {})
+        self.assertIs(aql.get_pool(DB), pool)
+        self.assertEqual([key[0] for key in aql._dict_pool], [os.getpid()])
+
+    @unittest.skipIf(not hasattr(os, 'fork'), 'os.fork not available.')
+    def test_fork(self):
+        '''
+        Forked children open their own connections; the parent's pooled
+        connection remains usable.
+        '''
+
+        pool = aql.get_pool(DB)
+        aql.exec_sql('SELECT 1', db=DB)
+        conn = pool._pool[0]
+
+        pid = os.fork()
+        if pid == 0:
+            is_ok = False
+            try:
+                pool_child = aql.get_pool(DB)
+                result = aql.exec_sql('SELECT 2', db=DB)
+                is_ok = (pool_child is not pool and result == [(2,)]
+                         and pool_child._pool[0] is not conn)
+                aql.close_pools()
+            finally:
+                os._exit(0 if is_ok else 1)
+
+        self.assertEqual(os.waitpid(pid, 0)[1], 0)
+        self.assertEqual(aql.exec_sql('SELECT 3', db=DB), [(3,)])
+        self.assertEqual(pool._pool, [conn])
+
+
+class TestPsqlRead(PsqlTestCase):
+
+    def setUp(self):
+
+        super().setUp()
+        self._fill()
+
+    def test_chunks(self):
+        ''' Chunks of the server-side cursor add up to the full table. '''
+
+        list_df = list(aql.read_sql(DB, SC, 'var_sy_pwr', chunksize=30))
+
+        self.assertEqual([len(df) for df in list_df], [30, 30, 30, 10])
+        df = pd.concat(list_df).sort_values('sy').reset_index(drop=True)
+        pd.testing.assert_frame_equal(df.astype(self.df.dtypes.to_dict()),
+                                      self.df)
+
+        list_df = list(aql.read_sql(DB, SC, 'var_sy_pwr', chunksize=50,
+                                    filt=[('pp_id', [0, 1])],
+                                    keep=['sy', 'value'], drop='sy'))
+        self.assertEqual([len(df) for df in list_df], [50])
+        self.assertEqual(list(list_df[0].columns), ['value'])
+        self.assertAlmostEqual(list_df[0].value.sum(),
+                               self.df.loc[self.df.pp_id < 2].value.sum())
+
+    def test_chunks_partial(self):
+        ''' Partially consumed iterators return their connection. '''
+
+        iter_df = aql.read_sql(DB, SC, 'var_sy_pwr', chunksize=10)
+        self.assertEqual(len(next(iter_df)), 10)
+        iter_df.close()
+
+        self.assertEqual(aql.get_pool(DB)._used, {})
+        self.assertEqual(len(self._read()), len(self.df))
+
+    def test_limit_0(self):
+        ''' Schema probes return empty DataFrames with the columns. '''
+
+        for kwargs, cols in [({}, list(self.df.columns)),
+                             ({'keep': ['sy', 'value']}, ['sy', 'value']),
+                             ({'drop': 'run_id'}, list(self.df.columns[:-1]))]:
+
+            df = aql.read_sql(DB, SC, 'var_sy_pwr', limit=0, **kwargs)
+
+            self.assertTrue(df.empty, msg=kwargs)
+            self.assertEqual(list(df.columns), cols, msg=kwargs)
+
+        list_df = list(aql.read_sql(DB, SC, 'var_sy_pwr', limit=0,
+                                    chunksize=10))
+        self.assertEqual(len(list_df), 1)
+        self.assertEqual(list(list_df[0].columns), list(self.df.columns))
+        self.assertEqual(len(aql.read_sql(DB, SC, 'var_sy_pwr', limit=7)), 7)
+
+    @unittest.skipIf(aql.pa is None, 'pyarrow not available.')
+    def test_arrow(self):
+
+        df = aql.read_sql(DB, SC, 'var_sy_pwr', keep=['sy', 'value'])
+        table = aql.read_sql(DB, SC, 'var_sy_pwr', keep=['sy', 'value'],
+                             output='arrow')
+
+        self.assertIsInstance(table, aql.pa.Table)
+        self.assertEqual(table.column_names, ['sy', 'value'])
+        pd.testing.assert_frame_equal(table.to_pandas(), df)
+
+        list_batch = list(aql.read_sql(DB, SC, 'var_sy_pwr', chunksize=40,
+                                       output='arrow'))
+        self.assertTrue(all(isinstance(batch, aql.pa.RecordBatch)
+                            for batch in list_batch))
+        self.assertEqual([batch.num_rows for batch in list_batch],
+                         [40, 40, 20])
+        table = aql.pa.Table.from_batches(list_batch)
+        self.assertAlmostEqual(sum(table.column('value').to_pylist()),
+                               self.df.value.sum())
+
+
+class TestReadSqlArgs(unittest.TestCase):
+    ''' Invalid arguments are rejected before connecting. '''
+
+    def test_invalid(self):
+
+        with self.assertRaises(ValueError):
+            aql.read_sql(DB, SC, 'var_sy_pwr', output='polars')
+
+        with self.assertRaises(ValueError):
+            aql.read_sql(DB, SC, 'var_sy_pwr', chunksize=10, copy='out_copy')
+
+
+class TestCatalogCache(unittest.TestCase):
+
+    def tearDown(self):
+
+        aql.clear_catalog_cache()
+
+    def test_invalidate(self):
+
+        for kind, key in [('cols', (SC, 'def_run')),
+                          ('cols', (SC, 'var_sy_pwr')),
+                          ('cols', ('public', 'def_run')),
+                          ('tables', (SC,)), ('tables', ('public',)),
+                          ('coldict', (SC,))]:
+            aql._cached_catalog(kind, (os.getpid(), DB) + key, lambda: [])
+
+        aql.invalidate_catalog_cache(SC, 'def_run')
+
+        self.assertEqual({key[:1] + key[3:] for key in aql._dict_catalog},
+                         {('cols', SC, 'var_sy_pwr'),
+                          ('cols', 'public', 'def_run'),
+                          ('tables', 'public')})
+
+    def test_ttl(self):
+        ''' Cached results are re-queried after CATALOG_TTL seconds. '''
+
+        func = mock.Mock(side_effect=[['def_run'], ['def_run', 'def_node']])
+        key = (os.getpid(), DB, SC)
+
+        with mock.patch.object(aql.time, 'monotonic') as monotonic:
+            for t, result in [(100, ['def_run']),
+                              (100 + aql.CATALOG_TTL - 1, ['def_run']),
+                              (100 + aql.CATALOG_TTL + 1,
+                               ['def_run', 'def_node']),
+                              (100 + aql.CATALOG_TTL + 2,
+                               ['def_run', 'def_node'])]:
+                monotonic.return_value = t
+                self.assertEqual(aql._cached_catalog('tables', key, func),
+                                 result, msg=t)
+
+        self.assertEqual(func.call_count, 2)
+
+    @unittest.skipIf(not hasattr(os, 'fork'), 'os.fork not available.')
+    def test_reset_after_fork(self):
+        ''' Pools, engines, and catalog entries are not inherited. '''
+
+        key = (os.getpid(), 'dbname=postgres')
+        aql._dict_pool[key] = aql._dict_engine[key] = object()
+        aql._cached_catalog('tables', key + (SC,), lambda: [])
+
+        try:
+            pid = os.fork()
+            if pid == 0:
+                os._exit(int(bool(aql._dict_pool or aql._dict_engine
+                                  or aql._dict_catalog)))
+
+            self.assertEqual(os.waitpid(pid, 0)[1], 0)
+            self.assertIn(key, aql._dict_pool)
+            self.assertEqual(len(aql._dict_catalog), 1)
+
+            aql._reset_after_fork()
+            self.assertEqual(aql._dict_pool, {})
+            self.assertEqual(aql._dict_engine, {})
+            self.assertEqual(aql._dict_catalog, {})
+        finally:
+            aql._dict_pool.pop(key, None)
+            aql._dict_engine.pop(key, None)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the reduction of output tables written by several CompIO
+instances.
+
+"""
+
+import unittest
+from unittest import mock
+
+import os
+
+import pandas as pd
+
+from helpers import build_model, get_tmp_dir, write_output
+from grimsel.core.io import CompIO, VariabIO
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class ReductionTests():
+    '''
+    Common methods; the model has 2 nodes and the output values of all
+    variables are 1 unless modified by the test class.
+    '''
+
+    mkwargs = None
+    hours = 48
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.tmp_dir = get_tmp_dir(cls, 'grimsel_test_reduction')
+        cls.ml = build_model(cls.tmp_dir, hours=cls.hours,
+                             mkwargs=cls.mkwargs)
+
+    def read(self, name, reduction, tb='var_sy_pwr', keep=('pwr',)):
+        '''
+        Writes the output set ``name`` and reads the table ``tb``.
+        '''
+
+        cl_out = os.path.join(self.tmp_dir, name)
+        write_output(self.ml.m, 'fastparquet', cl_out, reduction=reduction,
+                     keep=list(keep))
+
+        return pd.read_parquet(os.path.join(cl_out, tb + '_0000.parq'))
+
+    def add_tm_soy(self, df):
+        ''' Adds the time slot weights and aggregation columns. '''
+
+        m = self.ml.m
+
+        return m._add_tm_columns(df).merge(m.df_tm_soy, on=['tm_id', 'sy'])
+
+
+class TestReduction(ReductionTests, unittest.TestCase):
+    '''
+    Two weeks of hourly time slots; power and storage energy values vary
+    by time slot.
+    '''
+
+    hours = 24 * 14
+
+    @classmethod
+    def setUpClass(cls):
+
+        super().setUpClass()
+
+        m = cls.ml.m
+        for (sy, pp, ca), var in m.pwr.items():
+            var.value = 1 + sy % 5 + pp
+        for (sy, pp, ca), var in m.erg_st.items():
+            var.value = sy
+
+    def test_shared_table(self):
+        ''' pwr, pwr_st_ch, demand, and transmission rows are combined. '''
+
+        keep = ['pwr', 'pwr_st_ch', 'dmnd', 'trm']
+        df_full = self.read('out_shared_full', {'var_sy_pwr':
+                                                {'time': 'mt_id'}}, keep=keep)
+
+        # rows of all writers: plants, demand, and transmission pp_ids
+        set_pp = set(self.ml.m.setlst['ppall'])
+        self.assertTrue(set(df_full.pp_id) - set_pp)
+        self.assertEqual(set(df_full.bool_out), {True, False})
+
+        df = self.read('out_shared', {'var_sy_pwr': {'time': 'mt_id',
+                                                     'cols': ['bool_out']}},
+                       keep=keep)
+
+        self.assertFalse(df.duplicated(['mt_id', 'bool_out']).any())
+
+        df_exp = df_full.groupby(['mt_id', 'bool_out'], as_index=False
+                                 ).value.sum()
+        pd.testing.assert_frame_equal(
+                df.sort_values(['mt_id', 'bool_out'])
+                  [['mt_id', 'bool_out', 'value']].reset_index(drop=True),
+                df_exp.astype(df[['mt_id', 'bool_out', 'value']].dtypes),
+                check_dtype=False)
+
+    def test_filt_node(self):
+        ''' ``nd_id`` filters of tables with ``pp_id`` column. '''
+
+        df_full = self.read('out_filt_full', None)
+        df = self.read('out_filt_node', {'var_sy_pwr':
+                                         {'filt': {'nd_id': [1]}}})
+
+        dict_pp_nd = self.ml.m.mps.dict_plant_2_node_id
+        pp_id = [pp for pp in df_full.pp_id.unique() if dict_pp_nd[pp] == 1]
+
+        self.assertTrue(pp_id)
+        self.assertEqual(set(df.pp_id), set(pp_id))
+        pd.testing.assert_frame_equal(
+                df, df_full.loc[df_full.pp_id.isin(pp_id)]
+                           .reset_index(drop=True))
+
+    def test_filt_callable(self):
+
+        df_full = self.read('out_filt_cl_full', None)
+        pp_id = df_full.pp_id.iloc[0]
+
+        df = self.read('out_filt_cl', {'var_sy_pwr':
+                                       {'filt': {'sy': lambda sy: sy < 10,
+                                                 'pp_id': [pp_id]}}})
+
+        self.assertEqual(sorted(df.sy), list(range(10)))
+        pd.testing.assert_frame_equal(
+                df, df_full.loc[(df_full.sy < 10) & (df_full.pp_id == pp_id)]
+                           .reset_index(drop=True))
+
+    def test_filt_unknown(self):
+
+        with self.assertRaises(ValueError):
+            self.read('out_filt_unknown', {'var_sy_erg_st':
+                                           {'filt': {'fl_id': [0]}}},
+                      tb='var_sy_erg_st', keep=['erg_st'])
+
+    def test_time_week(self):
+        ''' Weekly mean and weighted sum of the storage energy. '''
+
+        df_full = self.add_tm_soy(self.read('out_wk_full', None,
+                                            tb='var_sy_erg_st',
+                                            keep=['erg_st']))
+        self.assertEqual(sorted(df_full.wk_id.unique()), [0, 1, 2])
+
+        idx = ['wk_id', 'pp_id', 'ca_id']
+        for agg in ['sum', 'mean']:
+            df = self.read('out_wk_%s'%agg,
+                           {'var_sy_erg_st': {'time': 'wk_id', 'agg': agg}},
+                           tb='var_sy_erg_st', keep=['erg_st'])
+
+            df_exp = df_full.groupby(idx).value.agg(agg)
+            pd.testing.assert_series_equal(
+                    df.set_index(idx).value.sort_index(), df_exp,
+                    check_index_type=False)
+
+    def test_time_custom(self):
+        ''' Custom daily buckets. '''
+
+        m = self.ml.m
+        df_day = m.df_tm_soy[['tm_id', 'sy']].assign(
+                                        day=lambda x: x.sy // 24)
+
+        df_full = self.read('out_day_full', None)
+        df = self.read('out_day', {'var_sy_pwr': {'time': df_day,
+                                                  'cols': ['pp_id']}})
+
+        self.assertEqual(df.columns.tolist(), ['day', 'pp_id', 'value',
+                                                'run_id'])
+        self.assertEqual(sorted(df.day.unique()), list(range(14)))
+
+        df_exp = (df_full.assign(day=df_full.sy // 24)
+                         .groupby(['day', 'pp_id']).value.sum())
+        pd.testing.assert_series_equal(
+                df.set_index(['day', 'pp_id']).value.sort_index(), df_exp,
+                check_index_type=False)
+
+    def test_agg_invalid(self):
+        ''' Invalid ``agg`` values are rejected before any aggregation. '''
+
+        m = self.ml.m
+        comp = VariabIO('var_sy_pwr', None, m.pwr, ('sy', 'pp_id', 'ca_id'),
+                        None, 'fastparquet', model=m)
+        df = comp.to_df()
+
+        with mock.patch.object(CompIO, '_aggregate_time') as aggregate_time:
+            with self.assertRaises(ValueError):
+                comp.reduce(df, {'time': 'mt_id', 'agg': 'max'})
+
+        aggregate_time.assert_not_called()
+
+
+class TestReductionWeights(ReductionTests, unittest.TestCase):
+    '''
+    Two-hour time slots: sums are weighted by the slot length.
+    '''
+
+    mkwargs = {'nhours': 2}
+
+    def test_weights(self):
+
+        df_full = self.read('out_nh2_full', None)
+        self.assertEqual(len(df_full.sy.unique()), 24)
+
+        for agg, value in [('sum', 48.), ('mean', 1.)]:
+            df = self.read('out_nh2_%s'%agg,
+                           {'var_sy_pwr': {'time': 'mt_id', 'agg': agg,
+                                           'cols': ['pp_id']}})
+
+            self.assertEqual(sorted(df.pp_id), sorted(df_full.pp_id.unique()))
+            self.assertEqual(df.value.unique().tolist(), [value])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the lazy multi-run result reader.
+
+"""
+
+import unittest
+from unittest import mock
+
+import os
+
+import pandas as pd
+
+from helpers import (build_model, get_tmp_dir, set_variable_values,
+                     write_model_runs)
+from grimsel.analysis.result_store import ResultStore
+from grimsel.auxiliary.filters import Filter
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class ResultStoreTests():
+    '''
+    Tests of all output targets. The output set holds three model runs with
+    the variable values ``run_id + 1``.
+    '''
+
+    output_target = None
+    fn_out = None
+
+    @classmethod
+    def setUpClass(cls):
+
+        tmp_dir = get_tmp_dir(cls, 'grimsel_test_rs')
+        cl_out = os.path.join(tmp_dir, cls.fn_out)
+
+        ml = build_model(tmp_dir, nsteps=[('swco', 3)], cl_out=cl_out,
+                         output_target=cls.output_target, no_output=False)
+
+        for run_id in range(3):
+            set_variable_values(ml.m, run_id + 1.)
+            write_model_runs(ml, [run_id])
+
+        cls.store = ResultStore(cl_out, cls.output_target)
+
+    def get_pp_id(self, key, name):
+        ''' Plant ids of a node, plant type, or fuel. '''
+
+        maps = self.store.maps
+        dict_pp = getattr(maps, {'nd': 'dict_plant_2_node_id',
+                                 'pt': 'dict_plant_2_pp_type_id',
+                                 'fl': 'dict_plant_2_fuel_id'}[key])
+        val_id = getattr(maps, 'dict_%s_id'%key)[name]
+
+        return [pp_id for pp_id, pp_val_id in dict_pp.items()
+                if pp_val_id == val_id]
+
+    def test_select_where(self):
+
+        tb = self.store['var_yr_erg_fl_yr']
+        df = (tb.select(['pp_id', 'value', 'run_id'])
+                .where(nd='ND000', pt='GAS_NEW', run_id=[1, 2])
+                .to_pandas())
+
+        df_all = tb.to_pandas()
+        pp_id = self.get_pp_id('pt', 'GAS_NEW')
+        df_exp = df_all.loc[df_all.pp_id.isin(pp_id)
+                            & (df_all.nd_id == 0)
+                            & df_all.run_id.isin([1, 2]),
+                            ['pp_id', 'value', 'run_id']]
+
+        self.assertEqual(len(df), 2)
+        self.assertEqual(list(df.columns), ['pp_id', 'value', 'run_id'])
+        self.assertEqual(sorted(df.run_id.unique()), [1, 2])
+        pd.testing.assert_frame_equal(df, df_exp.reset_index(drop=True),
+                                      check_dtype=False)
+
+    def test_run_parameter_filter(self):
+
+        df = (self.store['var_yr_cap_pwr_tot'].where(swco_id=[0, 2])
+                                              .to_pandas())
+
+        self.assertEqual(sorted(df.run_id.unique()), [0, 2])
+        self.assertEqual(sorted(df.value.unique()), [1., 3.])
+
+    def test_unknown_name(self):
+
+        with self.assertRaises(ValueError):
+            self.store['var_sy_pwr'].where(nd='FR0')
+
+
+class TestResultStoreParquet(ResultStoreTests, unittest.TestCase):
+
+    output_target = 'fastparquet'
+    fn_out = 'out'
+
+    def test_chunks(self):
+        ''' Each per-run file is read separately. '''
+
+        list_len = [len(df) for df
+                    in self.store['var_sy_erg_st'].where(run_id=[0, 1])
+                                                  .iter_chunks(64)]
+
+        self.assertEqual(list_len, [64, 32, 64, 32])
+
+
+class TestResultStoreHdf5(ResultStoreTests, unittest.TestCase):
+
+    output_target = 'hdf5'
+    fn_out = 'out.h5'
+
+    def test_to_hdf5(self):
+
+        flt = Filter([('run_id', [1, 2]), ('pp_id', [3]), ('sy', [5])])
+
+        self.assertEqual(flt.to_hdf5(), ['run_id in [1, 2]',
+                                         'pp_id in [3]', 'sy in [5]'])
+        self.assertEqual(flt.to_hdf5(['sy', 'run_id']),
+                         ['run_id in [1, 2]', 'sy in [5]'])
+        self.assertEqual(Filter().to_hdf5(), [])
+
+    def test_where_pushdown(self):
+        ''' Filters are applied by the PyTables query. '''
+
+        pp_id_nd = self.get_pp_id('nd', 'ND001')
+        pp_id_pt = self.get_pp_id('pt', 'WIND')
+
+        with mock.patch.object(pd.HDFStore, 'select', autospec=True,
+                               side_effect=pd.HDFStore.select) as select:
+            df = (self.store['var_sy_pwr'].where(nd='ND001', pt='WIND',
+                                                 run_id=0)
+                                          .to_pandas())
+
+        select.assert_called_once()
+        self.assertEqual(select.call_args[1]['where'],
+                         ['pp_id in %s'%pp_id_nd, 'pp_id in %s'%pp_id_pt,
+                          'run_id in [0]'])
+
+        pp_id = set(pp_id_nd) & set(pp_id_pt)
+        self.assertEqual(len(pp_id), 1)
+        self.assertEqual(len(df), 48)
+        self.assertEqual(set(df.pp_id), pp_id)
+        self.assertEqual(df.run_id.unique().tolist(), [0])
+
+    def test_chunks(self):
+
+        list_df = list(self.store['var_sy_pwr'].where(run_id=[0, 1])
+                                               .iter_chunks(500))
+
+        self.assertEqual([len(df) for df in list_df], [500, 500, 500, 36])
+        self.assertEqual(sorted(pd.concat(list_df).run_id.unique()), [0, 1])
+
+
+class TestResultStoreDuckDB(ResultStoreTests, unittest.TestCase):
+
+    output_target = 'duckdb'
+    fn_out = 'out.duckdb'
+
+    def test_chunks(self):
+
+        tb = self.store['var_sy_pwr'].where(run_id=[0, 1])
+        list_df = list(tb.iter_chunks(500))
+
+        self.assertEqual([len(df) for df in list_df], [500, 500, 500, 36])
+        pd.testing.assert_frame_equal(
+                pd.concat(list_df, ignore_index=True), tb.to_pandas(),
+                check_dtype=False)
+
+    def test_chunks_exact(self):
+        ''' No trailing empty chunk if the rows fill the last chunk. '''
+
+        list_len = [len(df) for df
+                    in self.store['var_sy_pwr'].where(run_id=0)
+                                               .iter_chunks(384)]
+
+        self.assertEqual(list_len, [384, 384])
+
+    def test_chunks_empty(self):
+
+        list_df = list(self.store['var_sy_pwr'].select(['sy', 'value'])
+                                               .where(run_id=5)
+                                               .iter_chunks(500))
+
+        self.assertEqual(len(list_df), 1)
+        self.assertTrue(list_df[0].empty)
+        self.assertEqual(list(list_df[0].columns), ['sy', 'value'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the parsing of CPLEX solution files into arrays.
+
+"""
+
+import unittest
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pyomo.environ as po
+
+from grimsel.core.solution import parse_cplex_solution, SolutionArrays
+
+# CPLEX solution file of the model from get_model
+SOLUTION_XML = '''<?xml version = "1.0" encoding="UTF-8" standalone="yes"?>
+<CPLEXSolution version="1.2">
+ <header
+   problemName="model.lp"
+   objectiveValue="5"
+   solutionTypeValue="1"
+   solutionTypeString="basic"
+   solutionStatusValue="1"
+   solutionStatusString="optimal"
+   solutionMethodString="dual"
+   primalFeasible="1"
+   dualFeasible="1"
+   simplexIterations="2"
+   writeLevel="1"/>
+ <linearConstraints>
+  <constraint name="c_l_c(1)_" index="0" status="BS" slack="-1" dual="0"/>
+  <constraint name="c_l_c(2)_" index="1" status="LL" slack="0" dual="2"/>
+  <constraint name="r_l_r_" index="2" status="LL" slack="0" dual="1"/>
+  <constraint name="r_u_r_" index="3" status="BS" slack="4" dual="0"/>
+  <constraint name="c_e_e_" index="4" status="LL" slack="0" dual="0"/>
+  <constraint name="c_e_ONE_VAR_CONSTANT" index="5" status="LL" slack="0" dual="0"/>
+ </linearConstraints>
+ <variables>
+  <variable name="x(1)" index="0" status="BS" value="2" reducedCost="0"/>
+  <variable name="x(2)" index="1" status="LL" value="2" reducedCost="0"/>
+  <variable name="y" index="2" status="BS" value="-1" reducedCost="0"/>
+  <variable name="ONE_VAR_CONSTANT" index="3" status="BS" value="1" reducedCost="0"/>
+ </variables>
+</CPLEXSolution>
+'''
+
+
+def get_model():
+    ''' Model matching the solution file ``SOLUTION_XML``. '''
+
+    m = po.ConcreteModel()
+    m.s = po.Set(initialize=[1, 2])
+    m.x = po.Var(m.s, bounds=(0, 10))
+    m.y = po.Var()
+    m.z = po.Var()
+    m.z.fix(4)
+    m.c = po.Constraint(m.s, rule=lambda m, i: m.x[i] >= i)
+    m.r = po.Constraint(expr=(1, m.x[1] + m.y, 5))
+    m.e = po.Constraint(expr=m.y + m.z == 3)
+    m.obj = po.Objective(expr=m.x[1] + 2 * m.x[2] + m.y)
+    m.dual = po.Suffix(direction=po.Suffix.IMPORT)
+
+    return m
+
+
+class TestSolution(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp(prefix='grimsel_test_solution')
+        self.fn_solution = os.path.join(self.tmp_dir, 'model.sol')
+        with open(self.fn_solution, 'w') as f:
+            f.write(SOLUTION_XML)
+
+        self.m = get_model()
+
+        _, smap_id = self.m.write(os.path.join(self.tmp_dir, 'model.lp'),
+                                  io_options={'symbolic_solver_labels':
+                                              True})
+        self.symbol_map = self.m.solutions.symbol_map[smap_id]
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def test_parse(self):
+
+        sol = parse_cplex_solution(self.fn_solution)
+
+        self.assertEqual(sol['header']['objectiveValue'], '5')
+        self.assertEqual(sol['var_names'].tolist(), ['x(1)', 'x(2)', 'y'])
+        np.testing.assert_array_equal(sol['var_values'], [2, 2, -1])
+
+        # LP prefixes removed; range constraint r with the non-zero dual
+        self.assertEqual(sol['con_names'].tolist(),
+                         ['c(1)', 'c(2)', 'r', 'e'])
+        np.testing.assert_array_equal(sol['con_duals'], [0, 2, 1, 0])
+
+    def test_symbol_map(self):
+
+        sol = SolutionArrays(parse_cplex_solution(self.fn_solution),
+                             self.symbol_map)
+        m = self.m
+
+        # fixed variable z isn't part of the LP problem
+        np.testing.assert_array_equal(
+                sol.get_variable_values([m.y, m.x[2], m.z, m.x[1]]),
+                [-1, 2, 4, 2])
+        np.testing.assert_array_equal(
+                sol.get_dual_values([m.r, m.c[2], m.e]), [1, 2, 0])
+        self.assertEqual(sol.objective_value, 5)
+
+    def test_missing(self):
+        ''' Solution without variables and constraints. '''
+
+        sol_data = {'header': {},
+                    'var_names': np.array([], dtype=object),
+                    'var_values': np.array([], dtype=float),
+                    'con_names': np.array([], dtype=object),
+                    'con_duals': np.array([], dtype=float)}
+        sol = SolutionArrays(sol_data, self.symbol_map)
+
+        np.testing.assert_array_equal(
+                sol.get_variable_values([self.m.z, self.m.y]), [4, np.nan])
+        np.testing.assert_array_equal(sol.get_dual_values([self.m.e]),
+                                      [np.nan])
+        self.assertEqual(len(sol.get_variable_values([])), 0)
+
+    def test_load(self):
+
+        sol = SolutionArrays(parse_cplex_solution(self.fn_solution),
+                             self.symbol_map)
+        sol.load(self.m)
+
+        self.assertTrue(sol.is_loaded)
+        self.assertEqual([self.m.x[1].value, self.m.x[2].value,
+                          self.m.y.value], [2, 2, -1])
+        self.assertEqual(self.m.dual[self.m.c[2]], 2)
+        self.assertEqual(self.m.dual[self.m.r], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the solver log parsers and the solver phase timing.
+
+"""
+
+import unittest
+
+import time
+
+import numpy as np
+
+import grimsel.core.solver_log as solver_log
+
+
+LOG_CPLEX_SIMPLEX = '''
+CPLEX> Tried aggregator 1 time.
+LP Presolve eliminated 1204 rows and 803 columns.
+Reduced LP has 5120 rows, 7002 columns, and 20188 nonzeros.
+Presolve time = 0.02 sec. (8.61 ticks)
+
+Iteration log . . .
+Iteration:     1   Dual objective     =             0.000000
+Iteration:  1523   Dual objective     =        123456.789000
+
+Dual simplex - Optimal:  Objective =  1.2345678900e+05
+Solution time =    0.35 sec.  Iterations = 2741 (12)
+Deterministic time = 120.50 ticks  (344.29 ticks/sec)
+'''
+
+LOG_CPLEX_BARRIER = '''
+Tried aggregator 2 times.
+LP Presolve eliminated 10 rows and 20 columns.
+Aggregator did 5 substitutions.
+Presolve time = 0.10 sec. (30.00 ticks)
+Number of nonzeros in lower triangle of A*A' = 12345
+Total time for automatic ordering = 0.01 sec. (1.20 ticks)
+Iter      Primal Obj          Dual Obj  Prim Inf Upper Inf  Dual Inf
+  24   1.2345678e+05   1.2345678e+05  1.0e-09  0.0e+00  1.0e-10
+Barrier time = 1.20 sec. (400.00 ticks)
+
+Dual crossover.
+  Dual:  Fixing 120 variables.
+Total crossover time = 0.30 sec. (50.00 ticks)
+
+Barrier - Optimal:  Objective =  1.2345678000e+05
+Solution time =    1.70 sec.  Barrier iterations = 25
+'''
+
+LOG_GUROBI = '''
+Optimize a model with 6324 rows, 7805 columns and 24012 nonzeros
+Presolve removed 1500 rows and 900 columns
+Presolve time: 0.05s
+Presolved: 4824 rows, 6905 columns, 19000 nonzeros
+
+Barrier statistics:
+ AA' NZ     : 2.100e+04
+Barrier solved model in 21 iterations and 0.80 seconds
+Optimal objective 1.23456780e+05
+
+Crossover log...
+
+     350 DPushes remaining with DInf 0.0000000e+00         0s
+
+    4210 PPushes remaining with PInf 0.0000000e+00         1s
+
+Solved with barrier
+Solved in 3021 iterations and 1.10 seconds
+Optimal objective  1.234567800e+05
+'''
+
+LOG_GLPK = '''
+GLPSOL: GLPK LP/MIP Solver, v4.65
+Reading problem data from '/tmp/tmp.pyomo.lp'...
+6324 rows, 7805 columns, 24012 non-zeros
+GLPK Simplex Optimizer, v4.65
+6323 rows, 7804 columns, 24011 non-zeros
+Preprocessing...
+5100 rows, 7000 columns, 20000 non-zeros
+Scaling...
+*     0: obj =   0.000000000e+00 inf =   1.000e+03 (100)
+*  3012: obj =   1.234567800e+05 inf =   0.000e+00 (0) 12
+OPTIMAL LP SOLUTION FOUND
+Time used:   0.4 secs
+Memory used: 12.3 Mb (12898765 bytes)
+'''
+
+LOG_CBC = '''
+Welcome to the CBC MILP Solver
+Presolve 4321 (-2003) rows, 6500 (-1305) columns and 18000 (-6012) elements
+Perturbing problem by 0.001% of 1234.5678 - largest nonzero change 0.0001
+0  Obj 0 Primal inf 1000 (100)
+2890  Obj 123456.78
+Optimal - objective value 123456.78
+After Postsolve, objective 123456.78, infeasibilities - dual 0 (0), primal 0 (0)
+Optimal objective 123456.78 - 2890 iterations time 0.512, Presolve 0.03
+Total time (CPU seconds):       0.55   (Wallclock seconds):       0.56
+'''
+
+
+class TestParseLog(unittest.TestCase):
+
+    def assertStats(self, dict_stats, dict_exp):
+
+        for key, val in dict_exp.items():
+            if isinstance(val, str):
+                self.assertEqual(dict_stats[key], val, key)
+            elif np.isnan(val):
+                self.assertTrue(np.isnan(dict_stats[key]), key)
+            else:
+                self.assertAlmostEqual(dict_stats[key], val, msg=key)
+
+    def test_cplex(self):
+
+        self.assertStats(solver_log.parse_log('cplex', LOG_CPLEX_SIMPLEX),
+                         {'algorithm': 'dual simplex',
+                          'presolve_rows_removed': 1204,
+                          'presolve_cols_removed': 803,
+                          'presolve_time': 0.02,
+                          'iterations_simplex': 2741,
+                          'iterations_barrier': np.nan,
+                          'crossover_time': np.nan,
+                          'solver_time': 0.35})
+
+        self.assertStats(solver_log.parse_log('cplexdirect', LOG_CPLEX_BARRIER),
+                         {'algorithm': 'barrier',
+                          'presolve_rows_removed': 10,
+                          'iterations_simplex': np.nan,
+                          'iterations_barrier': 25,
+                          'crossover_time': 0.3,
+                          'solver_time': 1.7})
+
+    def test_gurobi(self):
+
+        self.assertStats(solver_log.parse_log('gurobi', LOG_GUROBI),
+                         {'algorithm': 'barrier',
+                          'presolve_rows_removed': 1500,
+                          'presolve_cols_removed': 900,
+                          'presolve_time': 0.05,
+                          'iterations_simplex': 3000,
+                          'iterations_barrier': 21,
+                          'crossover_time': 0.3,
+                          'solver_time': 1.1})
+
+    def test_glpk(self):
+
+        self.assertStats(solver_log.parse_log('glpk', LOG_GLPK),
+                         {'algorithm': 'simplex',
+                          'presolve_rows_removed': 1223,
+                          'presolve_cols_removed': 804,
+                          'iterations_simplex': 3012,
+                          'iterations_barrier': np.nan,
+                          'solver_time': 0.4})
+
+    def test_cbc(self):
+
+        self.assertStats(solver_log.parse_log('cbc', LOG_CBC),
+                         {'algorithm': 'simplex',
+                          'presolve_rows_removed': 2003,
+                          'presolve_cols_removed': 1305,
+                          'presolve_time': 0.03,
+                          'iterations_simplex': 2890,
+                          'solver_time': 0.56})
+
+    def test_unknown(self):
+
+        dict_stats = solver_log.parse_log('highs', LOG_CBC)
+        self.assertEqual(dict_stats['algorithm'], '')
+        self.assertTrue(np.isnan(dict_stats['iterations_simplex']))
+
+
+class _DummySolver():
+
+    name = 'glpk'
+
+    def _presolve(self):
+        time.sleep(0.02)
+
+    def _apply_solver(self):
+        time.sleep(0.05)
+        self._log = LOG_GLPK
+
+    def solve(self):
+        self._presolve()
+        self._apply_solver()
+        time.sleep(0.01)
+
+
+class TestRunStats(unittest.TestCase):
+
+    def test_run_stats(self):
+
+        solver = _DummySolver()
+
+        with solver_log.time_solver_phases(solver) as dict_tdiff:
+            solver.solve()
+
+        self.assertNotIn('_presolve', vars(solver))
+
+        dict_stats = solver_log.get_run_stats(solver, dict_tdiff)
+
+        self.assertEqual(list(dict_stats), solver_log.LIST_STATS)
+        self.assertEqual(dict_stats['solver'], 'glpk')
+        self.assertEqual(dict_stats['iterations_simplex'], 3012)
+        self.assertGreaterEqual(dict_stats['tdiff_write_lp'], 0.02)
+        self.assertGreaterEqual(dict_stats['tdiff_solver'], 0.05)
+        self.assertGreaterEqual(dict_stats['tdiff_read_solution'], 0.01)
+        self.assertLess(dict_stats['tdiff_read_solution'], 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the concurrent reading of the input tables.
+
+"""
+
+import unittest
+from unittest import mock
+
+import os
+import threading
+
+import pandas as pd
+
+from helpers import build_model, get_tmp_dir
+import grimsel.core.io as grimsel_io
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestTableReader(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        tmp_dir = get_tmp_dir(cls, 'grimsel_test_tbrd')
+
+        cls.dict_m, cls.dict_tbrd, cls.dict_threads = {}, {}, {}
+        for input_workers in [1, 8]:
+
+            list_tbrd, list_threads = [], []
+
+            def df_from_dict(self, dct):
+                list_tbrd.append(self)
+                return df_from_dict_orig(self, dct)
+
+            def read_table(self, table, filt):
+                list_threads.append(threading.current_thread().name)
+                return read_table_orig(self, table, filt)
+
+            df_from_dict_orig = grimsel_io.TableReader.df_from_dict
+            read_table_orig = grimsel_io.TableReader._read_table
+            with mock.patch.multiple(grimsel_io.TableReader,
+                                     df_from_dict=df_from_dict,
+                                     _read_table=read_table):
+                ml = build_model(os.path.join(tmp_dir, str(input_workers)),
+                                 input_workers=input_workers)
+
+            cls.dict_m[input_workers] = ml.m
+            cls.dict_tbrd[input_workers] = list_tbrd[0]
+            cls.dict_threads[input_workers] = list_threads
+
+    def test_identical(self):
+        ''' Same model attributes from sequential and concurrent reading. '''
+
+        m_1, m_8 = self.dict_m[1], self.dict_m[8]
+
+        list_df = [name for name, val in vars(m_1).items()
+                   if name.startswith('df_')
+                   and (val is None or isinstance(val, pd.DataFrame))]
+        self.assertIn('df_profdmnd', list_df)
+
+        for name in list_df:
+            df_1, df_8 = getattr(m_1, name), getattr(m_8, name)
+
+            if df_1 is None:
+                self.assertIsNone(df_8, msg=name)
+            else:
+                pd.testing.assert_frame_equal(df_1, df_8, obj=name)
+
+    def test_threads(self):
+        ''' Stages with several tables are read by the thread pool. '''
+
+        main_name = threading.main_thread().name
+        list_1, list_8 = self.dict_threads[1], self.dict_threads[8]
+
+        self.assertEqual(set(list_1), {main_name})
+        self.assertTrue(any(name.startswith('TableReader')
+                            for name in list_8))
+        self.assertTrue(all(name.startswith('TableReader')
+                            or name == main_name for name in list_8))
+        self.assertEqual(len(list_1), len(list_8))
+
+    def test_read_stats(self):
+        ''' Read time and number of rows of each existing table. '''
+
+        for input_workers, tbrd in self.dict_tbrd.items():
+
+            m = self.dict_m[input_workers]
+            stats = tbrd.dict_read_stats
+
+            self.assertIn('def_plant', stats)
+            self.assertNotIn('def_week', stats)
+            self.assertIsNone(m.df_def_week)
+
+            for table, (t_read, nrows, source_str) in stats.items():
+                self.assertGreaterEqual(t_read, 0)
+                self.assertIsInstance(source_str, str)
+
+            # tables which are not modified after reading
+            for table in ['def_node', 'profdmnd', 'node_connect']:
+                self.assertEqual(stats[table][1],
+                                 len(getattr(m, 'df_' + table)), msg=table)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the time slot maps of connected nodes with different time
+resolutions.
+
+"""
+
+import unittest
+
+import pandas as pd
+from pyomo.repn import generate_standard_repn
+
+from helpers import build_model, get_tmp_dir
+from grimsel.auxiliary.timemap import TimeMap
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestTimeMapConnect(unittest.TestCase):
+    '''
+    Three nodes connected in a ring ``ND000 -> ND001 -> ND002 -> ND000``
+    with time slots of 1, 2, and 3 hours. The 2-hour and 3-hour slots of
+    ``ND001`` and ``ND002`` are not nested.
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+
+        tmp_dir = get_tmp_dir(cls, 'grimsel_test_tmcnn')
+        nhours = {'ND000': 1, 'ND001': 2, 'ND002': 3}
+
+        with cls().assertLogs('grimsel.core.model_base', 'WARNING') as cm:
+            cls.m = build_model(tmp_dir, nodes=3,
+                                mkwargs={'nhours': nhours}).m
+
+        cls.log_output = cm.output
+
+    def get_map_sysy_ref(self, nd, nd_2):
+        '''
+        Set-based slot map ``sy -> {sy2}`` of the original implementation.
+        '''
+
+        m = self.m
+        (freq, nhours), (freq_2, nhours_2) = (m._dict_nd_tm[nd],
+                                              m._dict_nd_tm[nd_2])
+
+        dict_tm = {}
+        for col, nh in [('sy', nhours), ('sy2', nhours_2)]:
+            tm = TimeMap(tm_filt=m.tm_filt, minimum=True,
+                         freq=min(freq, freq_2), nhours=nh)
+            dict_tm[col] = tm.df_hoy_soy.rename(columns={'sy': col})
+
+        df = pd.merge(dict_tm['sy'], dict_tm['sy2'], on='hy')
+
+        return df.groupby('sy').sy2.apply(set).to_dict()
+
+    def test_dict_sysy(self):
+
+        m = self.m
+
+        list_ndnd = list(m.df_node_connect[['nd_id', 'nd_2_id']]
+                          .itertuples(index=False, name=None))
+        list_ndnd += [ndnd[::-1] for ndnd in list_ndnd]
+
+        self.assertEqual(set(m.dict_sysy), set(list_ndnd))
+        self.assertEqual(len(m.dict_sysy), 6)
+
+        for nd, nd_2 in list_ndnd:
+
+            indptr, indices = m.dict_sysy[nd, nd_2]
+            dict_ref = self.get_map_sysy_ref(nd, nd_2)
+
+            self.assertEqual(len(indptr), len(dict_ref) + 1)
+            for sy, set_sy2 in dict_ref.items():
+                sy = int(sy)
+                self.assertEqual(set(indices[indptr[sy]:indptr[sy + 1]]),
+                                 set_sy2, msg=(nd, nd_2, sy))
+
+    def test_overlap_not_nested(self):
+        ''' 2-hour and 3-hour slots overlap partially. '''
+
+        m = self.m
+        indptr, indices = m.dict_sysy[1, 2]
+
+        self.assertEqual(indices[indptr[1]:indptr[2]].tolist(), [0, 1])
+        self.assertEqual(indices[indptr[2]:indptr[3]].tolist(), [1])
+
+        indptr, indices = m.dict_sysy[2, 1]
+        self.assertEqual(indices[indptr[0]:indptr[1]].tolist(), [0, 1])
+
+    def test_warning(self):
+        ''' Only the time maps of ``ND001`` and ``ND002`` are not nested. '''
+
+        list_msg = [msg for msg in self.log_output if 'not nested' in msg]
+
+        self.assertEqual(len(list_msg), 1)
+        self.assertIn('Time slots of time maps 1 and 2 are not nested',
+                      list_msg[0])
+
+    def test_symin(self):
+
+        m = self.m
+        df = m.df_symin_ndcnn
+
+        self.assertFalse(df.duplicated().any())
+
+        dict_nhours = {nd: frnh[1] for nd, frnh in m._dict_nd_tm.items()}
+        for (nd, nd_2), df_ndnd in df.groupby(['nd_id', 'nd_2_id']):
+
+            nd_min = min((nd, nd_2), key=dict_nhours.get)
+            self.assertEqual(df_ndnd.tm_min_id.unique().tolist(),
+                             [m.dict_nd_tm_id[nd_min]])
+            self.assertEqual(sorted(df_ndnd.symin),
+                             list(range(48 // dict_nhours[nd_min])))
+
+    def test_supply_transmission(self):
+        '''
+        Transmission terms of the supply constraints follow the slot maps.
+        '''
+
+        m = self.m
+
+        for (sy, nd, ca), constr in m.supply.items():
+
+            repn = generate_standard_repn(constr.body)
+            dict_coef = {var.index(): coef for var, coef
+                         in zip(repn.linear_vars, repn.linear_coefs)
+                         if var.parent_component() is m.trm}
+
+            dict_exp = {}
+            for nd_1, nd_2, sign in [(nd, (nd + 1) % 3, -1),
+                                     ((nd - 1) % 3, nd, 1)]:
+
+                nd_other = nd_2 if nd_1 == nd else nd_1
+                weight = m.nd_weight[nd_1 if sign == -1 else nd_2].value
+
+                if m.is_min_node[nd, nd_other]:
+                    list_sy = [sy]
+                else:
+                    list_sy = self.get_map_sysy_ref(nd, nd_other)[sy]
+
+                dict_exp.update({(sy_2, nd_1, nd_2, ca):
+                                 sign / len(list_sy) / weight
+                                 for sy_2 in list_sy})
+
+            self.assertEqual(set(dict_coef), set(dict_exp))
+            for key, coef in dict_coef.items():
+                self.assertAlmostEqual(coef, dict_exp[key])
+
+
+if __name__ == '__main__':
+    unittest.main()
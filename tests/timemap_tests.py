@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the generation and the on-disk cache of the time maps.
+
+"""
+
+import unittest
+from unittest import mock
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from helpers import get_tmp_dir
+from grimsel.auxiliary import timemap
+from grimsel.auxiliary.timemap import TimeMap
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+def get_reference(nhours=1, freq=1, start='2015-1-1 00:00',
+                  stop='2015-12-31 23:59', tm_filt=False, minimum=False):
+    '''
+    Time map tables from the pandas datetime accessors.
+
+    Same as the original (non-vectorized) ``gen_hoy_timemap`` and
+    ``gen_soy_timemap``, except that the non-numeric columns of
+    ``df_time_red`` are taken from the first row of each time slot.
+
+    Returns
+    -------
+    tuple
+        ``(df_time_map, df_hoy_soy, df_time_red)``
+
+    '''
+
+    dt = pd.Series(pd.date_range(start, stop, freq='%sH'%freq))
+
+    df = pd.DataFrame({'hour': dt.dt.hour, 'doy': dt.dt.dayofyear,
+                       'mt_id': dt.dt.month - 1, 'day': dt.dt.day,
+                       'year': dt.dt.year, 'dow': dt.dt.weekday})
+    df['how'] = df.dow * 24 + df.hour
+    df['hom'] = (df.day - 1) * 24 + df.hour
+    df['wk_id'] = dt.dt.isocalendar().week.astype(np.int64) - 1
+    df['wk_weight'] = df.groupby('wk_id').hour.transform(len)
+    df['hy'] = df.hour + 24 * (df.doy - 1) + dt.dt.minute / 60
+    df = df.loc[~((df.mt_id == 1) & (df.day == 29))].reset_index(drop=True)
+
+    if not minimum:
+        df['month'] = df.mt_id + 1
+        df['mt'] = df.mt_id.map(timemap.MONTH_DICT)
+        df['season'] = df.mt.map(timemap.SEASON_DICT)
+        df['wk'] = df.wk_id
+        df['dow_name'] = df.dow.map(timemap.DOW_DICT)
+        df['dow_type'] = df.dow.map(timemap.DOW_TYPE_DICT)
+
+        # week of the month: weeks by median month, relative to the last
+        # week of the previous month
+        wk_mt = df.groupby('wk_id').mt_id.median()
+        wk_max = wk_mt.reset_index().groupby('mt_id').wk_id.max() + 1
+        wk_max.index = wk_max.index + 1
+        df['wom'] = df.wk_id - wk_mt.map(wk_max).fillna(0)[df.wk_id].values
+
+        ndays = df.groupby(['year', 'mt_id']).day.nunique().rename('ndays')
+        df = df.join(ndays, on=['year', 'mt_id'])
+
+    if tm_filt:
+        for col, vals in tm_filt:
+            df = df.loc[df[col].isin(vals)]
+        df = df.reset_index(drop=True)
+
+    df['sy'] = (np.arange(len(df)) // int(round(nhours / freq))
+                ).astype(np.float64)
+
+    # weight only in the reduced table
+    df_w = df.assign(weight=df.groupby('sy').hy.transform(len) * freq)
+
+    df_hoy_soy = df[['sy', 'hy']]
+
+    if nhours == freq:
+        return df, df_hoy_soy, df_w
+
+    df_num = df_w.select_dtypes(include=['integer', 'floating'])
+    col_nonnum = [c for c in df_w.columns if not c in df_num.columns]
+
+    df_red = df_num.pivot_table(aggfunc=min, index=['year', 'sy'])
+    df_red = df_red.join(df_w.groupby(['year', 'sy'])[col_nonnum].first())
+
+    return df, df_hoy_soy, df_red.reset_index()
+
+
+class TestTimeMap(unittest.TestCase):
+
+    def setUp(self):
+
+        patch_dict = mock.patch.dict(timemap.TM_DICT, clear=True)
+        patch_dict.start()
+        self.addCleanup(patch_dict.stop)
+
+    def assertTimeMap(self, tm, list_df_exp):
+
+        for df, df_exp in zip([tm.df_time_map, tm.df_hoy_soy,
+                               tm.df_time_red], list_df_exp):
+            pd.testing.assert_frame_equal(df, df_exp, check_dtype=False)
+
+    def test_hourly(self):
+
+        tm = TimeMap(nhours=1, freq=1)
+
+        self.assertEqual(len(tm.df_time_red), 8760)
+        self.assertEqual(tm.df_time_map.wom.min(), 0)
+        self.assertTimeMap(tm, get_reference())
+
+    def test_multi_year(self):
+        ''' 15 minutes, three years including February 29. '''
+
+        kwargs = dict(nhours=2, freq=0.25, start='2015-1-1 00:00',
+                      stop='2017-12-31 23:59', minimum=True)
+        tm = TimeMap(**kwargs)
+        list_df_exp = get_reference(**kwargs)
+
+        self.assertTimeMap(tm, list_df_exp)
+
+        # one row per year and time slot
+        df_red = tm.df_time_red
+        self.assertEqual(len(df_red), 3 * 4380)
+        self.assertFalse(df_red.duplicated(['year', 'sy']).any())
+        self.assertEqual(df_red.weight.unique().tolist(), [2])
+
+    def test_filter(self):
+
+        kwargs = dict(nhours=3, freq=1,
+                      tm_filt=[('mt_id', [0, 6]), ('dow', [0, 5])])
+        tm = TimeMap(**kwargs)
+
+        self.assertTimeMap(tm, get_reference(**kwargs))
+        self.assertEqual(set(tm.df_time_red.mt), {'JAN', 'JUL'})
+        self.assertAlmostEqual(tm.get_year_share(),
+                               len(tm.df_time_map) / 8760)
+
+    @unittest.skipIf(os.environ.get('GRIMSEL_TIMEMAP_CACHE'),
+                     'TimeMap cache enabled through environment variable.')
+    def test_no_cache(self):
+        ''' The on-disk cache is opt-in. '''
+
+        self.assertIsNone(timemap.TM_CACHE_DIR)
+
+        with mock.patch.object(timemap, '_write_cache') as write_cache:
+            TimeMap(nhours=2, freq=1)
+
+        write_cache.assert_not_called()
+
+    def test_empty_filter(self):
+
+        with self.assertRaises(RuntimeError):
+            TimeMap(tm_filt=[('mt_id', [12])])
+
+
+class TestTimeMapCache(unittest.TestCase):
+
+    def setUp(self):
+
+        self.cache_dir = get_tmp_dir(self, 'grimsel_test_tmcache')
+
+        for patch in [mock.patch.dict(timemap.TM_DICT, clear=True),
+                      mock.patch.object(timemap, 'TM_CACHE_DIR',
+                                        self.cache_dir)]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_round_trip(self):
+
+        kwargs = dict(nhours=2, freq=1, tm_filt=[('mt_id', [1])])
+        tm = TimeMap(**kwargs)
+
+        list_fn = os.listdir(self.cache_dir)
+        self.assertEqual(len(list_fn), 1)
+        self.assertTrue(list_fn[0].startswith('tm_%015x'%hash(tm)))
+
+        # new process: empty module dict
+        timemap.TM_DICT.clear()
+        with mock.patch.object(TimeMap, 'gen_soy_timemap') as gen:
+            tm_cache = TimeMap(**kwargs)
+
+        gen.assert_not_called()
+        self.assertIsNot(tm_cache, tm)
+        for name_df in ['df_time_map', 'df_hoy_soy', 'df_time_red']:
+            pd.testing.assert_frame_equal(getattr(tm_cache, name_df),
+                                          getattr(tm, name_df))
+        self.assertIs(TimeMap(**kwargs), tm_cache)
+
+    def test_invalid(self):
+        ''' Cache files of other pandas versions are regenerated. '''
+
+        kwargs = dict(nhours=2, freq=1, tm_filt=[('mt_id', [1])])
+        TimeMap(**kwargs)
+        timemap.TM_DICT.clear()
+
+        with mock.patch.object(pd, '__version__', '0.0.0'):
+            tm = TimeMap(**kwargs)
+
+        self.assertFalse(tm.df_time_red.empty)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
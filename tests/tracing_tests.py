@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the span tracing of parallel model runs.
+
+"""
+
+import unittest
+
+import os
+import json
+import time
+import functools
+from multiprocessing import Pool
+
+from helpers import get_tmp_dir
+import grimsel.auxiliary.tracing as tracing
+import grimsel.auxiliary.multiproc as multiproc
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+def _run_model(run_id):
+
+    @tracing.traced('solve')
+    def solve():
+        time.sleep(0.01)
+
+    with tracing.span('write', tb='var_sy_pwr'):
+        solve()
+
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+
+        self.trace_dir = get_tmp_dir(self, 'grimsel_test_trace')
+
+    def tearDown(self):
+
+        tracing.stop(merge=False)
+
+    def test_disabled(self):
+
+        self.assertFalse(tracing.is_enabled())
+        _run_model(0)
+        self.assertEqual(os.listdir(self.trace_dir), [])
+
+    def test_parallel(self):
+
+        tracing.start(self.trace_dir, profile=True)
+
+        p = Pool(2, initializer=tracing.init_worker,
+                 initargs=(self.trace_dir, True, time.time()))
+        p.map(functools.partial(multiproc._call_run_id, _run_model),
+              range(4))
+        p.close()
+        p.join()
+
+        fn = tracing.stop()
+
+        with open(fn, 'r') as f:
+            list_event = json.load(f)['traceEvents']
+
+        list_span = [event for event in list_event if event['ph'] == 'X']
+        list_name = [event['name'] for event in list_span]
+
+        self.assertEqual(sorted(name for name in list_name
+                                if name.startswith('run_id')),
+                         ['run_id %d'%run_id for run_id in range(4)])
+        self.assertEqual(list_name.count('solve'), 4)
+        self.assertGreaterEqual(list_name.count('Pool.fork'), 1)
+
+        # nested spans of the same process are enclosed by the run span
+        dict_run = {event['args']['run_id']: event for event in list_span
+                    if event['name'].startswith('run_id')}
+        for event in list_span:
+            if event['name'] == 'write':
+                self.assertTrue(any(run['pid'] == event['pid']
+                                    and run['ts'] <= event['ts']
+                                    and (event['ts'] + event['dur']
+                                         <= run['ts'] + run['dur'])
+                                    for run in dict_run.values()))
+
+        self.assertEqual(sorted(fn for fn in os.listdir(self.trace_dir)
+                                if fn.endswith('.prof')),
+                         ['profile_run_id_%04d.prof'%run_id
+                          for run_id in range(4)])
+        self.assertFalse([fn for fn in os.listdir(self.trace_dir)
+                          if fn.endswith('.jsonl')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the aggregation of the inter-node transmission output.
+
+"""
+
+import unittest
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from helpers import build_model, get_tmp_dir
+from grimsel import logger
+logger.setLevel('ERROR')
+
+
+class TestAggregateNd2(unittest.TestCase):
+    '''
+    Three nodes connected in a ring ``ND000 -> ND001 -> ND002 -> ND000``
+    with time slots of 1, 2, and 4 hours and different node weights.
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+
+        tmp_dir = get_tmp_dir(cls, 'grimsel_test_trm')
+        nhours = {'ND000': 1, 'ND001': 2, 'ND002': 4}
+
+        ml = build_model(tmp_dir, nodes=3, mkwargs={'nhours': nhours},
+                         cl_out=os.path.join(tmp_dir, 'out'),
+                         no_output=False)
+        cls.m = ml.m
+        cls.trm_io = ml.io.modwr.dict_comp_obj['trm']
+
+        for nd, weight in {0: 1., 1: 2., 2: 0.5}.items():
+            cls.m.nd_weight[nd] = weight
+
+        # imports, exports, and zero transmission
+        rng = np.random.RandomState(0)
+        for var in cls.m.trm.values():
+            var.value = rng.choice([-2., -1., 0., 1., 3.]) * rng.rand()
+
+    def get_reference(self, dfall):
+        '''
+        Original implementation: averages the transmission of the node with
+        the higher time resolution by groups of ``nhours / nhours_2`` slots.
+        '''
+
+        m = self.m
+
+        dfall = pd.concat([dfall,
+                           dfall.assign(nd_2_id=dfall.nd_id,
+                                        nd_id=dfall.nd_2_id,
+                                        value=-dfall.value)])
+
+        dict_nhours = {nd: frnh[1] for nd, frnh in m._dict_nd_tm.items()}
+
+        def avg_to_nhours(x):
+
+            if m.is_min_node[x.name]:
+                return x.reset_index(drop=True)
+            else:  # reduce time resolution
+                nhours = dict_nhours[x.name[0]]
+                nhours_2 = dict_nhours[x.nd_2_id.iloc[0]]
+
+                x = x.sort_values('sy')
+                x['sy'] = np.repeat(np.arange(
+                                    np.ceil(len(x) / (nhours / nhours_2))),
+                                    nhours / nhours_2)
+
+                idx = [c for c in x.columns if not c == 'value']
+                x = x.pivot_table(index=idx, values='value', aggfunc=np.mean)
+                return x.reset_index()
+
+        dfall = (dfall.groupby(['nd_id', 'nd_2_id'], as_index=True)
+                      .apply(avg_to_nhours)
+                      .reset_index(drop=True))
+
+        dfexp = dfall.loc[dfall.value > 0]
+        dfexp = dfexp.groupby(['sy', 'nd_id', 'ca_id'])['value'].sum()
+        dfexp = dfexp.reset_index().assign(bool_out=True)
+
+        dfimp = dfall.loc[dfall.value < 0]
+        dfimp = dfimp.groupby(['sy', 'nd_id', 'ca_id'])['value'].sum()
+        dfimp = dfimp.reset_index().assign(bool_out=False)
+
+        dfagg = pd.concat([dfexp, dfimp], axis=0)
+
+        dict_nd_weight = {key: m.nd_weight[key].value for key in m.nd_weight}
+        dfagg['value'] /= dfagg.nd_id.map(dict_nd_weight)
+
+        return dfagg
+
+    def sort(self, df):
+
+        cols = ['bool_out', 'sy', 'nd_id', 'ca_id', 'value']
+        df = df[cols].astype({'sy': float, 'nd_id': int, 'ca_id': int})
+
+        return df.sort_values(cols[:-1]).reset_index(drop=True)
+
+    def test_aggregate_nd2(self):
+
+        df = self.trm_io.to_df()
+
+        dfagg = self.trm_io.aggregate_nd2(df.copy())
+        df_exp = self.get_reference(df)
+
+        pd.testing.assert_frame_equal(self.sort(dfagg), self.sort(df_exp))
+
+    def test_time_resolution(self):
+        ''' Each node's output is in its own time slots. '''
+
+        dfagg = self.trm_io.aggregate_nd2(self.trm_io.to_df())
+        dict_nsy = dfagg.groupby('nd_id').sy.max().to_dict()
+
+        self.assertEqual(dict_nsy, {0: 47, 1: 23, 2: 11})
+
+    def test_signs(self):
+        ''' Exports are positive, imports negative. '''
+
+        df = self.trm_io.to_df()
+        dfagg = self.trm_io.aggregate_nd2(df.copy())
+
+        self.assertTrue((dfagg.loc[dfagg.bool_out, 'value'] > 0).all())
+        self.assertTrue((dfagg.loc[~dfagg.bool_out, 'value'] < 0).all())
+
+        # ND000 has the highest time resolution: no averaging; exports are
+        # the positive flows to ND001 and the negative flows from ND002
+        val_exp = pd.concat([df.loc[df.nd_id == 0, ['sy', 'value']],
+                             df.loc[df.nd_2_id == 0, ['sy', 'value']]
+                               .assign(value=lambda x: -x.value)])
+        val_exp = val_exp.loc[val_exp.value > 0].groupby('sy').value.sum()
+        df_agg_nd = dfagg.loc[(dfagg.nd_id == 0) & dfagg.bool_out]
+
+        pd.testing.assert_series_equal(df_agg_nd.set_index('sy').value,
+                                       val_exp)
+
+
+if __name__ == '__main__':
+    unittest.main()